@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""Time of the pure Python similarity algorithms with an inferred premise
+schema, comparing the categorical premises with bitmaps versus calling the
+categorical distance premise by premise.
+
+Usage: python -m benchmarks.bench_categorical [scale_factor]
+"""
+import os
+import sys
+from copy import deepcopy
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.premise_schema import AttributeKind, PremiseSchema, categorical_distance
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    cases = list(cbr.get_all_cases_list())
+    cbr.schema = PremiseSchema.infer(cases)
+    # The same schema without the bitmap path: the categorical distance is called premise by premise
+    distance_schema = deepcopy(cbr.schema)
+    for attribute in distance_schema.attributes.values():
+        if attribute.kind == AttributeKind.CATEGORICAL:
+            attribute.kind = AttributeKind.TEXT
+            attribute._distance = categorical_distance
+    queries = [a_case.problem.context.premises for a_case in cases[:50]]
+    print("cases:", len(cases), "categorical premises:", len(cbr.schema.get_categorical_ids()))
+
+    for function in (sim_algs.normalized_euclidean_similarity, sim_algs.weighted_euclidean_similarity,
+                     sim_algs.normalized_tversky_similarity):
+        start = perf_counter()
+        for premises in queries:
+            function(premises, cases, schema=distance_schema)
+        distances = (perf_counter() - start) / len(queries)
+        bitmaps = cbr.get_categorical_bitmaps(queries[0], cases)
+        start = perf_counter()
+        for premises in queries:
+            function(premises, cases, schema=cbr.schema, bitmaps=bitmaps)
+        bitmap = (perf_counter() - start) / len(queries)
+        print("{}: distances {:.2f} ms, bitmaps {:.2f} ms ({:.1f}x)".format(function.__name__, distances * 1e3,
+                                                                           bitmap * 1e3, distances / bitmap))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Time of loading domain and argument case-bases of growing size, to check
+that the duplicate detection of add_case keeps the loading near-linear.
+
+Usage: python -m benchmarks.bench_loading [max_scale_factor]
+"""
+import os
+import sys
+from pickle import dump
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_argument_cases, scaled_domain_cases
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+
+def write_cases(cases: list, file_path: str):
+    with open(file_path, 'wb') as fh:
+        for a_case in cases:
+            dump(a_case, fh)
+
+
+def main():
+    logger.remove()
+    max_factor = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "cases.dat")
+        for factor in sorted({1, max_factor // 2, max_factor} - {0}):
+            write_cases(scaled_domain_cases(factor), file_path)
+            start = perf_counter()
+            cbr = DomainCBR(file_path, os.devnull, -1)
+            domain_time = perf_counter() - start
+            domain_cases = len(cbr.get_all_cases_list())
+
+            write_cases(scaled_argument_cases(factor), file_path)
+            start = perf_counter()
+            arg_cbr = ArgCBR(file_path, os.devnull)
+            argument_time = perf_counter() - start
+            print("x{}: {} domain cases in {:.3f} s, {} argument cases in {:.3f} s".format(
+                factor, domain_cases, domain_time, len(arg_cbr.get_all_cases_list()), argument_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""Time of the weighted Euclidean retrieval with and without the KD-tree of
+the numeric premises (Configuration.domain_cbrs_numeric_index), with a
+similarity threshold and with k most similar cases. Both return the same
+cases.
+
+Usage: python -m benchmarks.bench_numeric_index [scale_factor] [threshold] [k]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    cases = cbr.get_all_cases_list()
+    queries = [a_case.problem.context.premises for a_case in cases[::max(1, len(cases) // 50)]]
+    print("cases:", len(cases), "queries:", len(queries))
+
+    start = perf_counter()
+    cbr.get_numeric_tree()
+    print("tree built in {:.3f} s".format(perf_counter() - start))
+    for label, options in (("threshold {}".format(threshold), {}), ("k {}".format(k), {"k": k})):
+        results = {}
+        for numeric_index in (False, True):
+            domain_cbr.Configuration = lambda: Configuration(domain_cbrs_numeric_index=numeric_index)
+            start = perf_counter()
+            results[numeric_index] = [
+                [(id(c.case), c.similarity) for c in cbr.get_most_similar(
+                    premises, threshold if not options else 0.0, SimilarityType.WEIGHTED_EUCLIDEAN, **options)]
+                for premises in queries]
+            elapsed = (perf_counter() - start) / len(queries)
+            print("{}, numeric index {}: {:.2f} ms/retrieval".format(label, numeric_index, elapsed * 1e3))
+        assert results[False] == results[True]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""Time of the pure Python similarity algorithms scoring a big list of
+candidates sequentially versus in a pool of worker processes.
+
+Usage: python -m benchmarks.bench_parallel [scale_factor] [workers]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.agents.parallel_similarity import ParallelScorer
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    cases = cbr.get_all_cases_list()
+    queries = [a_case.problem.context.premises for a_case in cases[:5]]
+    print("cases:", len(cases), "workers:", workers)
+
+    scorer = ParallelScorer(cases, workers=workers)
+    scorer.most_similar(queries[0], cases, SimilarityType.WEIGHTED_EUCLIDEAN)  # Start the workers
+    for similarity_type in SimilarityType:
+        start = perf_counter()
+        for premises in queries:
+            cbr.get_most_similar_candidates(premises, cases, 0.5, similarity_type)
+        sequential = (perf_counter() - start) / len(queries)
+        start = perf_counter()
+        for premises in queries:
+            scorer.most_similar(premises, cases, similarity_type, 0.5)
+        parallel = (perf_counter() - start) / len(queries)
+        print("{}: sequential {:.0f} ms, parallel {:.0f} ms ({:.1f}x)".format(
+            similarity_type.name, sequential * 1e3, parallel * 1e3, sequential / parallel))
+    scorer.shutdown()
+
+
+if __name__ == '__main__':
+    main()
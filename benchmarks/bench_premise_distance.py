@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""Per-comparison cost of the premise distance, parsing the contents on every
+call (:func:`do_dist`) versus comparing the typed values cached in the
+premises (:func:`typed_dist`).
+
+Usage: python -m benchmarks.bench_premise_distance [domain_cases_file]
+"""
+import os
+import sys
+from timeit import timeit
+
+from loguru import logger
+
+from pyargcbr.agents.metrics import do_dist, typed_dist
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+
+def premise_pairs(file_path: str):
+    """Pairs of premises with the same ID of every two cases of the case-base"""
+    cases = DomainCBR(file_path, os.devnull, -1).get_all_cases_list()
+    pairs = []
+    for case1 in cases:
+        for case2 in cases:
+            premises2 = case2.problem.context.premises
+            for premise_id, premise1 in case1.problem.context.premises.items():
+                premise2 = premises2.get(premise_id)
+                if premise2:
+                    pairs.append((premise1, premise2))
+    return pairs
+
+
+def main():
+    logger.remove()
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "tests/domain_cases_py.dat"
+    pairs = premise_pairs(file_path)
+    for premise1, premise2 in pairs:  # Parse (and cache) the typed values before timing
+        premise1.typed_content, premise2.typed_content
+
+    before = timeit(lambda: [do_dist(p1.content, p2.content) for p1, p2 in pairs], number=3) / 3
+    after = timeit(lambda: [typed_dist(p1.typed_content, p2.typed_content) for p1, p2 in pairs], number=3) / 3
+    print("comparisons:", len(pairs))
+    print("do_dist (parse every call): {:.3f} us/comparison".format(before / len(pairs) * 1e6))
+    print("typed_dist (cached values): {:.3f} us/comparison".format(after / len(pairs) * 1e6))
+    print("speedup: {:.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
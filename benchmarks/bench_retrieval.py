@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+"""Time of DomainCBR.get_most_similar querying every case of a domain
+case-base with every similarity algorithm.
+
+Usage: python -m benchmarks.bench_retrieval [domain_cases_file] [repetitions]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+
+def main():
+    logger.remove()
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "tests/domain_cases_py.dat"
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    cbr = DomainCBR(file_path, os.devnull, -1)
+    cases = cbr.get_all_cases_list()
+    for similarity_type in SimilarityType:
+        start = perf_counter()
+        for _ in range(repetitions):
+            for a_case in cases:
+                cbr.get_most_similar(a_case.problem.context.premises, 0.0, similarity_type)
+        elapsed = (perf_counter() - start) / repetitions
+        print("{}: {:.2f} ms/retrieval ({} cases)".format(similarity_type.name, elapsed / len(cases) * 1e3,
+                                                          len(cases)))
+
+
+if __name__ == '__main__':
+    main()
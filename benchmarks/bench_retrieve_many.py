@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""Throughput of DomainCBR.retrieve_many (NumPy engine) for different batch
+sizes, compared with calling retrieve in a loop.
+
+Usage: python -m benchmarks.bench_retrieve_many [scale_factor]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityEngine, SimilarityType
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    queries = [a_case.problem.context.premises for a_case in cbr.get_all_cases_list()]
+    print("cases:", len(queries))
+
+    start = perf_counter()
+    for premises in queries[:200]:
+        cbr.get_most_similar(premises, 0.5, SimilarityType.NORMALIZED_EUCLIDEAN, SimilarityEngine.NUMPY)
+    loop = (perf_counter() - start) / 200
+    print("loop of get_most_similar: {:.0f} queries/s".format(1 / loop))
+
+    matrix = cbr.get_case_matrix()
+    for batch_size in (1, 10, 100, 1000):
+        batch = queries[:batch_size]
+        groups = {}
+        for premises in batch:
+            groups.setdefault(cbr.get_candidate_key(premises), []).append(premises)
+        start = perf_counter()
+        for group in groups.values():
+            matrix.similarity_many(group, cbr.get_candidate_cases(group[0]), SimilarityType.NORMALIZED_EUCLIDEAN,
+                                   0.5)
+        elapsed = perf_counter() - start
+        print("retrieve_many, batch of {}: {:.0f} queries/s".format(len(batch), len(batch) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""Write throughput of case-base snapshots: one buffered handle for the
+whole case-base versus opening the file for every case.
+
+Usage: python -m benchmarks.bench_snapshot [scale_factor]
+"""
+import os
+import sys
+from pickle import dump
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.cbrs.case_snapshot import write_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+
+def write_per_case(cases: list, file_path: str):
+    open(file_path, 'wb').close()
+    for a_case in cases:
+        with open(file_path, 'ab') as fh:
+            dump(a_case, fh)
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cases = scaled_domain_cases(factor)
+    with TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "cases.dat")
+        start = perf_counter()
+        write_per_case(cases, file_path)
+        per_case = perf_counter() - start
+        size = os.path.getsize(file_path)
+        print("per case: {} cases, {:.1f} MB in {:.3f} s ({:.1f} MB/s)".format(
+            len(cases), size / 1e6, per_case, size / 1e6 / per_case))
+
+        statistics = write_snapshot(cases, file_path)
+        print("snapshot: {} cases, {:.1f} MB in {:.3f} s ({:.1f} MB/s)".format(
+            statistics.cases, statistics.bytes_written / 1e6, statistics.seconds,
+            statistics.bytes_per_second / 1e6))
+        print("loaded cases:", len(DomainCBR(file_path, os.devnull, -1).get_all_cases_list()))
+
+
+if __name__ == '__main__':
+    main()
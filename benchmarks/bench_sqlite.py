@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""Domain case-bases of growing size held in memory (DomainCBR) and in a
+SQLite database (SQLiteDomainCBR): time of loading them (importing them into
+the database the first time, and opening it again), mean time of a
+retrieval and peak memory of the process. Every measure runs in a new
+process.
+
+Usage: python -m benchmarks.bench_sqlite [max_cases] [index] [queries]
+"""
+import os
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Tuple
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.cbrs.case_snapshot import write_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.cbrs.sqlite_cbrs import SQLiteDomainCBR
+
+
+def measure(file_path: str, database_path: str, index: int, queries: int) -> Tuple[float, float, float]:
+    """Loads the case-base (in the database, if a path is given) and
+    retrieves the cases similar to the first queries cases. Returns the
+    seconds of the load, the mean seconds of a retrieval and the peak
+    resident memory in MB"""
+    logger.remove()
+    start = perf_counter()
+    if database_path:
+        cbr = SQLiteDomainCBR(file_path, os.devnull, index, database_path=database_path)
+    else:
+        cbr = DomainCBR(file_path, os.devnull, index)
+    load_time = perf_counter() - start
+    query_cases = scaled_domain_cases(1)[:queries]
+    start = perf_counter()
+    for a_case in query_cases:
+        cbr.retrieve(a_case.problem.context.premises, 0.5)
+    retrieval_time = (perf_counter() - start) / len(query_cases)
+    return load_time, retrieval_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    logger.remove()
+    max_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    index = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    sizes = [size for size in (10000, 100000, 1000000) if size <= max_cases] or [max_cases]
+    with TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "cases.dat")
+        for size in sizes:
+            cases = scaled_domain_cases(-(-size // 48))  # The test case-base has 48 cases
+            write_snapshot(cases, file_path)
+            del cases
+            database_path = os.path.join(directory, "cases{}.db".format(size))
+            for name, path in (("memory", ""), ("sqlite import", database_path), ("sqlite reopen", database_path)):
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    load_time, retrieval_time, memory = executor.submit(measure, file_path, path, index,
+                                                                        queries).result()
+                print("{} cases, {}: load {:.2f} s, retrieval {:.2f} ms, peak memory {:.0f} MB{}".format(
+                    size, name, load_time, retrieval_time * 1000, memory,
+                    ", database {:.1f} MB".format(os.path.getsize(path) / 1e6) if path else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Startup time of an agent (building its ArgCBR and DomainCBR) and time of
+its first retrieval, from pickle and from columnar snapshots of growing
+size. Every startup runs in a new process, so the memory left by the
+previous ones does not change the result.
+
+Usage: python -m benchmarks.bench_startup [max_scale_factor]
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Tuple
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_argument_cases, scaled_domain_cases
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_snapshot import write_snapshot
+from pyargcbr.cbrs.columnar_snapshot import write_columnar_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+
+def start_agent(domain_file: str, argument_file: str) -> Tuple[float, float, int]:
+    """Builds the CBRs of an agent and retrieves the cases similar to the
+    first one. Returns the seconds of the startup, the seconds of the
+    retrieval and the number of cases retrieved"""
+    logger.remove()
+    start = perf_counter()
+    domain_cbr = DomainCBR(domain_file, os.devnull, -1)
+    ArgCBR(argument_file, os.devnull)
+    startup_time = perf_counter() - start
+    premises = domain_cbr.get_all_cases_list()[0].problem.context.premises
+    start = perf_counter()
+    similar_cases = domain_cbr.retrieve(premises, 0.5)
+    for similar_case in similar_cases:
+        similar_case.case.solutions  # Materializes the lazy cases
+    return startup_time, perf_counter() - start, len(similar_cases)
+
+
+def main():
+    logger.remove()
+    max_factor = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with TemporaryDirectory() as directory:
+        files = {snapshot_format: (os.path.join(directory, "domain." + snapshot_format),
+                                   os.path.join(directory, "arguments." + snapshot_format))
+                 for snapshot_format in ("pickle", "columnar")}
+        for factor in sorted({1, max_factor // 2, max_factor} - {0}):
+            domain_cases, argument_cases = scaled_domain_cases(factor), scaled_argument_cases(factor)
+            write_snapshot(domain_cases, files["pickle"][0])
+            write_snapshot(argument_cases, files["pickle"][1])
+            write_columnar_snapshot(domain_cases, files["columnar"][0], DomainCBR.snapshot_key)
+            write_columnar_snapshot(argument_cases, files["columnar"][1], ArgCBR.snapshot_key)
+            for snapshot_format, (domain_file, argument_file) in files.items():
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    startup_time, retrieval_time, retrieved = executor.submit(
+                        start_agent, domain_file, argument_file).result()
+                print("x{} {}: {} domain and {} argument cases ({:.1f} MB), startup {:.3f} s, "
+                      "first retrieval {:.4f} s ({} cases)".format(
+                          factor, snapshot_format, len(domain_cases), len(argument_cases),
+                          (os.path.getsize(domain_file) + os.path.getsize(argument_file)) / 1e6,
+                          startup_time, retrieval_time, retrieved))
+
+
+if __name__ == '__main__':
+    main()
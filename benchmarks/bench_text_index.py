@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""Time of the weighted Euclidean retrieval with and without the BK-trees of
+the text premises (Configuration.domain_cbrs_text_index), alone and with the
+KD-tree of the numeric premises, with a similarity threshold and with k most
+similar cases. All of them return the same cases.
+
+Usage: python -m benchmarks.bench_text_index [scale_factor] [threshold] [k]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+MODES = (("no index", {}), ("text index", {"domain_cbrs_text_index": True}),
+         ("text and numeric index", {"domain_cbrs_text_index": True, "domain_cbrs_numeric_index": True}))
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    cases = cbr.get_all_cases_list()
+    queries = [a_case.problem.context.premises for a_case in cases[::max(1, len(cases) // 50)]]
+    print("cases:", len(cases), "queries:", len(queries))
+
+    start = perf_counter()
+    text_index = cbr.get_text_index()
+    print("text index built in {:.3f} s, {} distinct contents".format(
+        perf_counter() - start, sum(len(tree.values) for tree in text_index.trees.values())))
+    cbr.get_numeric_tree()
+    for label, options in (("threshold {}".format(threshold), {}), ("k {}".format(k), {"k": k})):
+        results = []
+        for mode, configuration in MODES:
+            domain_cbr.Configuration = lambda: Configuration(**configuration)
+            start = perf_counter()
+            results.append([
+                [(id(c.case), c.similarity) for c in cbr.get_most_similar(
+                    premises, threshold if not options else 0.0, SimilarityType.WEIGHTED_EUCLIDEAN, **options)]
+                for premises in queries])
+            elapsed = (perf_counter() - start) / len(queries)
+            print("{}, {}: {:.2f} ms/retrieval".format(label, mode, elapsed * 1e3))
+        assert all(result == results[0] for result in results)
+
+
+if __name__ == '__main__':
+    main()
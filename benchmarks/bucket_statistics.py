@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+"""Sizes of the buckets of a composite hash index of a domain case-base, to
+choose the premise IDs of its key, and time of the retrieval with it.
+
+Usage: python -m benchmarks.bucket_statistics [domain_cases_file] [premise_id ...]
+"""
+import os
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+
+def main():
+    logger.remove()
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "tests/domain_cases_py.dat"
+    premise_ids = [int(premise_id) for premise_id in sys.argv[2:]] or [0]
+    cbr = DomainCBR(file_path, os.devnull, premise_ids)
+    cases = cbr.get_all_cases_list()
+    print("cases:", len(cases))
+    for statistics in cbr.get_bucket_statistics():
+        print("{}: {} buckets, size min {} max {} mean {:.1f} median {:.1f}".format(
+            statistics.premise_ids, statistics.buckets, statistics.min_size, statistics.max_size,
+            statistics.mean_size, statistics.median_size))
+
+    start = perf_counter()
+    candidates = 0
+    for a_case in cases:
+        candidates += len(cbr.get_candidate_cases(a_case.problem.context.premises))
+        cbr.get_most_similar(a_case.problem.context.premises, 0.0, SimilarityType.NORMALIZED_EUCLIDEAN)
+    elapsed = (perf_counter() - start) / len(cases)
+    print("{:.2f} ms/retrieval, {:.1f} candidates/retrieval".format(elapsed * 1e3, candidates / len(cases)))
+
+
+if __name__ == '__main__':
+    main()
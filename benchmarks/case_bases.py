@@ -0,0 +1,71 @@
+"""Helpers to build bigger case-bases from the ones shipped with the tests"""
+from copy import deepcopy
+from pickle import load
+from random import Random
+from typing import List
+
+from pyargcbr.knowledge_resources.argument_case import ArgumentCase
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+DOMAIN_CASES_FILE = "tests/domain_cases_py.dat"
+ARGUMENT_CASES_FILE = "tests/argument_cases_py.dat"
+
+
+def load_cases(file_path: str) -> list:
+    """Loads every case pickled in the given file"""
+    cases = []
+    with open(file_path, 'rb') as fh:
+        while True:
+            try:
+                aux = load(fh)
+            except EOFError:
+                break
+            if type(aux) in (DomainCase, ArgumentCase):
+                cases.append(aux)
+    return cases
+
+
+def mutate_content(content: str, rnd: Random) -> str:
+    """Returns a content similar to the given one: numbers are shifted and
+    some strings get a suffix"""
+    try:
+        return str(int(content) + rnd.randint(-50, 50))
+    except ValueError:
+        pass
+    if rnd.random() < 0.3:
+        return content + "_" + str(rnd.randint(0, 9))
+    return content
+
+
+def scaled_domain_cases(factor: int, file_path: str = DOMAIN_CASES_FILE, seed: int = 0) -> List[DomainCase]:
+    """Returns factor copies of each domain case of the file, with the
+    content of their premises mutated (except for the first copy)"""
+    rnd = Random(seed)
+    cases = load_cases(file_path)
+    scaled = list(cases)
+    for _ in range(factor - 1):
+        for a_case in cases:
+            new_case = deepcopy(a_case)
+            for premise in new_case.problem.context.premises.values():
+                premise.content = mutate_content(premise.content, rnd)
+            scaled.append(new_case)
+    return scaled
+
+
+def scaled_argument_cases(factor: int, file_path: str = ARGUMENT_CASES_FILE, seed: int = 0) -> List[ArgumentCase]:
+    """Returns factor copies of each argument case of the file, with the
+    content of their premises mutated and new IDs (except for the first
+    copy)"""
+    rnd = Random(seed)
+    cases = load_cases(file_path)
+    scaled = list(cases)
+    next_id = max(int(a_case.id) for a_case in cases) + 1  # The IDs of the shipped cases are numeric strings
+    for _ in range(factor - 1):
+        for a_case in cases:
+            new_case = deepcopy(a_case)
+            new_case.id = str(next_id)
+            next_id += 1
+            for premise in new_case.problem.context.premises.values():
+                premise.content = mutate_content(premise.content, rnd)
+            scaled.append(new_case)
+    return scaled
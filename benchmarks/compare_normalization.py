@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+"""Ranking agreement between the normalization of the distances by the
+candidates of each query (the default) and by the global ranges of the
+premises, and time of both modes with a similarity threshold (the global
+mode prunes the candidates that cannot reach it).
+
+For every query it reports whether both modes rank the same case first, the
+overlap of their 5 most similar cases and the Kendall tau of the complete
+rankings.
+
+Usage: python -m benchmarks.compare_normalization [scale_factor] [threshold]
+"""
+import os
+import sys
+from itertools import combinations
+from time import perf_counter
+from typing import List
+
+from loguru import logger
+
+from benchmarks.case_bases import scaled_domain_cases
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode, SimilarityType
+from pyargcbr.knowledge_resources.similar_domain_case import SimilarDomainCase
+
+
+def kendall_tau(a: List[SimilarDomainCase], b: List[SimilarDomainCase]) -> float:
+    """Kendall tau-a between the similarities given to the same cases"""
+    a_similarities = {id(c.case): c.similarity for c in a}
+    pairs = [(a_similarities[id(c.case)], c.similarity) for c in b]
+    concordant = discordant = 0
+    for (x1, y1), (x2, y2) in combinations(pairs, 2):
+        sign = (x1 - x2) * (y1 - y2)
+        if sign > 0:
+            concordant += 1
+        elif sign < 0:
+            discordant += 1
+    total = len(pairs) * (len(pairs) - 1) / 2
+    return (concordant - discordant) / total if total else 1.0
+
+
+def main():
+    logger.remove()
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    cbr = DomainCBR(os.devnull, os.devnull, -1)
+    for a_case in scaled_domain_cases(factor):
+        cbr.add_case(a_case)
+    cases = cbr.get_all_cases_list()
+    queries = [a_case.problem.context.premises for a_case in cases[:50]]
+    print("cases:", len(cases), "queries:", len(queries), "threshold:", threshold)
+
+    for similarity_type in (SimilarityType.NORMALIZED_EUCLIDEAN, SimilarityType.NORMALIZED_TVERSKY):
+        top1 = top5 = tau = 0.0
+        for premises in queries:
+            candidates_cases = cbr.get_most_similar(premises, 0.0, similarity_type)
+            global_cases = cbr.get_most_similar(premises, 0.0, similarity_type,
+                                                normalization=NormalizationMode.GLOBAL_RANGE)
+            top1 += candidates_cases[0].case is global_cases[0].case
+            top5 += len({id(c.case) for c in candidates_cases[:5]} & {id(c.case) for c in global_cases[:5]}) / 5
+            tau += kendall_tau(candidates_cases, global_cases)
+        print("{}: top-1 agreement {:.2f}, top-5 overlap {:.2f}, Kendall tau {:.3f}".format(
+            similarity_type.name, top1 / len(queries), top5 / len(queries), tau / len(queries)))
+
+        for mode in NormalizationMode:
+            start = perf_counter()
+            selected = 0
+            for premises in queries:
+                selected += len(cbr.get_most_similar(premises, threshold, similarity_type, normalization=mode))
+            elapsed = (perf_counter() - start) / len(queries)
+            print("    {}: {:.2f} ms/retrieval, {:.1f} cases selected".format(mode.name, elapsed * 1e3,
+                                                                            selected / len(queries)))
+
+
+if __name__ == '__main__':
+    main()
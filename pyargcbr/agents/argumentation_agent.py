@@ -412,9 +412,9 @@ class ArgAgent(Agent):
                         support_domain_cases: List[DomainCase] = [similar_domain_case.case]
 
                         for similar_domain_case2 in self.similar_domain_cases:
-                            for solution2 in similar_domain_case2.case.solutions:
-                                if (solution2.conclusion.id == solution.conclusion.id
-                                    and solution2.value == solution.value):
+                            solutions2 = similar_domain_case2.case.get_solutions_by_conclusion()
+                            for solution2 in solutions2.get(solution.conclusion.id, ()):
+                                if solution2.value == solution.value:
                                     support_domain_cases.append(similar_domain_case2)
                                     similar_domain_case2.case.remove_solution(solution2)
 
@@ -660,9 +660,10 @@ class ArgAgent(Agent):
                                                      justification=argument_justification,
                                                      solution=argument_solution)
             # Add argument case with the domain cases to the list of potential attacks
-            arg_cases.append(SimilarArgumentCase(arg_case_from_domain_case, self.domain_cbr.get_premises_similarity(
-                my_pos_premises, self.current_position.domain_cases[i].problem.context.premises
-            )))
+            arg_cases.append(SimilarArgumentCase(
+                arg_case_from_domain_case, self.domain_cbr.get_cached_premises_similarity(
+                    my_pos_premises, self.current_position.domain_cases[i].problem.context.premises
+                )))
 
         # This list contains positions that represent the different argument-cases
         # extracted just to calculate the degrees with the function get_degrees()
@@ -1491,8 +1492,9 @@ class ArgAgent(Agent):
             return False
 
     def finish_dialogue(self):
-        """Actions to be executed when the dialogue has to finish"""
-        pass
+        """Actions to be executed when the dialogue has to finish: the domain
+        cases retained during the dialogue are added to the case-base"""
+        self.domain_cbr.apply_retention_queue()
 
     def do_send_position(self, msg: Message):
         """Prepares a message with the position defended by the agent
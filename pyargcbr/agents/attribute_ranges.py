@@ -0,0 +1,271 @@
+from dataclasses import dataclass, field
+from heapq import heapify, heappop, heappush
+from typing import Dict, List, Optional
+
+from .metrics import NUMERIC_KINDS, ValueKind
+from .premise_schema import AttributeKind, NUMERIC_ATTRIBUTE_KINDS, PremiseSchema
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+
+class ValueCounts:
+    """Multiset of the values of an attribute in the case-base, with lazy
+    heaps of its smallest and greatest values, so a value is removed in
+    O(log n) and the limits are found without scanning the cases. The heaps
+    keep the values until they reach the top, and are built again when they
+    hold too many removed ones"""
+
+    def __init__(self):
+        self.counts: Dict[float, int] = {}  # value -> number of cases with it
+        self.low: List[float] = []  # min-heap of the values
+        self.high: List[float] = []  # min-heap of the negated values
+
+    def add(self, value: float):
+        """Adds a value to the multiset
+
+        Args:
+            value (float): The value of a case
+        """
+        count = self.counts.get(value, 0)
+        self.counts[value] = count + 1
+        if not count:
+            heappush(self.low, value)
+            heappush(self.high, -value)
+
+    def remove(self, value: float):
+        """Removes a value from the multiset
+
+        Args:
+            value (float): The value of a removed case, which must be in the
+                multiset
+        """
+        count = self.counts[value]
+        if count > 1:
+            self.counts[value] = count - 1
+            return
+        del self.counts[value]
+        if len(self.low) > 2 * len(self.counts) + 16:
+            self.low = list(self.counts)
+            heapify(self.low)
+            self.high = [-value for value in self.counts]
+            heapify(self.high)
+
+    def min(self) -> Optional[float]:
+        """Returns the smallest value, None if the multiset is empty"""
+        low = self.low
+        while low and low[0] not in self.counts:
+            heappop(low)
+        return low[0] if low else None
+
+    def max(self) -> Optional[float]:
+        """Returns the greatest value, None if the multiset is empty"""
+        high = self.high
+        while high and -high[0] not in self.counts:
+            heappop(high)
+        return -high[0] if high else None
+
+
+@dataclass
+class AttributeRange:
+    """The range of the contents of a premise in the case-base: the limits of
+    its numbers and timestamps and the length of its longest content. The
+    ranges built from the cases also count their values (and the cases with
+    the premise) so they can shrink when a case is removed; the merged ones
+    and the pickled ones only keep the limits. NaN numbers are ignored"""
+    min_number: Optional[float] = None
+    max_number: Optional[float] = None
+    min_timestamp: Optional[float] = None
+    max_timestamp: Optional[float] = None
+    max_length: int = 0
+    cases: int = field(default=0, compare=False, repr=False)
+    numbers: Optional[ValueCounts] = field(default=None, compare=False, repr=False)
+    timestamps: Optional[ValueCounts] = field(default=None, compare=False, repr=False)
+    lengths: Optional[ValueCounts] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def counted(cls) -> "AttributeRange":
+        """Returns an empty range that counts the values added to it"""
+        return cls(numbers=ValueCounts(), timestamps=ValueCounts(), lengths=ValueCounts())
+
+    def __getstate__(self):
+        return dict(self.__dict__, numbers=None, timestamps=None, lengths=None)
+
+    def add_premise(self, premise: Premise):
+        """Extends the range with the content of a premise
+
+        Args:
+            premise (Premise): A premise with the ID of this attribute
+        """
+        self.cases += 1
+        value = premise.typed_content
+        if value.kind in NUMERIC_KINDS and value.value == value.value:
+            if self.min_number is None or value.value < self.min_number:
+                self.min_number = value.value
+            if self.max_number is None or value.value > self.max_number:
+                self.max_number = value.value
+            if self.numbers is not None:
+                self.numbers.add(value.value)
+        elif value.kind == ValueKind.TIMESTAMP:
+            if self.min_timestamp is None or value.value < self.min_timestamp:
+                self.min_timestamp = value.value
+            if self.max_timestamp is None or value.value > self.max_timestamp:
+                self.max_timestamp = value.value
+            if self.timestamps is not None:
+                self.timestamps.add(value.value)
+        if len(premise.content) > self.max_length:
+            self.max_length = len(premise.content)
+        if self.lengths is not None:
+            self.lengths.add(len(premise.content))
+
+    def remove_premise(self, premise: Premise):
+        """Shrinks the range, if needed, without the content of a premise
+
+        Args:
+            premise (Premise): A premise with the ID of this attribute that
+                was added to the range
+
+        Raises:
+            ValueError: If the range does not count its values
+        """
+        if self.lengths is None:
+            raise ValueError("The range does not count its values")
+        self.cases -= 1
+        value = premise.typed_content
+        if value.kind in NUMERIC_KINDS and value.value == value.value:
+            self.numbers.remove(value.value)
+            if value.value in (self.min_number, self.max_number):
+                self.min_number, self.max_number = self.numbers.min(), self.numbers.max()
+        elif value.kind == ValueKind.TIMESTAMP:
+            self.timestamps.remove(value.value)
+            if value.value in (self.min_timestamp, self.max_timestamp):
+                self.min_timestamp, self.max_timestamp = self.timestamps.min(), self.timestamps.max()
+        self.lengths.remove(len(premise.content))
+        if len(premise.content) == self.max_length:
+            self.max_length = self.lengths.max() or 0
+
+    def merge(self, other: "AttributeRange"):
+        """Extends the range with another one of the same attribute. The
+        range stops counting its values, since the ones of the other part are
+        not known
+
+        Args:
+            other (AttributeRange): The range of another part of the case-base
+        """
+        for low, high in (("min_number", "max_number"), ("min_timestamp", "max_timestamp")):
+            if getattr(other, low) is not None:
+                if getattr(self, low) is None or getattr(other, low) < getattr(self, low):
+                    setattr(self, low, getattr(other, low))
+                if getattr(self, high) is None or getattr(other, high) > getattr(self, high):
+                    setattr(self, high, getattr(other, high))
+        self.max_length = max(self.max_length, other.max_length)
+        self.cases += other.cases
+        self.numbers = self.timestamps = self.lengths = None
+
+
+class AttributeRanges:
+    """Ranges of the premises of a domain case-base, kept up to date when
+    the cases are added or removed. They give, for a query premise, an upper bound of
+    its distance to the same premise of any case, which is used to normalize
+    the distances independently of the candidates of each query (see
+    :func:`similarity_algorithms.global_range_euclidean_similarity`)
+    """
+
+    def __init__(self):
+        self.ranges: Dict[int, AttributeRange] = {}  # premise id -> range of its contents
+        self.version = 0  # Increased with every change of the ranges
+
+    def add_case(self, new_case: DomainCase):
+        """Extends the ranges with the premises of a domain case
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+        """
+        self.version += 1
+        for premise_id, premise in new_case.problem.context.premises.items():
+            attribute_range = self.ranges.get(premise_id)
+            if attribute_range is None:
+                attribute_range = self.ranges[premise_id] = AttributeRange.counted()
+            attribute_range.add_premise(premise)
+
+    def remove_case(self, old_case: DomainCase):
+        """Shrinks the ranges after a domain case is removed, using the
+        counts of their values (see :class:`ValueCounts`). The range of a
+        premise that no case has any longer is deleted
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+
+        Raises:
+            ValueError: If some range of the case does not count its values
+                (it was merged from another part of the case-base)
+        """
+        self.version += 1
+        for premise_id, premise in old_case.problem.context.premises.items():
+            attribute_range = self.ranges[premise_id]
+            attribute_range.remove_premise(premise)
+            if not attribute_range.cases:
+                del self.ranges[premise_id]
+
+    def set_range(self, premise_id: int, attribute_range: Optional[AttributeRange]):
+        """Replaces the range of a premise with one computed elsewhere (see
+        :meth:`CaseDatabase.get_attribute_range`)
+
+        Args:
+            premise_id (int): The premise ID
+            attribute_range (Optional[AttributeRange]): The new range, or
+                None if no case has the premise any longer
+        """
+        self.version += 1
+        if attribute_range is None:
+            self.ranges.pop(premise_id, None)
+        else:
+            self.ranges[premise_id] = attribute_range
+
+    def merge(self, other: "AttributeRanges"):
+        """Extends the ranges with the ones of another part of the case-base
+        (see :class:`ShardedDomainCBR`)
+
+        Args:
+            other (AttributeRanges): The ranges of the other part
+        """
+        self.version += 1
+        for premise_id, other_range in other.ranges.items():
+            attribute_range = self.ranges.get(premise_id)
+            if attribute_range is None:
+                attribute_range = self.ranges[premise_id] = AttributeRange()
+            attribute_range.merge(other_range)
+
+    def max_distance(self, premise: Premise, schema: Optional[PremiseSchema] = None) -> float:
+        """Returns an upper bound of the distance between a premise and the
+        premise with the same ID of any case of the case-base: the greatest
+        difference with the limits of the numbers (or timestamps) and the
+        greatest Levenshtein distance allowed by the lengths of the contents
+
+        Args:
+            premise (Premise): The query premise
+            schema (Optional[PremiseSchema]): The premise schema whose
+                distance functions are used, if any
+
+        Returns:
+            float: The upper bound, 0.0 if no case has the premise
+        """
+        attribute = schema.get_attribute(premise.id) if schema is not None else None
+        if attribute is not None and attribute.kind == AttributeKind.CATEGORICAL:
+            return 1.0
+        attribute_range = self.ranges.get(premise.id)
+        if attribute_range is None:
+            return 0.0
+        bound = float(max(len(premise.content), attribute_range.max_length))
+        value = premise.typed_content
+        if value.kind in NUMERIC_KINDS:
+            low, high = attribute_range.min_number, attribute_range.max_number
+        elif value.kind == ValueKind.TIMESTAMP:
+            low, high = attribute_range.min_timestamp, attribute_range.max_timestamp
+        else:
+            low = high = None
+        if low is not None:
+            spread = max(value.value - low, high - value.value)
+            if attribute is not None and attribute.kind in NUMERIC_ATTRIBUTE_KINDS:
+                spread /= attribute.get_range()
+            bound = max(bound, spread)
+        return bound
@@ -0,0 +1,121 @@
+from operator import is_
+from typing import AbstractSet, Dict, Iterable, List, Sequence
+
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+
+def count_bits(bitmaps: Iterable[int], num_cases: int) -> List[int]:
+    """Counts how many of the given bitmaps have each bit set. The bitmaps are
+    added with bitwise operations into a bit-sliced counter (plane j holds
+    the bit j of the count of every position), so each addition processes
+    all the positions at once
+
+    Args:
+        bitmaps (Iterable[int]): The bitmaps to count
+        num_cases (int): The number of positions of the bitmaps
+
+    Returns:
+        List[int]: The count of each position
+    """
+    planes: List[int] = []
+    for carry in bitmaps:
+        for j, plane in enumerate(planes):
+            planes[j] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    counts = [0] * num_cases
+    for j, plane in enumerate(planes):
+        value = 1 << j
+        bits = format(plane, 'b').zfill(num_cases)[::-1]
+        counts = [count + value if bit == '1' else count for count, bit in zip(counts, bits)]
+    return counts
+
+
+class CategoricalBitmaps:
+    """Bitmaps of the contents of the categorical premises of a list of
+    candidate domain cases. For every premise ID and content, the bit i of
+    its bitmap is set if the candidate in position i has that premise with
+    that content, so the candidates that match (or not) a query premise are
+    obtained with a single bitwise operation
+    """
+
+    def __init__(self, candidate_cases: Sequence[DomainCase], premise_ids: AbstractSet[int]):
+        """
+        Args:
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases,
+                in the order of the positions of the bitmaps
+            premise_ids (AbstractSet[int]): The IDs of the categorical premises
+        """
+        self.premise_ids = frozenset(premise_ids)
+        self.cases: List[DomainCase] = list(candidate_cases)
+        self.num_cases = len(candidate_cases)
+        self.bitmaps: Dict[int, Dict[str, int]] = {}  # premise id -> content -> bitmap
+        positions: Dict[int, Dict[str, List[int]]] = {premise_id: {} for premise_id in self.premise_ids}
+        for position, a_case in enumerate(candidate_cases):
+            for premise_id, premise in a_case.problem.context.premises.items():
+                contents = positions.get(premise_id)
+                if contents is not None:
+                    contents.setdefault(premise.content, []).append(position)
+        for premise_id, contents in positions.items():
+            self.bitmaps[premise_id] = {content: self.to_bitmap(content_positions)
+                                        for content, content_positions in contents.items()}
+
+    def to_bitmap(self, positions: Iterable[int]) -> int:
+        """Returns the bitmap with the given positions set"""
+        bits = bytearray((self.num_cases + 7) // 8)
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, 'little')
+
+    def add_case(self, new_case: DomainCase):
+        """Adds a domain case at the end of the candidates
+
+        Args:
+            new_case (DomainCase): The new candidate domain case
+        """
+        bit = 1 << self.num_cases
+        for premise_id, premise in new_case.problem.context.premises.items():
+            contents = self.bitmaps.get(premise_id)
+            if contents is not None:
+                contents[premise.content] = contents.get(premise.content, 0) | bit
+        self.cases.append(new_case)
+        self.num_cases += 1
+
+    def update(self, candidate_cases: Sequence[DomainCase]) -> bool:
+        """Updates the bitmaps with the new candidates appended at the end of
+        the list of candidates (domain cases are only appended to the
+        case-base)
+
+        Args:
+            candidate_cases (Sequence[DomainCase]): The current list of
+                candidates
+
+        Returns:
+            bool: True if the bitmaps represent the given candidates, False if
+            they have to be built again because the old candidates are not a
+            prefix of the new ones
+        """
+        if len(candidate_cases) < self.num_cases or not all(map(is_, self.cases, candidate_cases)):
+            return False
+        for new_case in candidate_cases[self.num_cases:]:
+            self.add_case(new_case)
+        return True
+
+    def mismatches(self, premises: Iterable[Premise]) -> List[int]:
+        """Returns, for each one of the given categorical premises, the bitmap
+        of the candidates that do not have the premise with the same content
+        (the ones with a different content or without the premise)
+
+        Args:
+            premises (Iterable[Premise]): The categorical premises of a query
+
+        Returns:
+            List[int]: The bitmap of each premise
+        """
+        all_cases = (1 << self.num_cases) - 1
+        return [all_cases ^ self.bitmaps.get(premise.id, {}).get(premise.content, 0) for premise in premises]
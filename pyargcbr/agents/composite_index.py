@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from statistics import median
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+# The contents of the premises of a key (None for the premises that a case does not have)
+BucketKey = Tuple[Optional[str], ...]
+
+
+def index_premise_ids(index: Union[int, Sequence[int]]) -> Tuple[int, ...]:
+    """Returns the premise IDs of the hash index of a domain CBR
+
+    Args:
+        index (Union[int, Sequence[int]]): A premise ID, an ordered sequence
+            of premise IDs (composite key) or -1 (no hash index)
+
+    Returns:
+        Tuple[int, ...]: The premise IDs of the key, empty without hash index
+    """
+    if isinstance(index, int):
+        return () if index == -1 else (index,)
+    return tuple(index)
+
+
+@dataclass
+class BucketStatistics:
+    """Sizes of the buckets of a prefix of the key of a composite index
+
+    Attributes:
+        premise_ids (Tuple[int, ...]): The premise IDs of the prefix
+        buckets (int): The number of buckets (distinct contents)
+        min_size (int): The number of cases of the smallest bucket
+        max_size (int): The number of cases of the biggest bucket
+        mean_size (float): The mean number of cases per bucket
+        median_size (float): The median number of cases per bucket
+    """
+    premise_ids: Tuple[int, ...]
+    buckets: int
+    min_size: int
+    max_size: int
+    mean_size: float
+    median_size: float
+
+
+class CompositeIndex:
+    """Hash index of a domain case-base keyed by the contents of an ordered
+    tuple of premise IDs. The cases are also indexed by every prefix of the
+    key, so the retrieval can fall back to a shorter prefix when the bucket
+    of the whole key is empty or too small
+    """
+
+    def __init__(self, premise_ids: Sequence[int]):
+        """
+        Args:
+            premise_ids (Sequence[int]): The premise IDs of the key, from the
+                most to the least significant
+        """
+        self.premise_ids: Tuple[int, ...] = tuple(premise_ids)
+        # prefix length - 1 -> key prefix -> cases
+        self.buckets: List[Dict[BucketKey, List[DomainCase]]] = [{} for _ in self.premise_ids]
+
+    def get_key(self, premises: Mapping[int, Premise]) -> BucketKey:
+        """Returns the key of the given premises: the content of each premise
+        of the key, or None if it is missing"""
+        key: List[Optional[str]] = []
+        for premise_id in self.premise_ids:
+            premise = premises.get(premise_id)
+            key.append(None if premise is None else premise.content)
+        return tuple(key)
+
+    def add_case(self, new_case: DomainCase):
+        """Adds a domain case to the bucket of its key and of every prefix
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+        """
+        key = self.get_key(new_case.problem.context.premises)
+        for length, buckets in enumerate(self.buckets, 1):
+            buckets.setdefault(key[:length], []).append(new_case)
+
+    def add_cases(self, new_cases: Iterable[DomainCase]):
+        """Adds several domain cases to the buckets of their keys, in order
+        (see :meth:`add_case`)
+
+        Args:
+            new_cases (Iterable[DomainCase]): The domain cases added to the
+                case-base
+        """
+        keys = [(self.get_key(new_case.problem.context.premises), new_case) for new_case in new_cases]
+        for length, buckets in enumerate(self.buckets, 1):
+            for key, new_case in keys:
+                buckets.setdefault(key[:length], []).append(new_case)
+
+    def remove_case(self, old_case: DomainCase):
+        """Removes a domain case from the bucket of its key and of every
+        prefix, dropping the buckets left empty
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        key = self.get_key(old_case.problem.context.premises)
+        for length, buckets in enumerate(self.buckets, 1):
+            bucket = buckets.get(key[:length])
+            if bucket is None:
+                continue
+            bucket[:] = [a_case for a_case in bucket if a_case is not old_case]
+            if not bucket:
+                del buckets[key[:length]]
+
+    def get_probe_key(self, premises: Mapping[int, Premise], min_size: int = 1,
+                      pending: Sequence[DomainCase] = ()) -> BucketKey:
+        """Returns the longest prefix of the key of the given premises whose
+        bucket has at least min_size cases, or the first premise of the key
+        if none has
+
+        Args:
+            premises (Mapping[int, Premise]): The premises of the query
+            min_size (int): The minimum number of cases of the bucket
+            pending (Sequence[DomainCase]): Cases not added yet, counted in
+                the buckets as if they were
+
+        Returns:
+            BucketKey: The prefix of the key of the bucket of the candidates
+        """
+        key = self.get_key(premises)
+        pending_keys = [self.get_key(a_case.problem.context.premises) for a_case in pending]
+        for length in range(len(key), 1, -1):
+            prefix = key[:length]
+            size = len(self.buckets[length - 1].get(prefix, ()))
+            if pending_keys:
+                size += sum(pending_key[:length] == prefix for pending_key in pending_keys)
+            if size >= min_size:
+                return prefix
+        return key[:1]
+
+    def get_candidates(self, premises: Mapping[int, Premise], min_size: int = 1,
+                       pending: Sequence[DomainCase] = ()) -> List[DomainCase]:
+        """Returns the cases of the bucket of the longest prefix of the key of
+        the given premises with at least min_size cases (see
+        :meth:`get_probe_key`), in the order they were added
+
+        Args:
+            premises (Mapping[int, Premise]): The premises of the query
+            min_size (int): The minimum number of candidates wanted
+            pending (Sequence[DomainCase]): Cases not added yet, which follow
+                the cases of the bucket if they would be in it
+
+        Returns:
+            List[DomainCase]: The candidate cases
+        """
+        prefix = self.get_probe_key(premises, min_size, pending)
+        candidates = self.buckets[len(prefix) - 1].get(prefix, [])
+        if pending:
+            candidates = candidates + [a_case for a_case in pending
+                                       if self.get_key(a_case.problem.context.premises)[:len(prefix)] == prefix]
+        return candidates
+
+    def get_statistics(self) -> List[BucketStatistics]:
+        """Returns the statistics of the sizes of the buckets of each prefix of
+        the key, from the first premise to the whole key"""
+        statistics: List[BucketStatistics] = []
+        for length, buckets in enumerate(self.buckets, 1):
+            sizes = [len(cases) for cases in buckets.values()] or [0]
+            statistics.append(BucketStatistics(self.premise_ids[:length], len(buckets), min(sizes), max(sizes),
+                                               sum(sizes) / len(sizes), median(sizes)))
+        return statistics
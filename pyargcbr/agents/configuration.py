@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 
 import pyargcbr.configuration.settings as settings
-from ..configuration.configuration_parameters import SimilarityType
+from ..configuration.configuration_parameters import SimilarityType, SimilarityEngine, NormalizationMode, SnapshotFormat
 
 
 @dataclass
@@ -11,9 +11,35 @@ class Configuration:
     user_name: str = settings.Server.user
     password: str = settings.Server.password
     domain_cbrs_similarity: SimilarityType = settings.DomainCBR.similarity
+    domain_cbrs_similarity_engine: SimilarityEngine = settings.DomainCBR.engine
+    domain_cbrs_normalization: NormalizationMode = settings.DomainCBR.normalization
+    domain_cbrs_tversky_alpha: float = settings.DomainCBR.tversky_alpha
+    domain_cbrs_tversky_beta: float = settings.DomainCBR.tversky_beta
+    domain_cbrs_min_shared_premises: int = settings.DomainCBR.min_shared_premises
+    domain_cbrs_min_bucket_size: int = settings.DomainCBR.min_bucket_size
+    domain_cbrs_numeric_index: bool = settings.DomainCBR.numeric_index
+    domain_cbrs_text_index: bool = settings.DomainCBR.text_index
+    domain_cbrs_cache_size: int = settings.DomainCBR.cache_size
+    domain_cbrs_max_cases: int = settings.DomainCBR.max_cases
+    domain_cbrs_max_memory: int = settings.DomainCBR.max_memory
+    domain_cbrs_eviction_sample: int = settings.DomainCBR.eviction_sample
+    domain_cbrs_redundancy_threshold: float = settings.DomainCBR.redundancy_threshold
+    domain_cbrs_retention_queue: bool = settings.DomainCBR.retention_queue
+    domain_cbrs_retention_batch_size: int = settings.DomainCBR.retention_batch_size
+    domain_cbrs_retention_interval: float = settings.DomainCBR.retention_interval
+    domain_cbrs_case_log: bool = settings.DomainCBR.case_log
+    domain_cbrs_case_log_compaction: int = settings.DomainCBR.case_log_compaction
+    domain_cbrs_snapshot_format: SnapshotFormat = settings.DomainCBR.snapshot_format
+    domain_cbrs_schema_file: str = settings.DomainCBR.schema_file
+    domain_cbrs_infer_schema: bool = settings.DomainCBR.infer_schema
+    domain_cbrs_parallel_workers: int = settings.DomainCBR.parallel_workers
+    domain_cbrs_parallel_threshold: int = settings.DomainCBR.parallel_threshold
     arg_cbr_proponent_id_weight: float = settings.ArgCbr.proponent_id_weight
     arg_cbr_proponent_pref_weight: float = settings.ArgCbr.proponent_pref_weight
     arg_cbr_opponent_id_weight: float = settings.ArgCbr.opponent_id_weight
     arg_cbr_opponent_pref_weight: float = settings.ArgCbr.opponent_pref_weight
     arg_cbr_group_id_weight: float = settings.ArgCbr.group_id_weight
     arg_cbr_group_pref_weight: float = settings.ArgCbr.group_pref_weight
+    arg_cbr_case_log: bool = settings.ArgCbr.case_log
+    arg_cbr_case_log_compaction: int = settings.ArgCbr.case_log_compaction
+    arg_cbr_snapshot_format: SnapshotFormat = settings.ArgCbr.snapshot_format
@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..knowledge_resources.domain_case import DomainCase
+
+
+class InvertedPremiseIndex:
+    """Inverted index of the premises of a domain case-base. The cases are
+    numbered in the order they are added (their ordinal) and the posting
+    list of each premise ID holds, in increasing order, the ordinals of the
+    cases that have that premise. The candidates of a query are the cases
+    that share some premise IDs with it, each one listed once. The ordinals
+    of the removed cases are not reused until more than half of them are
+    removed, when the remaining cases are numbered again in the same order
+    """
+
+    def __init__(self):
+        self.cases: List[Optional[DomainCase]] = []  # ordinal -> case (None if removed)
+        self.ordinals: Dict[int, int] = {}  # id of the case object -> ordinal
+        self.postings: Dict[int, List[int]] = {}  # premise id -> ordinals of the cases with the premise
+
+    def add_case(self, new_case: DomainCase):
+        """Adds a domain case to the index with the next ordinal
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+        """
+        ordinal = len(self.cases)
+        self.cases.append(new_case)
+        self.ordinals[id(new_case)] = ordinal
+        for premise_id in new_case.get_features().premise_ids:
+            self.postings.setdefault(premise_id, []).append(ordinal)
+
+    def add_cases(self, new_cases: Iterable[DomainCase]):
+        """Adds several domain cases to the index, in order (see
+        :meth:`add_case`)
+
+        Args:
+            new_cases (Iterable[DomainCase]): The domain cases added to the
+                case-base
+        """
+        cases, ordinals, postings = self.cases, self.ordinals, self.postings
+        for new_case in new_cases:
+            ordinal = len(cases)
+            cases.append(new_case)
+            ordinals[id(new_case)] = ordinal
+            for premise_id in new_case.get_features().premise_ids:
+                posting_list = postings.get(premise_id)
+                if posting_list is None:
+                    postings[premise_id] = [ordinal]
+                else:
+                    posting_list.append(ordinal)
+
+    def remove_case(self, old_case: DomainCase):
+        """Removes a domain case from the posting lists of its premises
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        ordinal = self.ordinals.pop(id(old_case), None)
+        if ordinal is None:
+            return
+        self.cases[ordinal] = None
+        for premise_id in old_case.get_features().premise_ids:
+            posting_list = self.postings[premise_id]
+            del posting_list[bisect_left(posting_list, ordinal)]
+            if not posting_list:
+                del self.postings[premise_id]
+        if len(self.ordinals) * 2 < len(self.cases):
+            self.compact()
+
+    def compact(self):
+        """Numbers the remaining cases again, in the same order, dropping the
+        ordinals of the removed ones"""
+        cases = [a_case for a_case in self.cases if a_case is not None]
+        self.cases, self.ordinals, self.postings = [], {}, {}
+        self.add_cases(cases)
+
+    def get_indexed_ids(self, premise_ids: Iterable[int]) -> List[int]:
+        """Returns the given premise IDs that some case has, sorted"""
+        return sorted(premise_id for premise_id in premise_ids if premise_id in self.postings)
+
+    def candidate_ordinals(self, premise_ids: Iterable[int], min_shared: int = 1) -> List[int]:
+        """Returns the ordinals of the cases that have at least min_shared of
+        the given premise IDs. Only the posting lists of those IDs are read
+
+        Args:
+            premise_ids (Iterable[int]): The premise IDs of the query
+            min_shared (int): The minimum number of premise IDs that a case
+                has to share with the query
+
+        Returns:
+            List[int]: The ordinals, in increasing order and without
+            duplicates
+        """
+        posting_lists = [self.postings[premise_id] for premise_id in self.get_indexed_ids(premise_ids)]
+        if min_shared <= 1:
+            if len(posting_lists) == 1:
+                return list(posting_lists[0])
+            return sorted(set(chain.from_iterable(posting_lists)))
+        if len(posting_lists) < min_shared:
+            return []
+        counts = Counter(chain.from_iterable(posting_lists))
+        return sorted(ordinal for ordinal, count in counts.items() if count >= min_shared)
+
+    def get_candidates(self, premise_ids: Iterable[int], min_shared: int = 1,
+                       pending: Sequence[DomainCase] = ()) -> List[DomainCase]:
+        """Returns the cases that have at least min_shared of the given
+        premise IDs, in the order they were added (see
+        :meth:`candidate_ordinals`), followed by the ones of the given cases
+        not added yet that would be candidates once added
+        """
+        cases = self.cases
+        if not pending:
+            return [cases[ordinal] for ordinal in self.candidate_ordinals(premise_ids, min_shared)]
+        premise_ids = set(premise_ids)
+        return [cases[ordinal] for ordinal in self.candidate_ordinals(premise_ids, min_shared)] \
+            + [a_case for a_case in pending
+               if len(premise_ids.intersection(a_case.get_features().premise_ids)) >= max(min_shared, 1)]
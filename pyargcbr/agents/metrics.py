@@ -1,37 +1,181 @@
 from datetime import datetime
+from enum import Enum
 from time import mktime
+from typing import Dict, NamedTuple, Optional, Tuple, Union
 
+DATETIME_FORMAT = '%m/%d/%y %H:%M:%S'
 
-def do_dist(a: str, b: str):
-    ra, rb = None, None
-    # int ?
-    try:
-        ra = int(a)
-        rb = int(b)
-    except ValueError:
-        pass
-    # float ?
-    try:
-        ra = float(a)
-        rb = float(b)
-    except ValueError:
-        pass
-    # datetime ?
+
+class ValueKind(Enum):
+    """Types of the values that the content of a premise can represent"""
+    INTEGER = 0
+    FLOAT = 1
+    TIMESTAMP = 2
+    STRING = 3
+
+
+NUMERIC_KINDS = (ValueKind.INTEGER, ValueKind.FLOAT)
+
+
+class TypedValue(NamedTuple):
+    """The content of a premise parsed into the value it represents"""
+    kind: ValueKind
+    value: Union[float, str]
+    text: str
+
+
+def parse_value(a: str) -> TypedValue:
+    """Parses a premise content into a typed value. Integers and floats are
+    stored as float and timestamps as the seconds since the epoch, because
+    that is how they are compared in :func:`do_dist`
+
+    Args:
+        a (str): The content of the premise
+
+    Returns:
+        TypedValue: The typed value with the original text
+    """
     try:
-        datetime_format = '%m/%d/%y %H:%M:%S'
-        ra = mktime(datetime.strptime(a, datetime_format).timetuple())
-        rb = mktime(datetime.strptime(b, datetime_format).timetuple())
+        value = float(a)
     except ValueError:
         pass
+    else:
+        try:
+            int(a)
+        except ValueError:
+            return TypedValue(ValueKind.FLOAT, value, a)
+        return TypedValue(ValueKind.INTEGER, value, a)
+    if '/' in a:  # Every string matching DATETIME_FORMAT has a '/'
+        try:
+            return TypedValue(ValueKind.TIMESTAMP, mktime(datetime.strptime(a, DATETIME_FORMAT).timetuple()), a)
+        except ValueError:
+            pass
+    return TypedValue(ValueKind.STRING, a, a)
+
+
+def typed_dist(a: TypedValue, b: TypedValue, max_distance: Optional[int] = None,
+               memo: Optional[Dict[Tuple[str, str], int]] = None):
+    """Distance between two typed values. Numbers and timestamps are compared
+    by their absolute difference and anything else by the Levenshtein
+    distance of the texts. Like :func:`do_dist`, values equal to 0 are compared
+    as texts
+
+    Args:
+        a (TypedValue): A typed value
+        b (TypedValue): The other typed value
+        max_distance (Optional[int]): If given, Levenshtein distances greater
+            than it are returned as max_distance + 1 (see
+            :func:`levenshtein_distance`)
+        memo (Optional[Dict[Tuple[str, str], int]]): Dict to memoize the
+            Levenshtein distances of the texts already compared, usually
+            shared by all the comparisons of one retrieval (with the same
+            max_distance)
+
+    Returns:
+        The distance between both values
+    """
+    if a.kind is not ValueKind.STRING and b.kind is not ValueKind.STRING \
+        and (a.kind is b.kind or (a.kind in NUMERIC_KINDS and b.kind in NUMERIC_KINDS)) and a.value and b.value:
+        return abs(a.value - b.value)
+    if memo is None:
+        return levenshtein_distance(a.text, b.text, max_distance)
+    key = (a.text, b.text)
+    distance = memo.get(key)
+    if distance is None:
+        distance = levenshtein_distance(a.text, b.text, max_distance)
+        memo[key] = distance
+    return distance
+
+
+def do_dist(a: str, b: str, max_distance: Optional[int] = None):
+    """Distance between two premise contents, parsing them on every call. When
+    the same contents are compared many times, parse them once with
+    :func:`parse_value` (or use :attr:`Premise.typed_content`) and compare
+    them with :func:`typed_dist`
+
+    Args:
+        a (str): A premise content
+        b (str): The other premise content
+        max_distance (Optional[int]): If given, Levenshtein distances greater
+            than it are returned as max_distance + 1
+
+    Returns:
+        The distance between both contents
+    """
+    return typed_dist(parse_value(a), parse_value(b), max_distance)
+
+
+def levenshtein_distance(x: str, y: str, max_distance: Optional[int] = None) -> int:
+    """Levenshtein (edit) distance between two strings. Equal strings and the
+    common prefix and suffix are skipped before filling the table. If a
+    max_distance is given, only the band of the table within max_distance of
+    the diagonal is calculated and the calculation stops as soon as every
+    cell of a row exceeds it
+
+    Args:
+        x (str): A string
+        y (str): The other string
+        max_distance (Optional[int]): The maximum distance of interest
+
+    Returns:
+        int: The distance, or max_distance + 1 if it is greater than
+        max_distance
+    """
+    if x == y:
+        return 0
+    start = 0
+    end_x = len(x)
+    end_y = len(y)
+    while start < end_x and start < end_y and x[start] == y[start]:
+        start += 1
+    while end_x > start and end_y > start and x[end_x - 1] == y[end_y - 1]:
+        end_x -= 1
+        end_y -= 1
+    x = x[start:end_x]
+    y = y[start:end_y]
+
+    if max_distance is None:
+        return full_levenshtein_distance(x, y)
+    if len(x) < len(y):
+        x, y = y, x
+    limit = max_distance + 1
+    if len(x) - len(y) >= limit:
+        return limit
+    if not y:
+        return len(x)
+
+    previous_row = [i if i < limit else limit for i in range(len(x) + 1)]
+    for j in range(1, len(y) + 1):
+        current_row = [limit] * (len(x) + 1)
+        if j < limit:
+            current_row[0] = j
+        row_min = current_row[0]
+        y_char = y[j - 1]
+        for i in range(max(1, j - max_distance), min(len(x), j + max_distance) + 1):
+            distance = min(current_row[i - 1] + 1,
+                           previous_row[i] + 1,
+                           previous_row[i - 1] + (x[i - 1] != y_char))
+            if distance > limit:
+                distance = limit
+            current_row[i] = distance
+            if distance < row_min:
+                row_min = distance
+        if row_min >= limit:
+            return limit
+        previous_row = current_row
+    return previous_row[len(x)]
 
-    if ra and rb:
-        return abs(ra - rb)
 
-    # Just two str
-    return levenshtein_distance(a, b)
+def full_levenshtein_distance(x: str, y: str) -> int:
+    """Levenshtein distance between two strings filling the whole table
 
+    Args:
+        x (str): A string
+        y (str): The other string
 
-def levenshtein_distance(x: str, y: str):
+    Returns:
+        int: The distance
+    """
     current_row = [0] * (len(x) + 1)
     previous_row = [0] * (len(x) + 1)
     for i in range(1, len(x) + 1):
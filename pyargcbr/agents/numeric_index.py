@@ -0,0 +1,281 @@
+from dataclasses import dataclass, field
+from heapq import heappop, heappush
+from itertools import count
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from .metrics import NUMERIC_KINDS, ValueKind
+from .premise_schema import NUMERIC_ATTRIBUTE_KINDS, PremiseSchema
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+# A dimension of the index: the premise ID and the kind of its values
+Dimension = Tuple[int, str]
+Point = Dict[Dimension, float]
+
+
+def numeric_coordinates(premises: Mapping[int, Premise], schema: Optional[PremiseSchema] = None) -> Point:
+    """Returns the coordinates of some premises in the numeric space of the
+    index: the values of the premises whose distance is the absolute
+    difference of their values. Those are the premises of the numeric
+    attributes of the schema (with a parseable content) and, for the
+    premises without declared attribute, the numbers and timestamps
+    different from 0 (see :func:`metrics.typed_dist`)
+
+    Args:
+        premises (Mapping[int, Premise]): The premises
+        schema (Optional[PremiseSchema]): The premise schema of the domain
+
+    Returns:
+        Point: The value of each dimension of the premises
+    """
+    point: Point = {}
+    for premise in premises.values():
+        attribute = schema.get_attribute(premise.id) if schema is not None else None
+        if attribute is not None:
+            if attribute.kind in NUMERIC_ATTRIBUTE_KINDS:
+                value = attribute.parse(premise.content)
+                if value is not None:
+                    point[(premise.id, "schema")] = value
+            continue
+        typed_content = premise.typed_content
+        if typed_content.value:  # The values equal to 0 are compared as texts
+            if typed_content.kind in NUMERIC_KINDS:
+                point[(premise.id, "number")] = typed_content.value
+            elif typed_content.kind == ValueKind.TIMESTAMP:
+                point[(premise.id, "timestamp")] = typed_content.value
+    return point
+
+
+def dimension_factor(dimension: Dimension, schema: Optional[PremiseSchema] = None) -> float:
+    """Returns what the weighted Euclidean distance adds per unit of
+    difference in a dimension: twice the squared weight of the premise,
+    divided by the size of the range of its attribute if it is declared"""
+    if schema is None:
+        return 2.0
+    weight = schema.get_weight(dimension[0])
+    factor = 2.0 * weight * weight
+    if dimension[1] == "schema":
+        factor /= schema.get_attribute(dimension[0]).get_range()
+    return factor
+
+
+@dataclass
+class KDNode:
+    """A node of a :class:`NumericKDTree`. A leaf holds the ordinals of its
+    points; an inner node splits its points by the value of a dimension and
+    holds the ones that do not have that dimension"""
+    dimension: Optional[Dimension] = None
+    value: float = 0.0
+    points: List[int] = field(default_factory=lambda: [])
+    left: Optional["KDNode"] = None  # Points with a smaller value
+    right: Optional["KDNode"] = None  # Points with a greater or equal value
+    capacity: int = 0  # Number of points of a leaf that makes it split
+
+
+class NumericKDTree:
+    """KD-tree over the numeric premises of the cases of a domain case-base,
+    with the weighted L1 distance that the numeric premises add to the
+    weighted Euclidean distance (see :func:`dimension_factor`). That
+    distance is a lower bound of the whole distance of a case, so the cases
+    farther than a limit can be discarded without comparing their premises.
+
+    The dimensions are the numeric premises found in the cases (see
+    :func:`numeric_coordinates`), so a point may not have all of them. When
+    a node splits by a dimension that a point does not have, the point stays
+    in the node and it is visited whenever the node is. The cases are
+    numbered in the order they are added (their ordinal) and the tree is
+    updated incrementally. The ordinals of the removed cases are not reused;
+    when more than half of them are removed, the tree is built again with
+    the remaining cases
+    """
+
+    def __init__(self, schema: Optional[PremiseSchema] = None, leaf_size: int = 16):
+        """
+        Args:
+            schema (Optional[PremiseSchema]): The premise schema of the domain
+            leaf_size (int): The number of points of a leaf that makes it split
+        """
+        self.schema = schema
+        self.leaf_size = leaf_size
+        self.cases: List[Optional[DomainCase]] = []  # ordinal -> case (None if removed)
+        self.ordinals: Dict[int, int] = {}  # id of the case object -> ordinal
+        self.points: List[Point] = []  # ordinal -> coordinates
+        self.factors: Dict[Dimension, float] = {}
+        self.root = KDNode(capacity=leaf_size)
+
+    def add_case(self, new_case: DomainCase):
+        """Adds a domain case to the tree with the next ordinal
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+        """
+        ordinal = len(self.cases)
+        point = numeric_coordinates(new_case.problem.context.premises, self.schema)
+        self.cases.append(new_case)
+        self.ordinals[id(new_case)] = ordinal
+        self.points.append(point)
+        for dimension in point:
+            if dimension not in self.factors:
+                self.factors[dimension] = dimension_factor(dimension, self.schema)
+
+        node = self.find_node(point)
+        node.points.append(ordinal)
+        if node.dimension is None and len(node.points) > node.capacity:
+            self.split(node)
+
+    def remove_case(self, old_case: DomainCase):
+        """Removes a domain case from the node that holds its point
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        ordinal = self.ordinals.pop(id(old_case), None)
+        if ordinal is None:
+            return
+        self.find_node(self.points[ordinal]).points.remove(ordinal)
+        self.cases[ordinal] = None
+        self.points[ordinal] = {}
+        if len(self.ordinals) * 2 < len(self.cases):
+            self.compact()
+
+    def compact(self):
+        """Builds the tree again with the remaining cases, in the same order,
+        dropping the ordinals and the empty nodes of the removed ones"""
+        cases = [a_case for a_case in self.cases if a_case is not None]
+        self.cases, self.ordinals, self.points, self.factors = [], {}, [], {}
+        self.root = KDNode(capacity=self.leaf_size)
+        for a_case in cases:
+            self.add_case(a_case)
+
+    def find_node(self, point: Point) -> KDNode:
+        """Returns the node where a point is held: the leaf of its region or
+        the first inner node split by a dimension that it does not have"""
+        node = self.root
+        while node.dimension is not None:
+            coordinate = point.get(node.dimension)
+            if coordinate is None:
+                break
+            node = node.left if coordinate < node.value else node.right
+        return node
+
+    def split(self, node: KDNode):
+        """Splits a leaf by the median of the dimension where its points have
+        the greatest spread. If its points cannot be split, the leaf doubles
+        its capacity"""
+        spreads: Dict[Dimension, Tuple[float, float]] = {}
+        for ordinal in node.points:
+            for dimension, coordinate in self.points[ordinal].items():
+                low, high = spreads.get(dimension, (coordinate, coordinate))
+                spreads[dimension] = (min(low, coordinate), max(high, coordinate))
+        best = max(spreads.items(), key=lambda item: (item[1][1] - item[1][0]) * self.factors[item[0]], default=None)
+        if best is None or best[1][0] == best[1][1]:
+            node.capacity *= 2
+            return
+
+        dimension = best[0]
+        values = sorted(self.points[ordinal][dimension] for ordinal in node.points
+                        if dimension in self.points[ordinal])
+        value = values[len(values) // 2]
+        if value == values[0]:  # The left side cannot be empty
+            value = next(v for v in values if v > value)
+        points = node.points
+        node.dimension, node.value, node.points = dimension, value, []
+        node.left = KDNode(capacity=self.leaf_size)
+        node.right = KDNode(capacity=self.leaf_size)
+        for ordinal in points:
+            coordinate = self.points[ordinal].get(dimension)
+            if coordinate is None:
+                node.points.append(ordinal)
+            elif coordinate < value:
+                node.left.points.append(ordinal)
+            else:
+                node.right.points.append(ordinal)
+
+    def lower_bound(self, query: Point, ordinal: int) -> float:
+        """Returns the weighted L1 distance between the query and a point, in
+        the dimensions that both have"""
+        point = self.points[ordinal]
+        factors = self.factors
+        bound = 0.0
+        for dimension, value in query.items():
+            coordinate = point.get(dimension)
+            if coordinate is not None:
+                bound += factors[dimension] * abs(value - coordinate)
+        return bound
+
+    def range_search(self, premises: Mapping[int, Premise], max_distance: float) -> List[int]:
+        """Returns the ordinals of the cases whose numeric premises are within
+        the given distance of the ones of the query (see :meth:`lower_bound`)
+
+        Args:
+            premises (Mapping[int, Premise]): The premises of the query
+            max_distance (float): The maximum distance
+
+        Returns:
+            List[int]: The ordinals, in increasing order
+        """
+        query = numeric_coordinates(premises, self.schema)
+        ordinals: List[int] = []
+        offsets: Dict[Dimension, float] = {}
+
+        def search(node: KDNode, bound: float):
+            for ordinal in node.points:
+                if self.lower_bound(query, ordinal) <= max_distance:
+                    ordinals.append(ordinal)
+            if node.dimension is None:
+                return
+            value = query.get(node.dimension)
+            if value is None:
+                search(node.left, bound)
+                search(node.right, bound)
+                return
+            near, far = (node.left, node.right) if value < node.value else (node.right, node.left)
+            search(near, bound)
+            old_offset = offsets.get(node.dimension, 0.0)
+            new_offset = self.factors[node.dimension] * abs(value - node.value)
+            far_bound = bound - old_offset + new_offset
+            if far_bound <= max_distance:
+                offsets[node.dimension] = new_offset
+                search(far, far_bound)
+                offsets[node.dimension] = old_offset
+
+        search(self.root, 0.0)
+        return sorted(ordinals)
+
+    def nearest(self, premises: Mapping[int, Premise]) -> Iterator[Tuple[float, int]]:
+        """Yields the cases from the nearest to the farthest from the query,
+        best first
+
+        Args:
+            premises (Mapping[int, Premise]): The premises of the query
+
+        Returns:
+            Iterator[Tuple[float, int]]: The distance (see
+            :meth:`lower_bound`) and the ordinal of each case, in increasing
+            order of distance
+        """
+        query = numeric_coordinates(premises, self.schema)
+        tie_breaker = count()
+        # Items: (distance, tie breaker, ordinal, None) for points and (bound, tie breaker, node, offsets) for nodes
+        heap: list = [(0.0, next(tie_breaker), self.root, {})]
+        while heap:
+            bound, _, item, offsets = heappop(heap)
+            if offsets is None:
+                yield bound, item
+                continue
+            node: KDNode = item
+            for ordinal in node.points:
+                heappush(heap, (self.lower_bound(query, ordinal), next(tie_breaker), ordinal, None))
+            if node.dimension is None:
+                continue
+            value = query.get(node.dimension)
+            if value is None:
+                heappush(heap, (bound, next(tie_breaker), node.left, offsets))
+                heappush(heap, (bound, next(tie_breaker), node.right, offsets))
+                continue
+            near, far = (node.left, node.right) if value < node.value else (node.right, node.left)
+            heappush(heap, (bound, next(tie_breaker), near, offsets))
+            far_offsets = dict(offsets)
+            far_offsets[node.dimension] = self.factors[node.dimension] * abs(value - node.value)
+            heappush(heap, (bound - offsets.get(node.dimension, 0.0) + far_offsets[node.dimension],
+                            next(tie_breaker), far, far_offsets))
@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor
+from heapq import nlargest
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from . import similarity_algorithms as sim_algs
+from .premise_schema import PremiseSchema
+from ..configuration.configuration_parameters import SimilarityType
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+from ..knowledge_resources.similar_domain_case import SimilarDomainCase
+
+SIMILARITY_FUNCTIONS = {
+    SimilarityType.NORMALIZED_EUCLIDEAN: sim_algs.normalized_euclidean_similarities,
+    SimilarityType.WEIGHTED_EUCLIDEAN: sim_algs.weighted_euclidean_similarities,
+    SimilarityType.NORMALIZED_TVERSKY: sim_algs.normalized_tversky_similarities,
+}
+
+# A candidate sent to a worker: the position of the case in the copy of the worker, or the case itself if the
+# worker does not have it
+CandidateItem = Union[int, DomainCase]
+
+# Read-only copy of the case-base and schema of each worker process, set by init_worker
+worker_cases: List[DomainCase] = []
+worker_schema: Optional[PremiseSchema] = None
+
+
+def init_worker(cases: List[DomainCase], schema: Optional[PremiseSchema]):
+    """Initializer of the worker processes: stores their copy of the cases
+    and the premise schema"""
+    global worker_cases, worker_schema
+    worker_cases = cases
+    worker_schema = schema
+
+
+def resolve_candidates(items: Sequence[CandidateItem]) -> List[DomainCase]:
+    """Returns the domain cases of the candidate items of a chunk"""
+    return [worker_cases[item] if isinstance(item, int) else item for item in items]
+
+
+def chunk_max_distances(premises: Dict[int, Premise], items: Sequence[CandidateItem]) -> Dict[int, float]:
+    """First phase of the normalized algorithms, run by the workers: the
+    maximum distance of each premise to the candidates of a chunk (see
+    :func:`similarity_algorithms.premise_max_distances`)"""
+    return sim_algs.premise_max_distances(premises, resolve_candidates(items), worker_schema)
+
+
+def chunk_most_similar(premises: Dict[int, Premise], items: Sequence[CandidateItem], similarity_type: SimilarityType,
+                       threshold: float, k: Optional[int], max_distances: Optional[Dict[int, float]],
+                       options: Dict[str, float]) -> List[Tuple[int, float]]:
+    """Second phase, run by the workers: scores the candidates of a chunk
+    and selects the ones with a similarity greater or equal than the
+    threshold (only the k most similar ones, if k is given). The options are
+    passed to the similarity function (the Tversky weights)
+
+    Returns:
+        List[Tuple[int, float]]: The position in the chunk and the similarity
+        of the selected candidates, ordered by position
+    """
+    similarities = SIMILARITY_FUNCTIONS[similarity_type](premises, resolve_candidates(items), worker_schema,
+                                                         max_distances=max_distances, **options)
+    selected = [index for index, similarity in enumerate(similarities) if similarity >= threshold]
+    if k is not None and k < len(selected):
+        selected = sorted(nlargest(k, selected, key=similarities.__getitem__))
+    return [(index, similarities[index]) for index in selected]
+
+
+class ParallelScorer:
+    """Scores big lists of candidate cases with the pure Python similarity
+    algorithms in a pool of worker processes.
+
+    Each worker holds a read-only copy of the cases given when the pool is
+    created, so only the positions of the candidates are sent with every
+    retrieval (the cases added afterwards are sent with the chunks that
+    contain them). The candidates are split in one chunk per worker. The
+    normalized algorithms need the maximum distance of every premise among
+    all the candidates, so they run in two phases: the workers return the
+    maxima of their chunks and then score them with the global ones. The
+    results are the same ones of the sequential algorithms
+    """
+
+    def __init__(self, cases: Sequence[DomainCase], schema: Optional[PremiseSchema] = None, workers: int = 2):
+        """
+        Args:
+            cases (Sequence[DomainCase]): The cases copied to the workers
+            schema (Optional[PremiseSchema]): The premise schema of the domain
+            workers (int): The number of worker processes
+        """
+        self.cases: List[DomainCase] = list(cases)
+        self.rows: Dict[int, int] = {id(a_case): row for row, a_case in enumerate(self.cases)}
+        self.schema = schema
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(self.cases, schema))
+
+    def shutdown(self):
+        """Stops the worker processes"""
+        self.executor.shutdown()
+
+    def remove_case(self, old_case: DomainCase):
+        """Forgets the position of a domain case removed from the case-base.
+        The workers keep their copy, but it is never sent as a candidate
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        self.rows.pop(id(old_case), None)
+
+    def get_items(self, candidate_cases: Sequence[DomainCase]) -> List[CandidateItem]:
+        """Returns the items sent to the workers for the given candidates
+
+        Args:
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+
+        Returns:
+            List[CandidateItem]: The position of each candidate in the copy of
+            the workers, or the candidate itself if they do not have it
+        """
+        rows = self.rows
+        return [rows.get(id(a_case), a_case) for a_case in candidate_cases]
+
+    def most_similar(self, premises: Dict[int, Premise], candidate_cases: Sequence[DomainCase],
+                     similarity_type: SimilarityType, threshold: float = 0.0, k: Optional[int] = None,
+                     alpha: float = 1.0, beta: float = 1.0) -> List[SimilarDomainCase]:
+        """Returns the candidates with a similarity degree greater or equal
+        than the threshold, ordered from the most to the least similar
+
+        Args:
+            premises (Dict[int, Premise]): The premises of the query
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+            similarity_type (SimilarityType): The similarity algorithm
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return
+            alpha (float): The weight of the different premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+            beta (float): The weight of the distinct premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+
+        Returns:
+            List[SimilarDomainCase]: The selected candidates
+
+        Raises:
+            ZeroDivisionError: With SimilarityType.NORMALIZED_TVERSKY, as the
+                sequential algorithm does
+        """
+        if similarity_type not in SIMILARITY_FUNCTIONS:
+            similarity_type = SimilarityType.NORMALIZED_EUCLIDEAN
+        items = self.get_items(candidate_cases)
+        chunk_size = max(1, -(-len(items) // self.workers))
+        starts = range(0, len(items), chunk_size)
+
+        options: Dict[str, float] = {}
+        if similarity_type == SimilarityType.NORMALIZED_TVERSKY:
+            options = {"alpha": alpha, "beta": beta}
+        max_distances: Optional[Dict[int, float]] = None
+        if similarity_type != SimilarityType.WEIGHTED_EUCLIDEAN:
+            futures = [self.executor.submit(chunk_max_distances, premises, items[start:start + chunk_size])
+                       for start in starts]
+            max_distances = {}
+            for future in futures:
+                for premise_id, max_dist in future.result().items():
+                    max_distances[premise_id] = max(max_distances.get(premise_id, 0.0), max_dist)
+
+        futures = [self.executor.submit(chunk_most_similar, premises, items[start:start + chunk_size],
+                                        similarity_type, threshold, k, max_distances, options) for start in starts]
+        selected_cases: List[DomainCase] = []
+        similarities: List[float] = []
+        for start, future in zip(starts, futures):
+            for index, similarity in future.result():
+                selected_cases.append(candidate_cases[start + index])
+                similarities.append(similarity)
+        return sim_algs.select_most_similar(selected_cases, similarities, threshold, k)
@@ -0,0 +1,294 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from time import mktime
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Union
+
+from .metrics import DATETIME_FORMAT, levenshtein_distance, typed_dist
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+DistanceFunction = Callable[[Premise, Premise], float]
+
+
+class AttributeKind(Enum):
+    """Types of the values that a premise (attribute) of the domain can take"""
+    INTEGER = 0
+    FLOAT = 1
+    DATE = 2
+    CATEGORICAL = 3
+    TEXT = 4
+
+
+NUMERIC_ATTRIBUTE_KINDS = (AttributeKind.INTEGER, AttributeKind.FLOAT, AttributeKind.DATE)
+
+
+def premise_distance(a: Premise, b: Premise) -> float:
+    """Distance used for the premises without a declared attribute, the same
+    one used when there is no schema (see :func:`metrics.typed_dist`)"""
+    return typed_dist(a.typed_content, b.typed_content)
+
+
+@dataclass
+class PremiseAttribute:
+    """Declaration of the values of a premise of the domain
+
+    Attributes:
+        id (int): The ID of the premise
+        kind (AttributeKind): The type of the values of the premise
+        date_format (str): The format of the dates (AttributeKind.DATE)
+        min_value (Optional[float]): The minimum value of numbers and dates
+        max_value (Optional[float]): The maximum value of numbers and dates.
+            When both limits are given, the distances are divided by the
+            size of the range
+        weight (float): The weight of the premise in the weighted Euclidean
+            similarity
+    """
+    id: int = -1
+    kind: AttributeKind = AttributeKind.TEXT
+    date_format: str = DATETIME_FORMAT
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    weight: float = 1.0
+    _distance: Optional[DistanceFunction] = field(default=None, init=False, repr=False, compare=False)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_distance'] = None  # The compiled function is not picklable, it is compiled again when needed
+        return state
+
+    def parse(self, content: str) -> Optional[float]:
+        """Parses the content of a premise of a numeric or date attribute
+
+        Args:
+            content (str): The content of the premise
+
+        Returns:
+            Optional[float]: The number (the seconds since the epoch for
+            dates), or None if the content does not have the declared type
+        """
+        try:
+            if self.kind == AttributeKind.DATE:
+                return mktime(datetime.strptime(content, self.date_format).timetuple())
+            return float(content)
+        except ValueError:
+            return None
+
+    def get_range(self) -> float:
+        """Returns the size of the range of the attribute, or 1.0 if it is not
+        declared (or empty)"""
+        if self.min_value is not None and self.max_value is not None and self.max_value > self.min_value:
+            return self.max_value - self.min_value
+        return 1.0
+
+    def distance_function(self) -> DistanceFunction:
+        """Returns the distance function of the premises of this attribute.
+        It is compiled once for the declared kind: categorical values are 0.0
+        when equal and 1.0 otherwise, texts are compared by their Levenshtein
+        distance and numbers and dates by their absolute difference divided by
+        the size of the range. The parsed values and the Levenshtein distances
+        are cached. Contents that do not have the declared type are compared
+        with the default distance (:func:`premise_distance`)
+
+        Returns:
+            DistanceFunction: The distance function, taking two premises
+        """
+        if self._distance is None:
+            if self.kind == AttributeKind.CATEGORICAL:
+                self._distance = categorical_distance
+            elif self.kind == AttributeKind.TEXT:
+                self._distance = text_distance_function()
+            else:
+                self._distance = numeric_distance_function(self.parse, self.get_range())
+        return self._distance
+
+    def to_dict(self) -> Dict[str, Union[int, float, str]]:
+        """Returns the declaration of the attribute as a JSON serializable dict"""
+        attribute = {"id": self.id, "kind": self.kind.name.lower(), "weight": self.weight}
+        if self.kind == AttributeKind.DATE:
+            attribute["format"] = self.date_format
+        if self.min_value is not None:
+            attribute["min"] = self.min_value
+        if self.max_value is not None:
+            attribute["max"] = self.max_value
+        return attribute
+
+    @staticmethod
+    def from_dict(attribute: Dict[str, Union[int, float, str]]) -> "PremiseAttribute":
+        """Creates an attribute from its declaration (see :meth:`to_dict`)"""
+        return PremiseAttribute(id=int(attribute["id"]), kind=AttributeKind[str(attribute.get("kind", "text")).upper()],
+                                date_format=attribute.get("format", DATETIME_FORMAT),
+                                min_value=attribute.get("min"), max_value=attribute.get("max"),
+                                weight=float(attribute.get("weight", 1.0)))
+
+
+def categorical_distance(a: Premise, b: Premise) -> float:
+    """Distance between two categorical premises: 0.0 if they have the same
+    content, 1.0 otherwise"""
+    return 0.0 if a.content == b.content else 1.0
+
+
+def text_distance_function() -> DistanceFunction:
+    """Returns a Levenshtein distance function between the contents of two
+    premises, with its own cache of the distances already calculated"""
+    cached_distance = lru_cache(maxsize=65536)(levenshtein_distance)
+
+    def text_distance(a: Premise, b: Premise) -> float:
+        return cached_distance(a.content, b.content)
+
+    return text_distance
+
+
+def numeric_distance_function(parse: Callable[[str], Optional[float]], scale: float) -> DistanceFunction:
+    """Returns a distance function between numeric premises: the absolute
+    difference of their values divided by the given scale
+
+    Args:
+        parse (Callable[[str], Optional[float]]): Function that parses the
+            contents (the parsed values are cached)
+        scale (float): The value that divides the differences
+
+    Returns:
+        DistanceFunction: The distance function
+    """
+    values: Dict[str, Optional[float]] = {}
+
+    def numeric_distance(a: Premise, b: Premise) -> float:
+        try:
+            x = values[a.content]
+        except KeyError:
+            x = values[a.content] = parse(a.content)
+        try:
+            y = values[b.content]
+        except KeyError:
+            y = values[b.content] = parse(b.content)
+        if x is None or y is None:
+            return premise_distance(a, b)
+        return abs(x - y) / scale
+
+    return numeric_distance
+
+
+@dataclass
+class PremiseSchema:
+    """Declaration of the types, ranges and weights of the premises of a
+    domain. The similarity algorithms use the distance function of each
+    declared attribute instead of guessing the type of the contents on every
+    comparison. The premises without a declared attribute are compared as
+    usual (see :func:`premise_distance`)
+    """
+    attributes: Dict[int, PremiseAttribute] = field(default_factory=lambda: {})
+
+    def get_attribute(self, premise_id: int) -> Optional[PremiseAttribute]:
+        """Returns the attribute of a premise ID, or None if it is not declared"""
+        return self.attributes.get(premise_id)
+
+    def distance_function(self, premise_id: int) -> DistanceFunction:
+        """Returns the distance function of the premises with the given ID
+
+        Args:
+            premise_id (int): The ID of the premise
+
+        Returns:
+            DistanceFunction: The distance function of the attribute, or
+            :func:`premise_distance` if it is not declared
+        """
+        attribute = self.attributes.get(premise_id)
+        if attribute is None:
+            return premise_distance
+        return attribute.distance_function()
+
+    def is_categorical(self, premise_id: int) -> bool:
+        """Returns True if the premise ID is declared as categorical"""
+        attribute = self.attributes.get(premise_id)
+        return attribute is not None and attribute.kind == AttributeKind.CATEGORICAL
+
+    def get_categorical_ids(self) -> FrozenSet[int]:
+        """Returns the IDs of the premises declared as categorical"""
+        return frozenset(premise_id for premise_id, attribute in self.attributes.items()
+                         if attribute.kind == AttributeKind.CATEGORICAL)
+
+    def get_weight(self, premise_id: int) -> float:
+        """Returns the weight of a premise ID (1.0 if it is not declared)"""
+        attribute = self.attributes.get(premise_id)
+        if attribute is None:
+            return 1.0
+        return attribute.weight
+
+    def to_dict(self) -> Dict[str, list]:
+        """Returns the schema as a JSON serializable dict"""
+        return {"premises": [attribute.to_dict() for attribute in self.attributes.values()]}
+
+    @staticmethod
+    def from_dict(schema: Dict[str, list]) -> "PremiseSchema":
+        """Creates a schema from a dict like the ones returned by :meth:`to_dict`"""
+        attributes = [PremiseAttribute.from_dict(attribute) for attribute in schema.get("premises", [])]
+        return PremiseSchema({attribute.id: attribute for attribute in attributes})
+
+    def save(self, file_path: str):
+        """Stores the schema in a JSON file
+
+        Args:
+            file_path (str): The path of the file
+        """
+        with open(file_path, 'w') as fh:
+            json.dump(self.to_dict(), fh, indent=4)
+
+    @staticmethod
+    def load(file_path: str) -> "PremiseSchema":
+        """Loads a schema from a JSON file with the format::
+
+            {"premises": [{"id": 0, "kind": "integer", "min": 0, "max": 3000},
+                          {"id": 5, "kind": "categorical", "weight": 2.0},
+                          {"id": 9, "kind": "date", "format": "%d/%m/%Y"}]}
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            PremiseSchema: The loaded schema
+        """
+        with open(file_path, 'r') as fh:
+            return PremiseSchema.from_dict(json.load(fh))
+
+    @staticmethod
+    def infer(cases: Iterable[DomainCase], max_categories: int = 10) -> "PremiseSchema":
+        """Infers the schema from the contents of the premises of some
+        domain cases. A premise is an integer, a float or a date
+        (DATETIME_FORMAT) if all its contents are, with their minimum and
+        maximum values as range. Otherwise it is categorical if it has at
+        most max_categories different contents, or free text
+
+        Args:
+            cases (Iterable[DomainCase]): The domain cases
+            max_categories (int): The maximum number of different contents of
+                a categorical premise
+
+        Returns:
+            PremiseSchema: The inferred schema
+        """
+        contents: Dict[int, set] = {}
+        for a_case in cases:
+            for premise in a_case.problem.context.premises.values():
+                contents.setdefault(premise.id, set()).add(premise.content)
+
+        schema = PremiseSchema()
+        for premise_id, premise_contents in contents.items():
+            attribute = PremiseAttribute(premise_id)
+            for kind in NUMERIC_ATTRIBUTE_KINDS:
+                attribute.kind = kind
+                values = [attribute.parse(content) for content in premise_contents]
+                if None not in values and (kind != AttributeKind.INTEGER
+                                           or all(value.is_integer() for value in values)):
+                    attribute.min_value = min(values)
+                    attribute.max_value = max(values)
+                    break
+            else:
+                if len(premise_contents) <= max_categories:
+                    attribute.kind = AttributeKind.CATEGORICAL
+                else:
+                    attribute.kind = AttributeKind.TEXT
+            schema.attributes[premise_id] = attribute
+        return schema
@@ -1,26 +1,137 @@
-from math import sqrt
-from typing import Dict, List
+from heapq import heappush, heapreplace, nlargest
+from math import inf, sqrt
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .metrics import do_dist
+from .attribute_ranges import AttributeRanges
+from .categorical_bitmaps import CategoricalBitmaps, count_bits
+from .metrics import typed_dist, ValueKind
+from .numeric_index import NumericKDTree
+from .text_index import TextRadiusSearch, TextValueIndex
+from .premise_schema import DistanceFunction, PremiseSchema
 from ..knowledge_resources.domain_case import DomainCase
 from ..knowledge_resources.premise import Premise
 from ..knowledge_resources.similar_domain_case import SimilarDomainCase
 
 
-def normalized_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase]) \
-    -> List[SimilarDomainCase]:
+def select_most_similar(candidate_cases: Sequence[DomainCase], similarities: Sequence[float],
+                        threshold: float = 0.0, k: Optional[int] = None) -> List[SimilarDomainCase]:
+    """
+    Returns the candidates with a similarity degree greater or equal than the threshold, ordered from the most to
+    the least similar (candidates with the same similarity keep their order). If k is given, only the k most similar
+    ones are selected, using a bounded heap instead of sorting all of them. The SimilarDomainCase objects are only
+    created for the selected candidates.
+
+    :param candidate_cases: The candidate domain-cases
+    :param similarities: The similarity degree of each candidate
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :return: A similar domain-case's list with the selected candidates ordered by its similarity degree
+    """
+    selected = [index for index, similarity in enumerate(similarities) if similarity >= threshold]
+    if k is not None and k < len(selected):
+        selected = nlargest(k, selected, key=similarities.__getitem__)
+    else:
+        selected.sort(key=similarities.__getitem__, reverse=True)
+    return [SimilarDomainCase(candidate_cases[index], similarities[index]) for index in selected]
+
+
+def get_distance_function(premise_id: int, schema: Optional[PremiseSchema],
+                          memo: Dict[Tuple[str, str], int]) -> DistanceFunction:
+    """
+    Returns the function used to calculate the distance between the premises with the given ID. Without a schema,
+    the typed contents of the premises are compared (see :func:`metrics.typed_dist`) using the given memo.
+
+    :param premise_id: The ID of the premises
+    :param schema: The premise schema of the domain, if any
+    :param memo: The memo of the Levenshtein distances of the retrieval
+    :return: A function that returns the distance between two premises
+    """
+    if schema is not None:
+        return schema.distance_function(premise_id)
+    return lambda a, b: typed_dist(a.typed_content, b.typed_content, memo=memo)
+
+
+def split_categorical_premises(premises: Dict[int, Premise],
+                               schema: Optional[PremiseSchema]) -> Tuple[List[Premise], List[Premise]]:
+    """
+    Splits the premises into the regular ones and the ones declared as categorical in the schema.
+
+    :param premises: Dict with the premises of the query
+    :param schema: The premise schema of the domain, if any
+    :return: The regular premises and the categorical premises (in their original order)
+    """
+    if schema is None:
+        return list(premises.values()), []
+    regular_premises: List[Premise] = []
+    categorical_premises: List[Premise] = []
+    for premise in premises.values():
+        if schema.is_categorical(premise.id):
+            categorical_premises.append(premise)
+        else:
+            regular_premises.append(premise)
+    return regular_premises, categorical_premises
+
+
+def categorical_mismatches(categorical_premises: List[Premise], candidate_cases: List[DomainCase],
+                           bitmaps: Optional[CategoricalBitmaps] = None) -> List[int]:
+    """
+    Returns, for each categorical premise, the bitmap of the candidates that do not match it (see
+    :meth:`CategoricalBitmaps.mismatches`).
+
+    :param categorical_premises: The categorical premises of the query
+    :param candidate_cases: The candidate domain-cases
+    :param bitmaps: The bitmaps of the candidates, if they have already been built
+    :return: The bitmap of the mismatching candidates of each premise
+    """
+    if bitmaps is None:
+        bitmaps = CategoricalBitmaps(candidate_cases, {premise.id for premise in categorical_premises})
+    return bitmaps.mismatches(categorical_premises)
+
+
+def normalized_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                    threshold: float = 0.0, k: Optional[int] = None,
+                                    schema: Optional[PremiseSchema] = None,
+                                    bitmaps: Optional[CategoricalBitmaps] = None) -> List[SimilarDomainCase]:
     """
     Returns a list of the candidate domain-cases with a similarity degree to the given domain-cases.
     The similarity is calculated using normalized Euclidean distance among the premises.
 
     :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
     :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built. The
+        premises declared as categorical are compared with bitwise operations and added after the other ones
     :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
     """
+    similarities = normalized_euclidean_similarities(premises, candidate_cases, schema, bitmaps)
+    return select_most_similar(candidate_cases, similarities, threshold, k)
+
+
+def normalized_euclidean_similarities(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                      schema: Optional[PremiseSchema] = None,
+                                      bitmaps: Optional[CategoricalBitmaps] = None,
+                                      max_distances: Optional[Dict[int, float]] = None) -> List[float]:
+    """
+    Calculates the similarity degree of each candidate with the normalized Euclidean distance (see
+    :func:`normalized_euclidean_similarity`).
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built
+    :param max_distances: If given, the maximum distance of each premise among all the candidates, when the given
+        ones are only a part of them (see :func:`premise_max_distances`)
+    :return: The similarity degree of each candidate [0.0...1.0]
+    """
     num_cases = len(candidate_cases)
     accum_dist = [0] * num_cases
+    memo: Dict[Tuple[str, str], int] = {}
 
-    for premise in premises.values():
+    regular_premises, categorical_premises = split_categorical_premises(premises, schema)
+    for premise in regular_premises:
+        distance = get_distance_function(premise.id, schema, memo)
         max_dist = 0.0
         index = 0
         # temporal vector of distances per attribute: key: case object, value: distance
@@ -32,7 +143,7 @@ def normalized_euclidean_similarity(premises: Dict[int, Premise], candidate_case
         for candidate in candidate_cases:
             candidate_premise = candidate.problem.context.premises.get(premise.id, None)
             if candidate_premise:
-                aux_dist[index] = do_dist(premise.content, candidate_premise.content)
+                aux_dist[index] = distance(premise, candidate_premise)
             else:
                 max_dist_vec[index] = True  # The attribute does not exist in the retrieved case
 
@@ -40,6 +151,8 @@ def normalized_euclidean_similarity(premises: Dict[int, Premise], candidate_case
             if aux_dist[index] > max_dist:
                 max_dist = aux_dist[index]
             index += 1
+        if max_distances is not None:
+            max_dist = max_distances[premise.id]
 
         # Now we normalize the distances -> [0.0...1.0]
         for index in range(num_cases):
@@ -53,67 +166,170 @@ def normalized_euclidean_similarity(premises: Dict[int, Premise], candidate_case
             aux_dist[index] += aux_dist[index]
             accum_dist[index] += aux_dist[index]
 
-    final_candidates: List[SimilarDomainCase] = []
+    if categorical_premises:
+        # The normalized distance of a categorical premise is 1.0 for the candidates that do not match it (if any of
+        # them does not) and 0.0 otherwise
+        mismatches = categorical_mismatches(categorical_premises, candidate_cases, bitmaps)
+        counts = count_bits(mismatches, num_cases)
+        for index in range(num_cases):
+            accum_dist[index] += 2 * counts[index]
+
+    similarities: List[float] = []
     index = 0
     for candidate in candidate_cases:
         for candidate_premise in candidate.problem.context.premises.values():
             if not premises.get(candidate_premise.id, None):  # Not found
                 accum_dist[index] += 1
 
-        similarity: float = 1 / (sqrt(accum_dist[index]) + 1)
-        final_candidates.append(SimilarDomainCase(candidate, similarity))
+        similarities.append(1 / (sqrt(accum_dist[index]) + 1))
         index += 1
 
-    return sorted(final_candidates, reverse=True)
+    return similarities
 
 
-def weighted_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase]) \
-    -> List[SimilarDomainCase]:
+def weighted_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                  threshold: float = 0.0, k: Optional[int] = None,
+                                  schema: Optional[PremiseSchema] = None,
+                                  bitmaps: Optional[CategoricalBitmaps] = None) -> List[SimilarDomainCase]:
     """
     Returns a list of the candidate domain-cases with a similarity degree to the given domain-cases.
     The similarity is calculated using weighted Euclidean distance among the premises.
 
     :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
     :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built. The
+        premises declared as categorical are compared with bitwise operations and added after the other ones
     :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
     """
-    final_candidates: List[SimilarDomainCase] = []
-    for candidate in candidate_cases:
+    similarities = weighted_euclidean_similarities(premises, candidate_cases, schema, bitmaps)
+    return select_most_similar(candidate_cases, similarities, threshold, k)
+
+
+def weighted_euclidean_similarities(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                    schema: Optional[PremiseSchema] = None,
+                                    bitmaps: Optional[CategoricalBitmaps] = None,
+                                    max_distances: Optional[Dict[int, float]] = None,
+                                    memo: Optional[Dict[Tuple[str, str], int]] = None) -> List[float]:
+    """
+    Calculates the similarity degree of each candidate with the weighted Euclidean distance (see
+    :func:`weighted_euclidean_similarity`).
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built
+    :param max_distances: Not used, the distances are not normalized
+    :param memo: If given, the memo of the Levenshtein distances of the retrieval, with the ones already known
+    :return: The similarity degree of each candidate [0.0...1.0]
+    """
+    similarities: List[float] = []
+    if memo is None:
+        memo = {}
+    regular_premises, categorical_premises = split_categorical_premises(premises, schema)
+    distances = [get_distance_function(case_premise.id, schema, memo) for case_premise in regular_premises]
+    weights = [1.0 if schema is None else schema.get_weight(case_premise.id) for case_premise in regular_premises]
+
+    # The categorical premises are grouped by weight: each group adds its squared weight times 2.0 per mismatch
+    categorical_counts: List[Tuple[float, List[int]]] = []
+    if categorical_premises:
+        mismatches = categorical_mismatches(categorical_premises, candidate_cases, bitmaps)
+        categorical_weights = [schema.get_weight(case_premise.id) for case_premise in categorical_premises]
+        for categorical_weight in sorted(set(categorical_weights)):
+            counts = count_bits([mismatch for mismatch, mismatch_weight in zip(mismatches, categorical_weights)
+                                 if mismatch_weight == categorical_weight], len(candidate_cases))
+            categorical_counts.append((categorical_weight * categorical_weight, counts))
+
+    for index, candidate in enumerate(candidate_cases):
         distance = 0.0
-        weight: List[float] = [1.0] * len(premises)
+        weight: List[float] = list(weights)
         attribute = 0
 
-        for case_premise in premises.values():
+        for case_premise in regular_premises:
             my_dist = 1.0
 
             candidate_premise = candidate.problem.context.premises.get(case_premise.id, None)
             if candidate_premise:
-                my_dist = do_dist(case_premise.content, candidate_premise.content)
+                my_dist = distances[attribute](case_premise, candidate_premise)
 
             weight[attribute] *= weight[attribute]
             my_dist += my_dist
             distance += weight[attribute] * my_dist
             attribute += 1
 
+        for squared_weight, counts in categorical_counts:
+            distance += squared_weight * (2.0 * counts[index])
+
         for candidate_premise in candidate.problem.context.premises.values():
             domain_case_premise = premises.get(candidate_premise.id, None)
             if not domain_case_premise:  # Not found
                 distance += 1
 
-        similarity: float = 1 / (sqrt(distance) + 1)
-        final_candidates.append(SimilarDomainCase(candidate, similarity))
+        similarities.append(1 / (sqrt(distance) + 1))
 
-    return sorted(final_candidates, reverse=True)
+    return similarities
 
 
-def normalized_tversky_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase]) \
-    -> List[SimilarDomainCase]:
+def normalized_tversky_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                  threshold: float = 0.0, k: Optional[int] = None,
+                                  schema: Optional[PremiseSchema] = None,
+                                  bitmaps: Optional[CategoricalBitmaps] = None,
+                                  alpha: float = 1.0, beta: float = 1.0) -> List[SimilarDomainCase]:
+    """
+    Returns a list of the candidate domain-cases with a similarity degree to the given domain-cases.
+    The similarity is calculated using the normalized Tversky contrast model: the common premises (the ones with a
+    normalized distance lower than 0.05) divided by the common ones plus alpha times the different ones (the premises
+    of the query with a greater distance or missing in the candidate) plus beta times the distinct ones (the
+    premises of the candidate missing in the query).
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built
+    :param alpha: The weight of the different premises
+    :param beta: The weight of the distinct premises
+    :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
+    """
+    similarities = normalized_tversky_similarities(premises, candidate_cases, schema, bitmaps, alpha=alpha, beta=beta)
+    return select_most_similar(candidate_cases, similarities, threshold, k)
+
+
+def normalized_tversky_similarities(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                    schema: Optional[PremiseSchema] = None,
+                                    bitmaps: Optional[CategoricalBitmaps] = None,
+                                    max_distances: Optional[Dict[int, float]] = None,
+                                    alpha: float = 1.0, beta: float = 1.0) -> List[float]:
+    """
+    Calculates the similarity degree of each candidate with the normalized Tversky contrast model (see
+    :func:`normalized_tversky_similarity`). The premises of the candidates are taken from their features (see
+    :meth:`DomainCase.get_features`): the distinct premises are a set difference and the distance of the premises
+    with the same content as the query is not calculated.
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built
+    :param max_distances: If given, the maximum distance of each premise among all the candidates, when the given
+        ones are only a part of them (see :func:`premise_max_distances`)
+    :param alpha: The weight of the different premises
+    :param beta: The weight of the distinct premises
+    :return: The similarity degree of each candidate [0.0...1.0]
+    """
     num_cases = len(candidate_cases)
     common_at: List[float] = [0.0] * num_cases
     different_at: List[float] = [0.0] * num_cases
-    distinct_at: List[float] = [0.0] * num_cases
+    memo: Dict[Tuple[str, str], int] = {}
+    candidate_features = [candidate.get_features() for candidate in candidate_cases]
 
-    for premise in premises.values():
+    regular_premises, categorical_premises = split_categorical_premises(premises, schema)
+    for premise in regular_premises:
+        distance = get_distance_function(premise.id, schema, memo)
+        # The candidates with the same content are at distance 0, unless the content is not equal to itself (NaN)
+        feature = (premise.id, premise.content) if distance(premise, premise) == 0 else None
         max_dist = 0.0
         index = 0
         # temporal vector of distances per attribute: key: case object, value: distance
@@ -122,17 +338,22 @@ def normalized_tversky_similarity(premises: Dict[int, Premise], candidate_cases:
         # This means the ones with the value True associated will have a final similarity value of 1
         max_dist_vec: List[bool] = [False] * num_cases
 
-        for candidate in candidate_cases:
-            candidate_premise = candidate.problem.context.premises.get(premise.id, None)
-            if candidate_premise:
-                aux_dist[index] = do_dist(premise.content, candidate_premise.content)
+        for candidate, features in zip(candidate_cases, candidate_features):
+            if feature in features.values:
+                aux_dist[index] = 0.0
             else:
-                max_dist_vec[index] = True  # The attribute does not exist in the retrieved case
+                candidate_premise = candidate.problem.context.premises.get(premise.id, None)
+                if candidate_premise:
+                    aux_dist[index] = distance(premise, candidate_premise)
+                else:
+                    max_dist_vec[index] = True  # The attribute does not exist in the retrieved case
 
-            # If the new calculated similarity is the greatest we update the value of the max
-            if aux_dist[index] > max_dist:
-                max_dist = aux_dist[index]
+                # If the new calculated similarity is the greatest we update the value of the max
+                if aux_dist[index] > max_dist:
+                    max_dist = aux_dist[index]
             index += 1
+        if max_distances is not None:
+            max_dist = max_distances[premise.id]
 
         # Now we normalize the distances
         for index in range(num_cases):
@@ -149,15 +370,321 @@ def normalized_tversky_similarity(premises: Dict[int, Premise], candidate_cases:
                 else:
                     different_at[index] += 1
 
-    final_candidates: List[SimilarDomainCase] = []
-    index = 0
+    if categorical_premises:
+        mismatches = categorical_mismatches(categorical_premises, candidate_cases, bitmaps)
+        if max_distances is None:
+            active = [mismatch for mismatch in mismatches if mismatch]
+        else:
+            active = [mismatch for premise, mismatch in zip(categorical_premises, mismatches)
+                      if max_distances[premise.id]]
+        counts = count_bits(active, num_cases)
+        for index in range(num_cases):
+            common_at[index] += len(active) - counts[index]
+            different_at[index] += counts[index]
+
+    query_ids = frozenset(premises)
+    similarities: List[float] = []
+    for common, different, features in zip(common_at, different_at, candidate_features):
+        distinct = len(features.premise_ids - query_ids)  # Premises of the candidate not found in the query
+        similarities.append(common / (common + alpha * different + beta * distinct))
+
+    return similarities
+
+
+def premise_max_distances(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                          schema: Optional[PremiseSchema] = None,
+                          bitmaps: Optional[CategoricalBitmaps] = None) -> Dict[int, float]:
+    """
+    Returns the maximum distance of each premise to the candidates, as calculated by the normalized algorithms (1.0
+    for the candidates without the premise; for categorical premises, 1.0 if some candidate does not match it).
+    The maximum of the values returned for different parts of the candidates is the maximum of all of them.
+
+    :param premises: Dict with the premises of the query
+    :param candidate_cases: The candidate domain-cases
+    :param schema: If given, the premise schema that declares the distance function of the premises
+    :param bitmaps: The bitmaps of the categorical premises of the candidates, if they have already been built
+    :return: The maximum distance of each premise ID
+    """
+    max_distances: Dict[int, float] = {}
+    memo: Dict[Tuple[str, str], int] = {}
+    regular_premises, categorical_premises = split_categorical_premises(premises, schema)
+    for premise in regular_premises:
+        distance = get_distance_function(premise.id, schema, memo)
+        max_dist = 0.0
+        for candidate in candidate_cases:
+            candidate_premise = candidate.problem.context.premises.get(premise.id, None)
+            my_dist = distance(premise, candidate_premise) if candidate_premise else 1.0
+            if my_dist > max_dist:
+                max_dist = my_dist
+        max_distances[premise.id] = max_dist
+    if categorical_premises:
+        mismatches = categorical_mismatches(categorical_premises, candidate_cases, bitmaps)
+        for premise, mismatch in zip(categorical_premises, mismatches):
+            max_distances[premise.id] = 1.0 if mismatch else 0.0
+    return max_distances
+
+
+def pruning_order(premises: Dict[int, Premise], schema: Optional[PremiseSchema] = None) -> List[Premise]:
+    """
+    Returns the premises sorted by the cost of their distance function: first the categorical ones, then the
+    numbers and timestamps and then the texts, so the cheapest ones are used to prune the candidates.
+
+    :param premises: Dict with the premises of the query
+    :param schema: The premise schema of the domain, if any
+    :return: The sorted premises
+    """
+    def cost(premise: Premise) -> int:
+        if schema is not None and schema.is_categorical(premise.id):
+            return 0
+        return 1 if premise.typed_content.kind is not ValueKind.STRING else 2
+
+    return sorted(premises.values(), key=cost)
+
+
+def euclidean_limit(min_similarity: float) -> float:
+    """
+    Returns the accumulated distance above which the Euclidean similarity (1 / (sqrt(distance) + 1)) is lower than
+    the given one, with a small margin for the rounding errors.
+
+    :param min_similarity: The minimum similarity degree
+    :return: The maximum accumulated distance
+    """
+    if min_similarity <= 0:
+        return inf
+    return (1 / min_similarity - 1) ** 2 * (1 + 1e-9) + 1e-12
+
+
+def update_top_similarities(top: List[float], similarity: float, k: Optional[int], min_similarity: float) -> float:
+    """
+    Adds a similarity to the heap of the k greatest ones and returns the minimum similarity that a candidate needs
+    to be selected: the given one, or the k-th greatest similarity once k candidates are found.
+
+    :param top: Min-heap with the greatest similarities found
+    :param similarity: The similarity of a selected candidate
+    :param k: If given, the maximum number of candidates to return
+    :param min_similarity: The current minimum similarity
+    :return: The new minimum similarity
+    """
+    if k is None:
+        return min_similarity
+    if len(top) < k:
+        heappush(top, similarity)
+    elif similarity > top[0]:
+        heapreplace(top, similarity)
+    if len(top) == k and top[0] > min_similarity:
+        return top[0]
+    return min_similarity
+
+
+def global_range_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                      ranges: AttributeRanges, threshold: float = 0.0, k: Optional[int] = None,
+                                      schema: Optional[PremiseSchema] = None) -> List[SimilarDomainCase]:
+    """
+    Returns a list of the candidate domain-cases with a similarity degree to the given domain-cases.
+    The similarity is calculated using the Euclidean distance among the premises, normalized by the maximum distance
+    of each premise to any case of the case-base (see :meth:`AttributeRanges.max_distance`) instead of to the
+    candidates. Each candidate is scored independently, so the premises of a candidate stop being compared as soon
+    as its similarity cannot reach the threshold (or the k-th greatest similarity found).
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param ranges: The ranges of the premises of the case-base
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function of the premises
+    :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
+    """
+    if k is not None and k <= 0:
+        return []
+    memo: Dict[Tuple[str, str], int] = {}
+    ordered_premises = pruning_order(premises, schema)
+    distances = [get_distance_function(premise.id, schema, memo) for premise in ordered_premises]
+    scales = [ranges.max_distance(premise, schema) for premise in ordered_premises]
+    query_ids = premises.keys()
+    top: List[float] = []
+    min_similarity = threshold
+    limit = euclidean_limit(min_similarity)
+
+    selected_cases: List[DomainCase] = []
+    similarities: List[float] = []
     for candidate in candidate_cases:
-        for candidate_premise in candidate.problem.context.premises.values():
-            if not premises.get(candidate_premise.id, None):  # Not found
-                distinct_at[index] += 1
+        candidate_premises = candidate.problem.context.premises
+        accum_dist = float(len(candidate_premises.keys() - query_ids))  # Premises not found in the query
+        for premise, distance, scale in zip(ordered_premises, distances, scales):
+            if accum_dist > limit:
+                break  # Pruned
+            candidate_premise = candidate_premises.get(premise.id, None)
+            if candidate_premise is None:
+                my_dist = 1.0
+            elif scale:
+                my_dist = min(distance(premise, candidate_premise) / scale, 1.0)
+            else:
+                my_dist = 0.0
+            accum_dist += my_dist + my_dist
+        else:
+            similarity = 1 / (sqrt(accum_dist) + 1)
+            if similarity >= min_similarity:
+                selected_cases.append(candidate)
+                similarities.append(similarity)
+                new_min_similarity = update_top_similarities(top, similarity, k, min_similarity)
+                if new_min_similarity != min_similarity:
+                    min_similarity = new_min_similarity
+                    limit = euclidean_limit(min_similarity)
 
-        similarity: float = common_at[index] / (common_at[index] + different_at[index] + distinct_at[index])
-        final_candidates.append(SimilarDomainCase(candidate, similarity))
-        index += 1
+    return select_most_similar(selected_cases, similarities, threshold, k)
+
+
+def global_range_tversky_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                    ranges: AttributeRanges, threshold: float = 0.0, k: Optional[int] = None,
+                                    schema: Optional[PremiseSchema] = None, alpha: float = 1.0,
+                                    beta: float = 1.0) -> List[SimilarDomainCase]:
+    """
+    Returns a list of the candidate domain-cases with a similarity degree to the given domain-cases.
+    The similarity is calculated using the normalized Tversky contrast model, with the distances normalized by the
+    maximum distance of each premise to any case of the case-base (see :meth:`AttributeRanges.max_distance`), so
+    every premise of the query is either common or different for each candidate. The premises of a candidate stop
+    being compared as soon as its similarity cannot reach the threshold (or the k-th greatest similarity found),
+    even if all the remaining premises were common.
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param ranges: The ranges of the premises of the case-base
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function of the premises
+    :param alpha: The weight of the different premises
+    :param beta: The weight of the distinct premises
+    :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
+    """
+    if k is not None and k <= 0:
+        return []
+    memo: Dict[Tuple[str, str], int] = {}
+    ordered_premises = pruning_order(premises, schema)
+    distances = [get_distance_function(premise.id, schema, memo) for premise in ordered_premises]
+    scales = [ranges.max_distance(premise, schema) for premise in ordered_premises]
+    query_ids = frozenset(premises)
+    top: List[float] = []
+    min_similarity = threshold
+
+    selected_cases: List[DomainCase] = []
+    similarities: List[float] = []
+    for candidate in candidate_cases:
+        candidate_premises = candidate.problem.context.premises
+        distinct = beta * len(candidate.get_features().premise_ids - query_ids)
+        common = different = 0
+        remaining = len(ordered_premises)
+        for premise, distance, scale in zip(ordered_premises, distances, scales):
+            # Upper bound: all the remaining premises are common
+            if (common + remaining) * (1 + 1e-9) < \
+                    min_similarity * (common + remaining + alpha * different + distinct):
+                break  # Pruned
+            candidate_premise = candidate_premises.get(premise.id, None)
+            if candidate_premise is not None \
+                    and (not scale or distance(premise, candidate_premise) / scale < 0.05):
+                common += 1
+            else:
+                different += 1
+            remaining -= 1
+        else:
+            similarity = common / (common + alpha * different + distinct)
+            if similarity >= min_similarity:
+                selected_cases.append(candidate)
+                similarities.append(similarity)
+                min_similarity = update_top_similarities(top, similarity, k, min_similarity)
+
+    return select_most_similar(selected_cases, similarities, threshold, k)
+
+
+def indexed_weighted_euclidean_similarity(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                          tree: Optional[NumericKDTree] = None, threshold: float = 0.0,
+                                          k: Optional[int] = None, schema: Optional[PremiseSchema] = None,
+                                          batch_size: int = 64,
+                                          text_index: Optional[TextValueIndex] = None) -> List[SimilarDomainCase]:
+    """
+    Returns the same list as :func:`weighted_euclidean_similarity`, but only the candidates that the indexes of the
+    case-base cannot discard are compared. The distance of the numeric premises in the KD-tree is a lower bound of the
+    weighted Euclidean distance, so the candidates farther than the threshold are discarded with a range search. If k
+    is given, the candidates are compared from the nearest in the tree, in batches, until the next one is farther than
+    the k-th greatest similarity found. The contents of the text premises are searched in the BK-trees of the text
+    index within the radius allowed by the threshold (or the k-th greatest similarity), and the candidates with other
+    contents are discarded without comparing their premises. Without KD-tree, the candidates are compared from the
+    nearest in the text premises once the limit is known.
+
+    :param premises: Dict with the premises to calculate the similarity with the candidate domain_cases
+    :param candidate_cases: The domain-cases that can be similar to the domain-case to solve
+    :param tree: If given, the KD-tree of the numeric premises of the case-base, with all the candidates
+    :param threshold: The minimum similarity degree of the returned candidates
+    :param k: If given, the maximum number of candidates to return
+    :param schema: If given, the premise schema that declares the distance function and the weight of the premises
+        (the same one of the tree)
+    :param batch_size: The number of candidates compared at once when k is given
+    :param text_index: If given, the index of the contents of the premises of the case-base
+    :return: A similar domain-case's list with the candidates ordered by its similarity degree [0.0...1.0]
+    """
+    if k is not None and k <= 0:
+        return []
+    limit = euclidean_limit(threshold)
+    text_search = TextRadiusSearch(text_index, premises, schema) if text_index is not None else None
+    memo = text_search.memo if text_search is not None else None
+    scored: Dict[int, float] = {}  # position -> similarity
+
+    def score(batch: List[int]) -> List[Tuple[int, float]]:
+        if text_search is not None and (tree is not None or k is None):  # Otherwise, filtered by text_nearest
+            text_search.set_limit(limit)
+            batch = [position for position in batch if text_search.lower_bound(candidate_cases[position]) <= limit]
+        batch_cases = [candidate_cases[position] for position in batch]
+        similarities = weighted_euclidean_similarities(premises, batch_cases, schema, memo=memo)
+        scored.update(zip(batch, similarities))
+        return list(zip(batch, similarities))
+
+    def text_nearest() -> Iterator[Tuple[float, int]]:
+        # The candidates in order until the limit is finite, and the rest from the nearest in the text index
+        position = 0
+        while position < len(candidate_cases) and limit == inf:
+            yield 0.0, position
+            position += 1
+        text_search.set_limit(limit)
+        bounds = [(text_search.lower_bound(candidate_cases[rest]), rest)
+                  for rest in range(position, len(candidate_cases))]
+        bounds.sort()
+        yield from bounds
+
+    if tree is None:
+        if text_search is not None:
+            nearest = text_nearest()
+        else:
+            nearest = ((0.0, position) for position in range(len(candidate_cases)))
+        positions: Optional[Dict[int, int]] = None
+    else:
+        nearest = tree.nearest(premises)
+        positions = {id(candidate): position for position, candidate in enumerate(candidate_cases)}
+
+    if k is None:
+        if tree is None:
+            score(list(range(len(candidate_cases))))
+        else:
+            score([positions[id(tree.cases[ordinal])] for ordinal in tree.range_search(premises, limit)
+                   if id(tree.cases[ordinal]) in positions])
+    else:
+        top: List[float] = []
+        min_similarity = threshold
+        batch: List[int] = []
+        while True:
+            bound, ordinal = next(nearest, (inf, None))
+            if ordinal is not None and bound <= limit:
+                position = ordinal if positions is None else positions.get(id(tree.cases[ordinal]))
+                if position is not None:
+                    batch.append(position)
+                if len(batch) < batch_size:
+                    continue
+            for position, similarity in score(batch):
+                if similarity >= min_similarity:
+                    min_similarity = update_top_similarities(top, similarity, k, min_similarity)
+            limit = euclidean_limit(min_similarity)
+            batch = []
+            if ordinal is None or bound > limit:
+                break
 
-    return sorted(final_candidates, reverse=True)
+    selected = sorted(scored)  # The candidates with the same similarity keep their order
+    return select_most_similar([candidate_cases[position] for position in selected],
+                               [scored[position] for position in selected], threshold, k)
@@ -0,0 +1,243 @@
+from dataclasses import dataclass, field
+from math import floor, inf
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from .metrics import levenshtein_distance, ValueKind
+from .premise_schema import AttributeKind, PremiseSchema
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+
+@dataclass
+class BKNode:
+    """A node of a :class:`BKTree`: a value and its children by their
+    distance to it"""
+    value: str
+    children: Dict[int, "BKNode"] = field(default_factory=lambda: {})
+    max_edge: int = 0  # The greatest distance to a child
+
+
+class BKTree:
+    """Burkhard-Keller tree of distinct strings under the Levenshtein
+    distance. The triangle inequality bounds the distances to the children
+    of each node, so a search only compares the values within the radius and
+    a part of the others. A discarded value keeps its node, which still
+    routes the searches, but it is not found any more; when more than half
+    of the nodes are discarded, the tree is built again"""
+
+    def __init__(self):
+        self.root: Optional[BKNode] = None
+        self.values: Set[str] = set()  # The values found by the searches
+        self.nodes = 0
+
+    def add(self, value: str):
+        """Adds a value to the tree, if it is not already in it
+
+        Args:
+            value (str): The value
+        """
+        if value in self.values:
+            return
+        self.values.add(value)
+        if self.root is None:
+            self.root = BKNode(value)
+            self.nodes = 1
+            return
+        node = self.root
+        while True:
+            distance = levenshtein_distance(value, node.value)
+            if distance == 0:  # A discarded value added again
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKNode(value)
+                node.max_edge = max(node.max_edge, distance)
+                self.nodes += 1
+                return
+            node = child
+
+    def discard(self, value: str):
+        """Removes a value from the values found by the searches
+
+        Args:
+            value (str): The value
+        """
+        self.values.discard(value)
+        if len(self.values) * 2 < self.nodes:
+            self.compact()
+
+    def compact(self):
+        """Builds the tree again with the values found by the searches,
+        dropping the nodes of the discarded ones"""
+        values = sorted(self.values)
+        self.root, self.values, self.nodes = None, set(), 0
+        for value in values:
+            self.add(value)
+
+    def search(self, value: str, radius: int) -> Dict[str, int]:
+        """Returns the values of the tree within a distance of the given one
+
+        Args:
+            value (str): The value to search
+            radius (int): The maximum distance
+
+        Returns:
+            Dict[str, int]: The distance of each value found
+        """
+        found: Dict[str, int] = {}
+        nodes = [self.root] if self.root is not None else []
+        while nodes:
+            node = nodes.pop()
+            # A distance greater than radius + max_edge discards the node and all its children
+            distance = levenshtein_distance(value, node.value, radius + node.max_edge)
+            if distance <= radius and node.value in self.values:
+                found[node.value] = distance
+            for edge, child in node.children.items():
+                if distance - radius <= edge <= distance + radius:
+                    nodes.append(child)
+        return found
+
+
+class TextValueIndex:
+    """A :class:`BKTree` of the distinct contents of each premise ID of a
+    domain case-base, updated incrementally. The cases of each content are
+    counted, so it is discarded when the last one is removed"""
+
+    def __init__(self):
+        self.trees: Dict[int, BKTree] = {}
+        self.counts: Dict[Tuple[int, str], int] = {}  # (premise id, content) -> number of cases
+
+    def add_case(self, new_case: DomainCase):
+        """Adds the contents of the premises of a domain case to the trees
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+        """
+        for premise in new_case.problem.context.premises.values():
+            tree = self.trees.get(premise.id)
+            if tree is None:
+                tree = self.trees[premise.id] = BKTree()
+            tree.add(premise.content)
+            key = (premise.id, premise.content)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def remove_case(self, old_case: DomainCase):
+        """Discards the contents of the premises of a domain case that no
+        other case has
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        for premise in old_case.problem.context.premises.values():
+            key = (premise.id, premise.content)
+            count = self.counts.get(key, 0) - 1
+            if count > 0:
+                self.counts[key] = count
+            elif key in self.counts:
+                del self.counts[key]
+                self.trees[premise.id].discard(premise.content)
+
+    def search(self, premise_id: int, value: str, radius: int) -> Dict[str, int]:
+        """Returns the contents of the premises with the given ID within a
+        Levenshtein distance of the given value (see :meth:`BKTree.search`)"""
+        tree = self.trees.get(premise_id)
+        return tree.search(value, radius) if tree is not None else {}
+
+
+def text_premises(premises: Mapping[int, Premise],
+                  schema: Optional[PremiseSchema] = None) -> List[Tuple[Premise, float]]:
+    """Returns the premises of a query whose distance to the premises of any
+    case is the Levenshtein distance of their contents, and what the weighted
+    Euclidean distance adds per unit of that distance (twice the squared
+    weight of the premise). Those are the premises of the text attributes of
+    the schema and, for the premises without declared attribute, the ones
+    that are not numbers or timestamps different from 0 (see
+    :func:`metrics.typed_dist`)
+
+    Args:
+        premises (Mapping[int, Premise]): The premises of the query
+        schema (Optional[PremiseSchema]): The premise schema of the domain
+
+    Returns:
+        List[Tuple[Premise, float]]: The text premises and their factors
+    """
+    selected: List[Tuple[Premise, float]] = []
+    for premise in premises.values():
+        attribute = schema.get_attribute(premise.id) if schema is not None else None
+        if attribute is not None:
+            if attribute.kind != AttributeKind.TEXT:
+                continue
+        elif premise.typed_content.kind is not ValueKind.STRING and premise.typed_content.value:
+            continue
+        weight = schema.get_weight(premise.id) if schema is not None else 1.0
+        selected.append((premise, 2.0 * weight * weight))
+    return selected
+
+
+class TextRadiusSearch:
+    """The contents of the case-base within the radius of each text premise
+    of a query (see :func:`text_premises`) that keeps the weighted Euclidean
+    distance under a limit. The limit can only decrease, so the contents are
+    searched in the index once and filtered afterwards. The distances found
+    are also added to a memo of the Levenshtein distances of the retrieval
+    (see :func:`similarity_algorithms.get_distance_function`)"""
+
+    def __init__(self, index: TextValueIndex, premises: Mapping[int, Premise],
+                 schema: Optional[PremiseSchema] = None):
+        """
+        Args:
+            index (TextValueIndex): The index of the contents of the case-base
+            premises (Mapping[int, Premise]): The premises of the query
+            schema (Optional[PremiseSchema]): The premise schema of the domain
+        """
+        self.index = index
+        self.premises = text_premises(premises, schema)
+        self.radii: Optional[List[int]] = None
+        self.distances: Optional[List[Dict[str, int]]] = None  # Per text premise, once the limit is finite
+        self.memo: Dict[Tuple[str, str], int] = {}
+
+    def set_limit(self, limit: float):
+        """Discards the contents farther than the radius given by the limit
+
+        Args:
+            limit (float): The maximum weighted Euclidean distance
+        """
+        if limit == inf or not self.premises:
+            return
+        radii = [floor(limit / factor) for _, factor in self.premises]
+        if radii == self.radii:
+            return
+        self.radii = radii
+        if self.distances is None:
+            self.distances = []
+            for (premise, _), radius in zip(self.premises, radii):
+                found = self.index.search(premise.id, premise.content, radius)
+                self.distances.append(found)
+                self.memo.update(((premise.content, value), distance) for value, distance in found.items())
+        else:
+            self.distances = [{value: distance for value, distance in found.items() if distance <= radius}
+                              for found, radius in zip(self.distances, radii)]
+
+    def lower_bound(self, candidate: DomainCase) -> float:
+        """Returns the distance that the text premises add to the weighted
+        Euclidean distance of a candidate, or inf if any of its contents is
+        farther than the radius. The premises missing in the candidate add 0
+
+        Args:
+            candidate (DomainCase): The candidate
+
+        Returns:
+            float: The lower bound of the distance of the candidate
+        """
+        if self.distances is None:
+            return 0.0
+        bound = 0.0
+        candidate_premises = candidate.problem.context.premises
+        for (premise, factor), found in zip(self.premises, self.distances):
+            candidate_premise = candidate_premises.get(premise.id)
+            if candidate_premise is not None:
+                distance = found.get(candidate_premise.content)
+                if distance is None:
+                    return inf
+                bound += factor * distance
+        return bound
@@ -0,0 +1,547 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .metrics import typed_dist, TypedValue, ValueKind, NUMERIC_KINDS
+from .premise_schema import PremiseSchema
+from ..configuration.configuration_parameters import SimilarityType
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+from ..knowledge_resources.similar_domain_case import SimilarDomainCase
+
+
+NUMBER = 0
+TIMESTAMP = 1
+TEXT = 2
+
+
+def value_category(value: TypedValue) -> int:
+    """Category of a typed value: values of the same category (except TEXT)
+    are compared by their absolute difference (see :func:`metrics.typed_dist`)
+    """
+    if value.kind in NUMERIC_KINDS:
+        return NUMBER
+    if value.kind is ValueKind.TIMESTAMP:
+        return TIMESTAMP
+    return TEXT
+
+
+class CaseMatrix:
+    """Dense representation of the premises of a domain case-base used to
+    calculate the similarity algorithms with batched NumPy operations.
+
+    For every premise ID the matrix stores one array with a value code per
+    case (-1 when the case does not have the premise). The distance between
+    the query and the candidates is only calculated once per distinct value,
+    and the normalization and accumulation steps are done over whole arrays.
+    The scores and the ranking are the same ones returned by the functions of
+    :mod:`similarity_algorithms`.
+    """
+
+    def __init__(self, cases: Sequence[DomainCase] = ()):
+        """
+        Args:
+            cases (Sequence[DomainCase]): The initial domain cases of the matrix
+        """
+        self.cases: List[Optional[DomainCase]] = []  # row -> case (None if removed)
+        self.rows: Dict[int, int] = {}  # id of the case object -> row
+        self.values: Dict[int, List[Premise]] = {}  # premise id -> a premise with each distinct content
+        self.value_codes: Dict[int, Dict[str, int]] = {}  # premise id -> content -> code
+        self.codes: Dict[int, np.ndarray] = {}  # premise id -> code of each row
+        # premise id -> (category, number) of each distinct value, built on demand
+        self.value_arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.num_premises: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.capacity = 0
+        for a_case in cases:
+            self.add_case(a_case)
+
+    def __len__(self):
+        return len(self.cases)
+
+    def add_case(self, new_case: DomainCase) -> int:
+        """Adds a domain case as a new row of the matrix
+
+        Args:
+            new_case (DomainCase): The domain case to add
+
+        Returns:
+            int: The row of the case in the matrix
+        """
+        row = self.rows.get(id(new_case))
+        if row is not None:
+            return row
+        row = len(self.cases)
+        if row == self.capacity:
+            self.grow()
+        premises = new_case.problem.context.premises
+        for premise_id, premise in premises.items():
+            codes = self.codes.get(premise_id)
+            if codes is None:
+                codes = np.full(self.capacity, -1, dtype=np.int32)
+                self.codes[premise_id] = codes
+                self.values[premise_id] = []
+                self.value_codes[premise_id] = {}
+            value_codes = self.value_codes[premise_id]
+            code = value_codes.get(premise.content)
+            if code is None:
+                code = len(self.values[premise_id])
+                value_codes[premise.content] = code
+                self.values[premise_id].append(premise)
+            codes[row] = code
+        self.num_premises[row] = len(premises)
+        self.rows[id(new_case)] = row
+        self.cases.append(new_case)
+        return row
+
+    def remove_case(self, old_case: DomainCase):
+        """Removes a domain case from the matrix. Its row is not reused, it
+        is only left out of the rows of the candidates, until more than half
+        of the rows are removed and the matrix is built again
+
+        Args:
+            old_case (DomainCase): The domain case removed from the case-base
+        """
+        row = self.rows.pop(id(old_case), None)
+        if row is not None:
+            self.cases[row] = None
+            if len(self.rows) * 2 < len(self.cases):
+                self.compact()
+
+    def compact(self):
+        """Builds the matrix again with the remaining cases, in the same
+        order, dropping the rows and the distinct values of the removed ones"""
+        cases = [a_case for a_case in self.cases if a_case is not None]
+        self.cases, self.rows, self.values, self.value_codes, self.codes = [], {}, {}, {}, {}
+        self.value_arrays = {}
+        self.num_premises = np.zeros(0, dtype=np.int64)
+        self.capacity = 0
+        for a_case in cases:
+            self.add_case(a_case)
+
+    def grow(self):
+        """Doubles the capacity of the arrays of the matrix"""
+        new_capacity = max(16, self.capacity * 2)
+        for premise_id, codes in self.codes.items():
+            new_codes = np.full(new_capacity, -1, dtype=np.int32)
+            new_codes[:self.capacity] = codes
+            self.codes[premise_id] = new_codes
+        num_premises = np.zeros(new_capacity, dtype=np.int64)
+        num_premises[:self.capacity] = self.num_premises
+        self.num_premises = num_premises
+        self.capacity = new_capacity
+
+    def get_rows(self, candidate_cases: Sequence[DomainCase]) -> np.ndarray:
+        """Returns the rows of the given cases, adding the ones that are not
+        in the matrix yet
+
+        Args:
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+
+        Returns:
+            np.ndarray: The row of each candidate (in the same order)
+        """
+        rows = [self.rows.get(id(a_case)) for a_case in candidate_cases]
+        for index, row in enumerate(rows):
+            if row is None:
+                rows[index] = self.add_case(candidate_cases[index])
+        return np.array(rows, dtype=np.int64)
+
+    def premise_distances(self, premises: Sequence[Premise], rows: np.ndarray,
+                          memo: Optional[Dict[Tuple[str, str], int]] = None,
+                          schema: Optional[PremiseSchema] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the distance between the content of some premises with
+        the same ID (one per query) and the content of that premise in each one
+        of the given rows. The distance is only calculated once per distinct
+        pair of contents
+
+        Args:
+            premises (Sequence[Premise]): The premises of the queries, all of
+                them with the same ID
+            rows (np.ndarray): The rows of the candidate cases
+            memo (Optional[Dict[Tuple[str, str], int]]): Memo of the
+                Levenshtein distances of the retrieval
+            schema (Optional[PremiseSchema]): If given, the distances are
+                calculated with the distance function of the attribute
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The distances, a matrix with a row
+            per query and a column per candidate (1.0 when the candidate does
+            not have the premise), and the mask of the candidates that do not
+            have the premise
+        """
+        premise_id = premises[0].id
+        codes = self.codes.get(premise_id)
+        if codes is None:
+            return np.ones((len(premises), len(rows))), np.ones(len(rows), dtype=bool)
+        candidate_codes = codes[rows]
+        missing = candidate_codes < 0
+        values = self.values[premise_id]
+        present_codes = np.unique(candidate_codes[~missing])
+        query_values: Dict[str, int] = {}
+        query_premises: List[Premise] = []
+        query_indexes: List[int] = []
+        for premise in premises:
+            query_index = query_values.get(premise.content)
+            if query_index is None:
+                query_index = query_values[premise.content] = len(query_premises)
+                query_premises.append(premise)
+            query_indexes.append(query_index)
+        value_distances = np.zeros((len(query_premises), len(values)))
+        if schema is not None:
+            distance = schema.distance_function(premise_id)
+            for query_index, premise in enumerate(query_premises):
+                for code in present_codes.tolist():
+                    value_distances[query_index, code] = distance(premise, values[code])
+        else:
+            self.typed_value_distances(premise_id, query_premises, present_codes, value_distances, memo)
+        distances = value_distances[query_indexes][:, candidate_codes]
+        distances[:, missing] = 1.0
+        return distances, missing
+
+    def typed_value_distances(self, premise_id: int, query_premises: Sequence[Premise], present_codes: np.ndarray,
+                              value_distances: np.ndarray, memo: Optional[Dict[Tuple[str, str], int]] = None):
+        """Fills the distances between the typed contents of the query
+        premises and the given distinct values of the premise, as
+        :func:`metrics.typed_dist` does. Numbers and timestamps are compared
+        with the values of the same category in one vectorized operation
+
+        Args:
+            premise_id (int): The ID of the premise
+            query_premises (Sequence[Premise]): The distinct query premises
+            present_codes (np.ndarray): The codes of the values to compare
+            value_distances (np.ndarray): The matrix to fill, with a row per
+                query premise and a column per value code
+            memo (Optional[Dict[Tuple[str, str], int]]): Memo of the
+                Levenshtein distances of the retrieval
+        """
+        values = self.values[premise_id]
+        categories, numbers = self.get_value_arrays(premise_id)
+        for query_index, premise in enumerate(query_premises):
+            query_value = premise.typed_content
+            category = value_category(query_value)
+            text_codes = present_codes
+            if category != TEXT and query_value.value:
+                # Numbers and timestamps different from 0 are compared with the same category
+                same_category = (categories[present_codes] == category) & (numbers[present_codes] != 0)
+                number_codes = present_codes[same_category]
+                value_distances[query_index, number_codes] = np.abs(query_value.value - numbers[number_codes])
+                text_codes = present_codes[~same_category]
+            for code in text_codes.tolist():
+                value_distances[query_index, code] = typed_dist(query_value, values[code].typed_content, memo=memo)
+
+    def categorical_mismatches(self, premises: Sequence[Premise], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Compares the value code of some categorical premises with the same
+        ID (one per query) with the code of that premise in each one of the
+        given rows, so no distance is calculated
+
+        Args:
+            premises (Sequence[Premise]): The premises of the queries, all of
+                them with the same ID
+            rows (np.ndarray): The rows of the candidate cases
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The mismatches, a boolean matrix
+            with a row per query and a column per candidate (True when the
+            candidate has a different content or does not have the premise),
+            and the mask of the candidates that do not have the premise
+        """
+        codes = self.codes.get(premises[0].id)
+        if codes is None:
+            return np.ones((len(premises), len(rows)), dtype=bool), np.ones(len(rows), dtype=bool)
+        candidate_codes = codes[rows]
+        value_codes = self.value_codes[premises[0].id]
+        query_codes = np.array([value_codes.get(premise.content, -2) for premise in premises])
+        return candidate_codes[None, :] != query_codes[:, None], candidate_codes < 0
+
+    def get_value_arrays(self, premise_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the category and the number (0.0 for texts) of each
+        distinct value of a premise
+
+        Args:
+            premise_id (int): The ID of the premise
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The categories and the numbers
+        """
+        values = self.values[premise_id]
+        arrays = self.value_arrays.get(premise_id)
+        if arrays is None or len(arrays[0]) != len(values):
+            typed_values = [premise.typed_content for premise in values]
+            categories = np.array([value_category(value) for value in typed_values], dtype=np.int8)
+            numbers = np.array([0.0 if category == TEXT else value.value
+                                for category, value in zip(categories.tolist(), typed_values)])
+            arrays = (categories, numbers)
+            self.value_arrays[premise_id] = arrays
+        return arrays
+
+    @staticmethod
+    def normalize(distances: np.ndarray, missing: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalizes the distances of a premise (one row per query) by their
+        maximum value. The candidates without the premise get the maximum
+        normalized distance, and all of them get 0.0 when the maximum is 0.0
+
+        Args:
+            distances (np.ndarray): The distances of the premise
+            missing (np.ndarray): Mask of the candidates without the premise
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The normalized distances
+            [0.0...1.0] and the mask of the queries with a maximum distance
+            greater than 0.0
+        """
+        max_dist = np.maximum(distances.max(axis=1), 0.0)
+        positive = max_dist > 0
+        normalized = distances / np.where(positive, max_dist, 1.0)[:, None]
+        normalized[:, missing] = 1.0
+        normalized[~positive] = 0.0
+        return normalized, positive
+
+    @staticmethod
+    def add_ones(accum: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """Adds 1 to each accumulator as many times as given. The additions
+        are done one by one to obtain exactly the same floating point values
+        as the pure Python algorithms
+        """
+        for step in range(int(times.max(initial=0))):
+            accum = accum + (times > step)
+        return accum
+
+    @staticmethod
+    def select_most_similar(candidate_cases: Sequence[DomainCase], similarities: np.ndarray,
+                            threshold: float = 0.0, k: Optional[int] = None) -> List[SimilarDomainCase]:
+        """Vectorized version of :func:`similarity_algorithms.select_most_similar`.
+        When k is given, a partial selection (np.argpartition) finds the k-th
+        greatest similarity and only the candidates above it (and the first
+        ones equal to it) are sorted
+
+        Args:
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+            similarities (np.ndarray): The similarity degree of each candidate
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return
+
+        Returns:
+            List[SimilarDomainCase]: The selected candidates ordered by their
+            similarity degree
+        """
+        selected = np.flatnonzero(similarities >= threshold)
+        if k is not None and k < len(selected):
+            if k <= 0:
+                return []
+            selected_similarities = similarities[selected]
+            kth = np.partition(selected_similarities, len(selected) - k)[len(selected) - k]
+            greater = selected[selected_similarities > kth]
+            ties = selected[selected_similarities == kth][:k - len(greater)]
+            selected = np.sort(np.concatenate((greater, ties)))
+        selected = selected[np.argsort(-similarities[selected], kind='stable')]
+        return [SimilarDomainCase(candidate_cases[index], similarity)
+                for index, similarity in zip(selected.tolist(), similarities[selected].tolist())]
+
+    def similarities(self, premises_list: Sequence[Dict[int, Premise]], candidate_cases: Sequence[DomainCase],
+                     similarity_type: SimilarityType, schema: Optional[PremiseSchema] = None,
+                     alpha: float = 1.0, beta: float = 1.0) -> np.ndarray:
+        """Calculates the similarity degree of the candidates with each one of
+        the given queries, sharing the candidate arrays and the distances
+        between the same contents among all the queries. The premises of each
+        query are processed in their own order, so the results are exactly the
+        same ones obtained querying them one by one
+
+        Args:
+            premises_list (Sequence[Dict[int, Premise]]): The premises of each
+                query
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+                (the same ones for every query)
+            similarity_type (SimilarityType): The similarity algorithm
+            schema (Optional[PremiseSchema]): If given, the premise schema
+                that declares the distance function and the weight of the
+                premises
+            alpha (float): The weight of the different premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+            beta (float): The weight of the distinct premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+
+        Returns:
+            np.ndarray: The similarities, a row per query and a column per
+            candidate
+
+        Raises:
+            ZeroDivisionError: With SimilarityType.NORMALIZED_TVERSKY, when a
+                candidate has no common, different nor distinct attributes, as
+                the pure Python version does
+        """
+        rows = self.get_rows(candidate_cases)
+        shape = (len(premises_list), len(rows))
+        memo: Dict[Tuple[str, str], int] = {}
+        accum_dist = np.zeros(shape)
+        common_at = np.zeros(shape)
+        different_at = np.zeros(shape)
+        matched = np.zeros(shape, dtype=np.int64)
+        # Mismatches of the categorical premises, added after the other premises (weight -> counts when weighted)
+        categorical_counts: Dict[float, np.ndarray] = {}
+
+        queries_premises = [list(premises.values()) for premises in premises_list]
+        for position in range(max(map(len, queries_premises), default=0)):
+            # The queries with the same premise ID in this position are processed together
+            queries_by_premise: Dict[int, List[int]] = {}
+            for query, premises in enumerate(queries_premises):
+                if position < len(premises):
+                    queries_by_premise.setdefault(premises[position].id, []).append(query)
+
+            for queries in queries_by_premise.values():
+                query_premises = [queries_premises[query][position] for query in queries]
+                if schema is not None and schema.is_categorical(query_premises[0].id):
+                    mismatches, missing = self.categorical_mismatches(query_premises, rows)
+                    matched[queries] += ~missing
+                    if similarity_type == SimilarityType.NORMALIZED_TVERSKY:
+                        # The premise only counts when some candidate does not match it
+                        common_at[queries] += ~mismatches & mismatches.any(axis=1)[:, None]
+                        different_at[queries] += mismatches
+                        continue
+                    weight = 1.0
+                    if similarity_type == SimilarityType.WEIGHTED_EUCLIDEAN:
+                        weight = schema.get_weight(query_premises[0].id)
+                    counts = categorical_counts.setdefault(weight, np.zeros(shape, dtype=np.int64))
+                    counts[queries] += mismatches
+                    continue
+                distances, missing = self.premise_distances(query_premises, rows, memo, schema)
+                matched[queries] += ~missing
+                if similarity_type == SimilarityType.WEIGHTED_EUCLIDEAN:
+                    weight = 1.0 if schema is None else schema.get_weight(query_premises[0].id)
+                    accum_dist[queries] += weight * weight * (distances + distances)
+                    continue
+                distances, positive = self.normalize(distances, missing)
+                if similarity_type == SimilarityType.NORMALIZED_TVERSKY:
+                    common = distances < 0.05
+                    common_at[queries] += common & positive[:, None]
+                    different_at[queries] += ~common & positive[:, None]
+                else:
+                    accum_dist[queries] += distances + distances
+
+        for weight in sorted(categorical_counts):
+            accum_dist = accum_dist + weight * weight * (2.0 * categorical_counts[weight])
+        extra_premises = self.num_premises[rows] - matched
+        if similarity_type == SimilarityType.NORMALIZED_TVERSKY:
+            total = common_at + alpha * different_at + beta * extra_premises
+            if not total.all():
+                raise ZeroDivisionError("float division by zero")
+            return common_at / total
+        return 1 / (np.sqrt(self.add_ones(accum_dist, extra_premises)) + 1)
+
+    def similarity_many(self, premises_list: Sequence[Dict[int, Premise]], candidate_cases: Sequence[DomainCase],
+                        similarity_type: SimilarityType, threshold: float = 0.0, k: Optional[int] = None,
+                        schema: Optional[PremiseSchema] = None, alpha: float = 1.0,
+                        beta: float = 1.0) -> List[List[SimilarDomainCase]]:
+        """Returns the most similar candidates to each one of the given
+        queries (see :meth:`similarities`)
+
+        Args:
+            premises_list (Sequence[Dict[int, Premise]]): The premises of each
+                query
+            candidate_cases (Sequence[DomainCase]): The candidate domain cases
+                (the same ones for every query)
+            similarity_type (SimilarityType): The similarity algorithm
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return per query
+            schema (Optional[PremiseSchema]): If given, the premise schema
+                that declares the distance function and the weight of the
+                premises
+            alpha (float): The weight of the different premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+            beta (float): The weight of the distinct premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+
+        Returns:
+            List[List[SimilarDomainCase]]: The selected candidates of each
+            query ordered by their similarity degree
+        """
+        if not candidate_cases:
+            return [[] for _ in premises_list]
+        similarities = self.similarities(premises_list, candidate_cases, similarity_type, schema, alpha, beta)
+        return [self.select_most_similar(candidate_cases, query_similarities, threshold, k)
+                for query_similarities in similarities]
+
+    def normalized_euclidean_similarity(self, premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                        threshold: float = 0.0, k: Optional[int] = None,
+                                        schema: Optional[PremiseSchema] = None) -> List[SimilarDomainCase]:
+        """Vectorized version of
+        :func:`similarity_algorithms.normalized_euclidean_similarity`
+
+        Args:
+            premises (Dict[int, Premise]): The premises to calculate the
+                similarity with the candidate domain cases
+            candidate_cases (List[DomainCase]): The domain cases that can be
+                similar to the domain case to solve
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return
+            schema (Optional[PremiseSchema]): If given, the premise schema
+                of the domain
+
+        Returns:
+            List[SimilarDomainCase]: The candidates ordered by its similarity
+            degree [0.0...1.0]
+        """
+        return self.similarity_many([premises], candidate_cases, SimilarityType.NORMALIZED_EUCLIDEAN, threshold, k,
+                                    schema)[0]
+
+    def weighted_euclidean_similarity(self, premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                      threshold: float = 0.0, k: Optional[int] = None,
+                                      schema: Optional[PremiseSchema] = None) -> List[SimilarDomainCase]:
+        """Vectorized version of
+        :func:`similarity_algorithms.weighted_euclidean_similarity`
+
+        Args:
+            premises (Dict[int, Premise]): The premises to calculate the
+                similarity with the candidate domain cases
+            candidate_cases (List[DomainCase]): The domain cases that can be
+                similar to the domain case to solve
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return
+            schema (Optional[PremiseSchema]): If given, the premise schema
+                of the domain
+
+        Returns:
+            List[SimilarDomainCase]: The candidates ordered by its similarity
+            degree [0.0...1.0]
+        """
+        return self.similarity_many([premises], candidate_cases, SimilarityType.WEIGHTED_EUCLIDEAN, threshold, k,
+                                    schema)[0]
+
+    def normalized_tversky_similarity(self, premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                      threshold: float = 0.0, k: Optional[int] = None,
+                                      schema: Optional[PremiseSchema] = None, alpha: float = 1.0,
+                                      beta: float = 1.0) -> List[SimilarDomainCase]:
+        """Vectorized version of
+        :func:`similarity_algorithms.normalized_tversky_similarity`
+
+        Args:
+            premises (Dict[int, Premise]): The premises to calculate the
+                similarity with the candidate domain cases
+            candidate_cases (List[DomainCase]): The domain cases that can be
+                similar to the domain case to solve
+            threshold (float): The minimum similarity degree of the returned
+                candidates
+            k (Optional[int]): If given, the maximum number of candidates to
+                return
+            schema (Optional[PremiseSchema]): If given, the premise schema
+                of the domain
+            alpha (float): The weight of the different premises
+            beta (float): The weight of the distinct premises
+
+        Returns:
+            List[SimilarDomainCase]: The candidates ordered by its similarity
+            degree [0.0...1.0]
+
+        Raises:
+            ZeroDivisionError: When a candidate has no common, different nor
+                distinct attributes, as the pure Python version does
+        """
+        return self.similarity_many([premises], candidate_cases, SimilarityType.NORMALIZED_TVERSKY, threshold, k,
+                                    schema, alpha, beta)[0]
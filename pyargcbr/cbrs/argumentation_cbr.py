@@ -1,11 +1,15 @@
 from math import inf
-from pickle import load
 from typing import Dict, List, Sequence, Mapping, ValuesView
 
 from loguru import logger
 
 from ..agents.configuration import Configuration
+from ..cbrs.case_fingerprints import argument_case_fingerprint, argument_case_key, contents_fingerprint
+from ..cbrs.case_loader import gc_paused, LoadSummary
+from ..cbrs.case_log import ADD
+from ..cbrs.case_snapshot import SnapshotStatistics
 from ..cbrs.cbr import CBR
+from ..cbrs.columnar_snapshot import ColumnarSnapshot, get_case_key, open_snapshot
 from ..knowledge_resources.acceptability_status import AcceptabilityStatus
 from ..knowledge_resources.argument_case import ArgumentCase
 from ..knowledge_resources.argument_problem import ArgumentProblem
@@ -21,6 +25,7 @@ class ArgCBR(CBR):
     argument-cases that represent past argumentation experiences and their final
     outcome.
     """
+    snapshot_key = staticmethod(argument_case_key)
 
     def __init__(self, initial_file_path: str, storing_file_path: str):
         """
@@ -31,164 +36,220 @@ class ArgCBR(CBR):
                 domain-cases will be stored.
         """
         super().__init__(initial_file_path, storing_file_path)
+        self.fingerprints: Dict[int, List[ArgumentCase]] = {}
         self.load_case_base()
 
     def load_case_base(self):
-        """Loads the case-base stored in the initial file path"""
+        """Loads the case-base stored in the initial file path. If it is a
+        columnar snapshot, the argument-cases are loaded as lazy cases,
+        unpickled on their first use (see :meth:`add_snapshot_case`); the
+        snapshots stored by :meth:`do_cache` have that format if
+        Configuration.arg_cbr_snapshot_format says so. If
+        Configuration.arg_cbr_case_log is set, the last snapshot is loaded
+        instead (see :meth:`get_snapshot_path`) and the case log is replayed
+        on top of it (see :meth:`open_case_log`)"""
         super().load_case_base()  # Currently it does nothing
+        c = Configuration()
+        self.close_case_log()
+        self.snapshot_format = c.arg_cbr_snapshot_format
         self.case_base = {}
-        introduced = 0
-        not_introduced = 0
-        str_ids: str = ""  # This was not on the original code ()
-        with open(self.initial_file_path, 'rb') as fh:
-            while True:
-                try:
-                    aux = load(fh)
-                    if type(aux) == ArgumentCase:
-                        a_case: ArgumentCase = aux
-                        str_ids += str(a_case.solutions.conclusion.id) + " "
+        self.fingerprints = {}
+        loader = open_snapshot(self.get_snapshot_path(c.arg_cbr_case_log), ArgumentCase)
+        summary = LoadSummary()
+        with gc_paused():
+            for chunk in loader.chunks():
+                for a_case in chunk:
+                    if isinstance(loader, ColumnarSnapshot):
+                        returned_value = self.add_snapshot_case(loader, a_case)
+                    else:
                         returned_value = self.add_case(a_case)
-                        if returned_value:
-                            introduced += 1
-                        else:
-                            not_introduced += 1
-                except EOFError:
-                    break
-        logger.info(self.initial_file_path, "argument_cases: ", introduced + not_introduced,
-                    "introduced: ", introduced, "not_introduced: ", not_introduced, "sols: ", str_ids)
+                    conclusion_id = get_case_key(a_case, self.snapshot_key)[4]  # See argument_case_key
+                    summary.add(conclusion_id, returned_value)
+        logger.info("{}: argument {}", loader.file_path, summary)
+        if c.arg_cbr_case_log:
+            self.open_case_log(loader.checkpoint, c.arg_cbr_case_log_compaction)
+
+    def add_snapshot_case(self, snapshot: ColumnarSnapshot, a_case: ArgumentCase) -> bool:
+        """Adds a lazy argument-case of a columnar snapshot without
+        materializing it, if no argument-case of the case-base has its
+        fingerprint (computed from the premise columns and the key stored in
+        the snapshot, see :func:`argument_case_key`); otherwise, it is
+        compared with them by :meth:`add_case`
+
+        Args:
+            snapshot (ColumnarSnapshot): The snapshot of the argument-case
+            a_case (ArgumentCase): The lazy argument-case
+
+        Returns:
+            bool: True if the argument-case is added, else False.
+        """
+        contents = snapshot.get_contents(a_case)
+        if not contents:
+            return False
+        fingerprint = hash((contents_fingerprint(contents),) + get_case_key(a_case, argument_case_key))
+        if fingerprint in self.fingerprints:
+            return self.add_case(a_case)
+        self.case_base.setdefault(contents[0][0], []).append(a_case)
+        self.fingerprints[fingerprint] = [a_case]
+        return True
 
     def add_case(self, new_arg_case: ArgumentCase) -> bool:
         """Two cases are equal if they have the same domain context, social
         context, conclusion and state of acceptability. If two cases are equal,
         also the domain-cases associated and attacks received must be added to
-        the corresponding argument-case
+        the corresponding argument-case. The argument-cases with the same
+        fingerprint (see :func:`argument_case_fingerprint`) are the only ones
+        compared with the new one. The new case is written to the case log,
+        if it is open, before merging it
 
         Args:
             new_arg_case (ArgumentCase): The new case that will (or not) be
                 added
         """
         super().add_case(new_arg_case)  # Currently it does nothing
+        self.log_case(ADD, new_arg_case)
         new_case_premises: Dict[int, Premise] = new_arg_case.problem.context.premises
         # Copy the premises to an arraylist, ordered from lower to higher id
         new_case_premises_list: List[Premise] = list(new_case_premises.values())
         if len(new_case_premises_list) > 0:
             first_case_premise: Premise = new_case_premises_list[0]
             first_case_premise_id: int = first_case_premise.id
-            candidate_cases: List[ArgumentCase] = self.case_base.get(first_case_premise_id, [])
-            if candidate_cases:
-                for arg_case in candidate_cases:
-                    arg_case_premises = arg_case.problem.context.premises
-                    # if the premises are the same with the same content, check
-                    # if social context conclusion and state of acceptability
-                    # are the same
-                    if (self.is_same_domain_context_precise(new_case_premises_list, arg_case_premises)
-                        and self.is_same_social_context(new_arg_case.problem.social_context,
-                                                        arg_case.problem.social_context)
-                        and new_arg_case.solutions.conclusion.id == arg_case.solutions.conclusion.id
-                        and new_arg_case.solutions.acceptability_status == arg_case.solutions.acceptability_status):
-                        # It is the same argument-case, so it is not introduced
-                        # but we add associated cases and attacks received,
-                        # and dialogue graphs and increase timesUsed
-
-                        # Increase times used
-                        arg_case.times_used += new_arg_case.times_used
-
-                        # distinguishing premises
-                        # Take care that distinguishing premises are NEVER translated to Dict
-                        # (there are several dp with the same ID but different content in the List)
-                        distinguishing_premises = arg_case.solutions.dist_premises
-                        new_distinguishing_premises = new_arg_case.solutions.dist_premises
-                        if not new_distinguishing_premises:  # it's a literal translation, maybe not necessary
-                            new_distinguishing_premises = []
-                        if not distinguishing_premises:
-                            arg_case.solutions.dist_premises = new_distinguishing_premises
-                        else:
-                            arg_case.solutions.merge_distinguishing_premises(new_distinguishing_premises)
-
-                        # exceptions
-                        exceptions = arg_case.solutions.exceptions
-                        new_exceptions = new_arg_case.solutions.exceptions
-                        if not new_exceptions:
-                            new_exceptions = []
-                        if not exceptions:
-                            arg_case.solutions.exceptions = new_exceptions
-                        else:
-                            arg_case.solutions.merge_exceptions(new_exceptions)
-
-                        # presumptions
-                        presumptions = arg_case.solutions.presumptions
-                        new_presumptions = new_arg_case.solutions.presumptions
-                        if not new_presumptions:
-                            new_presumptions = []
-                        if not presumptions:
-                            arg_case.solutions.presumptions = new_presumptions
-                        else:
-                            arg_case.solutions.merge_presumptions(new_presumptions)
-
-                        # counter examples domain case IDs
-                        counter_examples_dom_case_ids = arg_case.solutions.counter_examples_dom_case_id
-                        new_counter_examples_dom_case_ids = new_arg_case.solutions.counter_examples_dom_case_id
-                        if not new_counter_examples_dom_case_ids:
-                            new_counter_examples_dom_case_ids = []
-                        if not counter_examples_dom_case_ids:
-                            arg_case.solutions.counter_examples_dom_case_ids = new_counter_examples_dom_case_ids
-                        else:
-                            arg_case.solutions.merge_counter_examples_dom_cases_ids(new_counter_examples_dom_case_ids)
-
-                        # counter examples argument case IDs
-                        counter_examples_arg_case_ids = arg_case.solutions.counter_examples_arg_case_id
-                        new_counter_examples_arg_case_ids = new_arg_case.solutions.counter_examples_arg_case_id
-                        if not new_counter_examples_arg_case_ids:
-                            new_counter_examples_arg_case_ids = []
-                        if not counter_examples_arg_case_ids:
-                            arg_case.solutions.counter_examples_arg_case_ids = new_counter_examples_arg_case_ids
-                        else:
-                            arg_case.solutions.merge_counter_examples_arg_cases_ids(new_counter_examples_arg_case_ids)
-
-                            # associated domain cases
-                            dom_cases_ids = arg_case.justification.domain_cases_ids
-                            new_dom_cases_ids = new_arg_case.justification.domain_cases_ids
-                            if not new_dom_cases_ids:
-                                new_dom_cases_ids = []
-                            if not dom_cases_ids:
-                                arg_case.justification.dom_cases_ids = new_dom_cases_ids
-                            else:
-                                arg_case.justification.merge_domain_cases_ids(new_dom_cases_ids)
-
-                            # associated argument cases
-                            arg_cases_ids = arg_case.justification.argument_cases_ids
-                            new_arg_cases_ids = new_arg_case.justification.argument_cases_ids
-                            if not new_arg_cases_ids:
-                                new_arg_cases_ids = []
-                            if not arg_cases_ids:
-                                arg_case.justification.arg_cases_ids = new_arg_cases_ids
-                            else:
-                                arg_case.justification.merge_argument_cases_ids(new_arg_cases_ids)
-
-                            # dialogue graphs
-                            dialogue_graphs = new_arg_case.justification.dialogue_graphs
-                            graphs = arg_case.justification.dialogue_graphs
-                            for diag in dialogue_graphs:
-                                nodes_to_change = diag.get_nodes(new_arg_case.id)
-                                if not nodes_to_change:
-                                    logger.error("ERROR updating argument-case case-base.",
-                                                 "No Argument-nodes matching in DialogueGraph")
-                                    continue
-                                for node in nodes_to_change:
-                                    node.arg_case_id = arg_case.id
-                                graphs.append(diag)
-
-                        return False
+            fingerprint = argument_case_fingerprint(new_arg_case)
+            for arg_case in self.fingerprints.get(fingerprint, []):
+                if self.is_same_case(arg_case, new_arg_case):
+                    # It is the same argument-case, so it is not introduced
+                    self.merge_case(arg_case, new_arg_case)
+                    return False
 
             # the same case is not stored, so it is added
+            candidate_cases: List[ArgumentCase] = self.case_base.get(first_case_premise_id, [])
             if not candidate_cases:
                 candidate_cases = []
             candidate_cases.append(new_arg_case)
             self.case_base[first_case_premise_id] = candidate_cases
+            self.fingerprints.setdefault(fingerprint, []).append(new_arg_case)
             return True
 
         return False
 
+    @staticmethod
+    def is_same_case(arg_case: ArgumentCase, new_arg_case: ArgumentCase) -> bool:
+        """Returns whether two argument-cases are equal (see :meth:`add_case`)
+
+        Args:
+            arg_case (ArgumentCase): An argument-case of the case-base
+            new_arg_case (ArgumentCase): The new argument-case
+
+        Returns:
+            bool: True if they have the same domain context, social context,
+            conclusion and state of acceptability
+        """
+        # if the premises are the same with the same content, check
+        # if social context conclusion and state of acceptability
+        # are the same
+        return (ArgCBR.is_same_domain_context_precise(list(new_arg_case.problem.context.premises.values()),
+                                                      arg_case.problem.context.premises)
+                and ArgCBR.is_same_social_context(new_arg_case.problem.social_context, arg_case.problem.social_context)
+                and new_arg_case.solutions.conclusion.id == arg_case.solutions.conclusion.id
+                and new_arg_case.solutions.acceptability_status == arg_case.solutions.acceptability_status)
+
+    def merge_case(self, arg_case: ArgumentCase, new_arg_case: ArgumentCase):
+        """Adds the associated cases, attacks received and dialogue graphs of
+        a new argument-case to an equal one of the case-base and increases
+        its times used
+
+        Args:
+            arg_case (ArgumentCase): The argument-case of the case-base
+            new_arg_case (ArgumentCase): The new argument-case, equal to it
+        """
+        # Increase times used
+        arg_case.times_used += new_arg_case.times_used
+
+        # distinguishing premises
+        # Take care that distinguishing premises are NEVER translated to Dict
+        # (there are several dp with the same ID but different content in the List)
+        distinguishing_premises = arg_case.solutions.dist_premises
+        new_distinguishing_premises = new_arg_case.solutions.dist_premises
+        if not new_distinguishing_premises:  # it's a literal translation, maybe not necessary
+            new_distinguishing_premises = []
+        if not distinguishing_premises:
+            arg_case.solutions.dist_premises = new_distinguishing_premises
+        else:
+            arg_case.solutions.merge_distinguishing_premises(new_distinguishing_premises)
+
+        # exceptions
+        exceptions = arg_case.solutions.exceptions
+        new_exceptions = new_arg_case.solutions.exceptions
+        if not new_exceptions:
+            new_exceptions = []
+        if not exceptions:
+            arg_case.solutions.exceptions = new_exceptions
+        else:
+            arg_case.solutions.merge_exceptions(new_exceptions)
+
+        # presumptions
+        presumptions = arg_case.solutions.presumptions
+        new_presumptions = new_arg_case.solutions.presumptions
+        if not new_presumptions:
+            new_presumptions = []
+        if not presumptions:
+            arg_case.solutions.presumptions = new_presumptions
+        else:
+            arg_case.solutions.merge_presumptions(new_presumptions)
+
+        # counter examples domain case IDs
+        counter_examples_dom_case_ids = arg_case.solutions.counter_examples_dom_case_id
+        new_counter_examples_dom_case_ids = new_arg_case.solutions.counter_examples_dom_case_id
+        if not new_counter_examples_dom_case_ids:
+            new_counter_examples_dom_case_ids = []
+        if not counter_examples_dom_case_ids:
+            arg_case.solutions.counter_examples_dom_case_ids = new_counter_examples_dom_case_ids
+        else:
+            arg_case.solutions.merge_counter_examples_dom_cases_ids(new_counter_examples_dom_case_ids)
+
+        # counter examples argument case IDs
+        counter_examples_arg_case_ids = arg_case.solutions.counter_examples_arg_case_id
+        new_counter_examples_arg_case_ids = new_arg_case.solutions.counter_examples_arg_case_id
+        if not new_counter_examples_arg_case_ids:
+            new_counter_examples_arg_case_ids = []
+        if not counter_examples_arg_case_ids:
+            arg_case.solutions.counter_examples_arg_case_ids = new_counter_examples_arg_case_ids
+        else:
+            arg_case.solutions.merge_counter_examples_arg_cases_ids(new_counter_examples_arg_case_ids)
+
+            # associated domain cases
+            dom_cases_ids = arg_case.justification.domain_cases_ids
+            new_dom_cases_ids = new_arg_case.justification.domain_cases_ids
+            if not new_dom_cases_ids:
+                new_dom_cases_ids = []
+            if not dom_cases_ids:
+                arg_case.justification.dom_cases_ids = new_dom_cases_ids
+            else:
+                arg_case.justification.merge_domain_cases_ids(new_dom_cases_ids)
+
+            # associated argument cases
+            arg_cases_ids = arg_case.justification.argument_cases_ids
+            new_arg_cases_ids = new_arg_case.justification.argument_cases_ids
+            if not new_arg_cases_ids:
+                new_arg_cases_ids = []
+            if not arg_cases_ids:
+                arg_case.justification.arg_cases_ids = new_arg_cases_ids
+            else:
+                arg_case.justification.merge_argument_cases_ids(new_arg_cases_ids)
+
+            # dialogue graphs
+            dialogue_graphs = new_arg_case.justification.dialogue_graphs
+            graphs = arg_case.justification.dialogue_graphs
+            for diag in dialogue_graphs:
+                nodes_to_change = diag.get_nodes(new_arg_case.id)
+                if not nodes_to_change:
+                    logger.error("ERROR updating argument-case case-base.",
+                                 "No Argument-nodes matching in DialogueGraph")
+                    continue
+                for node in nodes_to_change:
+                    node.arg_case_id = arg_case.id
+                graphs.append(diag)
+
     def get_degrees(self, arg_problem: ArgumentProblem, solution: Solution,
                     all_positions: Sequence[Position], index: int) -> List[float]:
         """Return a list with the degrees (attack, efficiency, explanatory
@@ -722,11 +783,11 @@ class ArgCBR(CBR):
             return False
         return True
 
-    def do_cache(self):
-        super().do_cache()
+    def do_cache(self) -> SnapshotStatistics:
+        return super().do_cache()
 
-    def do_cache_inc(self):
-        super().do_cache_inc()
+    def do_cache_inc(self) -> SnapshotStatistics:
+        return super().do_cache_inc()
 
     def get_all_cases(self) -> ValuesView[Sequence[ArgumentCase]]:  # here we go again with annotations
         return super().get_all_cases()
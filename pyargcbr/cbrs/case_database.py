@@ -0,0 +1,456 @@
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from os.path import splitext
+from pickle import dumps, loads
+from threading import RLock
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..agents.attribute_ranges import AttributeRange, AttributeRanges
+from ..agents.configuration import Configuration
+from ..agents.metrics import NUMERIC_KINDS, ValueKind
+from ..cbrs.case_snapshot import SNAPSHOT_PROTOCOL
+from ..knowledge_resources.case import Case
+from ..knowledge_resources.premise import Premise
+
+# Attribute of the cases read from a database with the ID of their row
+ROW_ID = "_row_id"
+# Names of the server of Configuration.server_name that mean this host
+LOCAL_SERVERS = ("", "localhost", "127.0.0.1", "::1")
+# Relation, group, proponent and opponent IDs of the social context, ID of
+# the conclusion and acceptability status of an argument-case
+ArgumentColumns = Tuple[Any, Any, Any, Any, Any, Any]
+NO_ARGUMENT_COLUMNS: ArgumentColumns = (None, None, None, None, None, None)
+# Premise ID and content (None if the premise is missing) of each premise of a bucket key
+BucketKey = Sequence[Tuple[int, Optional[str]]]
+
+
+def get_database_path(c: Configuration) -> str:
+    """Returns the path of the SQLite database of the configuration: its
+    database name, with the extension ".sqlite3" if it has none. SQLite
+    opens local files, so the server name must be this host; the user name
+    and the password are not used (SQLite has no accounts)
+
+    Args:
+        c (Configuration): The configuration
+
+    Returns:
+        str: The path of the database file, or ":memory:"
+
+    Raises:
+        ValueError: If the server of the configuration is not this host
+    """
+    if c.server_name not in LOCAL_SERVERS:
+        raise ValueError("A SQLite database is a local file, it cannot be on the server {}".format(c.server_name))
+    if c.database_name == ":memory:" or splitext(c.database_name)[1]:
+        return c.database_name
+    return c.database_name + ".sqlite3"
+
+
+def column_value(value: Any) -> Any:
+    """Returns a value as it is stored in a column: the name of an
+    enumeration member, the value itself if SQLite supports its type, or its
+    string otherwise"""
+    if isinstance(value, Enum):
+        return value.name
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+def premise_row(case_id: int, premise: Premise) -> Tuple[int, int, str, str, Optional[float], Optional[float], int]:
+    """Returns the row of the premises table of a premise of a case: its
+    content as it is and lower-cased, its number or timestamp (None if it
+    has another kind of value, or a NaN number) and the length of its
+    content, as they are counted by :class:`AttributeRange`"""
+    value = premise.typed_content
+    number = value.value if value.kind in NUMERIC_KINDS and value.value == value.value else None
+    timestamp = value.value if value.kind == ValueKind.TIMESTAMP else None
+    return case_id, premise.id, premise.content, premise.content.lower(), number, timestamp, len(premise.content)
+
+
+@dataclass
+class DatabaseStatistics:
+    """Counters of a :class:`CaseDatabase`"""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    transactions: int = 0  # Committed
+    queries: int = 0  # Queries of cases
+    loaded: int = 0  # Cases unpickled from the rows read
+
+
+class CaseDatabase:
+    """Case-base stored in a table of a SQLite database, so it does not have
+    to fit in memory. Each row holds a pickled case, the fingerprint of its
+    domain context (see :func:`stable_premises_fingerprint`) and, for the
+    argument-cases, the IDs of their social context, conclusion and
+    acceptability status, indexed to find the duplicates of a case. A second
+    table holds the ID and the content (as it is and lower-cased) of every
+    premise of every case, indexed by premise ID and content, so the
+    candidates of a query are selected by indexed SQL queries. It also holds
+    the number or timestamp and the length of each content, indexed by
+    premise ID, so the ranges of the premises are read with MIN and MAX
+    queries (see :meth:`get_attribute_range`) without reading the cases.
+
+    The cases read are new objects with the ID of their row in the attribute
+    ROW_ID, which :meth:`update_case` and :meth:`delete_case` use. Changes
+    are committed at the end of the outermost :meth:`transaction`, or
+    one by one outside of them
+    """
+
+    def __init__(self, file_path: str, table: str):
+        """
+        Args:
+            file_path (str): The path of the database file (see
+                :func:`get_database_path`)
+            table (str): The name of the table of the cases; the premises
+                are in the table with the suffix "_premises"
+
+        Raises:
+            ValueError: If the name of the table is not an identifier
+        """
+        if not table.isidentifier():
+            raise ValueError("{} is not a valid table name".format(table))
+        self.file_path = file_path
+        self.table = table
+        self.lock = RLock()
+        self.depth = 0  # Nesting level of the open transactions
+        self.statistics = DatabaseStatistics()
+        self.connection = sqlite3.connect(file_path, isolation_level=None, check_same_thread=False)
+        if file_path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+
+    def create_tables(self):
+        """Creates the tables of the case-base and their indexes, if they do
+        not exist"""
+        t = self.table
+        with self.transaction():
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS {0} (id INTEGER PRIMARY KEY, fingerprint INTEGER NOT NULL, "
+                "first_premise INTEGER, relation, group_id, proponent_id, opponent_id, conclusion_id, "
+                "acceptability, data BLOB NOT NULL)".format(t))
+            self.connection.execute("CREATE INDEX IF NOT EXISTS {0}_context ON {0} "
+                                    "(fingerprint, relation, group_id, proponent_id, opponent_id)".format(t))
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS {0}_premises (case_id INTEGER NOT NULL, premise_id INTEGER NOT NULL, "
+                "content TEXT, folded TEXT, number REAL, timestamp REAL, length INTEGER, "
+                "PRIMARY KEY (case_id, premise_id)) WITHOUT ROWID".format(t))
+            for column in ("content", "folded", "number", "timestamp", "length"):
+                self.connection.execute("CREATE INDEX IF NOT EXISTS {0}_{1} ON {0}_premises (premise_id, {1})"
+                                        .format(t, column))
+
+    def close(self):
+        """Closes the connection to the database"""
+        with self.lock:
+            self.connection.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Groups the changes made inside it in a single transaction,
+        committed when the outermost one ends (or rolled back if it raises
+        an exception). The database is locked for the other threads until
+        then"""
+        with self.lock:
+            if self.depth == 0:
+                self.connection.execute("BEGIN")
+            self.depth += 1
+            try:
+                yield
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("COMMIT")
+                self.statistics.transactions += 1
+
+    @staticmethod
+    def dump_case(a_case: Case) -> bytes:
+        """Pickles a case without the ID of its row"""
+        row_id = a_case.__dict__.pop(ROW_ID, None)
+        try:
+            return dumps(a_case, SNAPSHOT_PROTOCOL)
+        finally:
+            if row_id is not None:
+                a_case.__dict__[ROW_ID] = row_id
+
+    def insert_case(self, a_case: Case, fingerprint: int, columns: ArgumentColumns = NO_ARGUMENT_COLUMNS) -> int:
+        """Inserts a case and its premises
+
+        Args:
+            a_case (Case): The case
+            fingerprint (int): The fingerprint of its domain context
+            columns (ArgumentColumns): The IDs of the social context, the ID
+                of the conclusion and the acceptability status of an
+                argument-case
+
+        Returns:
+            int: The ID of the row of the case
+        """
+        premises = list(a_case.problem.context.premises.values())
+        first_premise = premises[0].id if premises else None
+        with self.transaction():
+            cursor = self.connection.execute(
+                "INSERT INTO {} (fingerprint, first_premise, relation, group_id, proponent_id, opponent_id, "
+                "conclusion_id, acceptability, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)".format(self.table),
+                (fingerprint, first_premise) + tuple(map(column_value, columns)) + (self.dump_case(a_case),))
+            row_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO {}_premises VALUES (?, ?, ?, ?, ?, ?, ?)".format(self.table),
+                [premise_row(row_id, premise) for premise in premises])
+        a_case.__dict__[ROW_ID] = row_id
+        self.statistics.inserted += 1
+        return row_id
+
+    def update_case(self, a_case: Case):
+        """Stores the changes of a case read from the database, other than
+        the ones of its premises
+
+        Args:
+            a_case (Case): The case
+
+        Raises:
+            ValueError: If the case was not read from the database
+        """
+        row_id = self.get_row_id(a_case)
+        with self.transaction():
+            self.connection.execute("UPDATE {} SET data = ? WHERE id = ?".format(self.table),
+                                    (self.dump_case(a_case), row_id))
+        self.statistics.updated += 1
+
+    def delete_case(self, a_case: Case) -> bool:
+        """Deletes a case read from the database and its premises
+
+        Args:
+            a_case (Case): The case
+
+        Returns:
+            bool: True if the case was in the database, else False
+        """
+        row_id = a_case.__dict__.get(ROW_ID)
+        if row_id is None:
+            return False
+        with self.transaction():
+            deleted = self.connection.execute("DELETE FROM {} WHERE id = ?".format(self.table), (row_id,)).rowcount
+            self.connection.execute("DELETE FROM {}_premises WHERE case_id = ?".format(self.table), (row_id,))
+        self.statistics.deleted += deleted
+        return deleted > 0
+
+    @staticmethod
+    def get_row_id(a_case: Case) -> int:
+        """Returns the ID of the row of a case read from the database"""
+        row_id = a_case.__dict__.get(ROW_ID)
+        if row_id is None:
+            raise ValueError("The case was not read from the database")
+        return row_id
+
+    def count(self) -> int:
+        """Returns the number of cases of the database"""
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM {}".format(self.table)).fetchone()[0]
+
+    def select_cases(self, query: str, parameters: Iterable[Any] = ()) -> List[Case]:
+        """Reads the cases of the rows given by a query of their ID and data,
+        in order
+
+        Args:
+            query (str): The query
+            parameters (Iterable[Any]): The parameters of the query
+
+        Returns:
+            List[Case]: The cases
+        """
+        with self.lock:
+            rows = self.connection.execute(query, tuple(parameters)).fetchall()
+        cases = []
+        for row_id, data in rows:
+            a_case = loads(data)
+            a_case.__dict__[ROW_ID] = row_id
+            cases.append(a_case)
+        self.statistics.queries += 1
+        self.statistics.loaded += len(cases)
+        return cases
+
+    def select_cases_in(self, case_ids_query: str, parameters: Iterable[Any] = (), condition: str = "1") -> List[Case]:
+        """Reads the cases whose row IDs are given by a query, in the order
+        they were inserted
+
+        Args:
+            case_ids_query (str): The query of the row IDs
+            parameters (Iterable[Any]): The parameters of the query and then
+                of the condition
+            condition (str): Another condition of the rows of the cases
+
+        Returns:
+            List[Case]: The cases
+        """
+        return self.select_cases("SELECT id, data FROM {} WHERE id IN ({}) AND {} ORDER BY id".format(
+            self.table, case_ids_query, condition), parameters)
+
+    def iter_cases(self, chunk_size: int = 1024) -> Iterator[Case]:
+        """Yields every case of the database, in the order they were
+        inserted, reading chunk_size cases at a time"""
+        last_id = 0
+        while True:
+            cases = self.select_cases("SELECT id, data FROM {} WHERE id > ? ORDER BY id LIMIT ?".format(self.table),
+                                      (last_id, chunk_size))
+            yield from cases
+            if len(cases) < chunk_size:
+                return
+            last_id = cases[-1].__dict__[ROW_ID]
+
+    def find_cases(self, fingerprint: int, columns: Optional[ArgumentColumns] = None) -> List[Case]:
+        """Returns the cases with the given fingerprint and, if given, the
+        given social context, conclusion and acceptability status
+
+        Args:
+            fingerprint (int): The fingerprint of the domain context
+            columns (Optional[ArgumentColumns]): The IDs of the social
+                context, the ID of the conclusion and the acceptability status
+
+        Returns:
+            List[Case]: The cases
+        """
+        if columns is None:
+            return self.select_cases("SELECT id, data FROM {} WHERE fingerprint = ? ORDER BY id".format(self.table),
+                                     (fingerprint,))
+        return self.select_cases(
+            "SELECT id, data FROM {} WHERE fingerprint = ? AND relation IS ? AND group_id IS ? AND proponent_id IS ? "
+            "AND opponent_id IS ? AND conclusion_id IS ? AND acceptability IS ? ORDER BY id".format(self.table),
+            (fingerprint,) + tuple(map(column_value, columns)))
+
+    def get_sharing_cases(self, premise_ids: Iterable[int], min_shared: int = 1) -> List[Case]:
+        """Returns the cases that have at least min_shared of the given
+        premise IDs, in the order they were inserted (like
+        :meth:`InvertedPremiseIndex.get_candidates`)
+
+        Args:
+            premise_ids (Iterable[int]): The premise IDs of the query
+            min_shared (int): The minimum number of premise IDs that a case
+                has to share with the query
+
+        Returns:
+            List[Case]: The cases
+        """
+        premise_ids = sorted(set(premise_ids))
+        min_shared = max(min_shared, 1)
+        if len(premise_ids) < min_shared:
+            return []
+        return self.select_cases_in(
+            "SELECT case_id FROM {}_premises WHERE premise_id IN ({}) GROUP BY case_id HAVING COUNT(*) >= ?".format(
+                self.table, ", ".join("?" * len(premise_ids))), premise_ids + [min_shared])
+
+    def get_bucket_query(self, key: BucketKey) -> Tuple[str, List[Any]]:
+        """Returns the query of the row IDs of the cases whose premises of the
+        key have the contents of the key (or are missing, if their content
+        is None), and its parameters"""
+        premise_id, content = key[0]
+        if content is not None:
+            case_id = "p0.case_id"
+            query = "SELECT p0.case_id FROM {}_premises p0 WHERE p0.premise_id = ? AND p0.content = ?".format(
+                self.table)
+            parameters: List[Any] = [premise_id, content]
+        else:  # Every case is read
+            case_id = "c.id"
+            query = "SELECT c.id FROM {0} c WHERE NOT EXISTS (SELECT 1 FROM {0}_premises p WHERE p.case_id = c.id " \
+                    "AND p.premise_id = ?)".format(self.table)
+            parameters = [premise_id]
+        for premise_id, content in key[1:]:
+            if content is None:
+                query += " AND NOT EXISTS (SELECT 1 FROM {}_premises p WHERE p.case_id = {} AND p.premise_id = ?)" \
+                    .format(self.table, case_id)
+                parameters.append(premise_id)
+            else:
+                query += " AND EXISTS (SELECT 1 FROM {}_premises p WHERE p.case_id = {} AND p.premise_id = ? " \
+                         "AND p.content = ?)".format(self.table, case_id)
+                parameters += [premise_id, content]
+        return query, parameters
+
+    def count_bucket(self, key: BucketKey) -> int:
+        """Returns the number of cases of the bucket of a key (see
+        :meth:`get_bucket_cases`)"""
+        query, parameters = self.get_bucket_query(key)
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM ({})".format(query), parameters).fetchone()[0]
+
+    def get_bucket_cases(self, key: BucketKey) -> List[Case]:
+        """Returns the cases whose premises of the key have the contents of
+        the key (or are missing, if their content is None), in the order
+        they were inserted (like :meth:`CompositeIndex.get_candidates`)
+
+        Args:
+            key (BucketKey): The premise ID and content of each premise of
+                the key
+
+        Returns:
+            List[Case]: The cases
+        """
+        return self.select_cases_in(*self.get_bucket_query(key))
+
+    def get_same_context_cases(self, contents: Sequence[Tuple[int, str]]) -> List[Case]:
+        """Returns the cases whose first premise is the first given one and
+        that have all the given premises, with the same contents regardless
+        of the case (like :meth:`ArgCBR.get_domain_similar_arg_cases`), in
+        the order they were inserted
+
+        Args:
+            contents (Sequence[Tuple[int, str]]): The ID and content of each
+                premise
+
+        Returns:
+            List[Case]: The cases
+        """
+        if not contents:
+            return []
+        conditions = " OR ".join(["(premise_id = ? AND folded = ?)"] * len(contents))
+        parameters: List[Any] = [value for premise_id, content in contents for value in (premise_id, content.lower())]
+        return self.select_cases_in(
+            "SELECT case_id FROM {}_premises WHERE {} GROUP BY case_id HAVING COUNT(*) = ?".format(
+                self.table, conditions), parameters + [len(contents), contents[0][0]], "first_premise = ?")
+
+    def get_attribute_range(self, premise_id: int) -> Optional[AttributeRange]:
+        """Returns the range of the contents of a premise in the database.
+        Each limit is read with its own MIN or MAX query, which SQLite answers
+        with a lookup of the index of its column. The range does not count
+        its values (see :class:`AttributeRange`)
+
+        Args:
+            premise_id (int): The premise ID
+
+        Returns:
+            Optional[AttributeRange]: The range, or None if no case has the
+            premise
+        """
+        limits = ", ".join("(SELECT {}({}) FROM {}_premises WHERE premise_id = ?)".format(function, column, self.table)
+                           for column, function in (("number", "MIN"), ("number", "MAX"), ("timestamp", "MIN"),
+                                                    ("timestamp", "MAX"), ("length", "MAX")))
+        with self.lock:
+            row = self.connection.execute("SELECT " + limits, (premise_id,) * 5).fetchone()
+        if row[4] is None:
+            return None
+        return AttributeRange(*row)
+
+    def get_attribute_ranges(self) -> AttributeRanges:
+        """Returns the ranges of the contents of every premise in the database
+        (see :meth:`get_attribute_range`). The premise IDs are also read one
+        by one from the index, without scanning the table
+
+        Returns:
+            AttributeRanges: The ranges
+        """
+        attribute_ranges = AttributeRanges()
+        with self.lock:
+            premise_id = self.connection.execute("SELECT MIN(premise_id) FROM {}_premises".format(self.table)) \
+                .fetchone()[0]
+            while premise_id is not None:
+                attribute_ranges.ranges[premise_id] = self.get_attribute_range(premise_id)
+                premise_id = self.connection.execute(
+                    "SELECT MIN(premise_id) FROM {}_premises WHERE premise_id > ?".format(self.table),
+                    (premise_id,)).fetchone()[0]
+        return attribute_ranges
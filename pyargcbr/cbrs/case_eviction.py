@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from heapq import heapify, heappop, heappush
+from itertools import count
+from pickle import dumps
+from typing import AbstractSet, Dict, Iterable, List, Optional, Tuple
+
+from ..knowledge_resources.domain_case import DomainCase
+
+
+@dataclass
+class EvictionStatistics:
+    """Counters of a :class:`CaseEvictionPolicy`"""
+    evictions: int = 0
+    redundant_evictions: int = 0  # Evicted cases covered by a near-identical neighbour
+    evicted_times_used: int = 0  # Sum of the times used of the solutions of the evicted cases
+    peak_cases: int = 0  # The greatest number of cases held
+    peak_memory: int = 0  # The greatest estimated size of the cases held, in bytes
+
+
+def times_used(a_case: DomainCase) -> int:
+    """Returns the number of times that the solutions of a domain case have
+    been used"""
+    return sum(solution.times_used for solution in a_case.solutions)
+
+
+def case_size(a_case: DomainCase) -> int:
+    """Returns the estimated size of a domain case in memory: the size of its
+    serialization, in bytes"""
+    return len(dumps(a_case))
+
+
+class CaseEvictionPolicy:
+    """Bookkeeping of the capacity of a domain case-base. It keeps the last
+    retrieval of every case and, if a memory budget is set, its estimated
+    size (see :func:`case_size`). When the case-base is over capacity, the
+    cases with the lowest utility are evicted first: the ones whose
+    solutions have been used the fewest times and, among them, the least
+    recently retrieved. Within a sample of the cases with the lowest utility,
+    a case covered by a near-identical neighbour is evicted before the rest.
+
+    The cases are kept in a heap by their utility when they are added. The
+    utility of a case only grows, so an entry may hold a lower utility and the
+    heap is not updated when the case is retrieved or its solutions are
+    used: an outdated entry is pushed again when it reaches the top (see
+    :meth:`lowest`)
+    """
+
+    def __init__(self, max_cases: int = 0, max_memory: int = 0, sample_size: int = 8):
+        """
+        Args:
+            max_cases (int): The maximum number of cases (0 for no limit)
+            max_memory (int): The maximum estimated size of the cases, in
+                bytes (0 for no limit)
+            sample_size (int): The number of cases with the lowest utility
+                checked for redundancy before each eviction
+        """
+        self.max_cases = max_cases
+        self.max_memory = max_memory
+        self.sample_size = sample_size
+        self.clock = 0
+        self.last_retrieved: Dict[int, int] = {}  # id of the case object -> clock of its last retrieval
+        self.heap: List[Tuple[Tuple[int, int], int, DomainCase]] = []  # (utility, sequence, case)
+        self.entries: Dict[int, int] = {}  # id of the case object -> sequence of its valid entry in the heap
+        self.sequence = count()
+        self.sizes: Dict[int, int] = {}  # id of the case object -> estimated size, with a memory budget
+        self.memory = 0
+        self.statistics = EvictionStatistics()
+
+    def configure(self, max_cases: int, max_memory: int, sample_size: int, cases: Iterable[DomainCase]):
+        """Changes the capacity of the case-base. The sizes of the cases are
+        estimated when a memory budget is set for the first time
+
+        Args:
+            max_cases (int): The maximum number of cases (0 for no limit)
+            max_memory (int): The maximum estimated size of the cases, in
+                bytes (0 for no limit)
+            sample_size (int): The number of cases checked for redundancy
+            cases (Iterable[DomainCase]): The cases of the case-base
+        """
+        self.max_cases = max_cases
+        self.sample_size = sample_size
+        if max_memory > 0 and self.max_memory <= 0:
+            self.sizes = {}
+            self.memory = 0
+            for a_case in cases:
+                self.add_size(a_case)
+        self.max_memory = max_memory
+
+    def add_case(self, new_case: DomainCase, num_cases: int):
+        """Registers a domain case added to the case-base as retrieved now
+
+        Args:
+            new_case (DomainCase): The domain case added to the case-base
+            num_cases (int): The number of cases of the case-base
+        """
+        self.clock += 1
+        self.last_retrieved[id(new_case)] = self.clock
+        self.push(new_case, (0, self.clock))  # A lower bound, so the solutions of a lazy case are not read
+        if self.max_memory > 0:
+            self.add_size(new_case)
+        self.statistics.peak_cases = max(self.statistics.peak_cases, num_cases)
+        self.statistics.peak_memory = max(self.statistics.peak_memory, self.memory)
+
+    def add_size(self, a_case: DomainCase):
+        """Adds the estimated size of a domain case to the memory used"""
+        size = case_size(a_case)
+        self.sizes[id(a_case)] = size
+        self.memory += size
+
+    def push(self, a_case: DomainCase, utility: Optional[Tuple[int, int]] = None):
+        """Pushes a domain case to the heap with its current utility (or a
+        lower bound of it), replacing its previous entry"""
+        sequence = next(self.sequence)
+        self.entries[id(a_case)] = sequence
+        heappush(self.heap, (self.utility(a_case) if utility is None else utility, sequence, a_case))
+
+    def remove_case(self, old_case: DomainCase):
+        """Forgets a domain case removed from the case-base. Its entry is left
+        in the heap until it reaches the top or the heap is compacted
+
+        Args:
+            old_case (DomainCase): The removed domain case
+        """
+        if self.entries.pop(id(old_case), None) is None:
+            return
+        self.last_retrieved.pop(id(old_case), None)
+        self.memory -= self.sizes.pop(id(old_case), 0)
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            entries = self.entries
+            self.heap = [entry for entry in self.heap if entries.get(id(entry[2])) == entry[1]]
+            heapify(self.heap)
+
+    def count_eviction(self, old_case: DomainCase, redundant: bool = False):
+        """Updates the statistics with an evicted domain case
+
+        Args:
+            old_case (DomainCase): The evicted domain case
+            redundant (bool): Whether it was covered by a near-identical
+                neighbour
+        """
+        self.statistics.evictions += 1
+        self.statistics.redundant_evictions += redundant
+        self.statistics.evicted_times_used += times_used(old_case)
+
+    def touch(self, cases: Iterable[DomainCase]):
+        """Marks the given domain cases of the case-base as retrieved now
+
+        Args:
+            cases (Iterable[DomainCase]): The retrieved domain cases
+        """
+        self.clock += 1
+        entries = self.entries
+        for a_case in cases:
+            if id(a_case) in entries:
+                self.last_retrieved[id(a_case)] = self.clock
+
+    def utility(self, a_case: DomainCase) -> Tuple[int, int]:
+        """Returns the utility of a domain case: the times its solutions have
+        been used and the clock of its last retrieval"""
+        return times_used(a_case), self.last_retrieved.get(id(a_case), 0)
+
+    def is_over_capacity(self, num_cases: int) -> bool:
+        """Returns whether the case-base exceeds the maximum number of cases
+        or the memory budget
+
+        Args:
+            num_cases (int): The number of cases of the case-base
+
+        Returns:
+            bool: True if some case has to be evicted
+        """
+        return 0 < self.max_cases < num_cases or 0 < self.max_memory < self.memory
+
+    def lowest(self, number: int, excluded_ids: AbstractSet[int] = frozenset()) -> List[DomainCase]:
+        """Returns the cases with the lowest utility, from the lowest to the
+        highest. The entries of the removed cases found on the way are
+        dropped and the outdated ones are pushed again with their utility
+
+        Args:
+            number (int): The maximum number of cases returned
+            excluded_ids (AbstractSet[int]): The ids of the case objects that
+                cannot be returned
+
+        Returns:
+            List[DomainCase]: The cases with the lowest utility
+        """
+        heap, entries = self.heap, self.entries
+        popped: List[Tuple[Tuple[int, int], int, DomainCase]] = []
+        cases: List[DomainCase] = []
+        while heap and len(cases) < number:
+            entry = heappop(heap)
+            utility, sequence, a_case = entry
+            if entries.get(id(a_case)) != sequence:
+                continue
+            if self.utility(a_case) != utility:
+                self.push(a_case)
+                continue
+            popped.append(entry)
+            if id(a_case) not in excluded_ids:
+                cases.append(a_case)
+        for entry in popped:
+            heappush(heap, entry)
+        return cases
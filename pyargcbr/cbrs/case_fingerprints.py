@@ -0,0 +1,98 @@
+from hashlib import blake2b
+from typing import Hashable, Iterable, Mapping, Tuple
+
+from ..knowledge_resources.argument_case import ArgumentCase
+from ..knowledge_resources.premise import Premise
+
+
+def premises_fingerprint(premises: Mapping[int, Premise]) -> int:
+    """Returns the fingerprint of a domain context: a hash of its sorted
+    (premise ID, lower-cased content) pairs. Two domain contexts with the
+    same premises and contents (ignoring the case) have the same fingerprint
+
+    Args:
+        premises (Mapping[int, Premise]): The premises of the context
+
+    Returns:
+        int: The fingerprint
+    """
+    return contents_fingerprint((premise.id, premise.content) for premise in premises.values())
+
+
+def contents_fingerprint(contents: Iterable[Tuple[int, str]]) -> int:
+    """Returns the fingerprint of a domain context given as its (premise
+    ID, content) pairs (see :func:`premises_fingerprint`)
+
+    Args:
+        contents (Iterable[Tuple[int, str]]): The ID and content of each
+            premise of the context
+
+    Returns:
+        int: The fingerprint
+    """
+    return hash(tuple(sorted((premise_id, content.lower()) for premise_id, content in contents)))
+
+
+def stable_premises_fingerprint(premises: Mapping[int, Premise]) -> int:
+    """Returns the fingerprint of a domain context like
+    :func:`premises_fingerprint`, but the same one in every process (the
+    hash of a string changes from one process to another), so it can be
+    stored: the first 8 bytes of the BLAKE2b digest of the sorted (premise
+    ID, lower-cased content) pairs, as a signed 64-bit integer
+
+    Args:
+        premises (Mapping[int, Premise]): The premises of the context
+
+    Returns:
+        int: The fingerprint
+    """
+    pairs = sorted((premise.id, premise.content.lower()) for premise in premises.values())
+    return int.from_bytes(blake2b(repr(pairs).encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def query_fingerprint(premises: Mapping[int, Premise]) -> Tuple[Tuple[int, str], ...]:
+    """Returns the exact fingerprint of the premises of a query: its sorted
+    (premise ID, content) pairs. Unlike :func:`premises_fingerprint`, the
+    case of the contents is kept (the similarity algorithms compare them as
+    they are) and two different queries never have the same fingerprint
+
+    Args:
+        premises (Mapping[int, Premise]): The premises of the query
+
+    Returns:
+        Tuple[Tuple[int, str], ...]: The fingerprint
+    """
+    return tuple(sorted((premise.id, premise.content) for premise in premises.values()))
+
+
+def argument_case_fingerprint(arg_case: ArgumentCase) -> int:
+    """Returns the fingerprint of an argument case: a hash of its domain
+    context (see :func:`premises_fingerprint`), its social context
+    (dependency relation, group, proponent and opponent), the ID of its
+    conclusion and its acceptability status. Two argument cases that
+    :meth:`ArgCBR.add_case` considers equal have the same fingerprint
+
+    Args:
+        arg_case (ArgumentCase): The argument case
+
+    Returns:
+        int: The fingerprint
+    """
+    return hash((premises_fingerprint(arg_case.problem.context.premises),) + argument_case_key(arg_case))
+
+
+def argument_case_key(arg_case: ArgumentCase) -> Tuple[Hashable, ...]:
+    """Returns the part of the fingerprint of an argument case that does
+    not depend on its domain context (see :func:`argument_case_fingerprint`)
+
+    Args:
+        arg_case (ArgumentCase): The argument case
+
+    Returns:
+        Tuple[Hashable, ...]: The dependency relation, group, proponent and
+        opponent of the social context, the ID of the conclusion and the
+        acceptability status
+    """
+    social_context = arg_case.problem.social_context
+    return (social_context.relation, social_context.group.id, social_context.proponent.id,
+            social_context.opponent.id, arg_case.solutions.conclusion.id, arg_case.solutions.acceptability_status)
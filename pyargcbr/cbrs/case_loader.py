@@ -0,0 +1,148 @@
+import gc
+import os
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pickle import load
+from time import perf_counter
+from typing import Counter as CounterType, Hashable, Iterator, List, Type
+
+from loguru import logger
+
+from ..cbrs.case_snapshot import LogCheckpoint
+from ..knowledge_resources.case import Case
+
+
+@dataclass
+class LoadProgress:
+    """Progress of a :class:`CaseLoader`"""
+    cases: int = 0  # Cases read
+    skipped: int = 0  # Objects of the file that are not cases of the expected type
+    bytes_read: int = 0
+    total_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def cases_per_second(self) -> float:
+        return self.cases / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class LoadSummary:
+    """Bounded summary of the cases loaded into a CBR: the number of cases
+    introduced and the number of cases of the most frequent conclusions.
+    Only the first max_conclusions distinct conclusion IDs are counted one by
+    one; the cases of the rest are only counted as a whole"""
+    max_conclusions: int = 20
+    introduced: int = 0
+    not_introduced: int = 0
+    conclusions: CounterType[Hashable] = field(default_factory=Counter)
+    other_conclusions: int = 0  # Cases of the conclusions not counted one by one
+
+    def add(self, conclusion_id: Hashable, introduced: bool):
+        """Counts a loaded case
+
+        Args:
+            conclusion_id (Hashable): The ID of the conclusion of the case
+            introduced (bool): Whether the case was added to the case-base
+                (or merged with an equal one)
+        """
+        if introduced:
+            self.introduced += 1
+        else:
+            self.not_introduced += 1
+        if conclusion_id in self.conclusions or len(self.conclusions) < self.max_conclusions:
+            self.conclusions[conclusion_id] += 1
+        else:
+            self.other_conclusions += 1
+
+    def __str__(self) -> str:
+        sols = " ".join("{}x{}".format(conclusion_id, count) for conclusion_id, count in self.conclusions.most_common())
+        if self.other_conclusions:
+            sols += " (+{} cases of other conclusions)".format(self.other_conclusions)
+        return "cases: {} introduced: {} not_introduced: {} sols: {}".format(
+            self.introduced + self.not_introduced, self.introduced, self.not_introduced, sols)
+
+
+class CaseLoader:
+    """Reads the cases pickled one after another in a case-base file and
+    yields them in chunks, logging the progress of the load (cases per
+    second and bytes read) every report_interval seconds. The sequence
+    number of the :class:`LogCheckpoint` of the file, if any, is kept in
+    checkpoint"""
+
+    def __init__(self, file_path: str, case_type: Type[Case], chunk_size: int = 1024,
+                 report_interval: float = 5.0):
+        """
+        Args:
+            file_path (str): The path of the case-base file
+            case_type (Type[Case]): The type of the cases; the other objects
+                of the file are skipped
+            chunk_size (int): The maximum number of cases of each chunk
+            report_interval (float): The seconds between two progress reports
+        """
+        self.file_path = file_path
+        self.case_type = case_type
+        self.chunk_size = chunk_size
+        self.report_interval = report_interval
+        self.progress = LoadProgress()
+        self.checkpoint = 0
+
+    def chunks(self) -> Iterator[List[Case]]:
+        """Yields the cases of the file in chunks of chunk_size cases (the
+        last one can be shorter), in the order they were stored
+
+        Returns:
+            Iterator[List[Case]]: The chunks of cases
+        """
+        progress = self.progress = LoadProgress(total_bytes=os.path.getsize(self.file_path))
+        self.checkpoint = 0
+        start = last_report = perf_counter()
+        chunk: List[Case] = []
+        with open(self.file_path, 'rb') as fh:
+            while True:
+                try:
+                    aux = load(fh)
+                except EOFError:
+                    break
+                if type(aux) == self.case_type:
+                    chunk.append(aux)
+                elif type(aux) == LogCheckpoint:
+                    self.checkpoint = aux.sequence
+                else:
+                    progress.skipped += 1
+                if len(chunk) >= self.chunk_size:
+                    progress.cases += len(chunk)
+                    progress.bytes_read = fh.tell()
+                    yield chunk
+                    chunk = []
+                    now = perf_counter()
+                    progress.seconds = now - start
+                    if now - last_report >= self.report_interval:  # Including the time spent adding the cases
+                        last_report = now
+                        self.report()
+            progress.cases += len(chunk)
+            progress.bytes_read = fh.tell()
+        progress.seconds = perf_counter() - start
+        if chunk:
+            yield chunk
+
+    def report(self):
+        """Logs the progress of the load"""
+        progress = self.progress
+        logger.info("{}: {} cases read, {} of {} bytes, {:.0f} cases/s", self.file_path, progress.cases,
+                    progress.bytes_read, progress.total_bytes, progress.cases_per_second)
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Disables the cyclic garbage collector while a case-base is loaded.
+    The loaded cases stay alive, so every collection triggered by their
+    allocations would traverse the whole growing case-base for nothing"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,188 @@
+import os
+from dataclasses import dataclass
+from pickle import dump, load
+from shutil import copyfileobj
+from threading import Lock, Thread
+from time import perf_counter
+from typing import BinaryIO, Callable, Optional
+
+from loguru import logger
+
+from ..cbrs.case_snapshot import SNAPSHOT_PROTOCOL, SnapshotStatistics
+from ..knowledge_resources.case import Case
+
+# Operations of the records of a case log
+ADD = "add"  # A case given to add_case, before merging it with an equal one
+REMOVE = "remove"  # A case removed from the case-base
+
+
+@dataclass
+class LogStatistics:
+    """Counters of a :class:`CaseLog`"""
+    appended: int = 0  # Records appended since the log was opened
+    bytes_appended: int = 0
+    replayed: int = 0  # Records applied when the log was opened
+    discarded_bytes: int = 0  # Bytes of an incomplete last record, cut when the log was opened
+    compactions: int = 0
+    compaction_seconds: float = 0.0
+
+
+class CaseLog:
+    """Append-only log of the changes of a case-base since its last snapshot.
+    Every record is a pickled (sequence number, operation, case) tuple, and
+    replaying the records in order on top of the snapshot rebuilds the
+    case-base. A compaction folds the log into a new snapshot that records
+    the sequence number of the last record it includes (see
+    :class:`LogCheckpoint`), so the records that are still in the log after
+    an interrupted compaction are not replayed twice"""
+
+    def __init__(self, file_path: str, sequence: int = 0):
+        """
+        Args:
+            file_path (str): The path of the log file
+            sequence (int): The sequence number of the last record already
+                included in the snapshot
+        """
+        self.file_path = file_path
+        self.sequence = sequence
+        self.records = 0  # Records in the file
+        self.lock = Lock()
+        self.fh: Optional[BinaryIO] = None
+        self.compaction: Optional[Thread] = None
+        self.statistics = LogStatistics()
+
+    def replay(self, apply: Callable[[str, Case], None]) -> int:
+        """Applies the records of the log file that are not in the snapshot,
+        in order. An incomplete last record, left by an interrupted append,
+        is cut from the file
+
+        Args:
+            apply (Callable[[str, Case], None]): The function that applies an
+                operation with its case
+
+        Returns:
+            int: The number of records applied
+        """
+        if not os.path.isfile(self.file_path):
+            return 0
+        replayed = 0
+        with open(self.file_path, 'rb') as fh:
+            size = os.fstat(fh.fileno()).st_size
+            end = 0
+            while end < size:
+                try:
+                    sequence, operation, a_case = load(fh)
+                except Exception:  # The pickle of the last record is incomplete
+                    break
+                end = fh.tell()
+                self.records += 1
+                if sequence <= self.sequence:
+                    continue  # Already in the snapshot
+                self.sequence = sequence
+                apply(operation, a_case)
+                replayed += 1
+        if end < size:
+            logger.warning("{}: {} bytes of an incomplete record discarded", self.file_path, size - end)
+            os.truncate(self.file_path, end)
+            self.statistics.discarded_bytes += size - end
+        self.statistics.replayed += replayed
+        return replayed
+
+    def open(self):
+        """Opens the log file to append records"""
+        self.fh = open(self.file_path, 'ab')
+
+    def close(self):
+        """Waits for the compaction in progress, if any, and closes the log
+        file"""
+        self.wait()
+        with self.lock:
+            if self.fh is not None:
+                self.fh.close()
+                self.fh = None
+
+    def append(self, operation: str, a_case: Case) -> int:
+        """Appends a record to the log file, pickling the case as it is now
+
+        Args:
+            operation (str): The operation (ADD or REMOVE)
+            a_case (Case): The case of the operation
+
+        Returns:
+            int: The sequence number of the record
+        """
+        with self.lock:
+            self.sequence += 1
+            offset = self.fh.tell()
+            dump((self.sequence, operation, a_case), self.fh, SNAPSHOT_PROTOCOL)
+            self.fh.flush()
+            self.records += 1
+            self.statistics.appended += 1
+            self.statistics.bytes_appended += self.fh.tell() - offset
+            return self.sequence
+
+    def is_compacting(self) -> bool:
+        """Returns whether a compaction is running in the background"""
+        return self.compaction is not None and self.compaction.is_alive()
+
+    def wait(self):
+        """Waits for the compaction running in the background, if any"""
+        if self.compaction is not None:
+            self.compaction.join()
+            self.compaction = None
+
+    def compact(self, write: Callable[[str, int], SnapshotStatistics], snapshot_path: str,
+                background: bool = False) -> Optional[SnapshotStatistics]:
+        """Writes a new snapshot with the state of the case-base after the
+        last record appended, and removes from the log the records it
+        includes. The records appended meanwhile stay in the log
+
+        Args:
+            write (Callable[[str, int], SnapshotStatistics]): The function
+                that writes the snapshot, already serialized, given its path
+                and the sequence number of its last record (like
+                :func:`write_pickles`)
+            snapshot_path (str): The path of the snapshot file
+            background (bool): Whether to write the snapshot in a background
+                thread instead of waiting for it
+
+        Returns:
+            Optional[SnapshotStatistics]: The statistics of the snapshot, or
+            None if it is written in the background
+        """
+        self.wait()
+        with self.lock:
+            self.fh.flush()
+            sequence, offset, records = self.sequence, self.fh.tell(), self.records
+
+        def run() -> SnapshotStatistics:
+            start = perf_counter()
+            statistics = write(snapshot_path, sequence)
+            self.cut(offset, records)
+            self.statistics.compactions += 1
+            self.statistics.compaction_seconds += perf_counter() - start
+            logger.info("{}: {} cases, {} records compacted into {}", self.file_path, statistics.cases, records,
+                        snapshot_path)
+            return statistics
+
+        if not background:
+            return run()
+        self.compaction = Thread(target=run, name="case-log-compaction", daemon=True)
+        self.compaction.start()
+        return None
+
+    def cut(self, offset: int, records: int):
+        """Removes the first records of the log file
+
+        Args:
+            offset (int): The end of the records to remove
+            records (int): The number of records to remove
+        """
+        with self.lock:
+            self.fh.close()
+            with open(self.file_path, 'rb') as fh, open(self.file_path + ".tmp", 'wb') as new_fh:
+                fh.seek(offset)
+                copyfileobj(fh, new_fh)
+            os.replace(self.file_path + ".tmp", self.file_path)
+            self.fh = open(self.file_path, 'ab')
+            self.records -= records
@@ -0,0 +1,137 @@
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pickle import dump, dumps, Pickler
+from time import perf_counter
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from ..knowledge_resources.case import Case
+
+# Protocol 4 splits each pickle in frames, so they are written and read in
+# big blocks, and every supported Python version can load it
+SNAPSHOT_PROTOCOL = 4
+BUFFER_SIZE = 1 << 20
+
+
+@dataclass
+class LogCheckpoint:
+    """Last object of a snapshot that folds a case log (see
+    :class:`CaseLog`): the sequence number of the last record of the log
+    included in the snapshot"""
+    sequence: int
+
+
+@dataclass
+class SnapshotStatistics:
+    """Result of writing a case-base snapshot with :func:`write_snapshot`"""
+    cases: int = 0
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_written / self.seconds if self.seconds > 0 else 0.0
+
+
+def pickle_cases(cases: Iterable[Case], protocol: int = SNAPSHOT_PROTOCOL) -> Iterator[bytes]:
+    """Pickles each case on its own, with the snapshot protocol
+
+    Args:
+        cases (Iterable[Case]): The cases
+        protocol (int): The pickle protocol
+
+    Returns:
+        Iterator[bytes]: The pickle of each case
+    """
+    for a_case in cases:
+        yield dumps(a_case, protocol)
+
+
+@contextmanager
+def snapshot_file(file_path: str, append: bool, statistics: SnapshotStatistics,
+                  checkpoint: Optional[int] = None) -> Iterator[BinaryIO]:
+    """Opens a snapshot file for writing through a single buffered handle
+    and, when the writing ends, stores the bytes written and the seconds
+    taken in the statistics, after writing a :class:`LogCheckpoint` if
+    given. A new snapshot of a regular file is written to a temporary file
+    that replaces it once it is complete, so a failed write keeps the
+    previous snapshot
+
+    Args:
+        file_path (str): The path of the file
+        append (bool): Whether to write at the end of the file instead of
+            replacing its content
+        statistics (SnapshotStatistics): The statistics of the writing
+        checkpoint (Optional[int]): The sequence number of the last record of
+            the case log included in the snapshot, if any
+
+    Returns:
+        Iterator[BinaryIO]: The handle of the file
+    """
+    start = perf_counter()
+    replace = not append and (os.path.isfile(file_path) or not os.path.exists(file_path))  # Not os.devnull
+    target_path = file_path + ".tmp" if replace else file_path
+    try:
+        with open(target_path, 'ab' if append else 'wb', buffering=BUFFER_SIZE) as fh:
+            offset = fh.tell()
+            yield fh
+            if checkpoint is not None:
+                dump(LogCheckpoint(checkpoint), fh, SNAPSHOT_PROTOCOL)
+            statistics.bytes_written = fh.tell() - offset
+        if replace:
+            os.replace(target_path, file_path)
+    except BaseException:
+        if replace and os.path.exists(target_path):
+            os.remove(target_path)
+        raise
+    statistics.seconds = perf_counter() - start
+
+
+def write_snapshot(cases: Iterable[Case], file_path: str, append: bool = False, protocol: int = SNAPSHOT_PROTOCOL,
+                   checkpoint: Optional[int] = None) -> SnapshotStatistics:
+    """Stores cases in a file that :meth:`CBR.load_case_base` can load: one
+    pickle per case, one after another (see :func:`snapshot_file`)
+
+    Args:
+        cases (Iterable[Case]): The cases
+        file_path (str): The path of the file
+        append (bool): Whether to add the cases at the end of the file instead
+            of replacing its content
+        protocol (int): The pickle protocol
+        checkpoint (Optional[int]): The sequence number of the last record of
+            the case log included in the snapshot, if any
+
+    Returns:
+        SnapshotStatistics: The number of cases and bytes written and the
+        seconds taken
+    """
+    statistics = SnapshotStatistics()
+    with snapshot_file(file_path, append, statistics, checkpoint) as fh:
+        pickler = Pickler(fh, protocol)
+        for a_case in cases:
+            pickler.dump(a_case)
+            pickler.clear_memo()  # Each case must be loadable on its own
+            statistics.cases += 1
+    return statistics
+
+
+def write_pickles(pickles: Iterable[bytes], file_path: str, checkpoint: Optional[int] = None) -> SnapshotStatistics:
+    """Stores cases already pickled (see :func:`pickle_cases`) in a new
+    snapshot (see :func:`snapshot_file`)
+
+    Args:
+        pickles (Iterable[bytes]): The pickle of each case
+        file_path (str): The path of the file
+        checkpoint (Optional[int]): The sequence number of the last record of
+            the case log included in the snapshot, if any
+
+    Returns:
+        SnapshotStatistics: The number of cases and bytes written and the
+        seconds taken
+    """
+    statistics = SnapshotStatistics()
+    with snapshot_file(file_path, False, statistics, checkpoint) as fh:
+        for pickled_case in pickles:
+            fh.write(pickled_case)
+            statistics.cases += 1
+    return statistics
@@ -1,6 +1,13 @@
+import os
 from pickle import dump
-from typing import Dict, List, Union, ValuesView, Sequence
+from typing import Dict, List, Optional, Union, ValuesView, Sequence
 
+from loguru import logger
+
+from ..cbrs.case_log import ADD, CaseLog
+from ..cbrs.case_snapshot import pickle_cases, SnapshotStatistics, write_pickles, write_snapshot
+from ..cbrs.columnar_snapshot import CaseKey, ColumnarWriter, is_columnar, write_columnar_snapshot
+from ..configuration.configuration_parameters import SnapshotFormat
 from ..knowledge_resources.case import Case
 
 
@@ -20,6 +27,7 @@ class CBR:
     case_base: Dict[Union[int, str], List[Case]]
     initial_file_path: str
     storing_file_path: str
+    snapshot_key: Optional[CaseKey] = None  # The key stored with each case in the columnar snapshots
 
     def __init__(self, initial_file_path: str, storing_file_path: str):
         """THE CBRs store cases that represent past experiences and their final outcome
@@ -30,6 +38,10 @@ class CBR:
         """
         self.initial_file_path = initial_file_path
         self.storing_file_path = storing_file_path
+        self.case_log: Optional[CaseLog] = None
+        self.compaction_records = 0
+        self.replaying = False
+        self.snapshot_format = SnapshotFormat.PICKLE
 
     def load_case_base(self):
         """Loads the case-base stored in the initial file path."""
@@ -46,20 +58,134 @@ class CBR:
         """
         pass
 
-    def do_cache(self):
-        """Stores the current domain-cases case-base to the storing file
-        path.
+    def get_snapshot_path(self, case_log: bool) -> str:
+        """Returns the path of the case-base file to load: with a case log,
+        the last snapshot in the storing file path if there is one, else the
+        initial file path
+
+        Args:
+            case_log (bool): Whether the case log is enabled
+
+        Returns:
+            str: The path of the file
         """
-        with open(self.storing_file_path, "wb") as f:
-            pass  # TODO This is supposed to reset the file    pending check
-        self.do_cache_inc()
+        if case_log and os.path.isfile(self.storing_file_path):
+            return self.storing_file_path
+        return self.initial_file_path
+
+    def open_case_log(self, checkpoint: int, compaction_records: int):
+        """Opens the case log of the storing file path (see :class:`CaseLog`)
+        and replays the records that are not in the case-base just loaded
+
+        Args:
+            checkpoint (int): The sequence number of the last record of the
+                log included in the loaded case-base
+            compaction_records (int): The number of records of the log that
+                start a compaction in the background (0 to only compact it
+                with :meth:`do_cache`)
+        """
+        self.case_log = CaseLog(self.storing_file_path + ".log", checkpoint)
+        self.compaction_records = compaction_records
+        self.replaying = True
+        try:
+            replayed = self.case_log.replay(self.replay_record)
+        finally:
+            self.replaying = False
+        self.case_log.open()
+        if replayed:
+            logger.info("{}: {} records replayed", self.case_log.file_path, replayed)
+
+    def close_case_log(self):
+        """Closes the case log, if it is open"""
+        if self.case_log is not None:
+            self.case_log.close()
+            self.case_log = None
+
+    def replay_record(self, operation: str, a_case: Case):
+        """Applies a record of the case log to the case-base
+
+        Args:
+            operation (str): The operation of the record
+            a_case (Case): The case of the record
+        """
+        if operation == ADD:
+            self.add_case(a_case)
+
+    def log_case(self, operation: str, a_case: Case):
+        """Appends a change of the case-base to the case log, if it is open.
+        If the log has reached the number of records given when it was
+        opened, a compaction is started in the background first, while the
+        case-base matches the last record
 
-    def do_cache_inc(self):
-        """Stores the current domain-cases case-base to the storing file path
-        without removing the previous objects.
+        Args:
+            operation (str): The operation (ADD or REMOVE)
+            a_case (Case): The case of the operation
+        """
+        case_log = self.case_log
+        if case_log is None or self.replaying:
+            return
+        if 0 < self.compaction_records <= case_log.records and not case_log.is_compacting():
+            self.compact_case_log(background=True)
+        case_log.append(operation, a_case)
+
+    def compact_case_log(self, background: bool = False) -> Optional[SnapshotStatistics]:
+        """Folds the case log into a new snapshot of the case-base in the
+        storing file path (see :meth:`CaseLog.compact`). The cases are
+        pickled before returning, so the case-base can change while the
+        snapshot is written in the background
+
+        Args:
+            background (bool): Whether to write the snapshot in a background
+                thread instead of waiting for it
+
+        Returns:
+            Optional[SnapshotStatistics]: The statistics of the snapshot, or
+            None if it is written in the background
+        """
+        if self.snapshot_format == SnapshotFormat.COLUMNAR:
+            writer = ColumnarWriter(self.snapshot_key)
+            for a_case in self.get_all_cases_list():
+                writer.add(a_case)
+            return self.case_log.compact(writer.write, self.storing_file_path, background)
+        pickles = list(pickle_cases(self.get_all_cases_list()))
+        return self.case_log.compact(lambda file_path, checkpoint: write_pickles(pickles, file_path, checkpoint),
+                                     self.storing_file_path, background)
+
+    def do_cache(self) -> SnapshotStatistics:
+        """Stores the current case-base to the storing file path, replacing
+        its content, in a snapshot that :meth:`load_case_base` can load (see
+        :func:`write_snapshot` and, with the columnar format,
+        :func:`write_columnar_snapshot`). With a case log, the log is folded
+        into the snapshot (see :meth:`compact_case_log`)
+
+        Returns:
+            SnapshotStatistics: The number of cases and bytes written and the
+            seconds taken
+        """
+        if self.case_log is not None:
+            return self.compact_case_log()
+        if self.snapshot_format == SnapshotFormat.COLUMNAR:
+            statistics = write_columnar_snapshot(self.get_all_cases_list(), self.storing_file_path, self.snapshot_key)
+        else:
+            statistics = write_snapshot(self.get_all_cases_list(), self.storing_file_path)
+        logger.info("{}: {} cases, {} bytes in {:.3f} s", self.storing_file_path, statistics.cases,
+                    statistics.bytes_written, statistics.seconds)
+        return statistics
+
+    def do_cache_inc(self) -> SnapshotStatistics:
+        """Stores the current case-base to the storing file path without
+        removing the previous objects. Columnar snapshots cannot be extended.
+
+        Returns:
+            SnapshotStatistics: The number of cases and bytes written and the
+            seconds taken
         """
-        for a_case in self.get_all_cases():
-            save_object(a_case, self.storing_file_path)
+        if is_columnar(self.storing_file_path):
+            raise ValueError("{} is a columnar snapshot, it cannot be extended".format(self.storing_file_path))
+        statistics = write_snapshot(self.get_all_cases_list(), self.storing_file_path, append=True)
+        logger.info("{}: {} cases, {} bytes appended in {:.3f} s", self.storing_file_path, statistics.cases,
+                    statistics.bytes_written, statistics.seconds)
+        return statistics
 
     def get_all_cases(self) -> ValuesView[Sequence[Case]]:
         """Returns all the cases from the cases base
@@ -0,0 +1,409 @@
+import mmap
+import struct
+from array import array
+from pickle import dumps, loads
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from loguru import logger
+
+from ..cbrs.case_loader import CaseLoader, LoadProgress
+from ..cbrs.case_snapshot import SNAPSHOT_PROTOCOL, SnapshotStatistics, snapshot_file
+from ..knowledge_resources.case import Case
+from ..knowledge_resources.domain_case import DERIVED_ATTRIBUTES
+from ..knowledge_resources.domain_context import DomainContext
+from ..knowledge_resources.premise import Premise
+from ..knowledge_resources.problem import Problem
+
+MAGIC = b"PYACBRC1"
+BYTE_ORDER = 0x01020304  # Reads 0x04030201 on a platform of the opposite byte order
+# Magic, byte order, cases, strings, checkpoint (-1 for none), flags, length of the pickled case type
+HEADER = struct.Struct("=8sIQQqQQ")  # Native byte order, like the columns
+EAGER_PROBLEM = 1  # Flag: the problems are built from the premise columns, not stored in the states
+# Sections of the file and the type code of their items
+SECTIONS: Tuple[Tuple[str, str], ...] = (
+    ("string_offsets", "Q"),  # Of each string of the table in string_data
+    ("string_data", "B"),  # UTF-8
+    ("premise_offsets", "Q"),  # Of the premises of each case in the premise columns
+    ("premise_ids", "q"),
+    ("premise_names", "I"),  # String numbers
+    ("premise_contents", "I"),  # String numbers
+    ("key_offsets", "Q"),  # Of the pickled key of each case in keys
+    ("keys", "B"),
+    ("state_offsets", "Q"),  # Of the pickled state of each case in states
+    ("states", "B"),
+)
+SECTION_TABLE = struct.Struct("=" + "QQ" * len(SECTIONS))
+ALIGNMENT = 8
+
+CaseKey = Callable[[Case], Tuple[Hashable, ...]]
+
+
+def is_columnar(file_path: str) -> bool:
+    """Returns whether a file is a columnar snapshot (see
+    :func:`write_columnar_snapshot`)"""
+    try:
+        with open(file_path, 'rb') as fh:
+            return fh.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class LazyCase:
+    """Mixin of the cases of a :class:`ColumnarSnapshot` that have not been
+    materialized yet. Their instance attributes (like the problem of the
+    domain cases, built from the premise columns) and methods are used as
+    they are; reading any other attribute unpickles the rest of the case
+    from the snapshot and turns the object into an instance of the case type
+    of the snapshot, so it has no cost after that"""
+
+    def __getattribute__(self, name: str):
+        attributes = object.__getattribute__(self, '__dict__')
+        if name in attributes or name == '__dict__' or name == '__class__':
+            return object.__getattribute__(self, name)
+        class_attribute = getattr(type(self), name, None)
+        if callable(class_attribute) or isinstance(class_attribute, property):
+            return object.__getattribute__(self, name)
+        materialize(self)
+        return getattr(self, name)
+
+    def __reduce_ex__(self, protocol):
+        materialize(self)
+        return self.__reduce_ex__(protocol)
+
+    def __eq__(self, other):
+        materialize(self)
+        return self == other
+
+    def __repr__(self):
+        materialize(self)
+        return repr(self)
+
+    def __str__(self):
+        materialize(self)
+        return str(self)
+
+
+LAZY_CLASSES: Dict[type, type] = {}
+
+
+def lazy_class(case_type: Type[Case]) -> type:
+    """Returns the class of the lazy cases of a case type (see
+    :class:`LazyCase`)"""
+    cls = LAZY_CLASSES.get(case_type)
+    if cls is None:
+        cls = LAZY_CLASSES[case_type] = type("Lazy" + case_type.__name__, (LazyCase, case_type), {})
+    return cls
+
+
+def materialize(a_case: Case):
+    """Loads the attributes of a lazy case from its snapshot, if it is not
+    already materialized. The attributes set meanwhile are kept
+
+    Args:
+        a_case (Case): The case
+    """
+    attributes = object.__getattribute__(a_case, '__dict__')
+    snapshot: Optional[ColumnarSnapshot] = attributes.get('_snapshot')
+    if snapshot is None:
+        return
+    with snapshot.lock:
+        if '_snapshot' not in attributes:
+            return  # Materialized by another thread
+        for name, value in snapshot.get_state(attributes['_ordinal']).items():
+            attributes.setdefault(name, value)
+        del attributes['_snapshot'], attributes['_ordinal']
+        object.__setattr__(a_case, '__class__', snapshot.case_type)
+
+
+def get_case_key(a_case: Case, key: CaseKey) -> Tuple[Hashable, ...]:
+    """Returns the key of a case, the one stored in its snapshot if it is a
+    lazy case, without materializing it
+
+    Args:
+        a_case (Case): The case
+        key (CaseKey): The function that computes the key of a case
+
+    Returns:
+        Tuple[Hashable, ...]: The key
+    """
+    attributes = object.__getattribute__(a_case, '__dict__')
+    snapshot: Optional[ColumnarSnapshot] = attributes.get('_snapshot')
+    if snapshot is not None:
+        return snapshot.get_key(attributes['_ordinal'])
+    return key(a_case)
+
+
+class ColumnarWriter:
+    """Builds a columnar snapshot of a case-base in memory (see
+    :func:`write_columnar_snapshot`). The cases are serialized when they are
+    added, so the case-base can change before the snapshot is written. The
+    lazy cases of another snapshot are copied without materializing them"""
+
+    def __init__(self, key: Optional[CaseKey] = None):
+        """
+        Args:
+            key (Optional[CaseKey]): The function that computes the key of
+                each case, stored to be read without materializing the case
+                (see :func:`get_case_key`)
+        """
+        self.key = key
+        self.case_type: Optional[type] = None
+        self.eager_problem = False
+        self.strings: Dict[str, int] = {}
+        self.columns: Dict[str, array] = {name: array(code) for name, code in SECTIONS if code != "B"}
+        self.data: Dict[str, List[bytes]] = {name: [] for name, code in SECTIONS if code == "B"}
+        self.sizes = {"keys": 0, "states": 0}
+        self.columns["premise_offsets"].append(0)
+        self.columns["key_offsets"].append(0)
+        self.columns["state_offsets"].append(0)
+
+    def __len__(self) -> int:
+        return len(self.columns["premise_offsets"]) - 1
+
+    def intern(self, value: str) -> int:
+        """Returns the number of a string in the string table, adding it if
+        needed"""
+        number = self.strings.get(value)
+        if number is None:
+            number = self.strings[value] = len(self.strings)
+        return number
+
+    def add(self, a_case: Case):
+        """Serializes a case into the snapshot
+
+        Args:
+            a_case (Case): The case; all the cases of a snapshot must have the
+                same type
+        """
+        attributes = object.__getattribute__(a_case, '__dict__')
+        snapshot: Optional[ColumnarSnapshot] = attributes.get('_snapshot')
+        case_type = snapshot.case_type if snapshot is not None else type(a_case)
+        if self.case_type is None:
+            self.case_type = case_type
+            self.eager_problem = snapshot.eager_problem if snapshot is not None else type(a_case.problem) is Problem
+        elif case_type is not self.case_type:
+            raise ValueError("A columnar snapshot only stores cases of one type: {} and {}".format(
+                self.case_type.__name__, case_type.__name__))
+        if snapshot is not None and snapshot.eager_problem == self.eager_problem:
+            ordinal = attributes['_ordinal']
+            premises = snapshot.get_premise_triples(ordinal)
+            key, state = snapshot.get_raw_key(ordinal), snapshot.get_raw_state(ordinal)
+        else:
+            premises = [(premise.id, premise.name, premise.content) for premise in
+                        a_case.problem.context.premises.values()]
+            key = dumps(self.key(a_case), SNAPSHOT_PROTOCOL) if self.key is not None else b""
+            excluded = DERIVED_ATTRIBUTES + (("problem",) if self.eager_problem else ())
+            state = dumps({name: value for name, value in a_case.__dict__.items() if name not in excluded},
+                          SNAPSHOT_PROTOCOL)
+        columns = self.columns
+        for premise_id, name, content in premises:
+            columns["premise_ids"].append(premise_id)
+            columns["premise_names"].append(self.intern(name))
+            columns["premise_contents"].append(self.intern(content))
+        columns["premise_offsets"].append(len(columns["premise_ids"]))
+        for section, pickled in (("keys", key), ("states", state)):
+            self.data[section].append(pickled)
+            self.sizes[section] += len(pickled)
+            columns[section[:-1] + "_offsets"].append(self.sizes[section])
+
+    def write(self, file_path: str, checkpoint: Optional[int] = None) -> SnapshotStatistics:
+        """Writes the snapshot to a file, replacing it once it is complete
+
+        Args:
+            file_path (str): The path of the file
+            checkpoint (Optional[int]): The sequence number of the last record
+                of the case log included in the snapshot, if any
+
+        Returns:
+            SnapshotStatistics: The number of cases and bytes written and the
+            seconds taken
+        """
+        strings = [value.encode('utf-8') for value in self.strings]
+        string_offsets = array("Q", [0])
+        for encoded in strings:
+            string_offsets.append(string_offsets[-1] + len(encoded))
+        chunks: Dict[str, Iterable[bytes]] = {"string_offsets": [string_offsets.tobytes()], "string_data": strings}
+        for name, code in SECTIONS:
+            if name not in chunks:
+                chunks[name] = self.data[name] if code == "B" else [self.columns[name].tobytes()]
+        case_type = dumps(self.case_type, SNAPSHOT_PROTOCOL)
+        offset = HEADER.size + len(case_type) + SECTION_TABLE.size
+        table = []
+        for name, code in SECTIONS:
+            offset += -offset % ALIGNMENT
+            length = sum(map(len, chunks[name]))
+            table += [offset, length]
+            offset += length
+
+        statistics = SnapshotStatistics(cases=len(self))
+        with snapshot_file(file_path, False, statistics) as fh:
+            fh.write(HEADER.pack(MAGIC, BYTE_ORDER, len(self), len(strings), -1 if checkpoint is None else checkpoint,
+                                 EAGER_PROBLEM if self.eager_problem else 0, len(case_type)))
+            fh.write(case_type)
+            fh.write(SECTION_TABLE.pack(*table))
+            for position, (name, code) in enumerate(SECTIONS):
+                fh.write(bytes(table[2 * position] - fh.tell()))  # Alignment
+                for chunk in chunks[name]:
+                    fh.write(chunk)
+        return statistics
+
+
+def write_columnar_snapshot(cases: Iterable[Case], file_path: str, key: Optional[CaseKey] = None,
+                            checkpoint: Optional[int] = None) -> SnapshotStatistics:
+    """Stores cases in a columnar snapshot that :class:`ColumnarSnapshot`
+    opens without unpickling them: a string table, the ID, name and content
+    of the premises of every case in columns, and the key and the rest of
+    each case pickled on its own, located by offset columns
+
+    Args:
+        cases (Iterable[Case]): The cases
+        file_path (str): The path of the file
+        key (Optional[CaseKey]): The function that computes the key of each
+            case (see :func:`get_case_key`)
+        checkpoint (Optional[int]): The sequence number of the last record of
+            the case log included in the snapshot, if any
+
+    Returns:
+        SnapshotStatistics: The number of cases and bytes written and the
+        seconds taken
+    """
+    writer = ColumnarWriter(key)
+    for a_case in cases:
+        writer.add(a_case)
+    return writer.write(file_path, checkpoint)
+
+
+class ColumnarSnapshot:
+    """A columnar snapshot (see :func:`write_columnar_snapshot`) mapped in
+    memory. The columns are read in place, and the cases are given as lazy
+    cases (see :class:`LazyCase`) that are unpickled on their first use. It
+    can be loaded like a :class:`CaseLoader`"""
+
+    def __init__(self, file_path: str, chunk_size: int = 1024):
+        """
+        Args:
+            file_path (str): The path of the snapshot file
+            chunk_size (int): The maximum number of cases of each chunk
+        """
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.lock = Lock()
+        with open(file_path, 'rb') as fh:
+            self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, self.num_cases, num_strings, checkpoint, flags, type_length = \
+            HEADER.unpack_from(self.map)
+        if magic != MAGIC or byte_order != BYTE_ORDER:
+            raise ValueError("{} is not a columnar snapshot of this platform".format(file_path))
+        self.checkpoint = max(checkpoint, 0)
+        self.eager_problem = bool(flags & EAGER_PROBLEM)
+        self.case_type: Type[Case] = loads(self.map[HEADER.size:HEADER.size + type_length])
+        table = SECTION_TABLE.unpack_from(self.map, HEADER.size + type_length)
+        view = memoryview(self.map)
+        self.sections: Dict[str, memoryview] = {}
+        for position, (name, code) in enumerate(SECTIONS):
+            offset, length = table[2 * position], table[2 * position + 1]
+            self.sections[name] = view[offset:offset + length].cast(code)
+        self.strings: List[Optional[str]] = [None] * num_strings
+        self.progress = LoadProgress(total_bytes=len(self.map))
+
+    def __len__(self) -> int:
+        return self.num_cases
+
+    def get_string(self, number: int) -> str:
+        """Returns a string of the string table, decoding it once"""
+        value = self.strings[number]
+        if value is None:
+            offsets = self.sections["string_offsets"]
+            value = self.strings[number] = str(self.sections["string_data"][offsets[number]:offsets[number + 1]],
+                                               'utf-8')
+        return value
+
+    def get_premise_triples(self, ordinal: int) -> List[Tuple[int, str, str]]:
+        """Returns the ID, name and content of the premises of a case"""
+        sections = self.sections
+        start, end = sections["premise_offsets"][ordinal], sections["premise_offsets"][ordinal + 1]
+        names, contents = sections["premise_names"], sections["premise_contents"]
+        return [(premise_id, self.get_string(names[position]), self.get_string(contents[position]))
+                for position, premise_id in enumerate(sections["premise_ids"][start:end], start)]
+
+    def get_contents(self, a_case: Case) -> List[Tuple[int, str]]:
+        """Returns the ID and content of the premises of a lazy case of the
+        snapshot, in their order, without materializing it"""
+        ordinal = object.__getattribute__(a_case, '__dict__')['_ordinal']
+        return [(premise_id, content) for premise_id, _, content in self.get_premise_triples(ordinal)]
+
+    def get_premises(self, ordinal: int) -> Dict[int, Premise]:
+        """Builds the premises of a case from the columns. Their typed
+        content is parsed on the first access"""
+        premises: Dict[int, Premise] = {}
+        for premise_id, name, content in self.get_premise_triples(ordinal):
+            premise = Premise.__new__(Premise)
+            premise.__dict__.update(id=premise_id, name=name, content=content)
+            premises[premise_id] = premise
+        return premises
+
+    def get_raw_key(self, ordinal: int) -> bytes:
+        offsets = self.sections["key_offsets"]
+        return bytes(self.sections["keys"][offsets[ordinal]:offsets[ordinal + 1]])
+
+    def get_raw_state(self, ordinal: int) -> bytes:
+        offsets = self.sections["state_offsets"]
+        return bytes(self.sections["states"][offsets[ordinal]:offsets[ordinal + 1]])
+
+    def get_key(self, ordinal: int) -> Tuple[Hashable, ...]:
+        """Returns the key stored for a case (empty if none)"""
+        raw_key = self.get_raw_key(ordinal)
+        return loads(raw_key) if raw_key else ()
+
+    def get_state(self, ordinal: int) -> Dict[str, Any]:
+        """Unpickles the attributes of a case stored in the snapshot"""
+        return loads(self.get_raw_state(ordinal))
+
+    def get_case(self, ordinal: int) -> Case:
+        """Returns a new lazy case (see :class:`LazyCase`) of the snapshot"""
+        a_case = object.__new__(lazy_class(self.case_type))
+        attributes = object.__getattribute__(a_case, '__dict__')
+        if self.eager_problem:
+            attributes['problem'] = Problem(DomainContext(self.get_premises(ordinal)))
+        attributes['_snapshot'] = self
+        attributes['_ordinal'] = ordinal
+        return a_case
+
+    def chunks(self) -> Iterator[List[Case]]:
+        """Yields the lazy cases of the snapshot in chunks of chunk_size cases
+        (see :meth:`CaseLoader.chunks`)
+
+        Returns:
+            Iterator[List[Case]]: The chunks of cases
+        """
+        progress = self.progress = LoadProgress(total_bytes=len(self.map))
+        start = perf_counter()
+        for first in range(0, self.num_cases, self.chunk_size):
+            chunk = [self.get_case(ordinal) for ordinal in range(first, min(first + self.chunk_size, self.num_cases))]
+            progress.cases += len(chunk)
+            yield chunk
+        progress.bytes_read = progress.total_bytes
+        progress.seconds = perf_counter() - start
+        logger.debug("{}: {} lazy cases mapped in {:.3f} s", self.file_path, progress.cases, progress.seconds)
+
+
+def open_snapshot(file_path: str, case_type: Type[Case]) -> Union[CaseLoader, ColumnarSnapshot]:
+    """Opens a case-base file to load it: a :class:`ColumnarSnapshot` if it
+    is a columnar snapshot, or else a :class:`CaseLoader` of its pickles
+
+    Args:
+        file_path (str): The path of the file
+        case_type (Type[Case]): The type of the cases
+
+    Returns:
+        Union[CaseLoader, ColumnarSnapshot]: The loader of the file
+    """
+    if not is_columnar(file_path):
+        return CaseLoader(file_path, case_type)
+    snapshot = ColumnarSnapshot(file_path)
+    if not issubclass(snapshot.case_type, case_type):
+        raise ValueError("{} stores {} cases, not {} ones".format(file_path, snapshot.case_type.__name__,
+                                                                 case_type.__name__))
+    return snapshot
@@ -1,12 +1,29 @@
-from pickle import load
-from typing import Dict, List, ValuesView, Mapping, Sequence
+from threading import RLock
+from time import perf_counter
+from typing import Dict, Iterable, List, ValuesView, Mapping, Sequence, Optional, Hashable, Tuple, Union
 
 from loguru import logger
 
 from ..agents import similarity_algorithms as sim_algs
+from ..agents.attribute_ranges import AttributeRanges
+from ..agents.categorical_bitmaps import CategoricalBitmaps
+from ..agents.composite_index import BucketKey, BucketStatistics, CompositeIndex, index_premise_ids
+from ..agents.inverted_index import InvertedPremiseIndex
+from ..agents.numeric_index import NumericKDTree
+from ..agents.text_index import TextValueIndex
 from ..agents.configuration import Configuration
+from ..agents.parallel_similarity import ParallelScorer, SIMILARITY_FUNCTIONS
+from ..agents.premise_schema import PremiseSchema
+from ..cbrs.case_eviction import CaseEvictionPolicy, EvictionStatistics
+from ..cbrs.case_fingerprints import premises_fingerprint, query_fingerprint
+from ..cbrs.case_loader import gc_paused, LoadSummary
+from ..cbrs.case_log import ADD, REMOVE
+from ..cbrs.case_snapshot import SnapshotStatistics
 from ..cbrs.cbr import CBR
-from ..configuration.configuration_parameters import SimilarityType
+from ..cbrs.columnar_snapshot import get_case_key, open_snapshot
+from ..cbrs.retention_queue import RetentionQueue, RetentionStatistics
+from ..cbrs.retrieval_cache import CacheStatistics, RetrievalCache
+from ..configuration.configuration_parameters import SimilarityType, SimilarityEngine, NormalizationMode
 from ..knowledge_resources.domain_case import DomainCase
 from ..knowledge_resources.domain_context import DomainContext
 from ..knowledge_resources.justification import Justification
@@ -14,12 +31,18 @@ from ..knowledge_resources.premise import Premise
 from ..knowledge_resources.problem import Problem
 from ..knowledge_resources.similar_domain_case import SimilarDomainCase
 
+try:
+    from ..agents.vectorized_similarity import CaseMatrix
+except ImportError:  # NumPy is an optional dependency, only needed by SimilarityEngine.NUMPY
+    CaseMatrix = None
+
 
 class DomainCBR(CBR):
     """This class implements the domain CBR."""
-    index: int = -1
+    index: Union[int, Tuple[int, ...]] = -1
 
-    def __init__(self, initial_file_path: str, storing_file_path: str, index: int):
+    def __init__(self, initial_file_path: str, storing_file_path: str, index: Union[int, Sequence[int]],
+                 schema: Optional[PremiseSchema] = None):
         """This CBR stores domain knowledge of previously solved problems. It is
         used by the argumentative agent to generate and select the Position
         (solution) to defend in an argumentation dialogue.
@@ -29,39 +52,125 @@ class DomainCBR(CBR):
                 domain cases.
             storing_file_path (str): The path of the file to store the domain
                 cases
-            index (int): Identifier of the premise wich value will be used as a
-                hash index. If not indexation is used, just set is value to -1
+            index (Union[int, Sequence[int]]): Identifier of the premise wich
+                value will be used as a hash index, or an ordered sequence of
+                identifiers whose values are used as a composite key (see
+                :class:`CompositeIndex`). If not indexation is used, just set
+                is value to -1 and the candidates are taken from an inverted
+                index of the premise IDs
+            schema (Optional[PremiseSchema]): The premise schema of the
+                domain. If not given, it is loaded from the schema file of the
+                configuration or inferred from the case-base if the
+                configuration says so; otherwise, no schema is used
         """
         super().__init__(initial_file_path, storing_file_path)
-        self.index = index
+        self.index = index if isinstance(index, int) else tuple(index)
+        self.composite_index: Optional[CompositeIndex] = None
+        self.fingerprints: Dict[int, List[DomainCase]] = {}
+        self.schema = schema
+        self.case_matrix = None
+        self.attribute_ranges: Optional[AttributeRanges] = None  # Built by get_attribute_ranges
+        self.inverted_index = InvertedPremiseIndex()
+        self.numeric_tree: Optional[NumericKDTree] = None
+        self.text_index: Optional[TextValueIndex] = None
+        self.categorical_bitmaps: Dict[Hashable, CategoricalBitmaps] = {}
+        self.parallel_scorer: Optional[ParallelScorer] = None
+        self.retrieval_cache = RetrievalCache()
+        self.similarity_cache = RetrievalCache()
+        self.eviction_policy = CaseEvictionPolicy()
+        self.num_cases = 0
+        self.batching = False  # The cache invalidation and the evictions wait for the end of the batch
+        self.lock = RLock()
+        self.retention_queue = RetentionQueue(self.apply_retention_queue)
         self.load_case_base()
 
     def load_case_base(self):
-        """Loads the case-base stored in the initial file path"""
-        self.case_base = {}
-        introduced = 0
-        not_introduced = 0
-        str_ids = ""
-        with open(self.initial_file_path, 'rb') as fh:
-            while True:
-                try:
-                    aux = load(fh)
-                    if type(aux) == DomainCase:
-                        a_case = aux
-                        str_ids += str(a_case.solutions[0].conclusion.id) + " "
+        """Loads the case-base stored in the initial file path, reading it in
+        chunks (see :class:`CaseLoader`) or, if it is a columnar snapshot,
+        as lazy domain-cases whose solutions and justification are unpickled
+        on their first use (see :class:`ColumnarSnapshot`), the format of
+        the snapshots stored by :meth:`do_cache` if
+        Configuration.domain_cbrs_snapshot_format says so. The structures
+        built from the case-base are updated once all the cases are added
+        (see :meth:`register_cases`). If Configuration.domain_cbrs_case_log is
+        set, the last snapshot is loaded instead (see
+        :meth:`get_snapshot_path`) and the case log is replayed on top of it
+        (see :meth:`open_case_log`). Finally, if the case-base exceeds the
+        capacity of the configuration, the cases with the lowest utility are
+        evicted (see :meth:`evict_cases`)"""
+        c = Configuration()
+        self.close_case_log()
+        self.snapshot_format = c.domain_cbrs_snapshot_format
+        self.clear_case_base(c)
+        loader = open_snapshot(self.get_snapshot_path(c.domain_cbrs_case_log), DomainCase)
+        summary = LoadSummary()
+        introduced: List[DomainCase] = []
+        self.batching = True
+        try:
+            with gc_paused():
+                for chunk in loader.chunks():
+                    for a_case in chunk:
                         returned_value = self.add_case(a_case)
+                        conclusion_ids = get_case_key(a_case, self.snapshot_key)
+                        summary.add(conclusion_ids[0] if conclusion_ids else None, returned_value)
                         if returned_value:
-                            introduced += 1
-                        else:
-                            not_introduced += 1
-                except EOFError:
-                    break
-        logger.info(self.initial_file_path, "domain_cases: ", introduced + not_introduced,
-                    "introduced: ", introduced, "not_introduced: ", not_introduced, "sols: ", str_ids)
+                            introduced.append(a_case)
+                self.register_cases(introduced)
+        finally:
+            self.batching = False
+        logger.info("{}: domain {}", loader.file_path, summary)
+        if self.schema is None:
+            self.schema = self.load_schema()
+        if c.domain_cbrs_case_log:
+            self.open_case_log(loader.checkpoint, c.domain_cbrs_case_log_compaction)
+        self.evict_cases()
+
+    def clear_case_base(self, c: Configuration):
+        """Empties the case-base and the structures built from it, the caches
+        and the retention queue, to load it again
+
+        Args:
+            c (Configuration): The configuration of the structures
+        """
+        self.case_base = {}
+        self.num_cases = 0
+        self.fingerprints = {}
+        self.case_matrix = None
+        # Only maintained when they are used, so they are built with the cases if the configuration uses them
+        self.attribute_ranges = AttributeRanges() if c.domain_cbrs_normalization == NormalizationMode.GLOBAL_RANGE \
+            else None
+        self.inverted_index = InvertedPremiseIndex()
+        self.numeric_tree = None
+        self.text_index = TextValueIndex() if c.domain_cbrs_text_index else None
+        premise_ids = index_premise_ids(self.index)
+        self.composite_index = CompositeIndex(premise_ids) if premise_ids else None
+        self.categorical_bitmaps = {}
+        self.retrieval_cache.clear()
+        self.similarity_cache.clear()  # The similarities depend on the schema, loaded again
+        self.retention_queue.clear()
+        self.eviction_policy = CaseEvictionPolicy()
+        self.close_parallel_scorer()
+
+    def load_schema(self) -> Optional[PremiseSchema]:
+        """Loads the premise schema from the file of the configuration, or
+        infers it from the case-base if the configuration says so
+
+        Returns:
+            Optional[PremiseSchema]: The premise schema, or None if the
+            configuration does not specify any
+        """
+        c = Configuration()
+        if c.domain_cbrs_schema_file:
+            return PremiseSchema.load(c.domain_cbrs_schema_file)
+        if c.domain_cbrs_infer_schema:
+            return PremiseSchema.infer(self.get_all_cases_list())
+        return None
 
     def retrieve_and_retain(self, dom_case: DomainCase, threshold: float) -> List[SimilarDomainCase]:
         """Retrieves the domain_cases that are in a range of similarity degree
-        with the given one.
+        with the given one. With Configuration.domain_cbrs_retention_queue,
+        the domain-case is not added to the case-base here but put in the
+        retention queue (see :meth:`apply_retention_queue`).
 
         Args:
             dom_case (DomainCase): The domain-case (representing a problem to
@@ -72,13 +181,14 @@ class DomainCBR(CBR):
             List[SimilarDomainCase]: A list with the domain cases
         """
         c = Configuration()
-        similar_cases = self.get_most_similar(dom_case.problem.context.premises, threshold, c.domain_cbrs_similarity)
+        similar_cases = self.get_most_similar_cached(dom_case.problem.context.premises, threshold, None, c)
         if similar_cases:
             for similar_case in similar_cases:
                 if similar_case.similarity < 1.0:
                     dom_case.solutions = similar_case.case.solutions
-                    returned_value = self.add_case(dom_case)
-                    if returned_value:
+                    if c.domain_cbrs_retention_queue:
+                        self.queue_case(dom_case, c)
+                    elif self.add_case(dom_case):
                         logger.info("New case Introduced")
                     else:
                         logger.info("New case NOT Introduced")
@@ -87,13 +197,16 @@ class DomainCBR(CBR):
 
         return similar_cases
 
-    def retrieve(self, premises: Dict[int, Premise], threshold: float) -> List[SimilarDomainCase]:
+    def retrieve(self, premises: Dict[int, Premise], threshold: float,
+                 k: Optional[int] = None) -> List[SimilarDomainCase]:
         """Retrieves the domain_cases that are in a range of similarity degree
         with the given premises.
 
         Args:
             premises (Dict[int, Premise]): The given premises
             threshold (float): The threshold that determines the range
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
 
         Returns:
             List[SimilarDomainCase]: The domain cases that fit in the range of
@@ -101,13 +214,166 @@ class DomainCBR(CBR):
         """
         # The parameter times_used can be also increased depending of the application domain
         c = Configuration()
-        similar_cases = self.get_most_similar(premises, threshold, c.domain_cbrs_similarity)
+        similar_cases = self.get_most_similar_cached(premises, threshold, k, c)
         return similar_cases
 
+    def get_most_similar_cached(self, premises: Dict[int, Premise], threshold: float, k: Optional[int],
+                                c: Configuration, max_distances: Optional[Dict[int, float]] = None,
+                                ranges: Optional[AttributeRanges] = None) -> List[SimilarDomainCase]:
+        """Gets the most similar domain cases with the algorithm, engine and
+        normalization of the configuration (see :meth:`get_most_similar`),
+        from the retrieval cache if they have already been retrieved. The
+        cache keeps up to Configuration.domain_cbrs_cache_size results (0
+        disables it) and the results of the candidates affected by a new case
+        are invalidated by :meth:`add_case`; while the retention queue has
+        pending cases, which are candidates too (see
+        :meth:`get_pending_cases`), the cache is not used. The cases returned
+        are marked as retrieved now for the eviction policy (see
+        :meth:`evict_cases`)
+
+        Args:
+            premises (Dict[int, Premise]): The given premises
+            threshold (float): The threshold that determines the range
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
+            c (Configuration): The configuration of the retrieval
+            max_distances (Optional[Dict[int, float]]): If given, the maximum
+                distance of each premise among the candidates of the whole
+                case-base, when this one is a part of it (see
+                :meth:`get_most_similar_candidates`)
+            ranges (Optional[AttributeRanges]): If given, the ranges of the
+                premises of the whole case-base, when this one is a part of it
+
+        Returns:
+            List[SimilarDomainCase]: The domain cases that fit in the range of
+            similarity
+        """
+        with self.lock:
+            pending = self.get_pending_cases()
+            self.retrieval_cache.resize(c.domain_cbrs_cache_size)
+            key = None
+            candidate_key = None
+            if c.domain_cbrs_cache_size > 0 and not pending:
+                candidate_key = self.get_candidate_key(premises)
+                # The external ranges change with the cases of the other parts, so their version is in the key
+                key = (query_fingerprint(premises), threshold, c.domain_cbrs_similarity, k, c.domain_cbrs_normalization,
+                       c.domain_cbrs_tversky_alpha, c.domain_cbrs_tversky_beta, candidate_key,
+                       None if max_distances is None else tuple(sorted(max_distances.items())),
+                       None if ranges is None else ranges.version)
+                similar_cases = self.retrieval_cache.get(key)
+            else:
+                similar_cases = None
+            if similar_cases is None:
+                similar_cases = self.get_most_similar_candidates(premises,
+                                                                 self.get_candidate_cases(premises, pending),
+                                                                 threshold, c.domain_cbrs_similarity,
+                                                                 c.domain_cbrs_similarity_engine, k,
+                                                                 c.domain_cbrs_normalization, c, max_distances,
+                                                                 ranges, pending)
+                if key is not None:
+                    # The global ranges change with any case, the candidates only with the ones of the bucket
+                    global_range = c.domain_cbrs_normalization == NormalizationMode.GLOBAL_RANGE
+                    self.retrieval_cache.put(key, (global_range, candidate_key), similar_cases)
+            similar_cases = list(similar_cases)
+            self.eviction_policy.touch(similar_case.case for similar_case in similar_cases)
+            return similar_cases
+
+    def invalidate_cache(self, *new_cases: DomainCase):
+        """Removes the cached results that the domain-cases added to (or
+        removed from) the case-base can change: the ones whose candidates
+        would include any of them and the ones normalized by the global
+        ranges of the premises
+
+        Args:
+            *new_cases (DomainCase): The domain-cases added to the case-base
+        """
+        if not new_cases or not self.retrieval_cache.get_buckets():
+            return
+        premises_list = [new_case.problem.context.premises for new_case in new_cases]
+        if self.composite_index is not None:
+            keys = [self.composite_index.get_key(premises) for premises in premises_list]
+            self.retrieval_cache.invalidate(
+                bucket for bucket in self.retrieval_cache.get_buckets()
+                if bucket[0] or any(key[:len(bucket[1])] == bucket[1] for key in keys))
+        else:
+            self.retrieval_cache.invalidate(
+                bucket for bucket in self.retrieval_cache.get_buckets()
+                if bucket[0] or any(sum(premise_id in premises for premise_id in bucket[1][0]) >= bucket[1][1]
+                                    for premises in premises_list))
+
+    def get_cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """Returns the counters of the retrieval cache and of the cache of
+        :meth:`get_cached_premises_similarity`
+
+        Returns:
+            Dict[str, CacheStatistics]: The statistics of the "retrieval" and
+            "similarity" caches
+        """
+        return {"retrieval": self.retrieval_cache.statistics, "similarity": self.similarity_cache.statistics}
+
+    def retrieve_many(self, premises_list: Sequence[Dict[int, Premise]], threshold: float,
+                      k: Optional[int] = None) -> List[List[SimilarDomainCase]]:
+        """Retrieves the domain_cases that are in a range of similarity degree
+        with each one of the given premises. The results are the same ones
+        obtained calling :meth:`retrieve` for each premises dict, but the
+        configuration is read once and the queries with the same candidate
+        cases are grouped; with SimilarityEngine.NUMPY each group is scored
+        in one pass, sharing the candidate arrays and the distances between
+        equal contents. While the retention queue has pending cases, each
+        query is scored on its own (see :meth:`get_pending_cases`). The cases
+        returned are marked as retrieved now for the eviction policy, like
+        the ones of :meth:`retrieve`
+
+        Args:
+            premises_list (Sequence[Dict[int, Premise]]): The premises of each
+                query
+            threshold (float): The threshold that determines the range
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned for each query
+
+        Returns:
+            List[List[SimilarDomainCase]]: The domain cases that fit in the
+            range of similarity of each query (in the same order as the
+            queries)
+        """
+        with self.lock:
+            pending = self.get_pending_cases()
+            c = Configuration()
+            results: List[List[SimilarDomainCase]] = [[] for _ in premises_list]
+            groups: Dict[Hashable, List[int]] = {}
+            for query, premises in enumerate(premises_list):
+                # The key does not tell the pending candidates apart
+                groups.setdefault(query if pending else self.get_candidate_key(premises), []).append(query)
+
+            for queries in groups.values():
+                candidate_cases = self.get_candidate_cases(premises_list[queries[0]], pending)
+                queries_premises = [premises_list[query] for query in queries]
+                if c.domain_cbrs_similarity_engine == SimilarityEngine.NUMPY \
+                        and c.domain_cbrs_normalization == NormalizationMode.CANDIDATES and not pending:
+                    group_results = self.get_case_matrix().similarity_many(queries_premises, candidate_cases,
+                                                                           c.domain_cbrs_similarity, threshold, k,
+                                                                           self.schema, c.domain_cbrs_tversky_alpha,
+                                                                           c.domain_cbrs_tversky_beta)
+                else:
+                    group_results = [self.get_most_similar_candidates(premises, candidate_cases, threshold,
+                                                                      c.domain_cbrs_similarity,
+                                                                      SimilarityEngine.PYTHON, k,
+                                                                      c.domain_cbrs_normalization, c,
+                                                                      pending=pending)
+                                     for premises in queries_premises]
+                for query, similar_cases in zip(queries, group_results):
+                    results[query] = similar_cases
+                    self.eviction_policy.touch(similar_case.case for similar_case in similar_cases)
+            return results
+
     def add_case(self, new_case: DomainCase) -> bool:
         """Adds a new domain-case to domain case-base. Otherwise, if the same
         domain-case exists in the case-base, adds the relevant data to the
-        existing domain-case.
+        existing domain-case. The domain-cases with the same fingerprint (see
+        :func:`premises_fingerprint`) are the only ones compared with it. If
+        the case-base exceeds its capacity, other domain-cases are evicted
+        (see :meth:`evict_cases`). The domain-case is written to the case
+        log, if it is open, before merging it.
 
         Args:
             new_case (DomainCase): :class:'DomainCase' that could be added.
@@ -115,70 +381,461 @@ class DomainCBR(CBR):
         Returns:
             bool: True if the domain-case is added, else False.
         """
-        main_premise_id = -1
-        main_premise_value: str = ""
-        cases: List[DomainCase] = []
+        with self.lock:
+            self.log_case(ADD, new_case)
+            current_case = self.find_case(new_case)
+            if current_case is not None:  # Same premises with same content
+                self.merge_case(current_case, new_case)
+                return False  # We do not introduce it because it is already in the case-base
 
-        if self.index != -1:
-            main_premise_value = new_case.problem.context.premises[self.index].content
-            cases = self.case_base.get(main_premise_value, [])
-        else:
-            new_case_premises_list: List[int] = []
-            for premise in new_case.problem.context.premises.values():
-                new_case_premises_list.append(premise.id)
-            new_case_premises_list = sorted(new_case_premises_list)
-            main_premise_id = new_case_premises_list[0]
-            cases = self.case_base.get(str(main_premise_id), [])
-
-        if not cases:
-            cases = [new_case]
-
-            if main_premise_value:
-                self.case_base[main_premise_value] = cases
+            bucket_key = self.get_bucket_key(new_case)
+            self.case_base.setdefault(bucket_key, []).append(new_case)
+            self.num_cases += 1
+            fingerprint = premises_fingerprint(new_case.problem.context.premises)
+            self.fingerprints.setdefault(fingerprint, []).append(new_case)
+            self.eviction_policy.add_case(new_case, self.num_cases)
+            if not self.batching:  # Otherwise, registered at the end of the batch
+                self.register_case(new_case)
+                self.invalidate_cache(new_case)
+                if not self.replaying:  # The evictions are replayed from the case log
+                    self.evict_cases([new_case])
+            return True
+
+    def find_case(self, a_case: DomainCase) -> Optional[DomainCase]:
+        """Returns the domain-case of the case-base with the same premises as
+        the given one, with the same content regardless of the case. The
+        domain-cases with the same fingerprint (see
+        :func:`premises_fingerprint`) are the only ones compared with it
+
+        Args:
+            a_case (DomainCase): The domain-case to look for
+
+        Returns:
+            Optional[DomainCase]: The domain-case of the case-base, or None if
+            there is none
+        """
+        with self.lock:
+            new_premises = a_case.problem.context.premises
+            for current_case in self.get_fingerprint_cases(new_premises):
+                if self.same_premises(current_case.problem.context.premises, new_premises):
+                    return current_case
+            return None
+
+    @staticmethod
+    def same_premises(current_premises: Mapping[int, Premise], new_premises: Mapping[int, Premise]) -> bool:
+        """Returns whether two premises dicts have the same premises with the
+        same content regardless of the case (see :meth:`find_case`)"""
+        if len(current_premises) != len(new_premises):
+            return False  # They do not have the same premises
+
+        for case_prem in new_premises.values():
+            prem_id = case_prem.id
+            if prem_id not in current_premises.keys() \
+                or not current_premises[prem_id].content.lower() == case_prem.content.lower():
+                return False
+        return True
+
+    def get_fingerprint_cases(self, premises: Mapping[int, Premise]) -> Sequence[DomainCase]:
+        """Returns the domain-cases of the case-base with the fingerprint of
+        the given premises (see :func:`premises_fingerprint`)
+
+        Args:
+            premises (Mapping[int, Premise]): The premises
+
+        Returns:
+            Sequence[DomainCase]: The domain-cases
+        """
+        return self.fingerprints.get(premises_fingerprint(premises), [])
+
+    @staticmethod
+    def merge_case(current_case: DomainCase, new_case: DomainCase):
+        """Adds the solutions of a new domain-case to the equal one of the
+        case-base: the times used of the solutions that it already has are
+        increased, and the rest are added
+
+        Args:
+            current_case (DomainCase): The domain-case of the case-base
+            new_case (DomainCase): The new domain-case, with the same premises
+        """
+        # add the new solutions to the case if there are some
+        for a_solution in new_case.solutions:
+            b_solution = current_case.get_solution(a_solution.conclusion.id)
+            if b_solution is not None:
+                b_solution.times_used += a_solution.times_used
             else:
-                self.case_base[str(main_premise_id)] = cases
+                a_solution.times_used = 1
+                current_case.add_solution(a_solution)
+
+    def queue_case(self, new_case: DomainCase, c: Configuration):
+        """Puts a domain-case in the retention queue, applying the queue if it
+        reaches Configuration.domain_cbrs_retention_batch_size cases and
+        there is no background thread (see :meth:`apply_retention_queue`)
+
+        Args:
+            new_case (DomainCase): The retained domain-case
+            c (Configuration): The configuration of the retention queue
+        """
+        self.retention_queue.configure(c.domain_cbrs_retention_batch_size, c.domain_cbrs_retention_interval)
+        if self.retention_queue.put(new_case):
+            self.apply_retention_queue()
+
+    def apply_retention_queue(self):
+        """Adds the domain-cases of the retention queue to the case-base, in
+        the order they were retained. The structures built from the case-base
+        are updated (see :meth:`register_cases`), the cache invalidated and
+        the capacity of the case-base enforced once for the whole batch. The
+        queue is applied when it reaches
+        Configuration.domain_cbrs_retention_batch_size cases, at the end of
+        a dialogue, before the case-base is stored (see :meth:`do_cache`)
+        and, if Configuration.domain_cbrs_retention_interval is greater than
+        0, by a background thread every interval seconds. Until then, the
+        retrievals see the retained cases (see :meth:`get_pending_cases`)
+        """
+        with self.lock:
+            batch = self.retention_queue.take()
+            if not batch:
+                return
+            start = perf_counter()
+            introduced: List[DomainCase] = []
+            self.batching = True
+            try:
+                for new_case, solutions in batch:
+                    new_case.solutions = solutions
+                    if self.add_case(new_case):
+                        introduced.append(new_case)
+            finally:
+                self.batching = False
+            self.register_cases(introduced)
+            self.invalidate_cache(*introduced)
+            self.evict_cases(introduced)
+            statistics = self.retention_queue.statistics
+            statistics.applied += len(batch)
+            statistics.introduced += len(introduced)
+            statistics.batches += 1
+            statistics.apply_seconds += perf_counter() - start
+            logger.info("Retained domain cases: {} introduced: {}", len(batch), len(introduced))
+
+    def get_pending_cases(self) -> List[DomainCase]:
+        """Returns the domain-cases of the retention queue that will be new
+        in the case-base when it is applied, in the order they were retained:
+        the ones without an equal domain-case (see :meth:`same_premises`) in
+        the case-base or before them in the queue. The retrievals score them
+        with the candidates of the case-base, so they see the retained cases
+        without applying the queue
+
+        Returns:
+            List[DomainCase]: The pending domain-cases
+        """
+        with self.lock:
+            pending: List[DomainCase] = []
+            fingerprints: Dict[int, List[DomainCase]] = {}
+            for new_case, _ in self.retention_queue.peek():
+                premises = new_case.problem.context.premises
+                if self.find_case(new_case) is not None:
+                    continue
+                same_fingerprint = fingerprints.setdefault(premises_fingerprint(premises), [])
+                if any(self.same_premises(a_case.problem.context.premises, premises) for a_case in same_fingerprint):
+                    continue
+                same_fingerprint.append(new_case)
+                pending.append(new_case)
+            return pending
+
+    def get_retention_statistics(self) -> RetentionStatistics:
+        """Returns the counters of the retention queue
+
+        Returns:
+            RetentionStatistics: The statistics of the retention queue
+        """
+        return self.retention_queue.statistics
+
+    def get_bucket_key(self, a_case: DomainCase) -> Union[str, BucketKey]:
+        """Returns the key of the bucket of the case-base where a domain-case
+        is stored
+
+        Args:
+            a_case (DomainCase): The domain-case
+
+        Returns:
+            Union[str, BucketKey]: The content of the premise of the hash
+            index (or the key of the composite index), or the lowest premise
+            ID without hash index
+        """
+        if self.composite_index is not None:
+            key = self.composite_index.get_key(a_case.problem.context.premises)
+            return key[0] if len(key) == 1 else key  # A single premise keeps its content as key
+        new_case_premises_list: List[int] = []
+        for premise in a_case.problem.context.premises.values():
+            new_case_premises_list.append(premise.id)
+        new_case_premises_list = sorted(new_case_premises_list)
+        return str(new_case_premises_list[0])
+
+    def remove_case(self, old_case: DomainCase) -> bool:
+        """Removes a domain-case from the case-base and from every structure
+        built from it (see :meth:`unregister_case`)
+
+        Args:
+            old_case (DomainCase): The domain-case to remove (the same object
+                stored in the case-base)
+
+        Returns:
+            bool: True if the domain-case was in the case-base, else False.
+        """
+        with self.lock:
+            bucket_key = self.get_bucket_key(old_case)
+            bucket = self.case_base.get(bucket_key, [])
+            position = next((position for position, a_case in enumerate(bucket) if a_case is old_case), None)
+            if position is None:
+                return False
+            del bucket[position]
+            if not bucket:
+                del self.case_base[bucket_key]
+            self.num_cases -= 1
+            fingerprint = premises_fingerprint(old_case.problem.context.premises)
+            same_fingerprint = [a_case for a_case in self.fingerprints[fingerprint] if a_case is not old_case]
+            if same_fingerprint:
+                self.fingerprints[fingerprint] = same_fingerprint
+            else:
+                del self.fingerprints[fingerprint]
+            self.unregister_case(old_case)
+            self.eviction_policy.remove_case(old_case)
+            self.invalidate_cache(old_case)
+            self.log_case(REMOVE, old_case)
             return True
 
-        found = False
+    def replay_record(self, operation: str, a_case: DomainCase):
+        if operation == REMOVE:
+            current_case = self.find_case(a_case)
+            if current_case is not None:
+                self.remove_case(current_case)
+        else:
+            super().replay_record(operation, a_case)
+
+    def evict_cases(self, protected: Iterable[DomainCase] = ()) -> List[DomainCase]:
+        """Evicts domain-cases until the case-base fits the capacity of the
+        configuration: Configuration.domain_cbrs_max_cases cases and
+        Configuration.domain_cbrs_max_memory bytes (0 for no limit). Among
+        the Configuration.domain_cbrs_eviction_sample cases with the lowest
+        utility (see :class:`CaseEvictionPolicy`), the first one that is
+        redundant (see :meth:`is_redundant`) is evicted; if none is, the one
+        with the lowest utility
 
-        for current_case in cases:
-            current_premises = current_case.problem.context.premises
-            new_premises = new_case.problem.context.premises
-            if len(current_premises) != len(new_premises):
-                continue  # They do not have the same premises, we go to look the next one
+        Args:
+            protected (Iterable[DomainCase]): The domain-cases that cannot be
+                evicted, like the ones just added
 
-            equal = True
-            for case_prem in new_premises.values():
-                prem_id = case_prem.id
-                if prem_id not in current_premises.keys() \
-                    or not current_premises[prem_id].content.lower() == case_prem.content.lower():
-                    equal = False
+        Returns:
+            List[DomainCase]: The evicted domain-cases
+        """
+        with self.lock:
+            c = Configuration()
+            policy = self.eviction_policy
+            protected_ids = {id(a_case) for a_case in protected}
+            policy.configure(c.domain_cbrs_max_cases, c.domain_cbrs_max_memory, c.domain_cbrs_eviction_sample,
+                             (a_case for cases in self.case_base.values() for a_case in cases))
+            evicted: List[DomainCase] = []
+            while policy.is_over_capacity(self.num_cases):
+                sample = policy.lowest(max(policy.sample_size, 1), protected_ids)
+                if not sample:
                     break
+                victim = next((a_case for a_case in sample[:policy.sample_size]
+                               if self.is_redundant(a_case, c.domain_cbrs_redundancy_threshold)), None)
+                redundant = victim is not None
+                if not redundant:
+                    victim = sample[0]
+                self.remove_case(victim)
+                policy.count_eviction(victim, redundant)
+                evicted.append(victim)
+            if evicted:
+                logger.info("Evicted domain cases: {}", len(evicted))
+            return evicted
 
-            if equal:  # Same premises with same content
-                # add the new solutions to the case if there are some
-                for a_solution in new_case.solutions:
-                    sol_found = False
-                    for b_solution in current_case.solutions:
-                        if b_solution.conclusion.id == a_solution.conclusion.id:
-                            b_solution.times_used += a_solution.times_used
-                            sol_found = True
-                            break
-                    if not sol_found:
-                        a_solution.times_used = 1
-                        current_case.add_solution(a_solution)
-
-                found = True
-                return False  # We do not introduce it because it is already in the case-base
+    def is_redundant(self, a_case: DomainCase, threshold: float) -> bool:
+        """Returns whether a domain-case is covered by a near-identical
+        neighbour: another candidate of its premises with all its conclusions
+        and a similarity (see :meth:`get_cached_premises_similarity`) greater
+        or equal than the threshold
 
-        if not found:
-            cases.append(new_case)
-            return True
+        Args:
+            a_case (DomainCase): The domain-case of the case-base
+            threshold (float): The minimum similarity of the neighbour
+
+        Returns:
+            bool: True if the domain-case can be evicted without losing any
+            solution of its neighbourhood
+        """
+        with self.lock:
+            premises = a_case.problem.context.premises
+            conclusions = {solution.conclusion.id for solution in a_case.solutions}
+            for neighbour in self.get_candidate_cases(premises):
+                if neighbour is a_case \
+                        or not conclusions <= {solution.conclusion.id for solution in neighbour.solutions}:
+                    continue
+                if self.get_cached_premises_similarity(premises, neighbour.problem.context.premises) >= threshold:
+                    return True
+            return False
 
-        return False
+    def get_eviction_statistics(self) -> EvictionStatistics:
+        """Returns the counters of the evictions of domain-cases
 
-    def get_most_similar(self, premises: Dict[int, Premise], threshold: float, similarity_type: SimilarityType) \
-        -> List[SimilarDomainCase]:
+        Returns:
+            EvictionStatistics: The statistics of the eviction policy
+        """
+        return self.eviction_policy.statistics
+
+    def register_case(self, new_case: DomainCase):
+        """Updates the structures built from the case-base (the features of
+        the case, the attribute ranges if they are built, the inverted and composite indexes, the
+        KD-tree of the numeric premises, the text index and the case matrix)
+        with a domain-case added to it
+
+        Args:
+            new_case (DomainCase): The domain-case added to the case-base
+        """
+        new_case.update_features()
+        if self.attribute_ranges is not None:
+            self.attribute_ranges.add_case(new_case)
+        self.inverted_index.add_case(new_case)
+        if self.composite_index is not None:
+            self.composite_index.add_case(new_case)
+        if self.numeric_tree is not None and self.numeric_tree.schema is self.schema:
+            self.numeric_tree.add_case(new_case)
+        if self.text_index is not None:
+            self.text_index.add_case(new_case)
+        self.add_to_case_matrix(new_case)
+
+    def unregister_case(self, old_case: DomainCase):
+        """Updates the structures built from the case-base (see
+        :meth:`register_case`) and the parallel scorer with a domain-case
+        removed from it. The attribute ranges shrink with the counts of their
+        values (see :meth:`AttributeRanges.remove_case`), and the bitmaps of the categorical premises are built again
+        when their candidates change
+
+        Args:
+            old_case (DomainCase): The domain-case removed from the case-base
+        """
+        if self.attribute_ranges is not None:
+            self.attribute_ranges.remove_case(old_case)
+        self.inverted_index.remove_case(old_case)
+        if self.composite_index is not None:
+            self.composite_index.remove_case(old_case)
+        if self.numeric_tree is not None:
+            self.numeric_tree.remove_case(old_case)
+        if self.text_index is not None:
+            self.text_index.remove_case(old_case)
+        if self.case_matrix is not None:
+            self.case_matrix.remove_case(old_case)
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.remove_case(old_case)
+
+    def register_cases(self, new_cases: Sequence[DomainCase]):
+        """Updates the structures built from the case-base with several
+        domain-cases added to it, like :meth:`register_case` but one structure
+        after another
+
+        Args:
+            new_cases (Sequence[DomainCase]): The domain-cases added to the
+                case-base, in the order they were added
+        """
+        attribute_ranges = self.attribute_ranges
+        for new_case in new_cases:
+            new_case.update_features()
+            if attribute_ranges is not None:
+                attribute_ranges.add_case(new_case)
+        self.inverted_index.add_cases(new_cases)
+        if self.composite_index is not None:
+            self.composite_index.add_cases(new_cases)
+        if self.numeric_tree is not None and self.numeric_tree.schema is self.schema:
+            for new_case in new_cases:
+                self.numeric_tree.add_case(new_case)
+        if self.text_index is not None:
+            for new_case in new_cases:
+                self.text_index.add_case(new_case)
+        for new_case in new_cases:
+            self.add_to_case_matrix(new_case)
+
+    def add_to_case_matrix(self, new_case: DomainCase):
+        """Adds a new domain-case to the case matrix used by the NumPy
+        similarity engine, if it has already been built
+
+        Args:
+            new_case (DomainCase): The domain-case added to the case-base
+        """
+        if self.case_matrix is not None:
+            self.case_matrix.add_case(new_case)
+
+    def get_case_matrix(self) -> CaseMatrix:
+        """Returns the case matrix used by the NumPy similarity engine. It is
+        built from the whole case-base the first time it is requested and
+        updated by :meth:`add_case` afterwards
+
+        Returns:
+            CaseMatrix: The case matrix of the case-base
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if CaseMatrix is None:
+            raise ImportError("NumPy is required to use SimilarityEngine.NUMPY")
+        with self.lock:
+            if self.case_matrix is None:
+                self.case_matrix = CaseMatrix(self.get_all_cases_list())
+            return self.case_matrix
+
+    def get_attribute_ranges(self) -> AttributeRanges:
+        """Returns the ranges of the premises of the case-base used by
+        NormalizationMode.GLOBAL_RANGE. They are built from the whole
+        case-base the first time they are requested (or when it is loaded, if
+        the configuration uses that normalization) and updated by
+        :meth:`add_case` and :meth:`remove_case` afterwards
+
+        Returns:
+            AttributeRanges: The ranges of the case-base
+        """
+        with self.lock:
+            if self.attribute_ranges is None:
+                attribute_ranges = AttributeRanges()
+                for a_case in self.get_all_cases_list():
+                    attribute_ranges.add_case(a_case)
+                self.attribute_ranges = attribute_ranges
+            return self.attribute_ranges
+
+    def get_numeric_tree(self) -> NumericKDTree:
+        """Returns the KD-tree of the numeric premises of the case-base used
+        by the weighted Euclidean retrieval when
+        Configuration.domain_cbrs_numeric_index is set. It is built from the
+        whole case-base the first time it is requested (or when the schema
+        changes) and updated by :meth:`add_case` afterwards
+
+        Returns:
+            NumericKDTree: The KD-tree of the case-base
+        """
+        with self.lock:
+            if self.numeric_tree is None or self.numeric_tree.schema is not self.schema:
+                self.numeric_tree = NumericKDTree(self.schema)
+                for a_case in self.get_all_cases_list():
+                    self.numeric_tree.add_case(a_case)
+            return self.numeric_tree
+
+    def get_text_index(self) -> TextValueIndex:
+        """Returns the BK-trees of the contents of the premises of the
+        case-base used by the weighted Euclidean retrieval when
+        Configuration.domain_cbrs_text_index is set. It is built with the
+        case-base if the configuration says so when it is loaded (otherwise,
+        the first time it is requested) and updated by :meth:`add_case`
+
+        Returns:
+            TextValueIndex: The text index of the case-base
+        """
+        with self.lock:
+            if self.text_index is None:
+                self.text_index = TextValueIndex()
+                for a_case in self.get_all_cases_list():
+                    self.text_index.add_case(a_case)
+            return self.text_index
+
+    def get_most_similar(self, premises: Dict[int, Premise], threshold: float, similarity_type: SimilarityType,
+                         engine: SimilarityEngine = SimilarityEngine.PYTHON, k: Optional[int] = None,
+                         normalization: NormalizationMode = NormalizationMode.CANDIDATES) -> List[SimilarDomainCase]:
         """Gets the most similar domain cases that are in a range of similarity
         degree with the given premises The similarity algorithm is determined by
         a parameter.
@@ -189,38 +846,230 @@ class DomainCBR(CBR):
                 the domain-cases to return.
             similarity_type (SimilarityType): A parameter to specify which
                 similarity algorithm has to be used
+            engine (SimilarityEngine): The implementation of the similarity
+                algorithms to use. Both of them return the same results, but
+                SimilarityEngine.NUMPY is faster with big case-bases
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
+            normalization (NormalizationMode): How the distances of the
+                normalized algorithms are normalized: by their maximum among
+                the candidates or by the ranges of the premises in the whole
+                case-base. NormalizationMode.GLOBAL_RANGE scores each
+                candidate independently and stops as soon as it cannot reach
+                the threshold (always with the pure Python implementation)
+
+        Returns:
+            List[SimilarDomainCase]: The domain-cases with a similarity degree
+            greater or equal than the threshold, ordered from the most to the
+            least similar
+        """
+        with self.lock:
+            pending = self.get_pending_cases()
+            candidate_cases = self.get_candidate_cases(premises, pending)
+            return self.get_most_similar_candidates(premises, candidate_cases, threshold, similarity_type, engine, k,
+                                                    normalization, pending=pending)
+
+    def get_most_similar_candidates(self, premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                    threshold: float, similarity_type: SimilarityType,
+                                    engine: SimilarityEngine = SimilarityEngine.PYTHON, k: Optional[int] = None,
+                                    normalization: NormalizationMode = NormalizationMode.CANDIDATES,
+                                    c: Optional[Configuration] = None,
+                                    max_distances: Optional[Dict[int, float]] = None,
+                                    ranges: Optional[AttributeRanges] = None,
+                                    pending: Sequence[DomainCase] = ()) -> List[SimilarDomainCase]:
+        """Scores the given candidate cases with the similarity algorithm and
+        engine specified (see :meth:`get_most_similar`). When the case-base
+        is a part of a bigger one (see :class:`ShardedDomainCBR`), the
+        distances can be normalized by the maxima among all its candidates or
+        by the ranges of all its premises; the candidates are then scored with
+        the pure Python implementation, like when some of them are pending
+        cases of the retention queue, which are not in the structures built
+        from the case-base
+
+        Args:
+            premises (Mapping[int, Premise]): The given premises
+            candidate_cases (List[DomainCase]): The candidate domain cases
+            threshold (float): The threshold of minimum degree of similarity of
+                the domain-cases to return.
+            similarity_type (SimilarityType): The similarity algorithm
+            engine (SimilarityEngine): The implementation of the similarity
+                algorithms to use
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
+            normalization (NormalizationMode): How the distances of the
+                normalized algorithms are normalized
+            c (Optional[Configuration]): The configuration of the indexes and
+                of the Tversky weights; by default, the current one
+            max_distances (Optional[Dict[int, float]]): If given, the maximum
+                distance of each premise among all the candidates (see
+                :func:`similarity_algorithms.premise_max_distances`)
+            ranges (Optional[AttributeRanges]): If given, the ranges of the
+                premises used by NormalizationMode.GLOBAL_RANGE instead of the
+                ones of this case-base
+            pending (Sequence[DomainCase]): The pending cases of the
+                retention queue (see :meth:`get_pending_cases`), which extend
+                the ranges of the premises
 
         Returns:
-            List[SimilarDomainCase]
+            List[SimilarDomainCase]: The selected domain-cases ordered from
+            the most to the least similar
         """
-        candidate_cases = self.get_candidate_cases(premises)
+        if c is None:
+            c = Configuration()
+        tversky_weights = {"alpha": c.domain_cbrs_tversky_alpha, "beta": c.domain_cbrs_tversky_beta}
+        if normalization == NormalizationMode.GLOBAL_RANGE:
+            if ranges is None:
+                ranges = self.get_attribute_ranges()
+            if pending:
+                pending_ranges = AttributeRanges()
+                pending_ranges.merge(ranges)
+                for a_case in pending:
+                    pending_ranges.add_case(a_case)
+                ranges = pending_ranges
+            if similarity_type == SimilarityType.NORMALIZED_TVERSKY:
+                return sim_algs.global_range_tversky_similarity(premises, candidate_cases, ranges, threshold, k,
+                                                                self.schema, **tversky_weights)
+            if similarity_type != SimilarityType.WEIGHTED_EUCLIDEAN:
+                return sim_algs.global_range_euclidean_similarity(premises, candidate_cases, ranges, threshold, k,
+                                                                  self.schema)
+        if max_distances is not None and similarity_type in SIMILARITY_FUNCTIONS:
+            options = tversky_weights if similarity_type == SimilarityType.NORMALIZED_TVERSKY else {}
+            similarities = SIMILARITY_FUNCTIONS[similarity_type](
+                premises, candidate_cases, self.schema,
+                None if pending else self.get_categorical_bitmaps(premises, candidate_cases),
+                max_distances=max_distances, **options)
+            return sim_algs.select_most_similar(candidate_cases, similarities, threshold, k)
+
         final_candidates: List[SimilarDomainCase] = []
-        more_similar_candidates: List[SimilarDomainCase] = []
+        algorithms = sim_algs
+        options = {}
+        if pending:
+            pass  # Scored with the pure Python implementation, without the structures built from the case-base
+        elif engine == SimilarityEngine.NUMPY:
+            algorithms = self.get_case_matrix()
+        else:
+            if similarity_type == SimilarityType.WEIGHTED_EUCLIDEAN \
+                    and (c.domain_cbrs_numeric_index or c.domain_cbrs_text_index):
+                tree = self.get_numeric_tree() if c.domain_cbrs_numeric_index else None
+                text_index = self.get_text_index() if c.domain_cbrs_text_index else None
+                return sim_algs.indexed_weighted_euclidean_similarity(premises, candidate_cases, tree, threshold, k,
+                                                                      self.schema, text_index=text_index)
+            if c.domain_cbrs_parallel_workers > 1 and len(candidate_cases) >= c.domain_cbrs_parallel_threshold:
+                scorer = self.get_parallel_scorer(c.domain_cbrs_parallel_workers)
+                return scorer.most_similar(premises, candidate_cases, similarity_type, threshold, k,
+                                           **tversky_weights)
+            options["bitmaps"] = self.get_categorical_bitmaps(premises, candidate_cases)
 
         if similarity_type == SimilarityType.NORMALIZED_EUCLIDEAN:
-            final_candidates = sim_algs.normalized_euclidean_similarity(premises, candidate_cases)
+            final_candidates = algorithms.normalized_euclidean_similarity(premises, candidate_cases, threshold, k,
+                                                                          self.schema, **options)
         elif similarity_type == SimilarityType.WEIGHTED_EUCLIDEAN:
-            final_candidates = sim_algs.weighted_euclidean_similarity(premises, candidate_cases)
+            final_candidates = algorithms.weighted_euclidean_similarity(premises, candidate_cases, threshold, k,
+                                                                        self.schema, **options)
         elif similarity_type == SimilarityType.NORMALIZED_TVERSKY:
-            final_candidates = sim_algs.normalized_tversky_similarity(premises, candidate_cases)
+            final_candidates = algorithms.normalized_tversky_similarity(premises, candidate_cases, threshold, k,
+                                                                        self.schema, **options, **tversky_weights)
         else:
-            final_candidates = sim_algs.normalized_euclidean_similarity(premises, candidate_cases)
+            final_candidates = algorithms.normalized_euclidean_similarity(premises, candidate_cases, threshold, k,
+                                                                          self.schema, **options)
+        return final_candidates
 
-        for sim_case in final_candidates:
-            if sim_case.similarity >= threshold:
-                more_similar_candidates.append(sim_case)
-            else:
-                break
-        return more_similar_candidates
+    def get_parallel_scorer(self, workers: int) -> ParallelScorer:
+        """Returns the pool of worker processes used to score big lists of
+        candidates with SimilarityEngine.PYTHON. It is created the first time
+        it is requested, with a copy of the case-base, and created again when
+        the number of workers or the schema change or when the cases added
+        since then (which are sent with every retrieval) are more than a 10%
+        of the copy
+
+        Args:
+            workers (int): The number of worker processes
+
+        Returns:
+            ParallelScorer: The pool of worker processes
+        """
+        scorer = self.parallel_scorer
+        if scorer is None or scorer.workers != workers or scorer.schema is not self.schema \
+                or self.num_cases > len(scorer.rows) * 1.1:
+            self.close_parallel_scorer()
+            scorer = ParallelScorer(self.get_all_cases_list(), self.schema, workers)
+            self.parallel_scorer = scorer
+        return scorer
+
+    def close_parallel_scorer(self):
+        """Stops the worker processes of the parallel scorer, if any"""
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.shutdown()
+        self.parallel_scorer = None
+
+    def get_categorical_bitmaps(self, premises: Mapping[int, Premise],
+                                candidate_cases: List[DomainCase]) -> Optional[CategoricalBitmaps]:
+        """Returns the bitmaps of the categorical premises of the given
+        candidate cases, used by the pure Python similarity algorithms. They
+        are kept per candidate key (see :meth:`get_candidate_key`) and
+        updated with the cases added since the last retrieval
+
+        Args:
+            premises (Mapping[int, Premise]): The given premises
+            candidate_cases (List[DomainCase]): The candidate domain cases of
+                the premises
+
+        Returns:
+            Optional[CategoricalBitmaps]: The bitmaps, or None if the schema
+            does not declare any categorical premise
+        """
+        with self.lock:
+            if self.schema is None:
+                return None
+            premise_ids = self.schema.get_categorical_ids()
+            if not premise_ids:
+                return None
+            key = self.get_candidate_key(premises)
+            bitmaps = self.categorical_bitmaps.get(key)
+            if bitmaps is None or bitmaps.premise_ids != premise_ids or not bitmaps.update(candidate_cases):
+                bitmaps = CategoricalBitmaps(candidate_cases, premise_ids)
+                self.categorical_bitmaps[key] = bitmaps
+            return bitmaps
+
+    def get_cached_premises_similarity(self, premises1: Dict[int, Premise],
+                                       premises2: Dict[int, Premise]) -> float:
+        """Obtains the similarity between two Dictionaries of premises with
+        the premise schema of the case-base, like :meth:`retrieve` (see
+        :meth:`get_premises_similarity`). The similarities are cached like the
+        retrievals (see :meth:`get_most_similar_cached`); they do not depend
+        on the case-base, so they are never invalidated.
+
+        Args:
+            premises1 (Mapping[int, Premise]): Dictionary of premises 1.
+            premises2 (Mapping[int, Premise]): Dictionary of premises 2.
+
+        Returns:
+            float: The value of the similarity.
+        """
+        with self.lock:
+            c = Configuration()
+            self.similarity_cache.resize(c.domain_cbrs_cache_size)
+            if c.domain_cbrs_cache_size <= 0:
+                return self.get_premises_similarity(premises1, premises2, self.schema)
+            key = (query_fingerprint(premises1), query_fingerprint(premises2), c.domain_cbrs_similarity,
+                   c.domain_cbrs_tversky_alpha, c.domain_cbrs_tversky_beta)
+            similarity = self.similarity_cache.get(key)
+            if similarity is None:
+                similarity = self.get_premises_similarity(premises1, premises2, self.schema)
+                self.similarity_cache.put(key, None, similarity)
+            return similarity
 
     @staticmethod
-    def get_premises_similarity(premises1: Dict[int, Premise], premises2: Dict[int, Premise]) -> float:
+    def get_premises_similarity(premises1: Dict[int, Premise], premises2: Dict[int, Premise],
+                                schema: Optional[PremiseSchema] = None) -> float:
         """Obtains the similarity between two Dictionaries of premises using the
         similarity algorithm specified in the configuration of this class.
 
         Args:
             premises1 (Mapping[int, Premise]): Dictionary of premises 1.
             premises2 (Mapping[int, Premise]): Dictionary of premises 2.
+            schema (Optional[PremiseSchema]): The premise schema of the
+                domain, if any
 
         Returns:
             float: The value of the similarity.
@@ -234,56 +1083,114 @@ class DomainCBR(CBR):
         final_candidates: List[SimilarDomainCase] = []
 
         if similarity_type == SimilarityType.NORMALIZED_EUCLIDEAN:
-            final_candidates = sim_algs.normalized_euclidean_similarity(premises1, case_list)
+            final_candidates = sim_algs.normalized_euclidean_similarity(premises1, case_list, schema=schema)
         elif similarity_type == SimilarityType.WEIGHTED_EUCLIDEAN:
-            final_candidates = sim_algs.weighted_euclidean_similarity(premises1, case_list)
+            final_candidates = sim_algs.weighted_euclidean_similarity(premises1, case_list, schema=schema)
         elif similarity_type == SimilarityType.NORMALIZED_TVERSKY:
-            final_candidates = sim_algs.normalized_tversky_similarity(premises1, case_list)
+            final_candidates = sim_algs.normalized_tversky_similarity(premises1, case_list, schema=schema,
+                                                                      alpha=c.domain_cbrs_tversky_alpha,
+                                                                      beta=c.domain_cbrs_tversky_beta)
         else:
-            final_candidates = sim_algs.normalized_euclidean_similarity(premises1, case_list)
+            final_candidates = sim_algs.normalized_euclidean_similarity(premises1, case_list, schema=schema)
 
         return final_candidates[0].similarity
 
-    def get_candidate_cases(self, premises: Mapping[int, Premise]) -> List[DomainCase]:
+    def get_candidate_key(self, premises: Mapping[int, Premise]) -> Hashable:
+        """Returns a key that identifies the candidate cases of the given
+        premises: two premises dicts with the same key get the same list of
+        candidates from :meth:`get_candidate_cases`
+
+        Args:
+            premises (Mapping[int, Premise]): Dictionary of premises that describes
+                the problem
+
+        Returns:
+            Hashable: The key of the candidate cases
+        """
+        with self.lock:
+            if self.composite_index is not None:
+                return self.composite_index.get_probe_key(premises, Configuration().domain_cbrs_min_bucket_size)
+            # The premise IDs of the inverted index that give the candidates
+            return (tuple(self.inverted_index.get_indexed_ids(premise.id for premise in premises.values())),
+                    Configuration().domain_cbrs_min_shared_premises)
+
+    def get_candidate_cases(self, premises: Mapping[int, Premise],
+                            pending: Sequence[DomainCase] = ()) -> List[DomainCase]:
         """Gets a :class:'DomainCase' List with the domain_cases that fit the
-        given premises
+        given premises. With a hash index, they are the cases of the bucket
+        of the longest prefix of the key with at least
+        Configuration.domain_cbrs_min_bucket_size cases (see
+        :class:`CompositeIndex`). Without hash index, they are the cases that
+        share at least Configuration.domain_cbrs_min_shared_premises premise
+        IDs with the given premises (see :class:`InvertedPremiseIndex`), in
+        the order they were added. The pending cases given, if any, are
+        counted and added as if they were already in the case-base
 
         Args:
             premises (Mapping[int, Premise]): Dictionary of premises that describes
                 the problem
+            pending (Sequence[DomainCase]): The pending cases of the retention
+                queue (see :meth:`get_pending_cases`)
 
         Returns:
             class: 'DomainCase' List
         """
-        candidate_cases: List[DomainCase] = []
-        main_premise_id: int = -1
-        main_premise_value: str = ''
+        with self.lock:
+            candidate_cases: List[DomainCase] = []
 
-        if self.index != -1:
-            main_premise_value = premises[self.index].content
-            candidate_cases = self.case_base.get(main_premise_value, [])
-            if not candidate_cases:
-                candidate_cases = []
-        else:
-            new_case_premises_list: List[int] = []
-            for premise in premises.values():
-                new_case_premises_list.append(premise.id)
-            new_case_premises_list = sorted(new_case_premises_list)  # for sorted '15' < '2'
-            for premise_id in new_case_premises_list:
-                main_premise_id = premise_id
-                dom_cases = self.case_base.get(str(main_premise_id))
-                if dom_cases:
-                    candidate_cases += dom_cases
-        return candidate_cases
-
-    def do_cache(self):
-        super().do_cache()
-
-    def do_cache_inc(self):
-        super().do_cache_inc()
+            if self.composite_index is not None:
+                min_size = Configuration().domain_cbrs_min_bucket_size
+                candidate_cases = self.composite_index.get_candidates(premises, min_size, pending)
+            else:
+                min_shared = Configuration().domain_cbrs_min_shared_premises
+                candidate_cases = self.inverted_index.get_candidates((premise.id for premise in premises.values()),
+                                                                     min_shared, pending)
+            return candidate_cases
+
+    def get_bucket_statistics(self) -> List[BucketStatistics]:
+        """Returns the statistics of the sizes of the buckets of the hash
+        index, for each prefix of its key (see
+        :meth:`CompositeIndex.get_statistics`)
+
+        Returns:
+            List[BucketStatistics]: The statistics, empty without hash index
+        """
+        with self.lock:
+            if self.composite_index is None:
+                return []
+            return self.composite_index.get_statistics()
+
+    @staticmethod
+    def snapshot_key(a_case: DomainCase) -> Tuple[Hashable, ...]:
+        """Returns the key stored with a domain-case in the columnar
+        snapshots: the conclusion IDs of its solutions"""
+        return tuple(solution.conclusion.id for solution in a_case.solutions)
+
+    def do_cache(self) -> SnapshotStatistics:
+        """Stores the case-base (see :meth:`CBR.do_cache`) after applying the
+        retention queue, so the retained cases are stored too"""
+        with self.lock:
+            self.apply_retention_queue()
+            return super().do_cache()
+
+    def do_cache_inc(self) -> SnapshotStatistics:
+        """Appends the case-base to the storing file (see
+        :meth:`CBR.do_cache_inc`) after applying the retention queue"""
+        with self.lock:
+            self.apply_retention_queue()
+            return super().do_cache_inc()
 
     def get_all_cases(self) -> ValuesView[Sequence[DomainCase]]:
-        return super().get_all_cases()
+        """Returns a copy of the buckets of the case-base, which the
+        background thread of the retention queue may change meanwhile. The
+        pending cases of the queue are not in them until it is applied
+
+        Returns:
+            ValuesView[Sequence[DomainCase]]: The list of cases of each bucket
+        """
+        with self.lock:
+            return {bucket_key: list(cases) for bucket_key, cases in self.case_base.items()}.values()
 
     def get_all_cases_list(self) -> Sequence[DomainCase]:
-        return super().get_all_cases_list()
+        with self.lock:
+            return [a_case for cases in self.case_base.values() for a_case in cases]
@@ -0,0 +1,139 @@
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, current_thread, Thread
+from typing import Callable, Deque, List, Optional, Tuple
+
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.solution import Solution
+
+# A retained domain-case and the solutions it had when it was retained
+RetainedCase = Tuple[DomainCase, List[Solution]]
+
+
+@dataclass
+class RetentionStatistics:
+    """Counters of a :class:`RetentionQueue`"""
+    queued: int = 0  # Cases put in the queue
+    applied: int = 0  # Cases added to the case-base (or merged with an equal one)
+    introduced: int = 0  # Applied cases that were new in the case-base
+    batches: int = 0
+    max_pending: int = 0  # The greatest number of cases waiting in the queue
+    apply_seconds: float = 0.0  # Time spent applying the batches
+
+
+class RetentionQueue:
+    """Write-behind queue of the domain-cases retained by a domain CBR. The
+    cases are put in the queue without touching the case-base and applied in
+    batches by the owner of the queue (see
+    :meth:`DomainCBR.apply_retention_queue`): when the queue reaches the
+    batch size and, if an interval is given, by a background thread that also
+    applies it periodically. Meanwhile, the reads see the pending cases
+    (see :meth:`peek`)"""
+
+    def __init__(self, apply: Callable[[], None]):
+        """
+        Args:
+            apply (Callable[[], None]): The function that applies the pending
+                cases, called by the background thread
+        """
+        self.apply = apply
+        self.pending: Deque[RetainedCase] = deque()
+        self.condition = Condition()
+        self.batch_size = 64
+        self.interval = 0.0
+        self.thread: Optional[Thread] = None
+        self.stopping = False
+        self.statistics = RetentionStatistics()
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def configure(self, batch_size: int, interval: float):
+        """Changes the size of the batches and the interval of the background
+        thread, starting it if the interval is greater than 0 or stopping it
+        otherwise
+
+        Args:
+            batch_size (int): The number of pending cases that triggers
+                their application
+            interval (float): The maximum number of seconds that a case
+                waits in the queue with the background thread (0 disables it)
+        """
+        self.batch_size = batch_size
+        self.interval = interval
+        if interval > 0 and self.thread is None:
+            self.stopping = False
+            self.thread = Thread(target=self.run, name="retention-queue", daemon=True)
+            self.thread.start()
+        elif interval <= 0 and self.thread is not None:
+            self.stop()
+
+    def put(self, new_case: DomainCase) -> bool:
+        """Puts a domain-case in the queue with its current list of solutions,
+        which it gets back when it is applied (the same case can be retained
+        several times with different solutions)
+
+        Args:
+            new_case (DomainCase): The retained domain-case
+
+        Returns:
+            bool: True if the queue has reached the batch size and there is no
+            background thread to apply it
+        """
+        with self.condition:
+            self.pending.append((new_case, new_case.solutions))
+            self.statistics.queued += 1
+            self.statistics.max_pending = max(self.statistics.max_pending, len(self.pending))
+            full = len(self.pending) >= self.batch_size
+            if full:
+                self.condition.notify()
+        return full and self.thread is None
+
+    def peek(self) -> List[RetainedCase]:
+        """Returns the pending cases without removing them from the queue
+
+        Returns:
+            List[RetainedCase]: The pending cases, in the order they were put
+        """
+        with self.condition:
+            return list(self.pending)
+
+    def take(self) -> List[RetainedCase]:
+        """Removes all the pending cases from the queue
+
+        Returns:
+            List[RetainedCase]: The pending cases, in the order they were put
+        """
+        with self.condition:
+            batch = list(self.pending)
+            self.pending.clear()
+        return batch
+
+    def run(self):
+        """Applies the pending cases when the queue reaches the batch size or
+        the interval expires, until the thread is stopped"""
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopping or len(self.pending) >= self.batch_size,
+                                        self.interval)
+                if self.stopping:
+                    return
+                if not self.pending:
+                    continue
+            self.apply()
+
+    def stop(self):
+        """Stops the background thread, if any. The pending cases stay in the
+        queue"""
+        thread = self.thread
+        if thread is None or thread is current_thread():
+            return
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        thread.join()
+        self.thread = None
+
+    def clear(self):
+        """Discards the pending cases"""
+        self.take()
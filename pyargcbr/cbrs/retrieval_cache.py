@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, KeysView, Optional, Set, Tuple
+
+
+@dataclass
+class CacheStatistics:
+    """Counters of a :class:`RetrievalCache`"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # Entries removed to make room for new ones
+    invalidations: int = 0  # Entries removed because the case-base changed
+
+
+class RetrievalCache:
+    """Bounded LRU cache of retrieval results. Each entry belongs to a
+    bucket (the part of the case-base it depends on), so the entries of the
+    buckets affected by a new case can be invalidated without clearing the
+    rest of the cache"""
+
+    def __init__(self, max_size: int = 0):
+        """
+        Args:
+            max_size (int): The maximum number of entries (0 disables the
+                cache)
+        """
+        self.max_size = max_size
+        self.entries: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()  # key -> (bucket, value)
+        self.buckets: Dict[Hashable, Set[Hashable]] = {}  # bucket -> keys
+        self.statistics = CacheStatistics()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the value cached with the given key and marks it as the
+        most recently used, or None if it is not cached
+
+        Args:
+            key (Hashable): The key of the entry
+
+        Returns:
+            Optional[Any]: The cached value
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.statistics.misses += 1
+            return None
+        self.statistics.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, bucket: Hashable, value: Any):
+        """Caches a value, evicting the least recently used entries if the
+        cache is full
+
+        Args:
+            key (Hashable): The key of the entry
+            bucket (Hashable): The bucket the value depends on
+            value (Any): The value
+        """
+        if self.max_size <= 0:
+            return
+        self.remove(key)
+        self.entries[key] = (bucket, value)
+        self.buckets.setdefault(bucket, set()).add(key)
+        self.evict()
+
+    def resize(self, max_size: int):
+        """Changes the maximum number of entries, evicting the least recently
+        used ones if there are more
+
+        Args:
+            max_size (int): The maximum number of entries
+        """
+        self.max_size = max_size
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until they fit the size"""
+        while len(self.entries) > max(self.max_size, 0):
+            key = next(iter(self.entries))
+            self.remove(key)
+            self.statistics.evictions += 1
+
+    def remove(self, key: Hashable) -> bool:
+        """Removes an entry, if it is cached
+
+        Args:
+            key (Hashable): The key of the entry
+
+        Returns:
+            bool: True if the entry was cached
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        keys = self.buckets[entry[0]]
+        keys.discard(key)
+        if not keys:
+            del self.buckets[entry[0]]
+        return True
+
+    def get_buckets(self) -> KeysView:
+        """Returns the buckets with some cached entry"""
+        return self.buckets.keys()
+
+    def invalidate(self, buckets: Iterable[Hashable]):
+        """Removes the entries of the given buckets
+
+        Args:
+            buckets (Iterable[Hashable]): The buckets affected by a change
+        """
+        for bucket in list(buckets):
+            for key in list(self.buckets.get(bucket, ())):
+                self.remove(key)
+                self.statistics.invalidations += 1
+
+    def clear(self):
+        """Removes all the entries, keeping the statistics"""
+        self.entries.clear()
+        self.buckets.clear()
@@ -0,0 +1,338 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+from zlib import crc32
+
+from loguru import logger
+
+from ..agents import similarity_algorithms as sim_algs
+from ..agents.attribute_ranges import AttributeRanges
+from ..agents.composite_index import index_premise_ids
+from ..agents.configuration import Configuration
+from ..agents.parallel_similarity import SIMILARITY_FUNCTIONS
+from ..agents.premise_schema import PremiseSchema
+from ..cbrs.case_snapshot import write_snapshot
+from ..cbrs.columnar_snapshot import open_snapshot
+from ..cbrs.domain_cbr import DomainCBR
+from ..cbrs.retrieval_cache import CacheStatistics
+from ..configuration.configuration_parameters import NormalizationMode, SimilarityType
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+from ..knowledge_resources.similar_domain_case import SimilarDomainCase
+
+
+def write_cases(cases: Iterable[DomainCase], file_path: str) -> int:
+    """Stores domain cases in a file that :meth:`DomainCBR.load_case_base`
+    can load (see :func:`write_snapshot`)
+
+    Args:
+        cases (Iterable[DomainCase]): The domain cases
+        file_path (str): The path of the file
+
+    Returns:
+        int: The number of cases stored
+    """
+    return write_snapshot(cases, file_path).cases
+
+
+# The DomainCBR of the shard of each worker process, set by init_shard
+shard_cbr: Optional[DomainCBR] = None
+
+
+def init_shard(initial_file_path: str, storing_file_path: str, index: Union[int, Sequence[int]],
+               schema: Optional[PremiseSchema]):
+    """Initializer of the worker processes: loads the case-base of their
+    shard"""
+    global shard_cbr
+    shard_cbr = DomainCBR(initial_file_path, storing_file_path, index, schema)
+
+
+def shard_ranges() -> AttributeRanges:
+    """Returns the ranges of the premises of the shard"""
+    return shard_cbr.get_attribute_ranges()
+
+
+def shard_add_case(new_case: DomainCase) -> bool:
+    """Adds a domain case to the shard (see :meth:`DomainCBR.add_case`)"""
+    return shard_cbr.add_case(new_case)
+
+
+def shard_max_distances(premises: Dict[int, Premise]) -> Dict[int, float]:
+    """First phase of the normalized algorithms: the maximum distance of each
+    premise to the candidates of the shard (see
+    :func:`similarity_algorithms.premise_max_distances`)"""
+    return sim_algs.premise_max_distances(premises, shard_cbr.get_candidate_cases(premises), shard_cbr.schema)
+
+
+def shard_most_similar(premises: Dict[int, Premise], similarity_type: SimilarityType, threshold: float,
+                       k: Optional[int], normalization: NormalizationMode, max_distances: Optional[Dict[int, float]],
+                       ranges: Optional[AttributeRanges], alpha: float, beta: float) -> List[SimilarDomainCase]:
+    """Second phase: retrieves the candidates of the shard with a similarity
+    greater or equal than the threshold (only the k most similar ones, if k
+    is given) through its retrieval path (see
+    :meth:`DomainCBR.get_most_similar_cached`), so the cache, the retention
+    queue, the indexes and the eviction policy of the shard are used. The
+    distances are normalized by the given maxima among all the candidates or
+    by the given ranges of the whole case-base"""
+    c = replace(Configuration(), domain_cbrs_similarity=similarity_type, domain_cbrs_normalization=normalization,
+                domain_cbrs_tversky_alpha=alpha, domain_cbrs_tversky_beta=beta)
+    return shard_cbr.get_most_similar_cached(premises, threshold, k, c, max_distances, ranges)
+
+
+def shard_cache_statistics() -> Dict[str, CacheStatistics]:
+    """Returns the statistics of the caches of the shard"""
+    return shard_cbr.get_cache_statistics()
+
+
+def shard_do_cache():
+    """Stores the case-base of the shard in its storing file path"""
+    write_cases(shard_cbr.get_all_cases_list(), shard_cbr.storing_file_path)
+
+
+def shard_cases() -> List[DomainCase]:
+    """Returns the cases of the shard"""
+    return list(shard_cbr.get_all_cases_list())
+
+
+class ShardedDomainCBR:
+    """Domain CBR whose case-base is partitioned in shards, each one held by
+    a :class:`DomainCBR` in its own worker process.
+
+    The cases are assigned to the shards by the content of the first premise
+    of the hash index (lower-cased, so the duplicates of a case are always in
+    its shard), which keeps every bucket of candidates in one shard: the
+    queries are routed to the shard of their key. Without hash index, the
+    candidates can be in every shard and the queries are broadcast: the
+    normalized algorithms run in two phases, first gathering the maximum
+    distance of each premise among all the candidates and then scoring them
+    with the global maxima. The ranges of the premises of the whole
+    case-base (NormalizationMode.GLOBAL_RANGE) are merged from the shards
+    when they are loaded and kept up to date by :meth:`add_case`. So the
+    similarities are the same ones of a single DomainCBR; the candidates
+    with the same similarity are ordered by shard.
+
+    Each shard is loaded from its own file, in parallel, and stored in its
+    own file (see :meth:`partition`)
+    """
+
+    def __init__(self, initial_file_paths: Sequence[str], storing_file_paths: Sequence[str],
+                 index: Union[int, Sequence[int]], schema: Optional[PremiseSchema] = None):
+        """
+        Args:
+            initial_file_paths (Sequence[str]): The path of the file to load
+                the initial domain cases of each shard
+            storing_file_paths (Sequence[str]): The path of the file to store
+                the domain cases of each shard
+            index (Union[int, Sequence[int]]): The hash index of the shards
+                (see :class:`DomainCBR`), or -1 to use the inverted index
+            schema (Optional[PremiseSchema]): The premise schema of the
+                domain. If not given, each shard loads it as
+                :class:`DomainCBR` does
+        """
+        if len(initial_file_paths) != len(storing_file_paths):
+            raise ValueError("Each shard needs an initial and a storing file path")
+        self.index = index if isinstance(index, int) else tuple(index)
+        self.executors = [ProcessPoolExecutor(1, initializer=init_shard,
+                                              initargs=(initial_file_path, storing_file_path, self.index, schema))
+                          for initial_file_path, storing_file_path in zip(initial_file_paths, storing_file_paths)]
+        # The shards are loaded in parallel, when their processes start
+        self.attribute_ranges: Optional[AttributeRanges] = None  # Built by get_attribute_ranges
+
+    @staticmethod
+    def partition(initial_file_path: str, shard_file_paths: Sequence[str],
+                  index: Union[int, Sequence[int]]) -> List[int]:
+        """Splits a file of domain cases (pickled or a columnar snapshot) in
+        one file per shard
+
+        Args:
+            initial_file_path (str): The path of the file with the domain cases
+            shard_file_paths (Sequence[str]): The path of the file of each shard
+            index (Union[int, Sequence[int]]): The hash index of the shards
+
+        Returns:
+            List[int]: The number of cases of each shard
+        """
+        shards: List[List[DomainCase]] = [[] for _ in shard_file_paths]
+        for chunk in open_snapshot(initial_file_path, DomainCase).chunks():
+            for a_case in chunk:
+                shards[ShardedDomainCBR.shard_of(a_case.problem.context.premises, index, len(shards))].append(a_case)
+        return [write_cases(cases, file_path) for cases, file_path in zip(shards, shard_file_paths)]
+
+    @staticmethod
+    def shard_of(premises: Dict[int, Premise], index: Union[int, Sequence[int]], shards: int) -> int:
+        """Returns the shard of a domain case (or query) with the given
+        premises: a stable hash of the lower-cased content of the first
+        premise of the hash index or, without hash index, of all the premises
+
+        Args:
+            premises (Dict[int, Premise]): The premises
+            index (Union[int, Sequence[int]]): The hash index of the shards
+            shards (int): The number of shards
+
+        Returns:
+            int: The shard
+        """
+        premise_ids = index_premise_ids(index)
+        if premise_ids:
+            premise = premises.get(premise_ids[0])
+            key = None if premise is None else premise.content.lower()
+        else:
+            key = sorted((premise.id, premise.content.lower()) for premise in premises.values())
+        return crc32(repr(key).encode()) % shards
+
+    def broadcast(self, function, *args) -> list:
+        """Runs a function in every shard and returns its results"""
+        futures = [executor.submit(function, *args) for executor in self.executors]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Stops the worker processes"""
+        for executor in self.executors:
+            executor.shutdown()
+
+    def add_case(self, new_case: DomainCase) -> bool:
+        """Adds a new domain-case to its shard (see :meth:`DomainCBR.add_case`)
+
+        Args:
+            new_case (DomainCase): :class:'DomainCase' that could be added.
+
+        Returns:
+            bool: True if the domain-case is added, else False.
+        """
+        shard = self.shard_of(new_case.problem.context.premises, self.index, len(self.executors))
+        added = self.executors[shard].submit(shard_add_case, new_case).result()
+        if added and self.attribute_ranges is not None:
+            self.attribute_ranges.add_case(new_case)
+        return added
+
+    def get_attribute_ranges(self) -> AttributeRanges:
+        """Returns the ranges of the premises of the whole case-base, merged
+        from the ones of the shards the first time they are requested and
+        extended by :meth:`add_case` afterwards
+
+        Returns:
+            AttributeRanges: The ranges of the case-base
+        """
+        if self.attribute_ranges is None:
+            attribute_ranges = AttributeRanges()
+            for ranges in self.broadcast(shard_ranges):
+                attribute_ranges.merge(ranges)
+            self.attribute_ranges = attribute_ranges
+        return self.attribute_ranges
+
+    def get_most_similar(self, premises: Dict[int, Premise], threshold: float, similarity_type: SimilarityType,
+                         k: Optional[int] = None, normalization: NormalizationMode = NormalizationMode.CANDIDATES,
+                         alpha: float = 1.0, beta: float = 1.0) -> List[SimilarDomainCase]:
+        """Gets the most similar domain cases that are in a range of similarity
+        degree with the given premises (see :meth:`DomainCBR.get_most_similar`)
+
+        Args:
+            premises (Dict[int, Premise]): The given premises
+            threshold (float): The threshold of minimum degree of similarity of
+                the domain-cases to return.
+            similarity_type (SimilarityType): The similarity algorithm
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
+            normalization (NormalizationMode): How the distances of the
+                normalized algorithms are normalized
+            alpha (float): The weight of the different premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+            beta (float): The weight of the distinct premises
+                (SimilarityType.NORMALIZED_TVERSKY)
+
+        Returns:
+            List[SimilarDomainCase]: The domain-cases with a similarity degree
+            greater or equal than the threshold, ordered from the most to the
+            least similar
+        """
+        if similarity_type not in SIMILARITY_FUNCTIONS:
+            similarity_type = SimilarityType.NORMALIZED_EUCLIDEAN
+        ranges = self.get_attribute_ranges() if normalization == NormalizationMode.GLOBAL_RANGE else None
+
+        if index_premise_ids(self.index):  # Routed to the shard of the key, which has all the candidates
+            shard = self.shard_of(premises, self.index, len(self.executors))
+            return self.executors[shard].submit(shard_most_similar, premises, similarity_type, threshold, k,
+                                                normalization, None, ranges, alpha, beta).result()
+
+        max_distances: Optional[Dict[int, float]] = None
+        if similarity_type != SimilarityType.WEIGHTED_EUCLIDEAN and normalization == NormalizationMode.CANDIDATES:
+            max_distances = {}
+            for shard_distances in self.broadcast(shard_max_distances, premises):
+                for premise_id, max_dist in shard_distances.items():
+                    max_distances[premise_id] = max(max_distances.get(premise_id, 0.0), max_dist)
+        selected: List[SimilarDomainCase] = []
+        for shard_selected in self.broadcast(shard_most_similar, premises, similarity_type, threshold, k,
+                                             normalization, max_distances, ranges, alpha, beta):
+            selected += shard_selected
+        return sim_algs.select_most_similar([c.case for c in selected], [c.similarity for c in selected],
+                                            threshold, k)
+
+    def retrieve(self, premises: Dict[int, Premise], threshold: float,
+                 k: Optional[int] = None) -> List[SimilarDomainCase]:
+        """Retrieves the domain_cases that are in a range of similarity degree
+        with the given premises, with the algorithm and normalization of the
+        configuration.
+
+        Args:
+            premises (Dict[int, Premise]): The given premises
+            threshold (float): The threshold that determines the range
+            k (Optional[int]): If given, only the k most similar domain-cases
+                are returned
+
+        Returns:
+            List[SimilarDomainCase]: The domain cases that fit in the range of
+            similarity
+        """
+        c = Configuration()
+        return self.get_most_similar(premises, threshold, c.domain_cbrs_similarity, k, c.domain_cbrs_normalization,
+                                     c.domain_cbrs_tversky_alpha, c.domain_cbrs_tversky_beta)
+
+    def retrieve_and_retain(self, dom_case: DomainCase, threshold: float) -> List[SimilarDomainCase]:
+        """Retrieves the domain_cases that are in a range of similarity degree
+        with the given one and adds it to the case-base with the solutions of
+        the similar ones (see :meth:`DomainCBR.retrieve_and_retain`).
+
+        Args:
+            dom_case (DomainCase): The domain-case (representing a problem to
+                solve) that needs a solution from the CBR
+            threshold (float): The threshold of minimum degree of similarity of
+
+        Returns:
+            List[SimilarDomainCase]: A list with the domain cases
+        """
+        similar_cases = self.retrieve(dom_case.problem.context.premises, threshold)
+        for similar_case in similar_cases:
+            if similar_case.similarity < 1.0:
+                dom_case.solutions = similar_case.case.solutions
+                if self.add_case(dom_case):
+                    logger.info("New case Introduced")
+                else:
+                    logger.info("New case NOT Introduced")
+            else:
+                logger.info("New case NOT Introduced. Similar 1.0")
+        return similar_cases
+
+    def get_cache_statistics(self) -> List[Dict[str, CacheStatistics]]:
+        """Returns the counters of the caches of every shard (see
+        :meth:`DomainCBR.get_cache_statistics`)
+
+        Returns:
+            List[Dict[str, CacheStatistics]]: The statistics of each shard
+        """
+        return self.broadcast(shard_cache_statistics)
+
+    def do_cache(self):
+        """Stores the case-base of every shard in its storing file path, in
+        parallel"""
+        self.broadcast(shard_do_cache)
+
+    def get_all_cases_list(self) -> List[DomainCase]:
+        """Returns a copy of the cases of every shard
+
+        Returns:
+            List[DomainCase]: The cases, shard by shard
+        """
+        cases: List[DomainCase] = []
+        for shard_case_list in self.broadcast(shard_cases):
+            cases += shard_case_list
+        return cases
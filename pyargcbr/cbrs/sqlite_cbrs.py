@@ -0,0 +1,479 @@
+from time import perf_counter
+from typing import Hashable, Iterable, List, Mapping, Optional, Sequence, Union, ValuesView
+
+from loguru import logger
+
+from ..agents.attribute_ranges import AttributeRanges
+from ..agents.composite_index import BucketKey, BucketStatistics
+from ..agents.configuration import Configuration
+from ..agents.premise_schema import PremiseSchema
+from ..cbrs.argumentation_cbr import ArgCBR
+from ..cbrs.case_database import CaseDatabase, DatabaseStatistics, get_database_path
+from ..cbrs.case_eviction import CaseEvictionPolicy
+from ..cbrs.case_fingerprints import argument_case_key, stable_premises_fingerprint
+from ..cbrs.case_loader import LoadSummary
+from ..cbrs.case_snapshot import SnapshotStatistics
+from ..cbrs.columnar_snapshot import get_case_key, open_snapshot
+from ..cbrs.domain_cbr import DomainCBR
+from ..knowledge_resources.argument_case import ArgumentCase
+from ..knowledge_resources.domain_case import DomainCase
+from ..knowledge_resources.premise import Premise
+
+try:
+    from ..agents.vectorized_similarity import CaseMatrix
+except ImportError:  # NumPy is optional
+    CaseMatrix = None
+
+
+class DatabaseEvictionPolicy(CaseEvictionPolicy):
+    """Eviction policy of a case-base stored in a database, which has no
+    capacity limit. The cases retrieved are copies read from the database,
+    so their retrievals are not recorded"""
+
+    def touch(self, cases: Iterable[DomainCase]):
+        pass
+
+
+def database_statistics(database: CaseDatabase, start: float) -> SnapshotStatistics:
+    """Returns the statistics of :meth:`do_cache` for a case-base stored in
+    a database: its cases and the seconds since the start; no bytes are
+    written, every change is already committed"""
+    statistics = SnapshotStatistics(cases=database.count(), seconds=perf_counter() - start)
+    logger.info("{}: {} cases committed in {}", database.table, statistics.cases, database.file_path)
+    return statistics
+
+
+class SQLiteDomainCBR(DomainCBR):
+    """Domain CBR whose case-base is stored in a SQLite database (see
+    :class:`CaseDatabase`) instead of in memory, so it does not have to fit
+    in it. The database is the one of Configuration.database_name (see
+    :func:`get_database_path`); if its table is empty, the cases of the
+    initial file are imported, in a transaction per chunk.
+
+    The candidates of every retrieval are selected with an indexed SQL
+    query and read from the database: the cases that share at least
+    Configuration.domain_cbrs_min_shared_premises premise IDs with the
+    query or, with a hash index, the ones of the bucket of the longest
+    prefix of the key with at least Configuration.domain_cbrs_min_bucket_size
+    cases, like :class:`DomainCBR`. So the similarities are the same ones.
+    Every change is committed when it is made (or at the end of the batch of
+    the retention queue), so the storing file, the case log and the
+    snapshot format are not used, and the case-base has no capacity limit
+    (no case is evicted, so the retrievals are not recorded either). The
+    ranges of the premises for NormalizationMode.GLOBAL_RANGE are read with
+    indexed MIN and MAX queries (see :meth:`CaseDatabase.get_attribute_ranges`)
+    and the ones of the premises of every case added or removed are read
+    again; the KD-tree of the numeric premises and the text index are not
+    supported
+    """
+
+    def __init__(self, initial_file_path: str, storing_file_path: str, index: Union[int, Sequence[int]],
+                 schema: Optional[PremiseSchema] = None, table: str = "domain_cases",
+                 database_path: Optional[str] = None):
+        """
+        Args:
+            initial_file_path (str): The path of the file of the domain cases
+                imported into an empty database
+            storing_file_path (str): Not used, the database stores the cases
+            index (Union[int, Sequence[int]]): The premise ID of the hash
+                index, the premise IDs of the composite key, or -1 (see
+                :class:`DomainCBR`)
+            schema (Optional[PremiseSchema]): The premise schema of the
+                domain (see :class:`DomainCBR`)
+            table (str): The table of the domain cases in the database
+            database_path (Optional[str]): The path of the database file;
+                by default, the one of the configuration
+        """
+        self.table = table
+        self.database_path = database_path
+        self.database: Optional[CaseDatabase] = None
+        super().__init__(initial_file_path, storing_file_path, index, schema)
+
+    def load_case_base(self):
+        """Opens the database of the case-base, importing the domain-cases of
+        the initial file path if it has none (see :meth:`import_cases`)
+
+        Raises:
+            ValueError: If the configuration asks for the in-memory indexes of
+                the whole case-base (numeric or text index)
+        """
+        c = Configuration()
+        if c.domain_cbrs_numeric_index or c.domain_cbrs_text_index:
+            raise ValueError("The numeric and text indexes are not supported with a SQLite case-base")
+        self.clear_case_base(c)
+        if self.database is None:
+            self.database = CaseDatabase(self.database_path or get_database_path(c), self.table)
+        self.num_cases = self.database.count()
+        if self.num_cases:
+            if self.attribute_ranges is not None:
+                self.attribute_ranges = self.database.get_attribute_ranges()
+        else:
+            self.import_cases(self.initial_file_path)
+        if self.schema is None:
+            self.schema = self.load_schema()
+
+    def import_cases(self, file_path: str) -> LoadSummary:
+        """Adds the domain-cases of a case-base file to the database, in a
+        transaction per chunk (see :class:`CaseLoader`)
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            LoadSummary: The summary of the cases imported
+        """
+        loader = open_snapshot(file_path, DomainCase)
+        summary = LoadSummary()
+        for chunk in loader.chunks():
+            introduced: List[DomainCase] = []
+            self.batching = True
+            try:
+                with self.database.transaction():
+                    for a_case in chunk:
+                        returned_value = self.add_case(a_case)
+                        conclusion_ids = get_case_key(a_case, self.snapshot_key)
+                        summary.add(conclusion_ids[0] if conclusion_ids else None, returned_value)
+                        if returned_value:
+                            introduced.append(a_case)
+            finally:
+                self.batching = False
+            self.register_cases(introduced)
+        logger.info("{}: domain {} imported into {}", loader.file_path, summary, self.database.file_path)
+        return summary
+
+    def close_database(self):
+        """Closes the database of the case-base"""
+        with self.lock:
+            if self.database is not None:
+                self.database.close()
+                self.database = None
+
+    def get_database_statistics(self) -> DatabaseStatistics:
+        """Returns the counters of the database of the case-base"""
+        return self.database.statistics
+
+    def add_case(self, new_case: DomainCase) -> bool:
+        """Adds a new domain-case to the database or, if it has the same
+        domain-case, adds the solutions of the new one to it (see
+        :meth:`DomainCBR.add_case`)
+
+        Args:
+            new_case (DomainCase): :class:'DomainCase' that could be added.
+
+        Returns:
+            bool: True if the domain-case is added, else False.
+        """
+        with self.lock:
+            self.apply_retention_queue()
+            with self.database.transaction():
+                current_case = self.find_case(new_case)
+                if current_case is not None:  # Same premises with same content
+                    self.merge_case(current_case, new_case)
+                    self.database.update_case(current_case)
+                    if not self.batching:
+                        self.invalidate_cache(current_case)  # The cached results hold older copies of the case
+                    return False
+                self.database.insert_case(new_case, stable_premises_fingerprint(new_case.problem.context.premises))
+            self.num_cases += 1
+            if not self.batching:  # Otherwise, registered at the end of the batch
+                self.register_case(new_case)
+                self.invalidate_cache(new_case)
+            return True
+
+    def get_fingerprint_cases(self, premises: Mapping[int, Premise]) -> Sequence[DomainCase]:
+        return self.database.find_cases(stable_premises_fingerprint(premises))
+
+    def remove_case(self, old_case: DomainCase) -> bool:
+        """Removes a domain-case read from the database
+
+        Args:
+            old_case (DomainCase): The domain-case to remove
+
+        Returns:
+            bool: True if the domain-case was in the database, else False.
+        """
+        with self.lock:
+            self.apply_retention_queue()
+            if not self.database.delete_case(old_case):
+                return False
+            self.num_cases -= 1
+            self.unregister_case(old_case)
+            self.invalidate_cache(old_case)
+            return True
+
+    def get_pending_cases(self) -> List[DomainCase]:
+        """The candidates are read from the database, so the retention queue
+        is applied before every retrieval instead (in a single transaction)
+
+        Returns:
+            List[DomainCase]: An empty list
+        """
+        self.apply_retention_queue()
+        return []
+
+    def apply_retention_queue(self):
+        """Adds the domain-cases of the retention queue to the database in a
+        single transaction (see :meth:`DomainCBR.apply_retention_queue`)"""
+        with self.lock:
+            if not len(self.retention_queue):
+                return
+            with self.database.transaction():
+                super().apply_retention_queue()
+
+    def evict_cases(self, protected: Sequence[DomainCase] = ()) -> List[DomainCase]:
+        """The case-base is not held in memory, so no domain-case is evicted
+
+        Returns:
+            List[DomainCase]: An empty list
+        """
+        return []
+
+    def clear_case_base(self, c: Configuration):
+        super().clear_case_base(c)
+        self.eviction_policy = DatabaseEvictionPolicy()
+
+    def update_attribute_ranges(self, cases: Sequence[DomainCase]):
+        """Reads again from the database the ranges of the premises of some
+        domain-cases added or removed, if the ranges are built
+
+        Args:
+            cases (Sequence[DomainCase]): The domain-cases
+        """
+        if self.attribute_ranges is None:
+            return
+        premise_ids = {premise_id for a_case in cases for premise_id in a_case.problem.context.premises}
+        for premise_id in sorted(premise_ids):
+            self.attribute_ranges.set_range(premise_id, self.database.get_attribute_range(premise_id))
+
+    def get_attribute_ranges(self) -> AttributeRanges:
+        """Returns the ranges of the premises of the database, read the first
+        time they are requested (see :meth:`CaseDatabase.get_attribute_ranges`)
+
+        Returns:
+            AttributeRanges: The ranges of the case-base
+        """
+        with self.lock:
+            if self.attribute_ranges is None:
+                self.attribute_ranges = self.database.get_attribute_ranges()
+            return self.attribute_ranges
+
+    def register_case(self, new_case: DomainCase):
+        """Updates the ranges of the premises with a domain-case added to the
+        database"""
+        self.update_attribute_ranges([new_case])
+
+    def register_cases(self, new_cases: Sequence[DomainCase]):
+        self.update_attribute_ranges(new_cases)
+
+    def unregister_case(self, old_case: DomainCase):
+        """Updates the ranges of the premises with a domain-case removed from
+        the database"""
+        self.update_attribute_ranges([old_case])
+        if self.parallel_scorer is not None:
+            self.parallel_scorer.remove_case(old_case)
+
+    def get_case_matrix(self) -> CaseMatrix:
+        """Returns a new case matrix, filled with the candidates of the
+        retrieval: the ones of the database are read again for every one
+
+        Returns:
+            CaseMatrix: An empty case matrix
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if CaseMatrix is None:
+            raise ImportError("NumPy is required to use SimilarityEngine.NUMPY")
+        return CaseMatrix([])
+
+    def get_categorical_bitmaps(self, premises: Mapping[int, Premise], candidate_cases: List[DomainCase]) -> None:
+        """The candidates are read again for every retrieval, so no bitmaps
+        are kept for them"""
+        return None
+
+    def get_probe_key(self, premises: Mapping[int, Premise], min_size: int = 1) -> BucketKey:
+        """Returns the longest prefix of the key of the given premises whose
+        bucket has at least min_size domain-cases in the database, or the
+        first premise of the key if none has (see
+        :meth:`CompositeIndex.get_probe_key`)"""
+        premise_ids = self.composite_index.premise_ids
+        key = self.composite_index.get_key(premises)
+        for length in range(len(key), 1, -1):
+            if self.database.count_bucket(list(zip(premise_ids, key[:length]))) >= min_size:
+                return key[:length]
+        return key[:1]
+
+    def get_candidate_key(self, premises: Mapping[int, Premise]) -> Hashable:
+        if self.composite_index is not None:
+            return self.get_probe_key(premises, Configuration().domain_cbrs_min_bucket_size)
+        return (tuple(sorted(premise.id for premise in premises.values())),
+                Configuration().domain_cbrs_min_shared_premises)
+
+    def get_candidate_cases(self, premises: Mapping[int, Premise],
+                            pending: Sequence[DomainCase] = ()) -> List[DomainCase]:
+        """Reads from the database the domain-cases that fit the given
+        premises (see :meth:`DomainCBR.get_candidate_cases`)
+
+        Args:
+            premises (Mapping[int, Premise]): Dictionary of premises that describes
+                the problem
+            pending (Sequence[DomainCase]): Always empty, the retention queue
+                is applied before reading (see :meth:`get_pending_cases`)
+
+        Returns:
+            class: 'DomainCase' List
+        """
+        if self.composite_index is not None:
+            prefix = self.get_probe_key(premises, Configuration().domain_cbrs_min_bucket_size)
+            return self.database.get_bucket_cases(list(zip(self.composite_index.premise_ids, prefix)))
+        return self.database.get_sharing_cases((premise.id for premise in premises.values()),
+                                               Configuration().domain_cbrs_min_shared_premises)
+
+    def get_bucket_statistics(self) -> List[BucketStatistics]:
+        """The buckets are not kept in memory
+
+        Returns:
+            List[BucketStatistics]: An empty list
+        """
+        return []
+
+    def do_cache(self) -> SnapshotStatistics:
+        """Every change is already committed to the database (see
+        :func:`database_statistics`)"""
+        with self.lock:
+            start = perf_counter()
+            self.apply_retention_queue()
+            return database_statistics(self.database, start)
+
+    def do_cache_inc(self) -> SnapshotStatistics:
+        return self.do_cache()
+
+    def get_all_cases(self) -> ValuesView[Sequence[DomainCase]]:
+        return {self.table: self.get_all_cases_list()}.values()
+
+    def get_all_cases_list(self) -> Sequence[DomainCase]:
+        """Reads every domain-case of the database
+
+        Returns:
+            Sequence[DomainCase]: The domain-cases, in the order they were
+            added
+        """
+        with self.lock:
+            self.apply_retention_queue()
+            return list(self.database.iter_cases())
+
+
+class SQLiteArgCBR(ArgCBR):
+    """Argumentation CBR whose case-base is stored in a SQLite database (see
+    :class:`CaseDatabase`) instead of in memory, like
+    :class:`SQLiteDomainCBR`. The argument-cases equal to a new one are
+    looked up by the fingerprint of their domain context and by their
+    social context, conclusion and acceptability status, and the ones with
+    the same domain context as a problem by their premises, with indexed SQL
+    queries
+    """
+
+    def __init__(self, initial_file_path: str, storing_file_path: str, table: str = "argument_cases",
+                 database_path: Optional[str] = None):
+        """
+        Args:
+            initial_file_path (str): The path of the file of the
+                argument-cases imported into an empty database
+            storing_file_path (str): Not used, the database stores the cases
+            table (str): The table of the argument-cases in the database
+            database_path (Optional[str]): The path of the database file;
+                by default, the one of the configuration
+        """
+        self.table = table
+        self.database_path = database_path
+        self.database: Optional[CaseDatabase] = None
+        super().__init__(initial_file_path, storing_file_path)
+
+    def load_case_base(self):
+        """Opens the database of the case-base, importing the argument-cases
+        of the initial file path if it has none, in a transaction per chunk
+        (see :class:`CaseLoader`)"""
+        c = Configuration()
+        self.case_base = {}
+        self.fingerprints = {}
+        if self.database is None:
+            self.database = CaseDatabase(self.database_path or get_database_path(c), self.table)
+        if self.database.count():
+            return
+        loader = open_snapshot(self.initial_file_path, ArgumentCase)
+        summary = LoadSummary()
+        for chunk in loader.chunks():
+            with self.database.transaction():
+                for a_case in chunk:
+                    returned_value = self.add_case(a_case)
+                    summary.add(get_case_key(a_case, self.snapshot_key)[4], returned_value)  # See argument_case_key
+        logger.info("{}: argument {} imported into {}", loader.file_path, summary, self.database.file_path)
+
+    def close_database(self):
+        """Closes the database of the case-base"""
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+    def get_database_statistics(self) -> DatabaseStatistics:
+        """Returns the counters of the database of the case-base"""
+        return self.database.statistics
+
+    def add_case(self, new_arg_case: ArgumentCase) -> bool:
+        """Adds a new argument-case to the database or, if it has an equal
+        one, merges the new one into it (see :meth:`ArgCBR.add_case`)
+
+        Args:
+            new_arg_case (ArgumentCase): The new case that will (or not) be
+                added
+
+        Returns:
+            bool: True if the argument-case is added, else False.
+        """
+        premises = new_arg_case.problem.context.premises
+        if not premises:
+            return False
+        fingerprint = stable_premises_fingerprint(premises)
+        columns = argument_case_key(new_arg_case)
+        with self.database.transaction():
+            for arg_case in self.database.find_cases(fingerprint, columns):
+                if self.is_same_case(arg_case, new_arg_case):
+                    self.merge_case(arg_case, new_arg_case)
+                    self.database.update_case(arg_case)
+                    return False
+            self.database.insert_case(new_arg_case, fingerprint, columns)
+        return True
+
+    def get_domain_similar_arg_cases(self, desired_premises: Mapping[int, Premise]) -> List[ArgumentCase]:
+        """Reads from the database the argument cases with the same given
+        premises (id and content) in the domain context (see
+        :meth:`ArgCBR.get_domain_similar_arg_cases`)
+
+        Args:
+            desired_premises: Dictionary with the desired premises
+
+        Returns:
+            Argument cases with the same given premises in the domain context
+        """
+        return self.database.get_same_context_cases([(premise.id, premise.content)
+                                                     for premise in desired_premises.values()])
+
+    def do_cache(self) -> SnapshotStatistics:
+        """Every change is already committed to the database (see
+        :func:`database_statistics`)"""
+        return database_statistics(self.database, perf_counter())
+
+    def do_cache_inc(self) -> SnapshotStatistics:
+        return self.do_cache()
+
+    def get_all_cases(self) -> ValuesView[Sequence[ArgumentCase]]:
+        return {self.table: self.get_all_cases_list()}.values()
+
+    def get_all_cases_list(self) -> Sequence[ArgumentCase]:
+        """Reads every argument-case of the database
+
+        Returns:
+            Sequence[ArgumentCase]: The argument-cases, in the order they
+            were added
+        """
+        return list(self.database.iter_cases())
@@ -18,9 +18,47 @@ class SimilarityType(Enum):
     NORMALIZED_TVERSKY = 2
 
 
+class SimilarityEngine(Enum):
+    PYTHON = 0
+    NUMPY = 1
+
+
+class NormalizationMode(Enum):
+    CANDIDATES = 0
+    GLOBAL_RANGE = 1
+
+
+class SnapshotFormat(Enum):
+    PICKLE = 0
+    COLUMNAR = 1
+
+
 @dataclass
 class DomainCBR:
     similarity: SimilarityType = SimilarityType.NORMALIZED_EUCLIDEAN
+    engine: SimilarityEngine = SimilarityEngine.PYTHON
+    normalization: NormalizationMode = NormalizationMode.CANDIDATES
+    tversky_alpha: float = 1.0
+    tversky_beta: float = 1.0
+    min_shared_premises: int = 1
+    min_bucket_size: int = 1
+    numeric_index: bool = False
+    text_index: bool = False
+    cache_size: int = 0
+    max_cases: int = 0
+    max_memory: int = 0
+    eviction_sample: int = 8
+    redundancy_threshold: float = 0.4
+    retention_queue: bool = False
+    retention_batch_size: int = 64
+    retention_interval: float = 0.0
+    case_log: bool = False
+    case_log_compaction: int = 10000
+    snapshot_format: SnapshotFormat = SnapshotFormat.PICKLE
+    schema_file: str = ""
+    infer_schema: bool = False
+    parallel_workers: int = 0
+    parallel_threshold: int = 20000
 
 
 @dataclass
@@ -31,3 +69,6 @@ class ArgCbr:
     opponent_pref_weight: float = 1.0
     group_id_weight: float = 1.0
     group_pref_weight: float = 1.0
+    case_log: bool = False
+    case_log_compaction: int = 10000
+    snapshot_format: SnapshotFormat = SnapshotFormat.PICKLE
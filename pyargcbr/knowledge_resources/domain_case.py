@@ -1,10 +1,28 @@
-from typing import List
+from dataclasses import dataclass
+from operator import is_
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from .case import Case
 from .justification import Justification
 from .problem import Problem
 from .solution import Solution
 
+# Attributes built again on demand from the problem and the solutions, so they are not pickled
+DERIVED_ATTRIBUTES = ("_features", "_solution_index")
+
+
+@dataclass(frozen=True)
+class CaseFeatures:
+    """The premises of a domain case as sets, to count the premises shared
+    with other cases with set operations
+
+    Attributes:
+        premise_ids (FrozenSet[int]): The IDs of the premises
+        values (FrozenSet[Tuple[int, str]]): The ID and content of each premise
+    """
+    premise_ids: FrozenSet[int]
+    values: FrozenSet[Tuple[int, str]]
+
 
 class DomainCase(Case):
     """Implementation of the concept DomainCase"""
@@ -16,6 +34,9 @@ class DomainCase(Case):
         self.solutions = solutions
         self.justification = justification
 
+    def __getstate__(self):
+        return {name: value for name, value in self.__dict__.items() if name not in DERIVED_ATTRIBUTES}
+
     def remove_solution(self, old_solution: Solution):
         """Removes a solution from the solutions list (solutions)
 
@@ -31,3 +52,61 @@ class DomainCase(Case):
             new_solution (Solution): The solution that will be added
         """
         self.solutions.append(new_solution)
+
+    def get_solutions_by_conclusion(self) -> Dict[int, List[Solution]]:
+        """Returns the solutions of the case by the ID of their conclusion, in
+        the order of the list. The map is kept with the solutions it was
+        built from and built again when the list holds other ones, however it
+        was changed: the list may be shared with other cases (it is not
+        pickled: unpickled cases build it on the first call)
+
+        Returns:
+            Dict[int, List[Solution]]: The solutions of each conclusion ID
+        """
+        index = self.__dict__.get('_solution_index')
+        solutions = self.solutions
+        if index is not None and len(index[0]) == len(solutions) and all(map(is_, index[0], solutions)):
+            return index[1]
+        by_conclusion: Dict[int, List[Solution]] = {}
+        for solution in solutions:
+            by_conclusion.setdefault(solution.conclusion.id, []).append(solution)
+        self._solution_index = (tuple(solutions), by_conclusion)
+        return by_conclusion
+
+    def get_solution(self, conclusion_id: int) -> Optional[Solution]:
+        """Returns the first solution of the case with the given conclusion ID
+        (see :meth:`get_solutions_by_conclusion`)
+
+        Args:
+            conclusion_id (int): The ID of the conclusion
+
+        Returns:
+            Optional[Solution]: The solution, or None if the case does not
+            have that conclusion
+        """
+        solutions = self.get_solutions_by_conclusion().get(conclusion_id)
+        return solutions[0] if solutions else None
+
+    def get_features(self) -> CaseFeatures:
+        """Returns the premises of the case as sets. They are built on the
+        first call and kept until :meth:`update_features` is called (they are
+        not pickled: unpickled cases build them on the first call)
+
+        Returns:
+            CaseFeatures: The features of the case
+        """
+        features = self.__dict__.get('_features')
+        if features is None:
+            features = self.update_features()
+        return features
+
+    def update_features(self) -> CaseFeatures:
+        """Builds again the features of the case, after its premises change
+
+        Returns:
+            CaseFeatures: The new features of the case
+        """
+        premises = self.problem.context.premises.values()
+        self._features = CaseFeatures(frozenset(premise.id for premise in premises),
+                                      frozenset((premise.id, premise.content) for premise in premises))
+        return self._features
@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Sequence, List
 
-from ..agents.metrics import do_dist as compare
+from ..agents.metrics import do_dist as compare, parse_value, typed_dist, TypedValue
 
 
 @dataclass
@@ -13,6 +13,29 @@ class Premise:
     name: str = field(default="", compare=False)
     content: str = field(default="", compare=False)
 
+    def __post_init__(self):
+        self._typed_content = parse_value(self.content)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_typed_content', None)  # Derived from the content, it is parsed again when needed
+        return state
+
+    @property
+    def typed_content(self) -> TypedValue:
+        """The content parsed into the value it represents. It is parsed
+        once and cached until the content changes. It is not pickled:
+        unpickled premises are parsed on the first access
+
+        Returns:
+            TypedValue: The typed value of the content
+        """
+        typed_content = self.__dict__.get('_typed_content')
+        if typed_content is None or typed_content.text is not self.content:
+            typed_content = parse_value(self.content)
+            self._typed_content = typed_content
+        return typed_content
+
     def my_cmp(self, other: Premise) -> int:
         """Comparator used to calculate all the comparison functions for the
         Premise objects
@@ -34,8 +57,8 @@ class Premise:
 
     def __eq__(self, other):
         res = self.my_cmp(other) == 0
-        res *= compare(self.name, other.name) == 0
-        res *= compare(self.content, other.content) == 0
+        res *= compare(self.name, other.name, max_distance=0) == 0
+        res *= typed_dist(self.typed_content, other.typed_content, max_distance=0) == 0
         return res
 
     def __le__(self, other):
@@ -12,6 +12,8 @@ with open('HISTORY.rst') as history_file:
 
 requirements = ['spade', 'loguru']
 
+extras_requirements = {'numpy': ['numpy']}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest>=3', ]
@@ -30,6 +32,7 @@ setup(
     ],
     description="Case-Based Argumentation Infrastructure in Python",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
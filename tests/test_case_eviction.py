@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+"""Tests for the eviction of domain cases of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.case_eviction import CaseEvictionPolicy, case_size
+from pyargcbr.cbrs.case_fingerprints import query_fingerprint
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.cbrs.sharded_domain_cbr import write_cases
+from pyargcbr.configuration.configuration_parameters import NormalizationMode, SimilarityEngine, SimilarityType
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+
+
+def results(similar_cases) -> list:
+    """The premises and similarity of each result, without the order of the ties"""
+    return sorted((c.similarity, query_fingerprint(c.case.problem.context.premises)) for c in similar_cases)
+
+
+class TestCaseEviction:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+
+    def test_policy(self):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0)
+        cases = list(cbr.get_all_cases_list())
+        policy = CaseEvictionPolicy(max_cases=len(cases) - 1, sample_size=2)
+        for a_case in cases:
+            policy.add_case(a_case, len(cases))
+        assert policy.is_over_capacity(len(cases))
+        assert not policy.is_over_capacity(len(cases) - 1)
+        lowest = policy.lowest(3)
+        assert len(lowest) == 3
+        unused = [a_case for a_case in cases if all(solution.times_used == 0 for solution in a_case.solutions)]
+        assert lowest[0] is unused[0]  # The least recently retrieved of the least used
+        assert policy.lowest(3) == lowest  # Not removed from the heap
+        policy.touch([unused[0]])
+        assert policy.lowest(1) == [unused[1]]
+        assert policy.lowest(1, {id(unused[1])}) == [lowest[2] if lowest[1] is unused[1] else lowest[1]]
+
+        policy.configure(0, case_size(cases[0]) * 2, 2, cases)
+        assert policy.memory == sum(map(case_size, cases))
+        assert policy.is_over_capacity(len(cases))
+        policy.remove_case(unused[1])
+        assert policy.memory == sum(case_size(a_case) for a_case in cases if a_case is not unused[1])
+        assert unused[1] not in policy.lowest(len(cases))
+        policy.touch([unused[1]])  # Not in the case-base any more
+        assert id(unused[1]) not in policy.last_retrieved
+        assert policy.statistics.evictions == 0
+        policy.count_eviction(unused[1])
+        assert policy.statistics.evictions == 1
+
+    @pytest.mark.parametrize("max_cases", [30, 10])  # 10 compacts the indexes
+    @pytest.mark.parametrize("index", [0, -1, (0, 4)])
+    def test_indexes_consistent(self, configuration, index, max_cases, tmp_path):
+        self.settings.update(domain_cbrs_numeric_index=True, domain_cbrs_text_index=True)
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        queries = [a_case.problem.context.premises for a_case in cbr.get_all_cases_list()[::3]]
+        cbr.get_attribute_ranges()  # Shrunk with the evictions from now on
+        for premises in queries:  # Builds the KD-tree, the case matrix and the bitmaps
+            cbr.get_most_similar(premises, 0.0, SimilarityType.WEIGHTED_EUCLIDEAN)
+            cbr.get_most_similar(premises, 0.0, SimilarityType.NORMALIZED_EUCLIDEAN, SimilarityEngine.NUMPY)
+
+        self.settings.update(domain_cbrs_max_cases=max_cases)
+        evicted = cbr.evict_cases()
+        assert len(evicted) == 48 - max_cases
+        assert len(cbr.get_all_cases_list()) == max_cases
+        statistics = cbr.get_eviction_statistics()
+        assert statistics.evictions == 48 - max_cases and statistics.peak_cases == 48
+        for structure in (cbr.inverted_index, cbr.numeric_tree, cbr.case_matrix):
+            assert len(structure.cases) <= 2 * max_cases  # The dead entries are dropped past a half
+        assert all(tree.nodes <= 2 * len(tree.values) for tree in cbr.text_index.trees.values())
+
+        remaining_file = str(tmp_path / "remaining.dat")
+        write_cases(cbr.get_all_cases_list(), remaining_file)
+        fresh_cbr = DomainCBR(remaining_file, "/tmp/null", index)
+        assert cbr.attribute_ranges.ranges == fresh_cbr.get_attribute_ranges().ranges
+        assert set(cbr.inverted_index.postings) == set(fresh_cbr.inverted_index.postings)
+        assert cbr.text_index.counts == fresh_cbr.text_index.counts
+        for premises in queries:
+            assert cbr.get_candidate_key(premises) == fresh_cbr.get_candidate_key(premises)
+            for similarity_type in SimilarityType:
+                for engine in SimilarityEngine:
+                    for normalization in NormalizationMode:
+                        for k in (None, 3):
+                            try:
+                                expected = fresh_cbr.get_most_similar(premises, 0.0, similarity_type, engine, k,
+                                                                      normalization)
+                            except ZeroDivisionError:  # Tversky without comparable premises
+                                continue
+                            similar_cases = cbr.get_most_similar(premises, 0.0, similarity_type, engine, k,
+                                                                 normalization)
+                            if k is None:
+                                assert results(similar_cases) == results(expected)
+                            else:
+                                assert [c.similarity for c in similar_cases] == [c.similarity for c in expected]
+
+    def test_eviction_order(self, configuration):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0)
+        cases = list(cbr.get_all_cases_list())
+        self.settings.update(domain_cbrs_max_cases=len(cases), domain_cbrs_cache_size=8)
+        most_used = max(cases, key=lambda a_case: sum(solution.times_used for solution in a_case.solutions))
+        unused = [a_case for a_case in cases if all(solution.times_used == 0 for solution in a_case.solutions)]
+        cbr.retrieve(unused[0].problem.context.premises, 1.0)  # The most recently retrieved of the unused cases
+
+        near_duplicate = deepcopy(most_used)
+        near_duplicate.problem.context.premises[max(most_used.problem.context.premises)].content += "x"
+        for solution in near_duplicate.solutions:
+            solution.times_used = 0
+        assert cbr.add_case(near_duplicate)
+        new_case = deepcopy(unused[1])
+        new_case.problem.context.premises[0].content = "99999"
+        assert cbr.add_case(new_case)  # Evicts the near duplicate, covered by the most used case
+        statistics = cbr.get_eviction_statistics()
+        assert statistics.evictions == 2 and statistics.redundant_evictions == 1
+        remaining = cbr.get_all_cases_list()
+        assert not any(a_case is near_duplicate for a_case in remaining)
+        assert any(a_case is new_case for a_case in remaining)  # The case just added is never evicted
+        assert any(a_case is unused[0] for a_case in remaining)
+        assert not any(a_case is unused[1] for a_case in remaining)
+        assert not any(similar_case.case is unused[1] or similar_case.case is near_duplicate
+                       for a_case in remaining for similar_case in cbr.retrieve(a_case.problem.context.premises, 0.0))
+
+    def test_retrieve_many_touches(self, configuration):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0)
+        cases = list(cbr.get_all_cases_list())
+        self.settings.update(domain_cbrs_max_cases=len(cases))
+        unused = [a_case for a_case in cases if all(solution.times_used == 0 for solution in a_case.solutions)]
+        cbr.retrieve_many([unused[0].problem.context.premises], 1.0)  # Only retrieved by a batch
+
+        new_case = deepcopy(unused[1])
+        new_case.problem.context.premises[0].content = "99999"
+        assert cbr.add_case(new_case)
+        remaining = cbr.get_all_cases_list()
+        assert cbr.get_eviction_statistics().evictions == 1
+        assert any(a_case is unused[0] for a_case in remaining)
+        assert not any(a_case is unused[1] for a_case in remaining)
+
+    def test_memory_budget(self, configuration):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1)
+        cases = cbr.get_all_cases_list()
+        budget = sum(map(case_size, cases)) // 2
+        self.settings.update(domain_cbrs_max_memory=budget)
+        evicted = cbr.evict_cases()
+        remaining = cbr.get_all_cases_list()
+        assert evicted and len(evicted) + len(remaining) == len(cases)
+        assert cbr.eviction_policy.memory == sum(map(case_size, remaining)) <= budget
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""Tests for the duplicate detection with case fingerprints of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_fingerprints import argument_case_fingerprint, premises_fingerprint
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.knowledge_resources.premise import Premise
+
+
+class TestCaseFingerprints:
+
+    def test_premises_fingerprint(self):
+        premises = {1: Premise(1, "a", "Si"), 2: Premise(2, "b", "12")}
+        assert premises_fingerprint(premises) == \
+            premises_fingerprint({2: Premise(2, "b", "12"), 1: Premise(1, "a", "sI")})
+        assert premises_fingerprint(premises) != premises_fingerprint({1: Premise(1, "a", "si")})
+        assert premises_fingerprint(premises) != \
+            premises_fingerprint({1: Premise(1, "a", "si"), 2: Premise(2, "b", "13")})
+
+    def test_domain_duplicates(self):
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", -1)
+        cases = list(cbr.get_all_cases_list())
+        for a_case in cases:
+            duplicate = deepcopy(a_case)
+            for premise in duplicate.problem.context.premises.values():
+                premise.content = premise.content.upper()
+            times_used = [solution.times_used for solution in a_case.solutions]
+            assert not cbr.add_case(duplicate)
+            assert [solution.times_used for solution in a_case.solutions] == \
+                [used + solution.times_used for used, solution in zip(times_used, duplicate.solutions)]
+        assert len(cbr.get_all_cases_list()) == len(cases)
+
+        new_case = deepcopy(cases[0])
+        new_case.problem.context.premises[0].content += "0"
+        assert cbr.add_case(new_case)
+        assert len(cbr.fingerprints) == len(cases) + 1
+
+    def test_argument_duplicates(self):
+        cbr = ArgCBR(os.path.abspath("tests/argument_cases_py.dat"), "/tmp/null")
+        cases = list(cbr.get_all_cases_list())
+        assert sum(map(len, cbr.fingerprints.values())) == len(cases)
+        for a_case in cases:
+            assert not cbr.add_case(deepcopy(a_case))
+        assert len(cbr.get_all_cases_list()) == len(cases)
+
+        new_case = deepcopy(cases[0])
+        new_case.problem.social_context.relation = None
+        assert argument_case_fingerprint(new_case) != argument_case_fingerprint(cases[0])
+        assert cbr.add_case(new_case)
+        assert len(cbr.get_all_cases_list()) == len(cases) + 1
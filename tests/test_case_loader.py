@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+"""Tests for the chunked loading of the case-bases of `pyargcbr`."""
+import os
+import pickle
+from pickle import load
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_loader import CaseLoader, LoadSummary
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode
+from pyargcbr.knowledge_resources.argument_case import ArgumentCase
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+ARGUMENT_CASES_FILE = os.path.abspath("tests/argument_cases_py.dat")
+
+
+def read_all(file_path: str) -> list:
+    objects = []
+    with open(file_path, 'rb') as fh:
+        while True:
+            try:
+                objects.append(load(fh))
+            except EOFError:
+                return objects
+
+
+class TestCaseLoader:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+
+    def test_chunks(self, tmp_path):
+        cases = [o for o in read_all(DOMAIN_CASES_FILE) if type(o) == DomainCase]
+        file_path = str(tmp_path / "mixed.dat")
+        with open(file_path, 'wb') as fh:
+            for number, a_case in enumerate(cases):
+                if number % 10 == 0:
+                    pickle.dump("not a case", fh)
+                pickle.dump(a_case, fh)
+
+        loader = CaseLoader(file_path, DomainCase, chunk_size=7, report_interval=0.0)
+        chunks = list(loader.chunks())
+        assert [len(chunk) for chunk in chunks] == [7] * (len(cases) // 7) + [len(cases) % 7]
+        assert [a_case for chunk in chunks for a_case in chunk] == cases
+        progress = loader.progress
+        assert progress.cases == len(cases) and progress.skipped == (len(cases) + 9) // 10
+        assert progress.bytes_read == progress.total_bytes == os.path.getsize(file_path)
+        assert progress.seconds > 0 and progress.cases_per_second > 0
+
+    def test_summary(self):
+        summary = LoadSummary(max_conclusions=2)
+        for conclusion_id, introduced in [(1, True), (2, False), (1, True), (3, True), (2, True), (4, False)]:
+            summary.add(conclusion_id, introduced)
+        assert summary.introduced == 4 and summary.not_introduced == 2
+        assert dict(summary.conclusions) == {1: 2, 2: 2} and summary.other_conclusions == 2
+        assert str(summary) == "cases: 6 introduced: 4 not_introduced: 2 sols: 1x2 2x2 (+2 cases of other conclusions)"
+
+    @pytest.mark.parametrize("index", [0, -1, (0, 4)])
+    def test_same_indexes(self, configuration, index, tmp_path):
+        self.settings.update(domain_cbrs_numeric_index=True, domain_cbrs_text_index=True,
+                             domain_cbrs_normalization=NormalizationMode.GLOBAL_RANGE)  # The ranges are maintained
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        empty_file = str(tmp_path / "empty.dat")
+        open(empty_file, 'wb').close()
+        incremental_cbr = DomainCBR(empty_file, "/tmp/null", index)
+        for a_case in read_all(DOMAIN_CASES_FILE):
+            incremental_cbr.add_case(a_case)  # Registered one by one
+
+        assert cbr.num_cases == incremental_cbr.num_cases
+        assert cbr.attribute_ranges.ranges == incremental_cbr.attribute_ranges.ranges
+        assert cbr.inverted_index.postings == incremental_cbr.inverted_index.postings
+        assert cbr.text_index.counts == incremental_cbr.text_index.counts
+        for a_case in cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            assert cbr.get_candidate_key(premises) == incremental_cbr.get_candidate_key(premises)
+            assert ([c.similarity for c in cbr.retrieve(premises, 0.0)]
+                    == [c.similarity for c in incremental_cbr.retrieve(premises, 0.0)])
+
+    def test_argument_cases(self):
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, "/tmp/null")
+        cases = [o for o in read_all(ARGUMENT_CASES_FILE) if type(o) == ArgumentCase]
+        assert 0 < len(cbr.get_all_cases_list()) <= len(cases)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""Tests for the case log of the CBRs of `pyargcbr`."""
+import os
+import shutil
+from copy import deepcopy
+from typing import List
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import argumentation_cbr, domain_cbr
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_fingerprints import query_fingerprint
+from pyargcbr.cbrs.case_loader import CaseLoader
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+ARGUMENT_CASES_FILE = os.path.abspath("tests/argument_cases_py.dat")
+
+
+def case_base_state(cbr: DomainCBR) -> list:
+    """The premises and the times used of the solutions of every case"""
+    return sorted((query_fingerprint(a_case.problem.context.premises),
+                   sorted((solution.conclusion.id, solution.times_used) for solution in a_case.solutions))
+                  for a_case in cbr.get_all_cases_list())
+
+
+def change_case_base(cbr: DomainCBR) -> List[DomainCase]:
+    """Adds new cases, merges others and removes one"""
+    cases = cbr.get_all_cases_list()
+    new_cases = []
+    for number, a_case in enumerate(cases[:6]):
+        new_case = deepcopy(a_case)
+        if number % 2:
+            new_case.problem.context.premises[max(new_case.problem.context.premises)].content += "x"
+        cbr.add_case(new_case)
+        new_cases.append(new_case)
+    cbr.remove_case(cases[-1])
+    return new_cases
+
+
+class TestCaseLog:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {"domain_cbrs_case_log": True, "arg_cbr_case_log": True}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+        monkeypatch.setattr(argumentation_cbr, "Configuration", lambda: Configuration(**self.settings))
+
+    def test_replay(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        change_case_base(cbr)
+        assert cbr.case_log.records == 7 and not os.path.exists(storing_file)
+
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        assert restarted_cbr.case_log.statistics.replayed == 7
+        assert case_base_state(restarted_cbr) == case_base_state(cbr)
+
+    def test_compaction(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, -1)
+        change_case_base(cbr)
+        log_copy = str(tmp_path / "copy.log")
+        shutil.copy(cbr.case_log.file_path, log_copy)
+        statistics = cbr.do_cache()
+        assert statistics.cases == cbr.num_cases
+        assert cbr.case_log.records == 0 and os.path.getsize(cbr.case_log.file_path) == 0
+        loader = CaseLoader(storing_file, DomainCase)
+        list(loader.chunks())
+        assert loader.checkpoint == 7
+
+        cbr.add_case(deepcopy(cbr.get_all_cases_list()[0]))  # Kept in the log
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, -1)
+        assert restarted_cbr.case_log.statistics.replayed == 1
+        assert case_base_state(restarted_cbr) == case_base_state(cbr)
+
+        restarted_cbr.close_case_log()
+        shutil.copy(log_copy, cbr.case_log.file_path)  # Compaction interrupted before cutting the log
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, -1)
+        assert restarted_cbr.case_log.statistics.replayed == 0
+        assert len(restarted_cbr.get_all_cases_list()) == cbr.num_cases
+
+    def test_background_compaction(self, configuration, tmp_path):
+        self.settings["domain_cbrs_case_log_compaction"] = 4
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        change_case_base(cbr)
+        cbr.case_log.wait()
+        assert cbr.case_log.statistics.compactions == 1 and cbr.case_log.records == 3
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        assert restarted_cbr.case_log.statistics.replayed == 3
+        assert case_base_state(restarted_cbr) == case_base_state(cbr)
+
+    def test_incomplete_record(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        change_case_base(cbr)
+        state = case_base_state(cbr)
+        cbr.close_case_log()
+        size = os.path.getsize(storing_file + ".log")
+        with open(storing_file + ".log", 'ab') as fh:
+            fh.write(b"\x80\x04\x95\x10")  # An append interrupted in the middle
+
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        assert restarted_cbr.case_log.statistics.discarded_bytes == 4
+        assert os.path.getsize(storing_file + ".log") == size
+        assert case_base_state(restarted_cbr) == state
+
+    def test_argument_cases(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "argument.dat")
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, storing_file)
+        a_case = cbr.get_all_cases_list()[0]
+        times_used = a_case.times_used
+        assert not cbr.add_case(deepcopy(a_case))  # Merged
+
+        restarted_cbr = ArgCBR(ARGUMENT_CASES_FILE, storing_file)
+        assert restarted_cbr.case_log.statistics.replayed == 1
+        assert ([c.times_used for c in restarted_cbr.get_all_cases_list()]
+                == [c.times_used for c in cbr.get_all_cases_list()])
+        assert a_case.times_used == 2 * times_used
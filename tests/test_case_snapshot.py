@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Tests for the case-base snapshots of the CBRs of `pyargcbr`."""
+import os
+import pickle
+
+import pytest
+
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_fingerprints import argument_case_fingerprint, query_fingerprint
+from pyargcbr.cbrs.case_snapshot import SNAPSHOT_PROTOCOL, write_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+ARGUMENT_CASES_FILE = os.path.abspath("tests/argument_cases_py.dat")
+
+
+def domain_state(cbr: DomainCBR) -> list:
+    return sorted((query_fingerprint(a_case.problem.context.premises),
+                   sorted((solution.conclusion.id, solution.times_used) for solution in a_case.solutions))
+                  for a_case in cbr.get_all_cases_list())
+
+
+class TestCaseSnapshot:
+
+    def test_domain_round_trip(self, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        statistics = cbr.do_cache()
+        assert statistics.cases == len(cbr.get_all_cases_list())
+        assert statistics.bytes_written == os.path.getsize(storing_file) and statistics.bytes_per_second > 0
+        assert not os.path.exists(storing_file + ".tmp")
+        with open(storing_file, 'rb') as fh:
+            assert fh.read(2) == pickle.PROTO + bytes([SNAPSHOT_PROTOCOL])
+
+        assert domain_state(DomainCBR(storing_file, "/tmp/null", 0)) == domain_state(cbr)
+        assert cbr.do_cache().bytes_written == statistics.bytes_written  # Replaced, not appended
+
+    def test_argument_round_trip(self, tmp_path):
+        storing_file = str(tmp_path / "argument.dat")
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, storing_file)
+        cbr.do_cache()
+        loaded_cbr = ArgCBR(storing_file, "/tmp/null")
+        assert (sorted(map(argument_case_fingerprint, loaded_cbr.get_all_cases_list()))
+                == sorted(map(argument_case_fingerprint, cbr.get_all_cases_list())))
+
+    def test_append(self, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        first = cbr.do_cache_inc()
+        second = cbr.do_cache_inc()
+        assert os.path.getsize(storing_file) == first.bytes_written + second.bytes_written
+        loaded_cbr = DomainCBR(storing_file, "/tmp/null", 0)  # The repeated cases are merged
+        assert len(loaded_cbr.get_all_cases_list()) == len(cbr.get_all_cases_list())
+
+    def test_failed_write_keeps_snapshot(self, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        cbr.do_cache()
+        size = os.path.getsize(storing_file)
+
+        def failing_cases():
+            yield from cbr.get_all_cases_list()[:3]
+            raise RuntimeError("interrupted")
+
+        with pytest.raises(RuntimeError):
+            write_snapshot(failing_cases(), storing_file)
+        assert os.path.getsize(storing_file) == size and not os.path.exists(storing_file + ".tmp")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""Tests for the bitmaps of the categorical premises of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.categorical_bitmaps import CategoricalBitmaps, count_bits
+from pyargcbr.agents.premise_schema import AttributeKind, PremiseSchema, categorical_distance
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType, SimilarityEngine
+
+
+class TestCategoricalBitmaps:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+        self.cbr.schema = PremiseSchema.infer(self.cbr.get_all_cases_list())
+
+    def test_count_bits(self):
+        bitmaps = [0b1011, 0b0010, 0b1110, 0, 0b0011]
+        assert count_bits(bitmaps, 5) == [2, 4, 1, 2, 0]
+        assert count_bits([], 3) == [0, 0, 0]
+
+    def test_mismatches(self, domain_cbr_setup):
+        cases = self.cbr.get_all_cases_list()
+        bitmaps = CategoricalBitmaps(cases, self.cbr.schema.get_categorical_ids())
+        for a_case in cases:
+            premises = [premise for premise in a_case.problem.context.premises.values()
+                        if self.cbr.schema.is_categorical(premise.id)]
+            for premise, mismatch in zip(premises, bitmaps.mismatches(premises)):
+                for position, candidate in enumerate(cases):
+                    candidate_premise = candidate.problem.context.premises.get(premise.id)
+                    matches = candidate_premise is not None and candidate_premise.content == premise.content
+                    assert bool(mismatch >> position & 1) != matches
+
+    def test_same_results_as_distances(self, domain_cbr_setup):
+        # The same schema with the categorical distance computed premise by premise
+        schema = deepcopy(self.cbr.schema)
+        for attribute in schema.attributes.values():
+            if attribute.kind == AttributeKind.CATEGORICAL:
+                attribute.kind = AttributeKind.TEXT
+                attribute._distance = categorical_distance
+        cases = self.cbr.get_all_cases_list()
+        for a_case in cases:
+            premises = a_case.problem.context.premises
+            for function in (sim_algs.normalized_euclidean_similarity, sim_algs.weighted_euclidean_similarity,
+                             sim_algs.normalized_tversky_similarity):
+                bitmap_cases = function(premises, cases, schema=self.cbr.schema)
+                distance_cases = function(premises, cases, schema=schema)
+                assert [c.similarity for c in bitmap_cases] == \
+                    pytest.approx([c.similarity for c in distance_cases])
+
+    def test_add_case(self, domain_cbr_setup):
+        pytest.importorskip("numpy")
+        premises = self.cbr.get_all_cases_list()[0].problem.context.premises
+        self.cbr.get_most_similar(premises, 0.0, SimilarityType.NORMALIZED_TVERSKY)
+        new_case = deepcopy(self.cbr.get_all_cases_list()[0])
+        for premise in new_case.problem.context.premises.values():
+            if premise.content == "si":
+                premise.content = "no"
+        assert self.cbr.add_case(new_case)
+        for similarity_type in SimilarityType:
+            python_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.PYTHON)
+            numpy_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.NUMPY)
+            assert [(id(c.case), c.similarity) for c in python_cases] == \
+                [(id(c.case), c.similarity) for c in numpy_cases]
+        bitmaps = self.cbr.get_categorical_bitmaps(premises, self.cbr.get_candidate_cases(premises))
+        assert bitmaps.cases[-1] is new_case
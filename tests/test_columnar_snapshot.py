@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""Tests for the columnar snapshots of the CBRs of `pyargcbr`."""
+import os
+import pickle
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import argumentation_cbr, domain_cbr
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_fingerprints import argument_case_fingerprint, query_fingerprint
+from pyargcbr.cbrs.columnar_snapshot import ColumnarSnapshot, is_columnar, open_snapshot, write_columnar_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SnapshotFormat
+from pyargcbr.knowledge_resources.argument_case import ArgumentCase
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+ARGUMENT_CASES_FILE = os.path.abspath("tests/argument_cases_py.dat")
+
+
+def case_base_state(cbr: DomainCBR) -> list:
+    """The premises and the times used of the solutions of every case"""
+    return sorted((query_fingerprint(a_case.problem.context.premises),
+                   sorted((solution.conclusion.id, solution.times_used) for solution in a_case.solutions))
+                  for a_case in cbr.get_all_cases_list())
+
+
+def argument_case_base_state(cbr: ArgCBR) -> list:
+    """The fingerprint and the times used of every argument case"""
+    return sorted((argument_case_fingerprint(a_case), a_case.times_used) for a_case in cbr.get_all_cases_list())
+
+
+class TestColumnarSnapshot:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {"domain_cbrs_snapshot_format": SnapshotFormat.COLUMNAR,
+                         "arg_cbr_snapshot_format": SnapshotFormat.COLUMNAR}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+        monkeypatch.setattr(argumentation_cbr, "Configuration", lambda: Configuration(**self.settings))
+
+    def test_domain_round_trip(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        statistics = cbr.do_cache()
+        assert statistics.cases == cbr.num_cases and is_columnar(storing_file)
+
+        columnar_cbr = DomainCBR(storing_file, "/tmp/null", 0)
+        assert all(type(a_case) is not DomainCase for a_case in columnar_cbr.get_all_cases_list())
+        assert case_base_state(columnar_cbr) == case_base_state(cbr)
+        for a_case in cbr.get_all_cases_list()[::10]:
+            premises = a_case.problem.context.premises
+            assert ([(similar_case.case, similar_case.similarity) for similar_case in columnar_cbr.retrieve(premises, 0.5)]
+                    == [(similar_case.case, similar_case.similarity) for similar_case in cbr.retrieve(premises, 0.5)])
+
+    def test_materialization(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        cbr.do_cache()
+        a_case = next(open_snapshot(storing_file, DomainCase).chunks())[0]
+        assert type(a_case) is not DomainCase and isinstance(a_case, DomainCase)
+        assert "solutions" not in a_case.__dict__
+
+        copied_case = pickle.loads(pickle.dumps(deepcopy(a_case)))
+        assert type(copied_case) is DomainCase and copied_case == a_case
+        assert a_case.solutions == cbr.get_all_cases_list()[0].solutions
+        assert type(a_case) is DomainCase and "_snapshot" not in a_case.__dict__
+
+    def test_argument_round_trip(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "arguments.dat")
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, storing_file)
+        cbr.do_cache()
+        columnar_cbr = ArgCBR(storing_file, "/tmp/null")
+        assert all(type(a_case) is not ArgumentCase for a_case in columnar_cbr.get_all_cases_list())
+        assert len(columnar_cbr.fingerprints) == len(cbr.fingerprints)
+        assert argument_case_base_state(columnar_cbr) == argument_case_base_state(cbr)
+
+    def test_argument_duplicates(self, configuration, tmp_path):
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, "/tmp/null")
+        cases = cbr.get_all_cases_list()
+        snapshot_file = str(tmp_path / "arguments.dat")
+        write_columnar_snapshot(cases + cases[:3], snapshot_file, ArgCBR.snapshot_key)
+        columnar_cbr = ArgCBR(snapshot_file, "/tmp/null")
+        assert len(columnar_cbr.get_all_cases_list()) == len(cases)
+        merged_cases = [a_case for a_case in columnar_cbr.get_all_cases_list() if type(a_case) is ArgumentCase]
+        assert len(merged_cases) == 3
+
+    def test_rewrite_lazy_cases(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        DomainCBR(DOMAIN_CASES_FILE, storing_file, 0).do_cache()
+        columnar_cbr = DomainCBR(storing_file, str(tmp_path / "copy.dat"), 0)
+        columnar_cbr.do_cache()
+        assert all(type(a_case) is not DomainCase for a_case in columnar_cbr.get_all_cases_list())
+        with open(storing_file, 'rb') as fh, open(str(tmp_path / "copy.dat"), 'rb') as copy_fh:
+            assert fh.read() == copy_fh.read()
+
+    def test_case_log_compaction(self, configuration, tmp_path):
+        self.settings["domain_cbrs_case_log"] = True
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        new_case = deepcopy(cbr.get_all_cases_list()[0])
+        new_case.problem.context.premises[max(new_case.problem.context.premises)].content += "x"
+        cbr.add_case(new_case)
+        cbr.compact_case_log()
+        cbr.close_case_log()
+        snapshot = open_snapshot(storing_file, DomainCase)
+        assert isinstance(snapshot, ColumnarSnapshot) and snapshot.checkpoint == 1
+
+        restarted_cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        assert restarted_cbr.case_log.statistics.replayed == 0
+        assert case_base_state(restarted_cbr) == case_base_state(cbr)
+        restarted_cbr.close_case_log()
+
+    def test_incremental_cache(self, configuration, tmp_path):
+        storing_file = str(tmp_path / "domain.dat")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, storing_file, 0)
+        cbr.do_cache()
+        with pytest.raises(ValueError):
+            cbr.do_cache_inc()
+        with pytest.raises(ValueError):
+            open_snapshot(storing_file, ArgumentCase)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""Tests for the composite hash index of `pyargcbr`."""
+import os
+from typing import Dict
+
+import pytest
+
+from pyargcbr.agents.composite_index import CompositeIndex, index_premise_ids
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+from pyargcbr.knowledge_resources.domain_context import DomainContext
+from pyargcbr.knowledge_resources.premise import Premise
+from pyargcbr.knowledge_resources.problem import Problem
+
+
+def new_case(contents: Dict[int, str]) -> DomainCase:
+    premises = {premise_id: Premise(premise_id, "premise" + str(premise_id), content)
+                for premise_id, content in contents.items()}
+    return DomainCase(problem=Problem(DomainContext(premises)), solutions=[])
+
+
+class TestCompositeIndex:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        self.cbr = DomainCBR(os.devnull, "/tmp/null", (1, 2))
+        self.cases = [new_case({1: "a", 2: "x", 3: "0"}), new_case({1: "a", 2: "y", 3: "1"}),
+                      new_case({1: "a", 2: "y", 3: "2"}), new_case({1: "b", 2: "x", 3: "3"}),
+                      new_case({1: "b", 3: "4"})]
+        for a_case in self.cases:
+            assert self.cbr.add_case(a_case)
+
+    def candidate_ids(self, contents: Dict[int, str]):
+        return [self.cases.index(a_case) for a_case in self.cbr.get_candidate_cases(
+            new_case(contents).problem.context.premises)]
+
+    def test_index_premise_ids(self):
+        assert index_premise_ids(-1) == ()
+        assert index_premise_ids(3) == (3,)
+        assert index_premise_ids([3, 1]) == (3, 1)
+
+    def test_whole_key_and_prefix(self, domain_cbr_setup):
+        assert self.candidate_ids({1: "a", 2: "y"}) == [1, 2]
+        assert self.candidate_ids({1: "b"}) == [4]
+        # No case has the whole key: the bucket of the first premise is used
+        assert self.candidate_ids({1: "b", 2: "y"}) == [3, 4]
+        assert self.candidate_ids({1: "c", 2: "y"}) == []
+
+    def test_min_bucket_size(self, domain_cbr_setup, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(domain_cbrs_min_bucket_size=2))
+        assert self.candidate_ids({1: "a", 2: "y"}) == [1, 2]
+        assert self.candidate_ids({1: "a", 2: "x"}) == [0, 1, 2]
+        premises = new_case({1: "a", 2: "x"}).problem.context.premises
+        assert self.cbr.get_candidate_key(premises) == ("a",)
+        assert len(self.cbr.retrieve_many([premises], 0.0)[0]) == 3
+
+    def test_statistics(self, domain_cbr_setup):
+        first, whole = self.cbr.get_bucket_statistics()
+        assert (first.premise_ids, first.buckets, first.min_size, first.max_size) == ((1,), 2, 2, 3)
+        assert (whole.premise_ids, whole.buckets, whole.min_size, whole.max_size) == ((1, 2), 4, 1, 2)
+        assert whole.mean_size == 1.25 and whole.median_size == 1.0
+        assert CompositeIndex([1]).get_statistics()[0].buckets == 0
+
+    def test_single_premise_index(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        indexed_cbr = DomainCBR(file, "/tmp/null", 0)
+        cbr = DomainCBR(file, "/tmp/null", -1)
+        for a_case in cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            candidates = indexed_cbr.get_candidate_cases(premises)
+            assert [c.problem.context.premises[0].content for c in candidates] == \
+                [premises[0].content] * len(candidates)
+            similar_cases = indexed_cbr.get_most_similar(premises, 1.0, SimilarityType.NORMALIZED_EUCLIDEAN)
+            assert similar_cases[0].case.problem.context.premises == premises
+        assert len(indexed_cbr.get_all_cases_list()) == len(cbr.get_all_cases_list())
+        assert indexed_cbr.get_bucket_statistics()[0].buckets == len(indexed_cbr.case_base)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests for the global-range normalization of the similarity of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.attribute_ranges import AttributeRanges
+from pyargcbr.agents.premise_schema import PremiseSchema
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode, SimilarityType
+
+GLOBAL_RANGE_FUNCTIONS = (sim_algs.global_range_euclidean_similarity, sim_algs.global_range_tversky_similarity)
+
+
+class TestGlobalRange:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+
+    def pruning_gives_same_results(self):
+        cases = self.cbr.get_all_cases_list()
+        for a_case in cases[::3]:
+            premises = a_case.problem.context.premises
+            for function in GLOBAL_RANGE_FUNCTIONS:
+                all_cases = function(premises, cases, self.cbr.get_attribute_ranges(), schema=self.cbr.schema)
+                assert len(all_cases) == len(cases)
+                assert all_cases[0].similarity == 1.0
+                for threshold, k in ((0.5, None), (0.0, 5), (0.4, 3)):
+                    pruned_cases = function(premises, cases, self.cbr.get_attribute_ranges(), threshold, k,
+                                            self.cbr.schema)
+                    expected_cases = [c for c in all_cases if c.similarity >= threshold][:k]
+                    assert [(id(c.case), c.similarity) for c in pruned_cases] == \
+                        [(id(c.case), c.similarity) for c in expected_cases]
+
+    def test_pruning_gives_same_results(self, domain_cbr_setup):
+        self.pruning_gives_same_results()
+
+    def test_pruning_gives_same_results_with_schema(self, domain_cbr_setup):
+        self.cbr.schema = PremiseSchema.infer(self.cbr.get_all_cases_list())
+        self.pruning_gives_same_results()
+
+    def test_ranges_updated_with_new_cases(self, domain_cbr_setup):
+        ranges = self.cbr.get_attribute_ranges().ranges
+        assert set(ranges) == {premise_id for a_case in self.cbr.get_all_cases_list()
+                               for premise_id in a_case.problem.context.premises}
+        max_number = ranges[0].max_number
+        new_case = deepcopy(self.cbr.get_all_cases_list()[0])
+        new_case.problem.context.premises[0].content = str(int(max_number) + 1000)
+        assert self.cbr.add_case(new_case)
+        assert ranges[0].max_number == max_number + 1000
+
+        premises = new_case.problem.context.premises
+        for similarity_type in (SimilarityType.NORMALIZED_EUCLIDEAN, SimilarityType.NORMALIZED_TVERSKY):
+            similar_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, k=1,
+                                                      normalization=NormalizationMode.GLOBAL_RANGE)
+            assert similar_cases[0].case is new_case
+
+    def test_ranges_shrunk_with_removed_cases(self, domain_cbr_setup):
+        cases = list(self.cbr.get_all_cases_list())
+        ranges = AttributeRanges()
+        for a_case in cases:
+            ranges.add_case(a_case)
+        while cases:
+            ranges.remove_case(cases.pop(len(cases) // 2))
+            expected_ranges = AttributeRanges()
+            for a_case in cases:
+                expected_ranges.add_case(a_case)
+            assert ranges.ranges == expected_ranges.ranges
+        assert not ranges.ranges
+
+    def test_merged_ranges_not_shrunk(self, domain_cbr_setup):
+        a_case = self.cbr.get_all_cases_list()[0]
+        ranges = AttributeRanges()
+        ranges.merge(self.cbr.get_attribute_ranges())
+        with pytest.raises(ValueError):
+            ranges.remove_case(a_case)
+
+    def test_weighted_euclidean_not_affected(self, domain_cbr_setup):
+        premises = self.cbr.get_all_cases_list()[0].problem.context.premises
+        candidates_cases = self.cbr.get_most_similar(premises, 0.0, SimilarityType.WEIGHTED_EUCLIDEAN)
+        global_cases = self.cbr.get_most_similar(premises, 0.0, SimilarityType.WEIGHTED_EUCLIDEAN,
+                                                 normalization=NormalizationMode.GLOBAL_RANGE)
+        assert [(id(c.case), c.similarity) for c in candidates_cases] == \
+            [(id(c.case), c.similarity) for c in global_cases]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""Tests for the inverted premise index of `pyargcbr`."""
+import os
+from typing import Dict
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.agents.inverted_index import InvertedPremiseIndex
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+from pyargcbr.knowledge_resources.domain_context import DomainContext
+from pyargcbr.knowledge_resources.premise import Premise
+from pyargcbr.knowledge_resources.problem import Problem
+
+
+def new_case(contents: Dict[int, str]) -> DomainCase:
+    premises = {premise_id: Premise(premise_id, "premise" + str(premise_id), content)
+                for premise_id, content in contents.items()}
+    return DomainCase(problem=Problem(DomainContext(premises)), solutions=[])
+
+
+def query(*premise_ids: int) -> Dict[int, Premise]:
+    return new_case({premise_id: "x" for premise_id in premise_ids}).problem.context.premises
+
+
+class TestInvertedIndex:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        self.cbr = DomainCBR(os.devnull, "/tmp/null", -1)
+        self.cases = [new_case({1: "a", 2: "b"}), new_case({2: "b", 3: "c"}), new_case({3: "c", 4: "d"}),
+                      new_case({5: "e"}), new_case({1: "a", 2: "b", 3: "c"})]
+        for a_case in self.cases:
+            assert self.cbr.add_case(a_case)
+
+    def test_postings(self):
+        index = InvertedPremiseIndex()
+        index.add_case(new_case({1: "a", 2: "b"}))
+        index.add_case(new_case({2: "c"}))
+        assert index.postings == {1: [0], 2: [0, 1]}
+        assert index.candidate_ordinals([2, 1]) == [0, 1]
+        assert index.candidate_ordinals([2, 1], 2) == [0]
+        assert index.candidate_ordinals([7]) == []
+
+    def test_candidates_without_duplicates(self, domain_cbr_setup):
+        # The cases whose lowest premise ID is not in the query are candidates too
+        candidates = self.cbr.get_candidate_cases(query(2, 3))
+        assert [id(c) for c in candidates] == [id(self.cases[i]) for i in (0, 1, 2, 4)]
+        similar_cases = self.cbr.get_most_similar(query(2, 3), 0.0, SimilarityType.NORMALIZED_EUCLIDEAN)
+        assert len(similar_cases) == 4
+        assert self.cbr.get_candidate_cases(query(6)) == []
+
+    def test_min_shared_premises(self, domain_cbr_setup, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(domain_cbrs_min_shared_premises=2))
+        candidates = self.cbr.get_candidate_cases(query(1, 2, 3))
+        assert [id(c) for c in candidates] == [id(self.cases[i]) for i in (0, 1, 4)]
+        assert self.cbr.get_candidate_key(query(1, 2, 3)) == ((1, 2, 3), 2)
+        assert self.cbr.get_candidate_cases(query(4, 5)) == []
+
+    def test_cases_added_after_retrieval(self, domain_cbr_setup):
+        premises = query(1, 5)
+        assert len(self.cbr.retrieve_many([premises], 0.0)[0]) == 3
+        added_case = new_case({5: "f", 6: "g"})
+        assert self.cbr.add_case(added_case)
+        assert self.cbr.get_candidate_cases(premises)[-1] is added_case
+        assert len(self.cbr.retrieve_many([premises], 0.0)[0]) == 4
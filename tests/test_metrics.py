@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+"""Tests for the distance metrics of `pyargcbr`."""
+import pickle
+from datetime import datetime
+from math import isnan
+from time import mktime
+
+from pyargcbr.agents.metrics import do_dist, parse_value, typed_dist, ValueKind, levenshtein_distance, \
+    full_levenshtein_distance
+from pyargcbr.knowledge_resources.premise import Premise
+
+CONTENTS = ["0", "1", "2649", "1820", "1.5", "-3", "nan", "si", "no", "()", "bull_compuprint",
+            "01/02/20 10:00:00", "12/31/99 23:59:59", "1/2/3", "1e3", " 7", "inf", "0.0", "-0", "", "1_000"]
+
+
+def test_parse_value():
+    assert parse_value("2649").kind == ValueKind.INTEGER
+    assert parse_value("1.5").kind == ValueKind.FLOAT
+    assert parse_value("01/02/20 10:00:00").kind == ValueKind.TIMESTAMP
+    assert parse_value("1/2/3").kind == ValueKind.STRING
+    assert parse_value("si") == (ValueKind.STRING, "si", "si")
+
+
+def reference_do_dist(a: str, b: str):
+    """The distance between two premise contents as it was calculated before
+    they were parsed into typed values"""
+    ra, rb = None, None
+    try:
+        ra = int(a)
+        rb = int(b)
+    except ValueError:
+        pass
+    try:
+        ra = float(a)
+        rb = float(b)
+    except ValueError:
+        pass
+    try:
+        ra = mktime(datetime.strptime(a, '%m/%d/%y %H:%M:%S').timetuple())
+        rb = mktime(datetime.strptime(b, '%m/%d/%y %H:%M:%S').timetuple())
+    except ValueError:
+        pass
+    if ra and rb:
+        return abs(ra - rb)
+    return full_levenshtein_distance(a, b)
+
+
+def test_typed_dist():
+    assert typed_dist(parse_value("2649"), parse_value("1820.5")) == 828.5
+    assert typed_dist(parse_value("0"), parse_value("5")) == 1  # zeros are compared as texts
+    assert typed_dist(parse_value("si"), parse_value("no")) == 2
+    for a in CONTENTS:
+        for b in CONTENTS:
+            expected = reference_do_dist(a, b)
+            for distance in (typed_dist(parse_value(a), parse_value(b)), do_dist(a, b)):
+                if isnan(expected):
+                    assert isnan(distance), (a, b)
+                else:
+                    assert distance == expected, (a, b)
+
+
+def test_premise_typed_content():
+    premise = Premise(1, "name", "10")
+    assert premise.typed_content.value == 10.0
+    premise.content += "aa"
+    assert premise.typed_content.kind == ValueKind.STRING
+    loaded_premise = pickle.loads(pickle.dumps(premise))
+    assert "_typed_content" not in loaded_premise.__dict__  # Not part of the case-base files
+    assert loaded_premise.typed_content.text == "10aa"
+    assert loaded_premise == premise
+
+
+def test_levenshtein_distance():
+    words = ["", "a", "si", "no", "kitten", "sitting", "bull_compuprint", "bull_compuprint_914n", "laserjet_4000n",
+             "comunicar_incidencia_a_bull", "comunicar_incidencia_al_cliente"]
+    for x in words:
+        for y in words:
+            distance = full_levenshtein_distance(x, y)
+            assert levenshtein_distance(x, y) == distance
+            for max_distance in range(0, 12):
+                assert levenshtein_distance(x, y, max_distance) == min(distance, max_distance + 1)
+
+
+def test_typed_dist_memo():
+    memo = {}
+    assert typed_dist(parse_value("kitten"), parse_value("sitting"), memo=memo) == 3
+    assert memo == {("kitten", "sitting"): 3}
+    assert typed_dist(parse_value("kitten"), parse_value("sitting"), memo=memo) == 3
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+"""Tests for the KD-tree of the numeric premises of `pyargcbr`."""
+import os
+from copy import deepcopy
+from random import Random
+from typing import List
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.agents.numeric_index import numeric_coordinates, NumericKDTree
+from pyargcbr.agents.premise_schema import PremiseSchema
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+from pyargcbr.knowledge_resources.premise import Premise
+
+
+def random_content(rnd: Random) -> str:
+    choice = rnd.random()
+    if choice < 0.1:
+        return "0"  # Compared as a text
+    if choice < 0.2:
+        return "text" + str(rnd.randint(0, 3))
+    if choice < 0.3:
+        return "0{}/1{}/20 10:00:00".format(rnd.randint(1, 9), rnd.randint(0, 9))
+    if choice < 0.5:
+        return str(rnd.uniform(-100, 100))
+    return str(rnd.randint(1, 100))
+
+
+def numeric_cases(cases: List[DomainCase], seed: int = 0) -> List[DomainCase]:
+    """Copies of the cases with some random numeric premises added"""
+    rnd = Random(seed)
+    new_cases = []
+    for _ in range(4):
+        for a_case in cases:
+            new_case = deepcopy(a_case)
+            premises = new_case.problem.context.premises
+            for premise_id in range(100, 104):
+                if rnd.random() < 0.9:
+                    premises[premise_id] = Premise(premise_id, "n" + str(premise_id), random_content(rnd))
+            new_cases.append(new_case)
+    return new_cases
+
+
+class TestNumericIndex:
+    cbr: DomainCBR = None
+    cases: List[DomainCase] = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+        self.cases = numeric_cases(self.cbr.get_all_cases_list())
+
+    def index_gives_same_results(self, schema=None):
+        tree = NumericKDTree(schema, leaf_size=4)
+        for a_case in self.cases:
+            tree.add_case(a_case)
+        for a_case in self.cases[::7]:
+            premises = a_case.problem.context.premises
+            all_cases = sim_algs.weighted_euclidean_similarity(premises, self.cases, schema=schema)
+            for threshold, k in ((0.0, None), (0.3, None), (0.1, 5), (0.0, 1), (0.2, 3)):
+                indexed_cases = sim_algs.indexed_weighted_euclidean_similarity(premises, self.cases, tree,
+                                                                               threshold, k, schema, batch_size=8)
+                expected_cases = [c for c in all_cases if c.similarity >= threshold][:k]
+                assert [(id(c.case), c.similarity) for c in indexed_cases] == \
+                    [(id(c.case), c.similarity) for c in expected_cases]
+
+    def test_index_gives_same_results(self, domain_cbr_setup):
+        self.index_gives_same_results()
+
+    def test_index_gives_same_results_with_schema(self, domain_cbr_setup):
+        self.index_gives_same_results(PremiseSchema.infer(self.cases))
+
+    def test_range_search(self, domain_cbr_setup):
+        tree = NumericKDTree(leaf_size=4)
+        for a_case in self.cases:
+            tree.add_case(a_case)
+        premises = self.cases[0].problem.context.premises
+        query = {premise_id: premise for premise_id, premise in premises.items() if premise_id >= 100}
+        bounds = [tree.lower_bound(numeric_coordinates(query), ordinal) for ordinal in range(len(self.cases))]
+        for max_distance in (0.0, 10.0, 100.0):
+            assert tree.range_search(query, max_distance) == \
+                [ordinal for ordinal, bound in enumerate(bounds) if bound <= max_distance]
+        assert [bound for bound, _ in tree.nearest(query)] == sorted(bounds)
+
+    def test_tree_updated_with_new_cases(self, domain_cbr_setup, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(domain_cbrs_numeric_index=True))
+        premises = self.cases[0].problem.context.premises
+        tree = self.cbr.get_numeric_tree()
+        assert len(tree.cases) == len(self.cbr.get_all_cases_list())
+        for a_case in self.cases:
+            self.cbr.add_case(a_case)
+        assert self.cbr.numeric_tree is tree
+        assert len(tree.cases) == len(self.cbr.get_all_cases_list())
+
+        cases = self.cbr.get_all_cases_list()
+        expected_cases = sim_algs.weighted_euclidean_similarity(premises, cases, 0.2, 10, self.cbr.schema)
+        similar_cases = self.cbr.get_most_similar(premises, 0.2, SimilarityType.WEIGHTED_EUCLIDEAN, k=10)
+        assert similar_cases[0].case is self.cases[0]
+        assert [(id(c.case), c.similarity) for c in similar_cases] == \
+            [(id(c.case), c.similarity) for c in expected_cases]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+"""Tests for the parallel similarity scoring of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents.parallel_similarity import ParallelScorer
+from pyargcbr.agents.premise_schema import PremiseSchema
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+
+
+class TestParallelSimilarity:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+        yield
+        self.cbr.close_parallel_scorer()
+
+    def same_results(self, scorer: ParallelScorer, threshold: float = 0.0, k: int = None):
+        for a_case in self.cbr.get_all_cases_list()[::4]:
+            premises = a_case.problem.context.premises
+            candidates = self.cbr.get_candidate_cases(premises)
+            for similarity_type in SimilarityType:
+                sequential_cases = self.cbr.get_most_similar_candidates(premises, candidates, threshold,
+                                                                         similarity_type, k=k)
+                parallel_cases = scorer.most_similar(premises, candidates, similarity_type, threshold, k)
+                assert [(id(c.case), c.similarity) for c in sequential_cases] == \
+                    [(id(c.case), c.similarity) for c in parallel_cases]
+
+    def test_same_results(self, domain_cbr_setup):
+        scorer = self.cbr.get_parallel_scorer(3)
+        self.same_results(scorer)
+        self.same_results(scorer, 0.3, 5)
+
+    def test_same_results_with_schema(self, domain_cbr_setup):
+        self.cbr.schema = PremiseSchema.infer(self.cbr.get_all_cases_list())
+        self.same_results(self.cbr.get_parallel_scorer(2))
+
+    def test_cases_added_to_the_case_base(self, domain_cbr_setup):
+        scorer = self.cbr.get_parallel_scorer(2)
+        new_case = deepcopy(self.cbr.get_all_cases_list()[0])
+        new_case.problem.context.premises[0].content = "1234"
+        assert self.cbr.add_case(new_case)
+        assert self.cbr.get_parallel_scorer(2) is scorer
+        assert scorer.get_items(self.cbr.get_all_cases_list())[-1] is new_case
+        self.same_results(scorer, 0.0, 3)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""Tests for the premise schema of `pyargcbr`."""
+import os
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.agents.premise_schema import AttributeKind, PremiseAttribute, PremiseSchema, premise_distance
+from pyargcbr.agents.similarity_algorithms import normalized_tversky_similarity
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType, SimilarityEngine
+from pyargcbr.knowledge_resources.premise import Premise
+
+
+class TestPremiseSchema:
+    cbr: DomainCBR = None
+    schema: PremiseSchema = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+        self.schema = PremiseSchema.infer(self.cbr.get_all_cases_list())
+
+    def test_infer(self, domain_cbr_setup):
+        assert self.schema.get_attribute(0).kind == AttributeKind.INTEGER
+        assert self.schema.get_attribute(0).min_value == 56.0
+        assert self.schema.get_attribute(0).max_value == 2649.0
+        assert self.schema.get_attribute(5).kind == AttributeKind.CATEGORICAL
+        assert self.schema.get_attribute(67).kind == AttributeKind.CATEGORICAL
+        assert PremiseSchema.infer(self.cbr.get_all_cases_list(), 3).get_attribute(6).kind == AttributeKind.TEXT
+
+    def test_save_and_load(self, domain_cbr_setup, tmp_path):
+        self.schema.attributes[9] = PremiseAttribute(9, AttributeKind.DATE, "%d/%m/%Y", weight=2.0)
+        file = str(tmp_path / "schema.json")
+        self.schema.save(file)
+        assert PremiseSchema.load(file) == self.schema
+
+    def test_distance_functions(self):
+        schema = PremiseSchema.from_dict({"premises": [
+            {"id": 0, "kind": "integer", "min": 0, "max": 200},
+            {"id": 1, "kind": "categorical"},
+            {"id": 2, "kind": "date", "format": "%d/%m/%Y"},
+            {"id": 3, "kind": "text"}]})
+        assert schema.distance_function(0)(Premise(0, "", "10"), Premise(0, "", "60")) == 0.25
+        assert schema.distance_function(0)(Premise(0, "", "10"), Premise(0, "", "si")) == 2
+        assert schema.distance_function(1)(Premise(1, "", "hp"), Premise(1, "", "xerox")) == 1.0
+        assert schema.distance_function(1)(Premise(1, "", "hp"), Premise(1, "", "hp")) == 0.0
+        assert schema.distance_function(2)(Premise(2, "", "01/02/2020"), Premise(2, "", "02/02/2020")) == 86400
+        assert schema.distance_function(3)(Premise(3, "", "kitten"), Premise(3, "", "sitting")) == 3
+        assert schema.distance_function(4) is premise_distance
+        assert schema.get_weight(4) == 1.0
+
+    def test_retrieval_with_schema(self, domain_cbr_setup):
+        pytest.importorskip("numpy")
+        self.cbr.schema = self.schema
+        for a_case in self.cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            for similarity_type in SimilarityType:
+                python_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.PYTHON)
+                numpy_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.NUMPY)
+                assert [(id(c.case), c.similarity) for c in python_cases] == \
+                    [(id(c.case), c.similarity) for c in numpy_cases]
+                assert python_cases[0].similarity == 1.0
+
+    def test_premises_similarity_with_schema(self, domain_cbr_setup, monkeypatch):
+        settings = {"domain_cbrs_similarity": SimilarityType.WEIGHTED_EUCLIDEAN}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**settings))
+        self.cbr.schema = self.schema
+        cases = self.cbr.get_all_cases_list()
+        for a_case in cases:
+            premises = a_case.problem.context.premises
+            for similar_case in self.cbr.retrieve(premises, 0.0):
+                other_premises = similar_case.case.problem.context.premises
+                assert self.cbr.get_cached_premises_similarity(premises, other_premises) == similar_case.similarity
+                assert DomainCBR.get_premises_similarity(premises, other_premises, self.schema) == \
+                    similar_case.similarity
+
+        # The Tversky similarity is normalized among the candidates: the one of a single candidate, with the weights
+        settings.update(domain_cbrs_similarity=SimilarityType.NORMALIZED_TVERSKY, domain_cbrs_tversky_alpha=0.7,
+                        domain_cbrs_tversky_beta=0.3)
+        premises = cases[0].problem.context.premises
+        for a_case in cases[1:]:
+            assert self.cbr.get_cached_premises_similarity(premises, a_case.problem.context.premises) == \
+                normalized_tversky_similarity(premises, [a_case], schema=self.schema, alpha=0.7, beta=0.3)[0].similarity
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""Tests for the retention queue of the domain CBR of `pyargcbr`."""
+import os
+import time
+from copy import deepcopy
+from typing import List
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.case_fingerprints import query_fingerprint
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+
+
+def new_cases(cbr: DomainCBR) -> List[DomainCase]:
+    """Copies of some cases of the case-base with a different premise"""
+    cases = []
+    for number, a_case in enumerate(cbr.get_all_cases_list()[::4]):
+        new_case = deepcopy(a_case)
+        new_case.problem.context.premises[max(new_case.problem.context.premises)].content += str(number % 3)
+        new_case.solutions = []
+        cases.append(new_case)
+    return cases
+
+
+def case_base_state(cbr: DomainCBR) -> list:
+    """The premises and the times used of the solutions of every case"""
+    return sorted((query_fingerprint(a_case.problem.context.premises),
+                   sorted((solution.conclusion.id, solution.times_used) for solution in a_case.solutions))
+                  for a_case in cbr.get_all_cases_list())
+
+
+class TestRetentionQueue:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {"domain_cbrs_retention_queue": True}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+
+    @pytest.mark.parametrize("index", [0, -1])
+    def test_same_case_base(self, configuration, index):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        sync_cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        for new_case in new_cases(cbr):
+            self.settings["domain_cbrs_retention_queue"] = True
+            cbr.retrieve_and_retain(deepcopy(new_case), 0.3)
+            self.settings["domain_cbrs_retention_queue"] = False
+            sync_cbr.retrieve_and_retain(deepcopy(new_case), 0.3)
+        assert cbr.get_retention_statistics().queued > 0 and len(cbr.retention_queue) > 0
+        cbr.apply_retention_queue()  # At the end of the dialogue
+        assert case_base_state(cbr) == case_base_state(sync_cbr)
+
+    def test_read_your_writes(self, configuration):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0)
+        num_cases = cbr.num_cases
+        new_case = new_cases(cbr)[0]
+        cbr.retrieve_and_retain(new_case, 0.0)
+        assert len(cbr.retention_queue) > 0 and cbr.num_cases == num_cases  # Not applied yet
+
+        similar_cases = cbr.retrieve(new_case.problem.context.premises, 1.0)
+        assert [similar_case.case for similar_case in similar_cases] == [new_case]
+        assert len(cbr.retention_queue) > 0 and cbr.num_cases == num_cases  # Seen without applying the queue
+
+        cbr.apply_retention_queue()
+        assert len(cbr.retention_queue) == 0 and cbr.num_cases == num_cases + 1
+        statistics = cbr.get_retention_statistics()
+        assert statistics.batches == 1 and statistics.introduced == 1
+        assert statistics.applied == statistics.queued
+
+    @pytest.mark.parametrize("index", [0, -1, (0, 4)])
+    @pytest.mark.parametrize("normalization", list(NormalizationMode))
+    def test_pending_cases_retrieved(self, configuration, index, normalization):
+        self.settings.update(domain_cbrs_normalization=normalization, domain_cbrs_min_bucket_size=3)
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        cases = new_cases(cbr)
+        for new_case in cases:
+            cbr.queue_case(new_case, domain_cbr.Configuration())
+            cbr.queue_case(new_case, domain_cbr.Configuration())  # Retained twice, added once
+        queries = [a_case.problem.context.premises for a_case in cbr.get_all_cases_list()[1::5] + cases]
+        pending_results = cbr.retrieve_many(queries, 0.0)
+        assert [cbr.retrieve(premises, 0.0) for premises in queries] == pending_results
+        assert len(cbr.retention_queue) == 2 * len(cases)
+
+        cbr.apply_retention_queue()
+        assert cbr.retrieve_many(queries, 0.0) == pending_results
+
+    def test_batch_size(self, configuration):
+        self.settings["domain_cbrs_retention_batch_size"] = 2
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0)
+        num_cases = cbr.num_cases
+        cases = new_cases(cbr)
+        cbr.retention_queue.put(cases[0])
+        cbr.queue_case(cases[1], domain_cbr.Configuration())
+        assert len(cbr.retention_queue) == 0 and cbr.num_cases == num_cases + 2
+
+    def test_background_thread(self, configuration):
+        self.settings["domain_cbrs_retention_interval"] = 0.01
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1)
+        num_cases = cbr.num_cases
+        try:
+            for new_case in new_cases(cbr)[:3]:
+                cbr.queue_case(new_case, domain_cbr.Configuration())
+            deadline = time.time() + 5.0
+            while len(cbr.retention_queue) and time.time() < deadline:
+                time.sleep(0.01)
+            with cbr.lock:
+                assert len(cbr.retention_queue) == 0 and cbr.num_cases == num_cases + 3
+        finally:
+            cbr.retention_queue.stop()
+        assert cbr.retention_queue.thread is None
+
+    def test_readers_during_background_thread(self, configuration):
+        self.settings.update(domain_cbrs_retention_interval=0.001, domain_cbrs_retention_batch_size=1)
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1)
+        num_cases = cbr.num_cases
+        cases = new_cases(cbr)
+        try:
+            for new_case in cases:
+                cbr.queue_case(new_case, domain_cbr.Configuration())
+                premises = new_case.problem.context.premises
+                for _ in range(20):  # Iterating the case-base while the thread changes it raises errors
+                    assert num_cases <= len(cbr.get_all_cases_list()) <= num_cases + len(cases)
+                    assert sum(map(len, cbr.get_all_cases())) <= num_cases + len(cases)
+                    cbr.get_candidate_cases(premises)
+                    cbr.is_redundant(new_case, 1.0)
+        finally:
+            cbr.retention_queue.stop()
+        cbr.apply_retention_queue()
+        assert cbr.num_cases == num_cases + len(cases)
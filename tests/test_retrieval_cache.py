@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Tests for the retrieval cache of `pyargcbr`."""
+import os
+from copy import deepcopy
+from typing import List, Tuple
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.cbrs.retrieval_cache import CacheStatistics, RetrievalCache
+from pyargcbr.configuration.configuration_parameters import NormalizationMode, SimilarityType
+from pyargcbr.knowledge_resources.premise import Premise
+from pyargcbr.knowledge_resources.similar_domain_case import SimilarDomainCase
+
+
+def results(similar_cases: List[SimilarDomainCase]) -> List[Tuple[int, float]]:
+    """The identity and the exact similarity of the retrieved cases (their
+    equality only compares the rounded similarities)"""
+    return [(id(similar_case.case), similar_case.similarity) for similar_case in similar_cases]
+
+
+class TestRetrievalCache:
+
+    @pytest.fixture
+    def cache_enabled(self, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(domain_cbrs_cache_size=8))
+
+    def test_lru(self):
+        cache = RetrievalCache(2)
+        cache.put("a", 1, [1])
+        cache.put("b", 1, [2])
+        assert cache.get("a") == [1]
+        cache.put("c", 2, [3])  # "b" is the least recently used
+        assert cache.get("b") is None
+        assert len(cache) == 2
+        assert cache.statistics == CacheStatistics(hits=1, misses=1, evictions=1)
+
+        cache.invalidate([1])
+        assert cache.get("a") is None
+        assert cache.get("c") == [3]
+        assert set(cache.get_buckets()) == {2}
+        assert cache.statistics.invalidations == 1
+        cache.resize(0)
+        assert len(cache) == 0
+        cache.put("a", 1, [1])
+        assert len(cache) == 0
+
+    @pytest.mark.parametrize("index", [0, -1])
+    def test_invalidated_by_add_case(self, cache_enabled, index):
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", index)
+        a_case = cbr.get_all_cases_list()[0]
+        premises = a_case.problem.context.premises
+        similar_cases = results(cbr.retrieve(premises, 0.0))
+        assert results(cbr.retrieve(premises, 0.0)) == similar_cases
+        assert results(cbr.retrieve(premises, 0.0, k=1)) == similar_cases[:1]
+        statistics = cbr.get_cache_statistics()["retrieval"]
+        assert (statistics.hits, statistics.misses) == (1, 2)
+
+        unrelated_case = deepcopy(a_case)
+        unrelated_case.problem.context.premises = {500: Premise(500, "other", "x")}
+        assert cbr.add_case(unrelated_case)
+        assert statistics.invalidations == 0
+        assert results(cbr.retrieve(premises, 0.0)) == similar_cases
+
+        new_case = deepcopy(a_case)
+        new_case.problem.context.premises[9].content = "new"
+        assert cbr.add_case(new_case)
+        assert statistics.invalidations == 2
+        new_similar_cases = cbr.retrieve(premises, 0.0)
+        assert any(similar_case.case is new_case for similar_case in new_similar_cases)
+        assert statistics.misses == 3
+
+    def test_global_range_invalidated(self, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(
+            domain_cbrs_cache_size=8, domain_cbrs_normalization=NormalizationMode.GLOBAL_RANGE))
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", 0)
+        premises = cbr.get_all_cases_list()[0].problem.context.premises
+        cbr.retrieve(premises, 0.0)
+        unrelated_case = deepcopy(cbr.get_all_cases_list()[0])
+        unrelated_case.problem.context.premises = {0: Premise(0, "other", "123456")}
+        assert cbr.add_case(unrelated_case)
+        assert cbr.get_cache_statistics()["retrieval"].invalidations == 1
+
+    def test_premises_similarity(self, cache_enabled):
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", -1)
+        cases = cbr.get_all_cases_list()
+        premises1, premises2 = cases[0].problem.context.premises, cases[1].problem.context.premises
+        similarity = cbr.get_cached_premises_similarity(premises1, premises2)
+        assert cbr.get_cached_premises_similarity(premises1, premises2) == similarity
+        assert cbr.get_cache_statistics()["similarity"] == CacheStatistics(hits=1, misses=1)
+        assert DomainCBR.get_premises_similarity(premises1, premises2) == similarity  # Static and not cached
+        assert cbr.get_cache_statistics()["similarity"] == CacheStatistics(hits=1, misses=1)
+
+    def test_premises_similarity_schema_reloaded(self, monkeypatch):
+        settings = {"domain_cbrs_cache_size": 8, "domain_cbrs_similarity": SimilarityType.WEIGHTED_EUCLIDEAN}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**settings))
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", -1)
+        cases = cbr.get_all_cases_list()
+        premises1, premises2 = cases[0].problem.context.premises, cases[1].problem.context.premises
+        cbr.get_cached_premises_similarity(premises1, premises2)
+        settings["domain_cbrs_infer_schema"] = True
+        cbr.load_case_base()  # Loads a new schema
+        assert cbr.get_cached_premises_similarity(premises1, premises2) == \
+            DomainCBR.get_premises_similarity(premises1, premises2, cbr.schema)
+        assert cbr.get_cache_statistics()["similarity"].misses == 2
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""Tests for the sharded domain CBR of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr, sharded_domain_cbr
+from pyargcbr.cbrs.case_fingerprints import query_fingerprint
+from pyargcbr.cbrs.columnar_snapshot import write_columnar_snapshot
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.cbrs.sharded_domain_cbr import ShardedDomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode, SimilarityType
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+
+
+def results(similar_cases) -> list:
+    """The premises and similarity of each result, without the order of the ties"""
+    return sorted((c.similarity, query_fingerprint(c.case.problem.context.premises)) for c in similar_cases)
+
+
+class TestShardedDomainCBR:
+    cbr: DomainCBR = None
+    sharded_cbr: ShardedDomainCBR = None
+
+    @pytest.fixture(params=[0, -1])
+    def sharded_setup(self, request, tmp_path):
+        index = request.param
+        shard_paths = [str(tmp_path / "shard{}.dat".format(shard)) for shard in range(3)]
+        counts = ShardedDomainCBR.partition(DOMAIN_CASES_FILE, shard_paths, index)
+        self.cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        assert sum(counts) == len(self.cbr.get_all_cases_list())
+        self.sharded_cbr = ShardedDomainCBR(shard_paths, shard_paths, index)
+        yield
+        self.sharded_cbr.shutdown()
+
+    def same_results(self, threshold: float = 0.0, k: int = None):
+        for a_case in self.cbr.get_all_cases_list()[::5]:
+            premises = a_case.problem.context.premises
+            for similarity_type in SimilarityType:
+                for normalization in NormalizationMode:
+                    try:
+                        expected_cases = self.cbr.get_most_similar(premises, threshold, similarity_type, k=k,
+                                                                   normalization=normalization)
+                    except ZeroDivisionError:  # Tversky without comparable premises, see ParallelScorer
+                        with pytest.raises(ZeroDivisionError):
+                            self.sharded_cbr.get_most_similar(premises, threshold, similarity_type, k, normalization)
+                        continue
+                    sharded_cases = self.sharded_cbr.get_most_similar(premises, threshold, similarity_type, k,
+                                                                      normalization)
+                    if k is None:
+                        assert results(sharded_cases) == results(expected_cases)
+                    else:
+                        assert [c.similarity for c in sharded_cases] == [c.similarity for c in expected_cases]
+
+    def test_same_results(self, sharded_setup):
+        self.same_results()
+        self.same_results(0.3, 3)
+
+    def test_add_case(self, sharded_setup, tmp_path):
+        cases = self.cbr.get_all_cases_list()
+        assert not self.sharded_cbr.add_case(deepcopy(cases[0]))
+        new_case = deepcopy(cases[0])
+        new_case.problem.context.premises[0].content = "99999"
+        assert self.sharded_cbr.add_case(deepcopy(new_case))
+        assert self.cbr.add_case(new_case)
+        self.same_results()
+
+        self.sharded_cbr.do_cache()
+        all_cases = self.sharded_cbr.get_all_cases_list()
+        self.sharded_cbr.shutdown()
+        shard_paths = [str(tmp_path / "shard{}.dat".format(shard)) for shard in range(3)]
+        self.sharded_cbr = ShardedDomainCBR(shard_paths, shard_paths, self.cbr.index)
+        assert sorted(map(query_fingerprint, (c.problem.context.premises for c in all_cases))) == \
+            sorted(map(query_fingerprint, (c.problem.context.premises for c in self.sharded_cbr.get_all_cases_list())))
+
+    def test_shard_retrieval_path(self, monkeypatch, tmp_path):
+        def configuration() -> Configuration:
+            return Configuration(domain_cbrs_cache_size=8)
+
+        monkeypatch.setattr(domain_cbr, "Configuration", configuration)
+        monkeypatch.setattr(sharded_domain_cbr, "Configuration", configuration)  # Inherited by the shards
+        shard_paths = [str(tmp_path / "shard{}.dat".format(shard)) for shard in range(2)]
+        ShardedDomainCBR.partition(DOMAIN_CASES_FILE, shard_paths, -1)
+        sharded_cbr = ShardedDomainCBR(shard_paths, shard_paths, -1)
+        try:
+            premises = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1).get_all_cases_list()[0].problem.context.premises
+            for similarity_type in SimilarityType:
+                for _ in range(2):
+                    sharded_cbr.get_most_similar(premises, 0.0, similarity_type)
+            statistics = [shard_statistics["retrieval"] for shard_statistics in sharded_cbr.get_cache_statistics()]
+            assert [(shard.hits, shard.misses) for shard in statistics] == [(3, 3), (3, 3)]
+        finally:
+            sharded_cbr.shutdown()
+
+    def test_partition_columnar(self, tmp_path):
+        cases = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0).get_all_cases_list()
+        columnar_file = str(tmp_path / "cases.columnar")
+        write_columnar_snapshot(cases, columnar_file, DomainCBR.snapshot_key)
+        shard_paths = [str(tmp_path / "shard{}.dat".format(shard)) for shard in range(3)]
+        assert ShardedDomainCBR.partition(columnar_file, shard_paths, 0) == \
+            ShardedDomainCBR.partition(DOMAIN_CASES_FILE, shard_paths, 0)
+        assert sum(ShardedDomainCBR.partition(columnar_file, shard_paths, 0)) == len(cases)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""Tests for the NumPy similarity engine of `pyargcbr`."""
+import os
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType, SimilarityEngine
+
+np = pytest.importorskip("numpy")
+
+
+class TestSimilarityEngines:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+
+    def same_results(self, similarity_type: SimilarityType):
+        for a_case in self.cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            python_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.PYTHON)
+            numpy_cases = self.cbr.get_most_similar(premises, 0.0, similarity_type, SimilarityEngine.NUMPY)
+            assert len(python_cases) == len(numpy_cases)
+            for python_case, numpy_case in zip(python_cases, numpy_cases):
+                assert python_case.case is numpy_case.case
+                assert python_case.similarity == numpy_case.similarity
+
+    def test_normalized_euclidean(self, domain_cbr_setup):
+        self.same_results(SimilarityType.NORMALIZED_EUCLIDEAN)
+
+    def test_weighted_euclidean(self, domain_cbr_setup):
+        self.same_results(SimilarityType.WEIGHTED_EUCLIDEAN)
+
+    def test_normalized_tversky(self, domain_cbr_setup):
+        self.same_results(SimilarityType.NORMALIZED_TVERSKY)
+
+    def test_subset_of_premises(self, domain_cbr_setup):
+        candidates = self.cbr.get_all_cases_list()
+        matrix = self.cbr.get_case_matrix()
+        for a_case in candidates:
+            premises = dict(list(a_case.problem.context.premises.items())[::2])
+            python_cases = sim_algs.normalized_euclidean_similarity(premises, candidates)
+            numpy_cases = matrix.normalized_euclidean_similarity(premises, candidates)
+            assert [(id(c.case), c.similarity) for c in python_cases] == \
+                [(id(c.case), c.similarity) for c in numpy_cases]
+
+    def test_threshold_and_top_k(self, domain_cbr_setup):
+        for a_case in self.cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            for engine in SimilarityEngine:
+                all_cases = self.cbr.get_most_similar(premises, 0.0, SimilarityType.NORMALIZED_EUCLIDEAN, engine)
+                for threshold in (0.2, 0.4, 0.6):
+                    for k in (None, 0, 1, 3, 100):
+                        cases = self.cbr.get_most_similar(premises, threshold, SimilarityType.NORMALIZED_EUCLIDEAN,
+                                                          engine, k)
+                        expected = [c for c in all_cases if c.similarity >= threshold][:k]
+                        assert [(id(c.case), c.similarity) for c in cases] == \
+                            [(id(c.case), c.similarity) for c in expected]
+
+    def test_similarity_many(self, domain_cbr_setup):
+        candidates = self.cbr.get_all_cases_list()
+        queries = [a_case.problem.context.premises for a_case in candidates]
+        queries += [dict(list(premises.items())[1::2]) for premises in queries]
+        matrix = self.cbr.get_case_matrix()
+        for similarity_type in (SimilarityType.NORMALIZED_EUCLIDEAN, SimilarityType.WEIGHTED_EUCLIDEAN):
+            batch = matrix.similarity_many(queries, candidates, similarity_type, 0.3, 10)
+            for premises, batch_cases in zip(queries, batch):
+                cases = self.cbr.get_most_similar_candidates(premises, candidates, 0.3, similarity_type,
+                                                             SimilarityEngine.PYTHON, 10)
+                assert [(id(c.case), c.similarity) for c in cases] == \
+                    [(id(c.case), c.similarity) for c in batch_cases]
+
+    def test_retrieve_many(self, domain_cbr_setup):
+        queries = [a_case.problem.context.premises for a_case in self.cbr.get_all_cases_list()]
+        for premises, batch_cases in zip(queries, self.cbr.retrieve_many(queries, 0.2)):
+            cases = self.cbr.retrieve(premises, 0.2)
+            assert [(id(c.case), c.similarity) for c in cases] == [(id(c.case), c.similarity) for c in batch_cases]
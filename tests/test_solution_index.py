@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests for the solutions by conclusion of the domain cases of `pyargcbr`."""
+import os
+import pickle
+from copy import deepcopy
+
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.knowledge_resources.conclusion import Conclusion
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+from pyargcbr.knowledge_resources.domain_context import DomainContext
+from pyargcbr.knowledge_resources.premise import Premise
+from pyargcbr.knowledge_resources.problem import Problem
+from pyargcbr.knowledge_resources.solution import Solution
+
+
+def make_solution(conclusion_id: int, times_used: int = 1) -> Solution:
+    return Solution(Conclusion(conclusion_id, str(conclusion_id)), "value", times_used)
+
+
+def make_case(*conclusion_ids: int) -> DomainCase:
+    return DomainCase(problem=Problem(DomainContext({1: Premise(1, "a", "x")})),
+                      solutions=[make_solution(conclusion_id) for conclusion_id in conclusion_ids])
+
+
+class TestSolutionIndex:
+
+    def test_solutions_by_conclusion(self):
+        a_case = make_case(1, 2, 1)
+        assert a_case.get_solution(1) is a_case.solutions[0]  # The first one of the list
+        assert a_case.get_solution(3) is None
+
+        new_solution = make_solution(3)
+        a_case.add_solution(new_solution)
+        assert a_case.get_solution(3) is new_solution
+        a_case.remove_solution(a_case.solutions[0])
+        assert a_case.get_solution(1) is a_case.solutions[1]
+
+        a_case.solutions.append(make_solution(4))  # Changed without add_solution
+        assert a_case.get_solution(4) is a_case.solutions[-1]
+        a_case.solutions = [make_solution(5)]
+        assert a_case.get_solution(2) is None and a_case.get_solution(5) is a_case.solutions[0]
+        assert list(a_case.get_solutions_by_conclusion()) == [5]
+
+    def test_solutions_of_the_same_conclusion(self):
+        a_case = make_case(1, 2, 1)
+        assert a_case.get_solutions_by_conclusion()[1] == [a_case.solutions[0], a_case.solutions[2]]
+        first_solution = a_case.solutions[0]
+        a_case.remove_solution(first_solution)
+        assert a_case.get_solutions_by_conclusion()[1] == [a_case.solutions[1]]
+        assert a_case.get_solution(1) is not first_solution
+
+    def test_shared_solutions(self):
+        a_case = make_case(1, 2)
+        b_case = make_case()
+        b_case.solutions = a_case.solutions  # Like a retained case and its most similar one
+        assert b_case.get_solution(2) is a_case.solutions[1]
+        a_case.remove_solution(a_case.solutions[1])
+        a_case.add_solution(make_solution(3))
+        assert b_case.get_solution(2) is None
+        assert b_case.get_solution(3) is a_case.solutions[1]
+
+    def test_old_pickles(self):
+        a_case = make_case(1, 2)
+        a_case.get_solution(1)
+        del a_case.__dict__['_solution_index']  # Pickled before the solutions had a map
+        loaded_case = pickle.loads(pickle.dumps(a_case))
+        assert loaded_case.get_solution(2) == a_case.solutions[1]
+        assert loaded_case == a_case
+
+    def test_derived_attributes_not_pickled(self):
+        a_case = make_case(1, 2)
+        a_case.get_solution(1)
+        a_case.get_features()
+        loaded_case = pickle.loads(pickle.dumps(a_case))
+        assert "_solution_index" not in loaded_case.__dict__ and "_features" not in loaded_case.__dict__
+        assert loaded_case.get_solution(2) == a_case.solutions[1]
+        assert loaded_case.get_features() == a_case.get_features()
+
+    def test_add_case_merges_solutions(self):
+        cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", 0)
+        current_case = cbr.get_all_cases_list()[0]
+        solution = current_case.solutions[0]
+        times_used = solution.times_used
+        new_case = deepcopy(current_case)
+        new_case.solutions = [make_solution(solution.conclusion.id, 3), make_solution(-5, 7)]
+        assert not cbr.add_case(new_case)
+        assert solution.times_used == times_used + 3
+        assert current_case.get_solution(-5).times_used == 1
+        assert [s.conclusion.id for s in current_case.solutions][-1] == -5
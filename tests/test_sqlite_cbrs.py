@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""Tests for the SQLite case-bases of the CBRs of `pyargcbr`."""
+import os
+from copy import deepcopy
+
+import pytest
+
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.cbrs import domain_cbr, sqlite_cbrs
+from pyargcbr.cbrs.argumentation_cbr import ArgCBR
+from pyargcbr.cbrs.case_database import CaseDatabase, get_database_path, ROW_ID
+from pyargcbr.cbrs.case_fingerprints import argument_case_fingerprint, query_fingerprint
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.cbrs.sqlite_cbrs import SQLiteArgCBR, SQLiteDomainCBR
+from pyargcbr.configuration.configuration_parameters import NormalizationMode
+
+DOMAIN_CASES_FILE = os.path.abspath("tests/domain_cases_py.dat")
+ARGUMENT_CASES_FILE = os.path.abspath("tests/argument_cases_py.dat")
+
+
+def case_base_state(cbr: DomainCBR) -> list:
+    """The premises and the times used of the solutions of every case"""
+    return sorted((query_fingerprint(a_case.problem.context.premises),
+                   sorted((solution.conclusion.id, solution.times_used) for solution in a_case.solutions))
+                  for a_case in cbr.get_all_cases_list())
+
+
+def retrieved(cbr: DomainCBR, premises) -> list:
+    return [(query_fingerprint(similar_case.case.problem.context.premises), similar_case.similarity)
+            for similar_case in cbr.retrieve(premises, 0.3)]
+
+
+class TestSQLiteCBRs:
+    settings: dict = None
+
+    @pytest.fixture
+    def configuration(self, monkeypatch):
+        self.settings = {}
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(**self.settings))
+        monkeypatch.setattr(sqlite_cbrs, "Configuration", lambda: Configuration(**self.settings))
+
+    @pytest.mark.parametrize("index", [-1, 0, (0, 1)])
+    def test_same_retrievals(self, configuration, tmp_path, index):
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index)
+        sqlite_cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", index, database_path=str(tmp_path / "cases.db"))
+        assert sqlite_cbr.num_cases == cbr.num_cases
+        assert case_base_state(sqlite_cbr) == case_base_state(cbr)
+        for a_case in cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            assert retrieved(sqlite_cbr, premises) == retrieved(cbr, premises)
+
+    def test_reopen(self, configuration, tmp_path):
+        database_path = str(tmp_path / "cases.db")
+        cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1, database_path=database_path)
+        new_case = deepcopy(cbr.get_all_cases_list()[0])
+        new_case.problem.context.premises[max(new_case.problem.context.premises)].content += "x"
+        assert cbr.add_case(new_case)
+        assert not cbr.add_case(deepcopy(new_case))  # Merged: its solutions are used twice
+        cbr.close_database()
+
+        reopened_cbr = SQLiteDomainCBR("/nonexistent", "/tmp/null", -1, database_path=database_path)
+        assert reopened_cbr.get_database_statistics().inserted == 0
+        assert reopened_cbr.num_cases == cbr.num_cases
+        similar_case = reopened_cbr.retrieve(new_case.problem.context.premises, 1.0)[0]
+        assert similar_case.case.problem == new_case.problem
+        assert [solution.times_used for solution in similar_case.case.solutions] == \
+            [2 * solution.times_used for solution in new_case.solutions]
+
+    def test_remove_case(self, configuration, tmp_path):
+        cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", 0, database_path=str(tmp_path / "cases.db"))
+        num_cases = cbr.num_cases
+        a_case = cbr.get_all_cases_list()[-1]
+        assert cbr.remove_case(a_case)
+        assert not cbr.remove_case(a_case)
+        assert cbr.num_cases == cbr.database.count() == num_cases - 1
+        assert all(similar_case.case.__dict__[ROW_ID] != a_case.__dict__[ROW_ID]
+                   for similar_case in cbr.retrieve(a_case.problem.context.premises, 0.0))
+
+    def test_global_ranges(self, configuration, tmp_path):
+        self.settings.update(domain_cbrs_normalization=NormalizationMode.GLOBAL_RANGE)
+        database_path = str(tmp_path / "cases.db")
+        cbr = DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1)
+        sqlite_cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1, database_path=database_path)
+        assert sqlite_cbr.attribute_ranges.ranges == cbr.attribute_ranges.ranges
+        sqlite_cbr.close_database()
+
+        reopened_cbr = SQLiteDomainCBR("/nonexistent", "/tmp/null", -1, database_path=database_path)
+        assert reopened_cbr.get_database_statistics().loaded == 0  # Read with MIN and MAX queries
+        assert reopened_cbr.attribute_ranges.ranges == cbr.attribute_ranges.ranges
+        for a_case in reopened_cbr.get_all_cases_list()[::2]:
+            loaded = reopened_cbr.get_database_statistics().loaded
+            assert reopened_cbr.remove_case(a_case)
+            assert reopened_cbr.get_database_statistics().loaded == loaded
+            assert cbr.remove_case(next(c for c in cbr.get_all_cases_list()
+                                        if c.problem.context.premises == a_case.problem.context.premises))
+        assert reopened_cbr.attribute_ranges.ranges == cbr.attribute_ranges.ranges
+        a_case = reopened_cbr.get_all_cases_list()[0]
+        assert [c.similarity for c in reopened_cbr.retrieve(a_case.problem.context.premises, 0.0)] == \
+            [c.similarity for c in cbr.retrieve(a_case.problem.context.premises, 0.0)]
+
+    def test_retrievals_not_recorded(self, configuration, tmp_path):
+        cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1, database_path=str(tmp_path / "cases.db"))
+        for a_case in cbr.get_all_cases_list():
+            assert cbr.retrieve(a_case.problem.context.premises, 0.0)
+        assert not cbr.eviction_policy.last_retrieved and not cbr.eviction_policy.clock
+
+    def test_retention_queue(self, configuration, tmp_path):
+        cbr = SQLiteDomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1, database_path=str(tmp_path / "cases.db"))
+        num_cases = cbr.num_cases
+        transactions = cbr.get_database_statistics().transactions
+        for number, a_case in enumerate(cbr.get_all_cases_list()[:5]):
+            new_case = deepcopy(a_case)
+            new_case.problem.context.premises[max(new_case.problem.context.premises)].content += str(number)
+            cbr.retention_queue.put(new_case)
+        cbr.do_cache()  # The whole batch in a single transaction
+        statistics = cbr.get_database_statistics()
+        assert cbr.num_cases == cbr.database.count() == num_cases + 5
+        assert statistics.transactions == transactions + 1
+
+    def test_rollback(self, tmp_path):
+        database = CaseDatabase(str(tmp_path / "cases.db"), "domain_cases")
+        a_case = next(iter(DomainCBR(DOMAIN_CASES_FILE, "/tmp/null", -1).get_all_cases_list()))
+        with pytest.raises(RuntimeError):
+            with database.transaction():
+                database.insert_case(a_case, 0)
+                raise RuntimeError()
+        assert database.count() == 0
+        with pytest.raises(ValueError):
+            CaseDatabase(str(tmp_path / "cases.db"), "cases; DROP TABLE cases")
+
+    def test_argument_cases(self, tmp_path):
+        database_path = str(tmp_path / "cases.db")
+        cbr = ArgCBR(ARGUMENT_CASES_FILE, "/tmp/null")
+        sqlite_cbr = SQLiteArgCBR(ARGUMENT_CASES_FILE, "/tmp/null", database_path=database_path)
+        cases = cbr.get_all_cases_list()
+        assert sorted(map(argument_case_fingerprint, sqlite_cbr.get_all_cases_list())) == \
+            sorted(map(argument_case_fingerprint, cases))
+        for a_case in cases:
+            premises = a_case.problem.context.premises
+            assert [similar_case.problem.context.premises for similar_case in
+                    sqlite_cbr.get_domain_similar_arg_cases(premises)] == \
+                [similar_case.problem.context.premises for similar_case in cbr.get_domain_similar_arg_cases(premises)]
+
+        assert not sqlite_cbr.add_case(deepcopy(cases[0]))
+        assert not cbr.add_case(deepcopy(cases[0]))
+        sqlite_cbr.close_database()
+        reopened_cbr = SQLiteArgCBR("/nonexistent", "/tmp/null", database_path=database_path)
+        merged_case = next(a_case for a_case in reopened_cbr.get_all_cases_list()
+                           if argument_case_fingerprint(a_case) == argument_case_fingerprint(cases[0]))
+        assert merged_case.times_used == cases[0].times_used  # Merged like ArgCBR does
+        assert len(reopened_cbr.get_all_cases_list()) == len(cases)
+
+    def test_database_path(self):
+        assert get_database_path(Configuration(database_name="cases")) == "cases.sqlite3"
+        assert get_database_path(Configuration(database_name="/tmp/cases.db")) == "/tmp/cases.db"
+        assert get_database_path(Configuration(server_name="127.0.0.1", database_name=":memory:")) == ":memory:"
+        with pytest.raises(ValueError):
+            get_database_path(Configuration(server_name="db.example.com"))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""Tests for the BK-tree index of the text premises of `pyargcbr`."""
+import os
+from copy import deepcopy
+from random import Random
+from typing import List
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.agents.metrics import levenshtein_distance
+from pyargcbr.agents.numeric_index import NumericKDTree
+from pyargcbr.agents.premise_schema import PremiseSchema
+from pyargcbr.agents.text_index import BKTree, TextValueIndex
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+
+
+def random_text(rnd: Random) -> str:
+    return "".join(rnd.choice("abcde") for _ in range(rnd.randint(0, 8)))
+
+
+def text_cases(cases: List[DomainCase], seed: int = 0) -> List[DomainCase]:
+    """Copies of the cases with random texts in some of their premises"""
+    rnd = Random(seed)
+    new_cases = []
+    for _ in range(4):
+        for a_case in cases:
+            new_case = deepcopy(a_case)
+            premises = new_case.problem.context.premises
+            for premise_id in list(premises)[1:]:
+                if rnd.random() < 0.5:
+                    premises[premise_id].content = random_text(rnd)
+                elif rnd.random() < 0.1:
+                    del premises[premise_id]
+            new_cases.append(new_case)
+    return new_cases
+
+
+class TestTextIndex:
+    cbr: DomainCBR = None
+    cases: List[DomainCase] = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+        self.cases = text_cases(self.cbr.get_all_cases_list())
+
+    def test_bk_tree_search(self):
+        rnd = Random(1)
+        values = {random_text(rnd) for _ in range(300)}
+        tree = BKTree()
+        for value in values:
+            tree.add(value)
+        assert tree.values == values
+        for query in [random_text(rnd) for _ in range(20)]:
+            for radius in (0, 1, 2, 4):
+                expected = {value: levenshtein_distance(query, value) for value in values}
+                assert tree.search(query, radius) == \
+                    {value: distance for value, distance in expected.items() if distance <= radius}
+
+    def index_gives_same_results(self, schema=None):
+        text_index = TextValueIndex()
+        tree = NumericKDTree(schema)
+        for a_case in self.cases:
+            text_index.add_case(a_case)
+            tree.add_case(a_case)
+        for a_case in self.cases[::7]:
+            premises = a_case.problem.context.premises
+            all_cases = sim_algs.weighted_euclidean_similarity(premises, self.cases, schema=schema)
+            for threshold, k in ((0.0, None), (0.2, None), (0.25, 5), (0.0, 1), (0.0, 3)):
+                for numeric_tree in (None, tree):
+                    indexed_cases = sim_algs.indexed_weighted_euclidean_similarity(
+                        premises, self.cases, numeric_tree, threshold, k, schema, batch_size=8, text_index=text_index)
+                    expected_cases = [c for c in all_cases if c.similarity >= threshold][:k]
+                    assert [(id(c.case), c.similarity) for c in indexed_cases] == \
+                        [(id(c.case), c.similarity) for c in expected_cases]
+
+    def test_index_gives_same_results(self, domain_cbr_setup):
+        self.index_gives_same_results()
+
+    def test_index_gives_same_results_with_schema(self, domain_cbr_setup):
+        self.index_gives_same_results(PremiseSchema.infer(self.cases))
+
+    def test_index_built_and_updated(self, monkeypatch):
+        monkeypatch.setattr(domain_cbr, "Configuration", lambda: Configuration(domain_cbrs_text_index=True))
+        self.cbr = DomainCBR(os.path.abspath("tests/domain_cases_py.dat"), "/tmp/null", -1)
+        text_index = self.cbr.text_index
+        assert text_index is not None
+        assert {(premise_id, value) for premise_id, tree in text_index.trees.items() for value in tree.values} == \
+            {(premise.id, premise.content) for a_case in self.cbr.get_all_cases_list()
+             for premise in a_case.problem.context.premises.values()}
+
+        self.cases = text_cases(self.cbr.get_all_cases_list())
+        for a_case in self.cases:
+            self.cbr.add_case(a_case)
+        assert self.cbr.get_text_index() is text_index
+        premises = self.cases[0].problem.context.premises
+        assert all(premise.content in text_index.trees[premise.id].values for premise in premises.values())
+
+        cases = self.cbr.get_all_cases_list()
+        expected_cases = sim_algs.weighted_euclidean_similarity(premises, cases, 0.2, 10, self.cbr.schema)
+        similar_cases = self.cbr.get_most_similar(premises, 0.2, SimilarityType.WEIGHTED_EUCLIDEAN, k=10)
+        assert similar_cases[0].case is self.cases[0]
+        assert [(id(c.case), c.similarity) for c in similar_cases] == \
+            [(id(c.case), c.similarity) for c in expected_cases]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+"""Tests for the Tversky similarity over the case features of `pyargcbr`."""
+import os
+from copy import deepcopy
+from typing import Dict, List
+
+import pytest
+
+from pyargcbr.agents import similarity_algorithms as sim_algs
+from pyargcbr.agents.configuration import Configuration
+from pyargcbr.agents.premise_schema import PremiseSchema
+from pyargcbr.cbrs import domain_cbr
+from pyargcbr.cbrs.domain_cbr import DomainCBR
+from pyargcbr.configuration.configuration_parameters import SimilarityType, SimilarityEngine
+from pyargcbr.knowledge_resources.domain_case import DomainCase
+from pyargcbr.knowledge_resources.premise import Premise
+
+
+def reference_tversky_similarities(premises: Dict[int, Premise], candidate_cases: List[DomainCase],
+                                   alpha: float = 1.0, beta: float = 1.0) -> List[float]:
+    """The Tversky similarity counting the premises of the dicts of every
+    candidate, without a schema"""
+    common_at = [0.0] * len(candidate_cases)
+    different_at = [0.0] * len(candidate_cases)
+    distinct_at = [0.0] * len(candidate_cases)
+    for premise in premises.values():
+        distances = []
+        for candidate in candidate_cases:
+            candidate_premise = candidate.problem.context.premises.get(premise.id)
+            distances.append(None if candidate_premise is None
+                             else sim_algs.typed_dist(premise.typed_content, candidate_premise.typed_content))
+        max_dist = max([1.0 if distance is None else distance for distance in distances] + [0.0])
+        if max_dist == 0:
+            continue
+        for index, distance in enumerate(distances):
+            if distance is not None and distance / max_dist < 0.05:
+                common_at[index] += 1
+            else:
+                different_at[index] += 1
+    for index, candidate in enumerate(candidate_cases):
+        distinct_at[index] = len([premise_id for premise_id in candidate.problem.context.premises
+                                  if premise_id not in premises])
+    return [common / (common + alpha * different + beta * distinct)
+            for common, different, distinct in zip(common_at, different_at, distinct_at)]
+
+
+class TestTverskyFeatures:
+    cbr: DomainCBR = None
+
+    @pytest.fixture
+    def domain_cbr_setup(self):
+        file = os.path.abspath("tests/domain_cases_py.dat")
+        self.cbr = DomainCBR(file, "/tmp/null", -1)
+
+    def test_features(self, domain_cbr_setup):
+        for a_case in self.cbr.get_all_cases_list():
+            premises = a_case.problem.context.premises
+            features = a_case.get_features()
+            assert features.premise_ids == set(premises)
+            assert features.values == {(premise.id, premise.content) for premise in premises.values()}
+
+    def test_same_results_as_reference(self, domain_cbr_setup):
+        cases = self.cbr.get_all_cases_list()
+        for a_case in cases:
+            premises = a_case.problem.context.premises
+            for alpha, beta in ((1.0, 1.0), (0.5, 2.0), (1.0, 0.0)):
+                similarities = sim_algs.normalized_tversky_similarities(premises, cases, alpha=alpha, beta=beta)
+                assert similarities == reference_tversky_similarities(premises, cases, alpha, beta)
+
+    def test_weights_from_configuration(self, domain_cbr_setup, monkeypatch):
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(domain_cbr, "Configuration",
+                            lambda: Configuration(domain_cbrs_tversky_alpha=0.5, domain_cbrs_tversky_beta=2.0))
+        self.cbr.schema = PremiseSchema.infer(self.cbr.get_all_cases_list())
+        cases = self.cbr.get_all_cases_list()
+        for a_case in cases[::4]:
+            premises = a_case.problem.context.premises
+            expected_cases = sim_algs.normalized_tversky_similarity(premises, cases, schema=self.cbr.schema,
+                                                                    alpha=0.5, beta=2.0)
+            for engine in SimilarityEngine:
+                similar_cases = self.cbr.get_most_similar(premises, 0.0, SimilarityType.NORMALIZED_TVERSKY, engine)
+                assert [(id(c.case), c.similarity) for c in similar_cases] == \
+                    [(id(c.case), c.similarity) for c in expected_cases]
+
+    def test_features_updated_when_added(self, domain_cbr_setup):
+        new_case = deepcopy(self.cbr.get_all_cases_list()[0])
+        new_case.get_features()  # Built before its premises change
+        new_case.problem.context.premises[0].content = "999999"
+        assert (0, "999999") not in new_case.get_features().values
+        assert self.cbr.add_case(new_case)
+        assert (0, "999999") in new_case.get_features().values
+        similar_cases = self.cbr.get_most_similar(new_case.problem.context.premises, 0.0,
+                                                  SimilarityType.NORMALIZED_TVERSKY)
+        assert similar_cases[0].case is new_case